@@ -0,0 +1,75 @@
+"""
+JSONコーデックのマイクロベンチマーク
+
+コードレビューAPIで最も大きいペイロードを通る3つの処理
+(リクエストボディの解析・モデル出力の解析・レスポンスの変換)について、
+標準ライブラリのjsonとcommon.json_codecの処理時間を比較します。
+
+実行方法:
+    PYTHONPATH=src python benchmarks/bench_json_codec.py
+"""
+import os
+import json
+import base64
+import timeit
+
+from common import json_codec
+
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), "..", "testdata")
+REPEAT = 200
+
+
+def _load_request_body() -> str:
+    sources = []
+    for name in sorted(os.listdir(TESTDATA_DIR)):
+        with open(os.path.join(TESTDATA_DIR, name), "rb") as f:
+            sources.append(f.read())
+    source_base64 = base64.b64encode(b"\n".join(sources) * 4).decode("ascii")
+    return json.dumps({"source_base64": source_base64, "language": "C#"})
+
+
+def _create_review_result() -> dict:
+    return {
+        "review_result": "NG",
+        "review_points": [
+            {
+                "location": f"Method{index}",
+                "codeline": index * 10,
+                "category": "Readability",
+                "overview": "変数名が処理内容を表していません。",
+                "details": "変数名 a, b, c, d からは値の意味が読み取れません。" * 8,
+                "suggestion": "意味のある名前に変更しましょう。\n\nint firstOctet = ...;\n" * 4,
+            }
+            for index in range(40)
+        ],
+    }
+
+
+def _measure(label: str, stdlib_func, codec_func):
+    stdlib_seconds = timeit.timeit(stdlib_func, number=REPEAT)
+    codec_seconds = timeit.timeit(codec_func, number=REPEAT)
+    print(
+        f"{label:<24} json: {stdlib_seconds / REPEAT * 1e6:9.1f}us  "
+        f"{json_codec.codec_name()}: {codec_seconds / REPEAT * 1e6:9.1f}us  "
+        f"x{stdlib_seconds / codec_seconds:.1f}"
+    )
+
+
+def main():
+    request_body = _load_request_body()
+    review_result = _create_review_result()
+    model_text = json.dumps(review_result, ensure_ascii=False)
+
+    print(f"request body: {len(request_body)} chars / model output: {len(model_text)} chars")
+    _measure("request body loads", lambda: json.loads(request_body), lambda: json_codec.loads(request_body))
+    _measure("model output loads", lambda: json.loads(model_text), lambda: json_codec.loads(model_text))
+    _measure(
+        "response dumps",
+        lambda: json.dumps(review_result, ensure_ascii=False),
+        lambda: json_codec.dumps(review_result),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+レスポンス形式のベンチマーク
+
+従来のレスポンス形式(prompt.RESPONSE_FORMAT)と短縮形式(compact_schema.CompactResponseSchema)について、
+testdata/ のソースコードをレビューした場合の出力トークン数と処理時間を比較します。
+
+既定ではBedrockを呼び出さず、同じ指摘事項を両方の形式で出力した場合の推定トークン数と
+展開処理の時間を比較します。--bedrock を指定すると実際にBedrockを呼び出し、
+レスポンスのusage.outputTokensと応答時間を比較します(AWSの認証情報が必要です)。
+
+実行方法:
+    PYTHONPATH=src python benchmarks/bench_response_schema.py
+    PYTHONPATH=src python benchmarks/bench_response_schema.py --bedrock --model-id <モデルID>
+"""
+import os
+import json
+import time
+import timeit
+import argparse
+import statistics
+
+from code_review.compact_schema import COMPACT_POINT_KEYS, CompactResponseSchema
+from code_review.prompt import CodeReviewPrompt
+from code_review.rules import CodingRulesBuilder, CodingRulesFromFile
+from code_review.tokens import estimate_tokens
+
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), "..", "testdata")
+RULES_FILE = os.path.join(os.path.dirname(__file__), "..", "rules.json")
+LANGUAGES = {".cs": "C#", ".ts": "TypeScript", ".py": "Python"}
+REPEAT = 200
+
+
+def _load_testdata():
+    for name in sorted(os.listdir(TESTDATA_DIR)):
+        with open(os.path.join(TESTDATA_DIR, name), encoding="utf-8") as f:
+            yield name, LANGUAGES.get(os.path.splitext(name)[1], "C#"), f.read()
+
+
+def _create_review_result(source_code: str, categories) -> dict:
+    """ソースコードの行数に応じた件数の指摘事項(20行に1件)を作成する"""
+    line_count = source_code.count("\n") + 1
+    return {
+        "review_result": "NG",
+        "review_points": [
+            {
+                "location": f"Method{index}",
+                "codeline": index * 20 + 1,
+                "category": categories[index % len(categories)],
+                "overview": "変数名が処理内容を表していません。",
+                "details": "変数名 a, b, c からは値の意味が読み取れません。処理内容を表す名前にすることで可読性が向上します。",
+                "suggestion": "意味のある名前に変更しましょう。\nint firstOctet = ...;",
+            }
+            for index in range(max(1, line_count // 20))
+        ],
+    }
+
+
+def _to_compact(review_result: dict, categories, include_suggestion: bool) -> dict:
+    """指摘事項を短縮形式で出力した場合のJSONを作成する"""
+    keys = {key: short_key for short_key, key in COMPACT_POINT_KEYS.items()}
+    points = []
+    for point in review_result["review_points"]:
+        compact_point = {keys[key]: value for key, value in point.items() if include_suggestion or key != "suggestion"}
+        compact_point["c"] = categories.index(point["category"]) + 1
+        points.append(compact_point)
+    return {"r": review_result["review_result"], "p": points}
+
+
+def run_offline(coding_rules):
+    categories = coding_rules.categories
+    print(f"{'file':<14} {'prompt(full)':>13} {'prompt(compact)':>16} {'output(full)':>13} "
+          f"{'output(compact)':>16} {'output(no-s)':>13} {'expand':>9}")
+    for name, language, source_code in _load_testdata():
+        review_result = _create_review_result(source_code, categories)
+        full_text = json.dumps(review_result, ensure_ascii=False)
+        compact_result = _to_compact(review_result, categories, include_suggestion=True)
+        compact_text = json.dumps(compact_result, ensure_ascii=False, separators=(",", ":"))
+        no_suggestion_text = json.dumps(
+            _to_compact(review_result, categories, include_suggestion=False), ensure_ascii=False, separators=(",", ":")
+        )
+
+        schema = CompactResponseSchema()
+        full_prompt = CodeReviewPrompt(source_code, language, coding_rules).create_system_prompt()
+        compact_prompt = CodeReviewPrompt(source_code, language, coding_rules, response_schema=schema).create_system_prompt()
+        expand_seconds = timeit.timeit(lambda: schema.expand(compact_result, coding_rules), number=REPEAT) / REPEAT
+
+        print(
+            f"{name:<14} {estimate_tokens(full_prompt):>13} {estimate_tokens(compact_prompt):>16} "
+            f"{estimate_tokens(full_text):>13} {estimate_tokens(compact_text):>16} "
+            f"{estimate_tokens(no_suggestion_text):>13} {expand_seconds * 1e6:>7.1f}us"
+        )
+
+
+def run_bedrock(coding_rules, model_id: str, repeat: int, max_tokens: int):
+    import boto3
+
+    client = boto3.client("bedrock-runtime")
+    schemas = {
+        "full": None,
+        "compact": CompactResponseSchema(),
+        "compact(no-s)": CompactResponseSchema(include_suggestion=False),
+    }
+    print(f"{'file':<14} {'schema':<14} {'outputTokens':>13} {'seconds':>8}")
+    for name, language, source_code in _load_testdata():
+        for label, schema in schemas.items():
+            output_tokens, seconds = [], []
+            for _ in range(repeat):
+                prompt = CodeReviewPrompt(source_code, language, coding_rules, response_schema=schema)
+                started = time.perf_counter()
+                response = client.converse(
+                    modelId=model_id,
+                    messages=[{"role": "user", "content": [{"text": prompt.create_user_prompt()}]}],
+                    system=[{"text": prompt.create_system_prompt()}],
+                    inferenceConfig={"maxTokens": max_tokens, "temperature": 0.0},
+                )
+                seconds.append(time.perf_counter() - started)
+                output_tokens.append(response["usage"]["outputTokens"])
+            print(f"{name:<14} {label:<14} {statistics.median(output_tokens):>13.0f} {statistics.median(seconds):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="レスポンス形式ごとの出力トークン数と処理時間を比較します。")
+    parser.add_argument("--bedrock", action="store_true", help="実際にBedrockを呼び出して比較する")
+    parser.add_argument("--model-id", help="BedrockのモデルID(--bedrock指定時は必須)")
+    parser.add_argument("--repeat", type=int, default=3, help="Bedrockの呼び出し回数(中央値を表示)")
+    parser.add_argument("--max-tokens", type=int, default=4096, help="BedrockのmaxTokens")
+    args = parser.parse_args()
+
+    coding_rules = CodingRulesBuilder(CodingRulesFromFile(RULES_FILE)).add_all_rules().build()
+    if args.bedrock:
+        if not args.model_id:
+            parser.error("--bedrock には --model-id が必要です")
+        run_bedrock(coding_rules, args.model_id, args.repeat, args.max_tokens)
+    else:
+        run_offline(coding_rules)
+
+
+if __name__ == "__main__":
+    main()
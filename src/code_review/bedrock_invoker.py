@@ -0,0 +1,141 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+from common.deadline import Deadline
+from common.exception import Boto3Exception, DeadlineExceededError
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# 再試行すれば成功する可能性のあるBedrockのエラーコード
+RETRYABLE_ERROR_CODES = frozenset([
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+])
+
+OPERATION_NAME = "bedrock:Converse"
+
+# クライアントを使い回すための読み込みタイムアウト(秒)の区分
+READ_TIMEOUT_BUCKETS = (1, 2, 3, 5, 8, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 900)
+
+
+def read_timeout_bucket(read_timeout: int) -> int:
+    """
+    読み込みタイムアウトを、クライアントを使い回せる区分に切り下げる
+    期限を超えないよう切り上げは行いません。区分を超える値は最大の区分とします。
+    """
+    return max([bucket for bucket in READ_TIMEOUT_BUCKETS if bucket <= read_timeout] or [READ_TIMEOUT_BUCKETS[0]])
+
+
+@dataclass(frozen=True)
+class InvokerConfig:
+    # 1回の呼び出しの最大試行回数
+    max_attempts: int = 3
+
+    # 再試行までの待ち時間(秒)。試行ごとに2倍にする
+    backoff_seconds: float = 0.5
+
+    # 最初のトークンが返るまでの見込み時間(秒)
+    first_token_seconds: float = 2.0
+
+    # 1秒あたりの出力トークン数の見込み
+    output_tokens_per_second: float = 50.0
+
+    # レビュー結果として意味のある最小の出力トークン数。これを出力できない残り時間では呼び出さない
+    min_output_tokens: int = 256
+
+    @property
+    def min_call_seconds(self) -> float:
+        """最小の出力トークン数を出力するのに必要な秒数"""
+        return self.first_token_seconds + self.min_output_tokens / self.output_tokens_per_second
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "InvokerConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+        return cls(
+            max_attempts=int(config.get("MaxAttempts", defaults.max_attempts)),
+            backoff_seconds=float(config.get("BackoffSeconds", defaults.backoff_seconds)),
+            first_token_seconds=float(config.get("FirstTokenSeconds", defaults.first_token_seconds)),
+            output_tokens_per_second=float(config.get("OutputTokensPerSecond", defaults.output_tokens_per_second)),
+            min_output_tokens=int(config.get("MinOutputTokens", defaults.min_output_tokens)),
+        )
+
+
+class BedrockInvoker:
+    """
+    処理の期限に合わせてBedrockのConverse APIを呼び出すクラス
+    呼び出しごとに残り時間を読み込みタイムアウトとしたクライアントを使い、出力しきれない maxTokens は縮めます。
+    再試行はbotocoreに任せず自前で行い、期限までに終えられない再試行は行いません。
+    """
+    def __init__(
+        self,
+        client_factory: Callable[[int], "BedrockRuntime"],
+        config: Optional[InvokerConfig] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        # 読み込みタイムアウト(秒)を受け取り、botocoreの再試行を無効にしたクライアントを返す
+        self.client_factory = client_factory
+        self.config = config or InvokerConfig()
+        self.sleep = sleep
+
+    def converse(self, request: Dict[str, Any], deadline: Deadline) -> Dict[str, Any]:
+        """
+        期限内にConverse APIを呼び出す
+        Args:
+            request: Converse APIのパラメータ
+            deadline: 処理の期限
+        Returns:
+            Converse APIのレスポンス
+        Raises:
+            DeadlineExceededError: 期限までに呼び出しを完了できない場合
+            Boto3Exception: Bedrockがエラーを返した場合
+        """
+        last_error = None
+        for attempt in range(max(1, self.config.max_attempts)):
+            if attempt:
+                backoff_seconds = self.config.backoff_seconds * 2 ** (attempt - 1)
+                if not deadline.has_time_for(backoff_seconds + self.config.min_call_seconds):
+                    logger.warning(f"期限までに再試行を完了できないため打ち切ります attempt={attempt}")
+                    break
+                self.sleep(backoff_seconds)
+
+            deadline.check(OPERATION_NAME, self.config.min_call_seconds)
+            remaining_seconds = deadline.remaining_seconds()
+            max_tokens = self._affordable_max_tokens(request["inferenceConfig"]["maxTokens"], remaining_seconds)
+            call_request = {**request, "inferenceConfig": {**request["inferenceConfig"], "maxTokens": max_tokens}}
+            client = self.client_factory(max(1, int(remaining_seconds)))
+
+            try:
+                response = client.converse(**call_request)
+            except ReadTimeoutError as error:
+                raise DeadlineExceededError.timed_out(OPERATION_NAME) from error
+            except ClientError as error:
+                if error.response.get("Error", {}).get("Code") not in RETRYABLE_ERROR_CODES:
+                    raise Boto3Exception(service="bedrock") from error
+                logger.warning(f"Bedrockの呼び出しに失敗しました attempt={attempt + 1} error={error}")
+                last_error = error
+                continue
+
+            # --- 縮めたmaxTokensで出力が打ち切られた結果は使えない ---
+            if response.get("stopReason") == "max_tokens" and max_tokens < request["inferenceConfig"]["maxTokens"]:
+                raise DeadlineExceededError.timed_out(OPERATION_NAME)
+            return response
+
+        raise Boto3Exception(service="bedrock") from last_error
+
+    def _affordable_max_tokens(self, max_tokens: int, remaining_seconds: float) -> int:
+        """残り時間で出力できるトークン数までmaxTokensを縮める"""
+        affordable = int((remaining_seconds - self.config.first_token_seconds) * self.config.output_tokens_per_second)
+        if affordable < max_tokens:
+            logger.info(f"残り時間に合わせてmaxTokensを縮めます {max_tokens} -> {affordable}")
+            return affordable
+        return max_tokens
@@ -0,0 +1,231 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from code_review.bedrock_invoker import RETRYABLE_ERROR_CODES
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+@dataclass(frozen=True)
+class BedrockEndpoint:
+    # 接続先の名前(SSMパラメータ bedrock/Endpoints/<名前>/...)
+    name: str
+
+    # リージョン
+    region: str
+
+    # このリージョンで使うモデルID・推論プロファイル(未指定の場合はリクエストのモデルIDをそのまま使う)
+    model_id: Optional[str] = None
+
+    # 振り分けの重み
+    weight: float = 1.0
+
+    @classmethod
+    def from_config(cls, bedrock_config: Dict[str, Any]) -> List["BedrockEndpoint"]:
+        """SSMから読み込んだbedrockの設定の Endpoints から、接続先の一覧を生成する(名前順)"""
+        endpoints = []
+        for name, endpoint_config in sorted(bedrock_config.get("Endpoints", {}).items()):
+            endpoints.append(cls(
+                name=name,
+                region=endpoint_config["Region"],
+                model_id=endpoint_config.get("ModelId") or None,
+                weight=float(endpoint_config.get("Weight", 1.0)),
+            ))
+        return endpoints
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    # 切り離すまでの連続失敗回数
+    failure_threshold: int = 1
+
+    # 最初に切り離す時間(秒)。連続して切り離すごとに2倍にする
+    ejection_seconds: float = 10.0
+
+    # 切り離す時間の上限(秒)
+    max_ejection_seconds: float = 120.0
+
+    # 接続先ごとの統計をログに出力する間隔(秒)
+    log_interval_seconds: float = 60.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PoolConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+        return cls(
+            failure_threshold=int(config.get("FailureThreshold", defaults.failure_threshold)),
+            ejection_seconds=float(config.get("EjectionSeconds", defaults.ejection_seconds)),
+            max_ejection_seconds=float(config.get("MaxEjectionSeconds", defaults.max_ejection_seconds)),
+            log_interval_seconds=float(config.get("LogIntervalSeconds", defaults.log_interval_seconds)),
+        )
+
+
+class EndpointState:
+    """接続先ごとの処理中のリクエスト数・統計・切り離しの状態"""
+    def __init__(self, endpoint: BedrockEndpoint):
+        self.endpoint = endpoint
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttles = 0
+        self.total_latency = 0.0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def load(self) -> float:
+        """重み付きの負荷(処理中のリクエスト数 / 重み)"""
+        return (self.outstanding + 1) / self.endpoint.weight
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        succeeded = self.requests - self.errors
+        return {
+            "region": self.endpoint.region,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttles": self.throttles,
+            "average_latency": round(self.total_latency / succeeded, 3) if succeeded else 0.0,
+            "ejected": not self.is_available(now),
+        }
+
+
+class BedrockClientPool:
+    """
+    複数のリージョン(推論プロファイル)のBedrockクライアントにリクエストを振り分けるクラス
+    bedrock-runtimeクライアントと同じく converse(**request) で呼び出せます。
+    切り離されていない接続先のうち、重み付きの処理中リクエスト数が最も少ない接続先を選び、
+    スロットリングやサーバーエラーが続いた接続先は一定時間切り離して、別の接続先で再試行します。
+    切り離した接続先は時間の経過で自動的に振り分け対象に戻ります。
+    """
+    def __init__(
+        self,
+        endpoints: List[BedrockEndpoint],
+        client_factory: Callable[[str], "BedrockRuntime"],
+        model_id: Optional[str] = None,
+        config: Optional[PoolConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not endpoints:
+            raise ValueError("'endpoints' must not be empty")
+        self.client_factory = client_factory
+        # 接続先のモデルIDに置き換える対象のモデルID(未指定の場合はすべてのリクエスト)
+        self.model_id = model_id
+        self.config = config or PoolConfig()
+        self.clock = clock
+        self._states = [EndpointState(endpoint) for endpoint in endpoints]
+        self._clients: Dict[str, "BedrockRuntime"] = {}
+        self._lock = threading.Lock()
+        self._logged_at = clock()
+
+    def with_clients(self, client_factory: Callable[[str], "BedrockRuntime"]) -> "BedrockClientPool":
+        """接続先の状態を共有したまま、クライアントの生成方法(タイムアウト等)だけが異なるプールを作る"""
+        pool = BedrockClientPool.__new__(BedrockClientPool)
+        pool.__dict__.update(self.__dict__)
+        pool.client_factory = client_factory
+        pool._clients = {}
+        return pool
+
+    @property
+    def endpoints(self) -> List[BedrockEndpoint]:
+        return [state.endpoint for state in self._states]
+
+    def converse(self, **request) -> Dict[str, Any]:
+        """
+        接続先を選んでConverse APIを呼び出す
+        Raises:
+            ClientError: すべての接続先で再試行できるエラーとなった場合や、再試行できないエラーの場合
+        """
+        tried = set()
+        while True:
+            state = self._acquire(tried)
+            tried.add(state.endpoint.name)
+            started = self.clock()
+            try:
+                response = self._client(state.endpoint.region).converse(**self._endpoint_request(state.endpoint, request))
+            except ClientError as error:
+                code = error.response.get("Error", {}).get("Code")
+                self._release(state, started, failed=True, throttled=code == "ThrottlingException",
+                              retryable=code in RETRYABLE_ERROR_CODES)
+                if code not in RETRYABLE_ERROR_CODES or len(tried) >= len(self._states):
+                    raise
+                logger.warning(f"Bedrockの呼び出しに失敗したため別の接続先で再試行します endpoint={state.endpoint.name} error={code}")
+                continue
+            except Exception:
+                # --- タイムアウト等は期限を超えないよう再試行せずに送出する ---
+                self._release(state, started, failed=True, retryable=True)
+                raise
+            self._release(state, started, failed=False)
+            return response
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """接続先ごとの統計"""
+        now = self.clock()
+        with self._lock:
+            return {state.endpoint.name: state.stats(now) for state in self._states}
+
+    def _acquire(self, tried: set) -> EndpointState:
+        """切り離されていない接続先のうち、重み付きの負荷が最も小さいものを選ぶ"""
+        now = self.clock()
+        with self._lock:
+            candidates = [state for state in self._states if state.endpoint.name not in tried]
+            available = [state for state in candidates if state.is_available(now)]
+            if available:
+                state = min(available, key=lambda state: state.load())
+            else:
+                # --- すべて切り離されている場合は最も早く戻る接続先を使う ---
+                state = min(candidates, key=lambda state: state.ejected_until)
+            state.outstanding += 1
+            state.requests += 1
+            return state
+
+    def _release(self, state: EndpointState, started: float, failed: bool, throttled: bool = False, retryable: bool = False):
+        now = self.clock()
+        with self._lock:
+            state.outstanding -= 1
+            if not failed:
+                state.total_latency += now - started
+                state.consecutive_failures = 0
+                state.ejections = 0
+                state.ejected_until = 0.0
+            else:
+                state.errors += 1
+                state.throttles += int(throttled)
+                if retryable:
+                    state.consecutive_failures += 1
+                    if state.consecutive_failures >= self.config.failure_threshold:
+                        self._eject(state, now)
+            log_stats = now - self._logged_at >= self.config.log_interval_seconds
+            if log_stats:
+                self._logged_at = now
+        if log_stats:
+            logger.info(f"Bedrockの接続先ごとの統計 {self.stats()}")
+
+    def _eject(self, state: EndpointState, now: float):
+        ejection_seconds = min(
+            self.config.max_ejection_seconds, self.config.ejection_seconds * 2 ** state.ejections
+        )
+        state.ejections += 1
+        state.consecutive_failures = 0
+        state.ejected_until = now + ejection_seconds
+        logger.warning(f"Bedrockの接続先を{ejection_seconds:.0f}秒間切り離します endpoint={state.endpoint.name}")
+
+    def _endpoint_request(self, endpoint: BedrockEndpoint, request: Dict[str, Any]) -> Dict[str, Any]:
+        if endpoint.model_id and (self.model_id is None or request.get("modelId") == self.model_id):
+            return {**request, "modelId": endpoint.model_id}
+        return request
+
+    def _client(self, region: str) -> "BedrockRuntime":
+        with self._lock:
+            if region not in self._clients:
+                self._clients[region] = self.client_factory(region)
+            return self._clients[region]
@@ -0,0 +1,250 @@
+import re
+import bisect
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_review.static_check import IStaticCheck, LANGUAGE_SYNTAXES, mask_comments_and_strings, resolve_language
+
+
+# 重複コードのルールID(rules.json)
+DUPLICATED_CODE_RULE_ID = "duplicated-code"
+
+# 字句の取り出し(識別子・数値・記号1文字)
+_TOKEN = re.compile(r"[^\W\d]\w*|\d[\w.]*|[^\w\s]")
+
+# 正規化しない(構造を表す)予約語。C#・TypeScript・Pythonの主要なものを共通で扱う
+_KEYWORDS = frozenset([
+    "if", "else", "elif", "for", "foreach", "while", "do", "switch", "case", "default", "break", "continue",
+    "return", "yield", "try", "catch", "except", "finally", "throw", "raise", "new", "class", "def", "function",
+    "var", "let", "const", "public", "private", "protected", "internal", "static", "async", "await", "void",
+    "import", "from", "using", "in", "is", "not", "and", "or", "null", "None", "true", "false", "True", "False",
+    "this", "self", "lambda", "with", "as", "pass",
+])
+
+# ローリングハッシュの法と基数
+_HASH_MODULUS = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+def normalized_tokens(source_code: str, language: str) -> Tuple[List[str], List[int]]:
+    """
+    コメント・文字列を除いて字句に分け、識別子と数値を正規化する
+    Returns:
+        (正規化した字句, 字句ごとの行番号(1始まり))
+    """
+    syntax = LANGUAGE_SYNTAXES.get(resolve_language(language))
+    text = mask_comments_and_strings(source_code, syntax) if syntax else source_code
+    line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+    tokens, lines = [], []
+    for match in _TOKEN.finditer(text):
+        value = match.group(0)
+        if value[0].isdigit():
+            value = "NUM"
+        elif (value[0].isalpha() or value[0] == "_") and value not in _KEYWORDS:
+            value = "ID"
+        tokens.append(value)
+        lines.append(bisect.bisect_right(line_starts, match.start()))
+    return tokens, lines
+
+
+@dataclass(frozen=True)
+class CloneDetectorConfig:
+    # k-gramの長さ(トークン数)。これより短い一致は検出しない
+    kgram_tokens: int = 12
+
+    # winnowingの窓幅(k-gram数)。kgram_tokens + window - 1 トークン以上の一致は必ず検出される
+    window: int = 8
+
+    # 重複と見なす最小トークン数
+    min_tokens: int = 50
+
+    # 重複と見なす最小行数
+    min_lines: int = 4
+
+    # 報告する重複の最大件数
+    max_pairs: int = 20
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CloneDetectorConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+        return cls(
+            kgram_tokens=int(config.get("KgramTokens", defaults.kgram_tokens)),
+            window=int(config.get("Window", defaults.window)),
+            min_tokens=int(config.get("MinTokens", defaults.min_tokens)),
+            min_lines=int(config.get("MinLines", defaults.min_lines)),
+            max_pairs=int(config.get("MaxPairs", defaults.max_pairs)),
+        )
+
+
+@dataclass(frozen=True)
+class ClonePair:
+    # 先に現れる側の行範囲(1始まり、両端を含む)
+    first_start_line: int
+    first_end_line: int
+
+    # 後に現れる側の行範囲
+    second_start_line: int
+    second_end_line: int
+
+    # 一致したトークン数
+    token_count: int
+
+    def describe(self) -> str:
+        """プロンプトに含める1行の説明"""
+        return (
+            f"lines {self.first_start_line}-{self.first_end_line} and "
+            f"lines {self.second_start_line}-{self.second_end_line} ({self.token_count} tokens)"
+        )
+
+
+class CloneDetector:
+    """
+    ソースコード内の重複コード(変数名などが異なるだけのものを含む)を検出するクラス
+    トークンを正規化した上でk-gramのローリングハッシュをwinnowingで間引き、
+    同じ指紋が現れる位置の組を延長して重複範囲を求めます。計算量はトークン数に対してほぼ線形です。
+    """
+    def __init__(self, config: Optional[CloneDetectorConfig] = None):
+        self.config = config or CloneDetectorConfig()
+
+    def detect(self, source_code: str, language: str) -> List[ClonePair]:
+        """
+        重複コードを検出する
+        Args:
+            source_code: ソースコード文字列
+            language: プログラミング言語種別を表した文字列(未対応の言語はコメント等を除かずに扱う)
+        Returns:
+            重複範囲の組(一致トークン数の多い順)
+        """
+        tokens, lines = normalized_tokens(source_code, language)
+        k = self.config.kgram_tokens
+        if len(tokens) < max(k, self.config.min_tokens) + 1:
+            return []
+
+        # --- 指紋の選択(winnowing) ---
+        fingerprints = self._winnow(self._kgram_hashes(tokens, k), self.config.window)
+
+        # --- 同じ指紋が現れる位置を、位置の差(オフセット)ごとにまとめる ---
+        last_position: Dict[int, int] = {}
+        positions_by_offset: Dict[int, List[int]] = defaultdict(list)
+        for hash_value, position in fingerprints:
+            previous = last_position.get(hash_value)
+            if previous is not None:
+                positions_by_offset[position - previous].append(previous)
+            last_position[hash_value] = position
+
+        # --- 同じオフセットで連続する位置を1つの重複範囲に延長する ---
+        # 最小トークン数の重複には少なくともこの数の指紋が含まれるため、指紋の少ないオフセットは延長しない
+        min_fingerprints = max(1, (self.config.min_tokens - k + 1) // self.config.window)
+        clones: List[Tuple[int, int, int]] = []
+        for offset, positions in positions_by_offset.items():
+            if len(positions) < min_fingerprints:
+                continue
+            covered_until = 0
+            for start in positions:
+                if start < covered_until:
+                    continue
+                # 重複の先頭から最初の指紋までは高々 k + window トークン
+                lower_bound = max(covered_until, start - k - self.config.window)
+                first, length = self._extend(tokens, start, offset, lower_bound)
+                if length:
+                    clones.append((first, first + offset, length))
+                    covered_until = first + length
+
+        pairs = []
+        for first, second, length in sorted(clones, key=lambda clone: -clone[2]):
+            pair = ClonePair(
+                first_start_line=lines[first],
+                first_end_line=lines[first + length - 1],
+                second_start_line=lines[second],
+                second_end_line=lines[second + length - 1],
+                token_count=length,
+            )
+            if length < self.config.min_tokens or pair.first_end_line - pair.first_start_line + 1 < self.config.min_lines:
+                continue
+            if any(self._contains(existing, pair) for existing in pairs):
+                continue
+            pairs.append(pair)
+            if len(pairs) >= self.config.max_pairs:
+                break
+        return pairs
+
+    @staticmethod
+    def _kgram_hashes(tokens: List[str], k: int) -> List[int]:
+        """k-gramごとのローリングハッシュ値を求める"""
+        token_ids: Dict[str, int] = {}
+        values = [token_ids.setdefault(token, len(token_ids) + 1) for token in tokens]
+        highest = pow(_HASH_BASE, k - 1, _HASH_MODULUS)
+
+        hashes = []
+        current = 0
+        for index, value in enumerate(values):
+            if index >= k:
+                current = (current - values[index - k] * highest) % _HASH_MODULUS
+            current = (current * _HASH_BASE + value) % _HASH_MODULUS
+            if index >= k - 1:
+                hashes.append(current)
+        return hashes
+
+    @staticmethod
+    def _winnow(hashes: List[int], window: int) -> List[Tuple[int, int]]:
+        """窓ごとの最小ハッシュ値(同値なら右端)を指紋として選ぶ"""
+        fingerprints: List[Tuple[int, int]] = []
+        candidates: deque = deque()
+        for index, hash_value in enumerate(hashes):
+            while candidates and hashes[candidates[-1]] >= hash_value:
+                candidates.pop()
+            candidates.append(index)
+            if candidates[0] <= index - window:
+                candidates.popleft()
+            if index >= window - 1 and (not fingerprints or fingerprints[-1][1] != candidates[0]):
+                fingerprints.append((hashes[candidates[0]], candidates[0]))
+        return fingerprints
+
+    @staticmethod
+    def _extend(tokens: List[str], start: int, offset: int, lower_bound: int) -> Tuple[int, int]:
+        """一致位置から前後に一致を延長し、(開始位置, 長さ)を返す(2つの範囲が重ならない長さまで)"""
+        first = start
+        while first > lower_bound and tokens[first - 1] == tokens[first - 1 + offset]:
+            first -= 1
+        end = start
+        while end + offset < len(tokens) and end < first + offset and tokens[end] == tokens[end + offset]:
+            end += 1
+        return first, end - first
+
+    @staticmethod
+    def _contains(outer: ClonePair, inner: ClonePair) -> bool:
+        return (
+            outer.first_start_line <= inner.first_start_line and inner.first_end_line <= outer.first_end_line
+            and outer.second_start_line <= inner.second_start_line and inner.second_end_line <= outer.second_end_line
+        )
+
+
+class DuplicatedCodeCheck(IStaticCheck):
+    """重複コードのルールを、LLMを使わずにCloneDetectorの結果から指摘する"""
+    rule_id = DUPLICATED_CODE_RULE_ID
+
+    def __init__(self, detector: Optional[CloneDetector] = None):
+        self.detector = detector or CloneDetector()
+
+    def supports(self, language: str) -> bool:
+        # 字句の取り出しは言語に依存しないため、すべての言語を検査できる
+        return True
+
+    def check(self, source_code: str, language: str, rule: Dict[str, Optional[str]]) -> List[Dict]:
+        review_points = []
+        for pair in self.detector.detect(source_code, language):
+            review_points.append({
+                "location": f"{pair.second_start_line}-{pair.second_end_line}行目",
+                "codeline": pair.second_start_line,
+                "category": rule["category"],
+                "overview": "重複したコードがあります。",
+                "details": (
+                    f"{pair.second_start_line}行目から{pair.second_end_line}行目の処理が、"
+                    f"{pair.first_start_line}行目から{pair.first_end_line}行目と同じ構造({pair.token_count}トークン)で重複しています。"
+                ),
+                "suggestion": "共通の処理を関数やメソッドに抽出し、両方の箇所から呼び出すようにしてください。",
+            })
+        return review_points
@@ -1,16 +1,44 @@
 import os
-import json
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from code_review.rules import RuleProviderBase, CodingRulesBuilder, CodingRulesFromFile
-from code_review.prompt import CodeReviewPrompt
+from code_review.rules import RuleProviderBase, CodingRules, CodingRulesBuilder, CodingRulesFromFile
+from code_review.prompt import CodeReviewPrompt, REVIEW_TOOL_NAME
+from code_review.fingerprint import content_hash, review_key
+from code_review.normalizer import NormalizerConfig, SourceNormalizer
+from code_review.static_check import NonAsciiIdentifierCheck, StaticCheckEngine, cap_review_points, merge_review_points
+from code_review.clone_detect import DUPLICATED_CODE_RULE_ID, CloneDetector, CloneDetectorConfig, DuplicatedCodeCheck
+from code_review.token_meter import TokenMeter, TokenUsage, TokenUsageFromDynamoDB, sum_bedrock_usage
+from code_review.rate_limiter import TokenBucketFromDynamoDB, TokenRateLimiter
+from code_review.bedrock_invoker import BedrockInvoker, InvokerConfig, read_timeout_bucket
+from code_review.bedrock_pool import BedrockClientPool, BedrockEndpoint, PoolConfig
+from code_review.hedging import HedgedConverse, HedgingConfig
+from code_review.single_flight import LeaseFromDynamoDB, SingleFlight
+from code_review.units import SourceUnit, split_units, unit_key
+from code_review.project import ProjectConfig, ProjectReviewService
+from code_review.outline import REVIEW_MODE_OUTLINE, Outline, OutlineConfig, extract_outline
+from code_review.packing import PackedReviewPrompt, PackedSource, PackingConfig, pack, split_packed_result, split_usage
+from code_review.near_duplicate import (
+    NearDuplicateConfig, NearDuplicateFromDynamoDB, NearDuplicateIndex, ReusePlan,
+    extract_regions, index_scope, plan_reuse, restore_codelines,
+)
+from code_review.compact_schema import CompactResponseSchema
+from code_review.triage import VERDICT_NG, TriagePrompt, category_verdicts, parse_verdicts
+from code_review.tokens import estimate_tokens
+from code_review.result_store import IReviewResultRepository, ReviewResultFromDynamoDB, StoredReview
+from code_review.webhook import WebhookNotifier, WebhookQueueFromSQS, DeadLetterFromDynamoDB
+from common import json_codec
 from common.config import SsmConfigLoader
-from common.exception import Boto3Exception
+from common.deadline import Deadline
+from common.exception import Boto3Exception, QuotaExceededError
 
 
 logger = logging.getLogger(__name__)
@@ -48,71 +76,871 @@ class CodeReviewService:
         self,
         bedrock: "BedrockRuntime",
         model_config: CodeReviewModelConfig,
-        rule_provider: RuleProviderBase
+        rule_provider: RuleProviderBase,
+        result_store: Optional[IReviewResultRepository] = None,
+        normalizer: Optional[SourceNormalizer] = None,
+        static_checker: Optional[StaticCheckEngine] = None,
+        clone_detector: Optional[CloneDetector] = None,
+        token_meter: Optional[TokenMeter] = None,
+        rate_limiter: Optional[TokenRateLimiter] = None,
+        invoker: Optional[BedrockInvoker] = None,
+        response_schema: Optional[CompactResponseSchema] = None,
+        max_points: int = 0,
+        tool_use: bool = False,
+        triage_model: Optional[CodeReviewModelConfig] = None,
+        triage_parallel: bool = False,
+        hedger: Optional[HedgedConverse] = None,
+        single_flight: Optional[SingleFlight] = None,
+        near_duplicates: Optional[NearDuplicateIndex] = None,
+        unit_memo: bool = False,
+        outline: Optional[OutlineConfig] = None,
+        packing: Optional[PackingConfig] = None,
     ):
         self.bedrock = bedrock
         self.model_config = model_config
         self.rule_provider = rule_provider
+        self.result_store = result_store
+        self.normalizer = normalizer
+        self.static_checker = static_checker
+        self.clone_detector = clone_detector
+        self.token_meter = token_meter
+        self.rate_limiter = rate_limiter
+        self.invoker = invoker
+        self.response_schema = response_schema
+        # 指摘事項の上限件数の既定値(0の場合は上限なし)
+        self.max_points = max_points
+        # Trueの場合は構造化出力(Tool use)でレビュー結果を受け取る
+        self.tool_use = tool_use
+        # 構造化出力に対応していなかったモデル(以降はテキストの出力形式を使う)
+        self._models_without_tool_use: Set[str] = set()
+        # 指定した場合は高速なモデルでカテゴリごとに一次判定し、NGのカテゴリだけを詳細レビューする
+        self.triage_model = triage_model
+        # Trueの場合はNGのカテゴリごとに詳細レビューを並列に依頼する
+        self.triage_parallel = triage_parallel
+        # 指定した場合は応答の遅い呼び出しに同じリクエストを追加で送り、先に返った応答を使う
+        self.hedger = hedger
+        # 指定した場合は同時に依頼された同じレビューのBedrockの呼び出しを1回にまとめる
+        self.single_flight = single_flight
+        # 指定した場合は近似重複の提出の指摘事項を流用し、変更された行だけをレビューする
+        self.near_duplicates = near_duplicates
+        # Trueの場合は関数・クラスの単位ごとにレビュー結果を保存し、保存されていない単位だけをレビューする
+        self.unit_memo = unit_memo
+        # 指定した場合は閾値を超える大きなソースコードをアウトラインにして、構造についてのレビューを行う
+        self.outline = outline
+        # 指定した場合は excute_reviews で小さなソースコードを言語ごとにまとめ、1回の呼び出しでレビューする
+        self.packing = packing
 
-    def excute_review(self, source_code: str, language: str) -> Dict:
+    def excute_review(
+        self,
+        source_code: str,
+        language: str,
+        api_key_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        max_points: Optional[int] = None,
+        related_files: str = "",
+    ) -> Dict:
         """
         コードレビューを実行する
         Args:
             source_code: ソースコード文字列
             language: プログラミング言語種別を表した文字列
+            api_key_id: リクエストに使用されたAPIキーのID(トークン使用量の集計単位)
+            deadline: 処理の期限(Lambdaの残り実行時間)。指定しない場合はBedrockの呼び出しを期限で打ち切らない
+            max_points: 指摘事項の上限件数。サービスの既定値より大きい場合は既定値を上限とする
+            related_files: 同じプロジェクトの関連ファイルの要約(プロジェクトのレビューで使用)。結果に影響するためキーに含める
         Returns:
             コードレビュー結果(JSON形式)
             フォーマットはprompt.RESPONSE_FORMATを参照してください。
+        Raises:
+            QuotaExceededError: 1日あたりのトークン予算を超える場合
+            CapacityExceededError: Bedrockの1分あたりのトークン数の上限に達している場合
+            DeadlineExceededError: 期限までにBedrockの呼び出しを完了できない場合
         """
 
         # --- コーディングルール定義オブジェクト生成 ---
         coding_rules = CodingRulesBuilder(self.rule_provider).add_all_rules().build()
 
+        # --- 指摘事項の上限件数(リクエストの指定とサービスの既定値の小さい方) ---
+        points_limit = self._points_limit(max_points)
+
+        # --- 大きなソースコードはアウトラインでレビューする(作成できた場合だけ、結果のキーにも含める) ---
+        outline = self._build_outline(source_code, language)
+
+        # --- 保存済みのレビュー結果があれば再利用する ---
+        source_hash, result_key, scope = self._review_keys(
+            source_code, language, coding_rules, points_limit, related_files, outline=outline is not None
+        )
+        stored_review = self._find_stored_review(result_key)
+        if stored_review:
+            logger.info(f"保存済みのレビュー結果を返します key={result_key}")
+            return stored_review.result
+
+        # --- 同時に依頼された同じレビューは1回の実行にまとめる(利用枠の超過はAPIキーごとのため、待っていた依頼は実行し直す) ---
+        if self.single_flight:
+            return self.single_flight.run(
+                result_key,
+                lambda: self._execute_review(
+                    source_code, language, coding_rules, source_hash, result_key, scope, points_limit, api_key_id, deadline,
+                    related_files, outline,
+                ),
+                lambda: self._find_stored_result(result_key),
+                deadline,
+                rerun_on=(QuotaExceededError,),
+            )
+        return self._execute_review(
+            source_code, language, coding_rules, source_hash, result_key, scope, points_limit, api_key_id, deadline,
+            related_files, outline,
+        )
+
+    def is_review_stored(self, source_code: str, language: str, max_points: Optional[int] = None) -> bool:
+        """
+        excute_review と同じ引数のレビュー結果が保存済みか確認する(事前投入のジョブで使用)
+        Returns:
+            保存済みの場合はTrue。保存先が設定されていない場合は常にFalse
+        """
+        coding_rules = CodingRulesBuilder(self.rule_provider).add_all_rules().build()
+        _, result_key, _ = self._review_keys(
+            source_code, language, coding_rules, self._points_limit(max_points),
+            outline=self._build_outline(source_code, language) is not None,
+        )
+        return self._find_stored_review(result_key) is not None
+
+    def excute_reviews(
+        self,
+        sources: Sequence[Tuple[str, str]],
+        api_key_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        max_points: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        複数のソースコードのコードレビューを実行する(事前投入などのバッチ処理で使用)
+        packing が設定されている場合は、保存済みの結果がない小さなソースコードを言語ごとにまとめ、1回のBedrockの呼び出しでレビューします。
+        まとめる対象でないソースコード・まとめたレビューの出力から結果を取り出せなかったソースコードは excute_review で個別にレビューします。
+        Args:
+            sources: (ソースコード文字列, プログラミング言語種別) の一覧
+            api_key_id: リクエストに使用されたAPIキーのID(トークン使用量の集計単位)
+            deadline: 処理の期限。指定しない場合はBedrockの呼び出しを期限で打ち切らない
+            max_points: ソースコードごとの指摘事項の上限件数
+        Returns:
+            ソースコードごとのコードレビュー結果(sources と同じ順)
+        Raises:
+            excute_review と同じ
+        """
+        results: List[Optional[Dict]] = [None] * len(sources)
+
+        # --- 一次判定を行う場合はカテゴリごとの判定を結果に含めるため、まとめない ---
+        if self.packing and not self.triage_model:
+            coding_rules = CodingRulesBuilder(self.rule_provider).add_all_rules().build()
+            points_limit = self._points_limit(max_points)
+
+            # --- 保存済みの結果がない小さなソースコードを言語ごとに集める ---
+            candidates: Dict[str, List[int]] = {}
+            for index, (source_code, language) in enumerate(sources):
+                if estimate_tokens(source_code) > self.packing.max_source_tokens or self._build_outline(source_code, language):
+                    continue
+                _, result_key, _ = self._review_keys(source_code, language, coding_rules, points_limit)
+                results[index] = self._find_stored_result(result_key)
+                if results[index] is None:
+                    candidates.setdefault(language, []).append(index)
+
+            for language, indices in candidates.items():
+                for group in pack([estimate_tokens(sources[index][0]) for index in indices], self.packing):
+                    group_indices = [indices[position] for position in group]
+                    if len(group_indices) < 2:
+                        continue
+                    packed_results = self._review_packed(
+                        [sources[index][0] for index in group_indices],
+                        language, coding_rules, points_limit, api_key_id, deadline,
+                    )
+                    for index, result in zip(group_indices, packed_results):
+                        results[index] = result
+
+        # --- まとめてレビューしなかったもの・結果を取り出せなかったものは個別にレビューする ---
+        return [
+            result if result is not None else self.excute_review(source_code, language, api_key_id, deadline, max_points)
+            for (source_code, language), result in zip(sources, results)
+        ]
+
+    def _points_limit(self, max_points: Optional[int]) -> int:
+        return min([limit for limit in (max_points, self.max_points) if limit and limit > 0], default=0)
+
+    def _review_keys(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        points_limit: int,
+        related_files: str = "",
+        outline: bool = False,
+    ) -> Tuple[str, str, str]:
+        """
+        レビュー対象のハッシュ値・レビュー結果のキー・近似重複の検索範囲を求める
+        Args:
+            outline: アウトラインでレビューするか(_build_outline でアウトラインを作成できた場合だけTrue)
+        """
+        source_hash = content_hash(source_code, language)
+        options = []
+        if points_limit:
+            options.append(f"max_points={points_limit}")
+        if self.triage_model:
+            options.append(f"triage={self.triage_model.model_id}")
+        if outline:
+            options.append(f"outline={self.outline.threshold_tokens}")
+        if related_files:
+            options.append(f"related={hashlib.sha256(related_files.encode('utf-8')).hexdigest()[:16]}")
+        result_key = review_key(source_hash, coding_rules.version, self.model_config.model_id, options=",".join(options))
+        scope = index_scope(language, coding_rules.version, self.model_config.model_id, options=",".join(options))
+        return source_hash, result_key, scope
+
+    def _build_outline(self, source_code: str, language: str) -> Optional[Outline]:
+        """
+        アウトラインでレビューするかを判定し、アウトラインを作成する
+        閾値を超える大きなソースコードでも、アウトラインを作成できない場合(未対応の言語など)は全体をレビューします。
+        Returns:
+            アウトライン(アウトラインでレビューしない場合はNone)
+        """
+        if not self.outline or estimate_tokens(source_code) <= self.outline.threshold_tokens:
+            return None
+        outline = extract_outline(source_code, language, self.outline)
+        if outline is None:
+            logger.info("アウトラインを作成できないため、ソースコード全体をレビューします")
+        return outline
+
+    def _execute_review(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        source_hash: str,
+        result_key: str,
+        scope: str,
+        points_limit: int,
+        api_key_id: Optional[str],
+        deadline: Optional[Deadline],
+        related_files: str = "",
+        outline: Optional[Outline] = None,
+    ) -> Dict:
+        """
+        保存済みの結果がない場合のレビュー(ローカル検査・LLMによるレビュー・結果の保存)
+        Args:
+            outline: アウトラインでレビューする場合のアウトライン(_build_outline で作成したもの)
+        """
+        # --- 機械的に判定できるルールはローカルで検査し、プロンプトから除外する ---
+        local_review_points, prompt_rules = self._check_locally(source_code, language, coding_rules)
+
+        # --- LLMによるレビュー(LLMで確認するルールがない場合は実行しない) ---
+        usage = {}
+        if prompt_rules.total_count and outline:
+            # --- 大きなソースコードはアウトラインだけを送り、構造についてレビューする ---
+            logger.info(
+                f"アウトラインでレビューします 推定トークン数:{estimate_tokens(source_code)} -> {estimate_tokens(outline.text)}"
+            )
+            review_result, usage = self._review_with_llm(
+                outline.text, language, prompt_rules, points_limit, api_key_id, deadline, related_files, outline=True
+            )
+            review_result["review_points"] = restore_codelines(review_result.get("review_points") or [], outline.line_numbers)
+            review_result["review_mode"] = REVIEW_MODE_OUTLINE
+        elif prompt_rules.total_count:
+            # --- 近似重複の提出があれば指摘事項を流用し、変更された行だけをレビューする ---
+            plan = self._plan_reuse(scope, source_code, language)
+            if plan is None and self.unit_memo and self.result_store:
+                review_result, usage = self._review_by_units(
+                    source_code, language, prompt_rules, coding_rules.version, scope, points_limit, api_key_id, deadline,
+                    related_files,
+                )
+            elif plan is None:
+                review_result, usage = self._review_with_llm(
+                    source_code, language, prompt_rules, points_limit, api_key_id, deadline, related_files
+                )
+            else:
+                review_result = {"review_result": "OK", "review_points": []}
+                if plan.regions:
+                    partial_source, line_numbers = extract_regions(source_code, plan.regions)
+                    review_result, usage = self._review_with_llm(
+                        partial_source, language, prompt_rules, points_limit, api_key_id, deadline, related_files
+                    )
+                    review_result["review_points"] = restore_codelines(review_result.get("review_points") or [], line_numbers)
+                merge_review_points(review_result, plan.review_points)
+
+            if self.near_duplicates and not review_result.get("answered_model_id"):
+                self.near_duplicates.add(scope, result_key, source_code, language, review_result.get("review_points") or [])
+        else:
+            review_result = {"review_result": "OK", "review_points": []}
+            if self.triage_model:
+                # すべてのルールをローカルで検査した場合も、カテゴリごとの判定を返す
+                review_result["triage_verdicts"] = {}
+
+        return self._finish_review(
+            review_result, local_review_points, points_limit, source_hash, result_key, coding_rules, usage
+        )
+
+    def _check_locally(self, source_code: str, language: str, coding_rules: CodingRules) -> Tuple[List[Dict], CodingRules]:
+        """
+        機械的に判定できるルールをローカルで検査する
+        Returns:
+            (ローカル検査の指摘事項, LLMで確認するルール)
+        """
+        if not self.static_checker:
+            return [], coding_rules
+        local_rule_ids = self.static_checker.covered_rule_ids(coding_rules, language)
+        if not local_rule_ids:
+            return [], coding_rules
+        local_review_points = self.static_checker.run(source_code, language, coding_rules)
+        logger.info(f"ローカルで検査したルール:{sorted(local_rule_ids)} 指摘数:{len(local_review_points)}")
+        return local_review_points, coding_rules.excluding(local_rule_ids)
+
+    def _finish_review(
+        self,
+        review_result: Dict,
+        local_review_points: List[Dict],
+        points_limit: int,
+        source_hash: str,
+        result_key: str,
+        coding_rules: CodingRules,
+        usage: Dict,
+    ) -> Dict:
+        """LLMによるレビュー結果とローカル検査の指摘事項を統合し、保存する"""
+        # --- 指摘事項を上限件数までに絞り込み、ローカル検査の指摘事項と統合する ---
+        if points_limit:
+            local_review_points = cap_review_points(review_result, local_review_points, points_limit)
+        merge_review_points(review_result, local_review_points)
+
+        # --- 一次判定を行った場合は、統合した指摘事項とルール全体のカテゴリからカテゴリごとの判定を求める ---
+        triage_verdicts = review_result.pop("triage_verdicts", None)
+        if triage_verdicts is not None:
+            review_result["category_verdicts"] = [
+                verdict.to_dict()
+                for verdict in category_verdicts(triage_verdicts, review_result.get("review_points") or [], coding_rules.categories)
+            ]
+
+        # --- レビュー結果を保存する(詳細レビューのモデル以外が応答した結果は、モデルIDを含むキーで保存しない) ---
+        answered_model_id = review_result.pop("answered_model_id", None)
+        if answered_model_id:
+            logger.info(f"追加のリクエストで別のモデルが応答したため、レビュー結果を保存しません モデル:{answered_model_id}")
+            return review_result
+        self._save_review(StoredReview(
+            review_key=result_key,
+            content_hash=source_hash,
+            rule_set_version=coding_rules.version,
+            model_id=self.model_config.model_id,
+            result=review_result,
+            usage=usage,
+        ))
+        return review_result
+
+    def _review_with_llm(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        points_limit: int,
+        api_key_id: Optional[str],
+        deadline: Optional[Deadline],
+        related_files: str = "",
+        outline: bool = False,
+    ) -> Tuple[Dict, Dict]:
+        """
+        トークン予算・流量制御の枠の範囲でBedrockにレビューを依頼する
+        Returns:
+            (コードレビュー結果, Bedrockのトークン使用量)
+        """
+        def request() -> Tuple[Dict, Dict]:
+            if self.triage_model:
+                return self._review_with_triage(
+                    source_code, language, coding_rules, deadline,
+                    max_points=points_limit, related_files=related_files, outline=outline,
+                )
+            return self._request_review(
+                source_code, language, coding_rules, deadline,
+                max_points=points_limit, related_files=related_files, outline=outline,
+            )
+
+        return self._within_token_budget(estimate_tokens(source_code) + estimate_tokens(related_files), api_key_id, request)
+
+    def _within_token_budget(
+        self, estimated_input_tokens: int, api_key_id: Optional[str], request: Callable[[], Tuple[Any, Dict]]
+    ) -> Tuple[Any, Dict]:
+        """
+        トークン予算・流量制御の枠の範囲でBedrockの呼び出しを実行する
+        Args:
+            estimated_input_tokens: 推定入力トークン数
+            api_key_id: リクエストに使用されたAPIキーのID
+            request: Bedrockを呼び出し、(結果, Bedrockのトークン使用量)を返す関数
+        """
+        # --- トークン予算の確認と使用量の記録(利用キーごと・日ごと) ---
+        if self.token_meter:
+            self.token_meter.check_budget(api_key_id, estimated_input_tokens)
+
+        # --- 全コンテナ共通の1分あたりのトークン数の枠を予約し、使用量で精算する ---
+        reservation = None
+        if self.rate_limiter:
+            reservation = self.rate_limiter.reserve(estimated_input_tokens + self.model_config.token_max)
+        try:
+            result, usage = request()
+        except Exception:
+            if self.rate_limiter:
+                self.rate_limiter.cancel(reservation)
+            raise
+        if self.rate_limiter:
+            self.rate_limiter.settle(reservation, TokenUsage.from_bedrock_usage(usage).total_tokens)
+
+        if self.token_meter:
+            self.token_meter.record(api_key_id, usage)
+        return result, usage
+
+    def _review_by_units(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        rule_set_version: str,
+        scope: str,
+        points_limit: int,
+        api_key_id: Optional[str],
+        deadline: Optional[Deadline],
+        related_files: str = "",
+    ) -> Tuple[Dict, Dict]:
+        """
+        関数・クラスの単位ごとに保存したレビュー結果を使い、保存されていない単位だけをまとめてレビューする
+        単位ごとの指摘事項は単位の先頭からの行番号で保存し、ファイル全体の行番号に付け替えて組み立てます。
+        行番号のない指摘事項はどの単位にも属さないため、単位ごとには保存しません。
+        指摘事項が上限件数に達した場合は、上限を超えて省かれた指摘のある単位をOKとして保存しないよう、単位ごとには保存しません。
+        Returns:
+            (コードレビュー結果, Bedrockのトークン使用量)
+        """
+        units = split_units(source_code, language)
+        if len(units) < 2:
+            return self._review_with_llm(source_code, language, coding_rules, points_limit, api_key_id, deadline, related_files)
+
+        keys = [unit_key(scope, unit) for unit in units]
+        try:
+            stored_units = self.result_store.batch_get(keys)
+        except Exception:
+            logger.exception("単位ごとのレビュー結果の取得に失敗しました")
+            stored_units = {}
+
+        review_points = []
+        for unit, key in zip(units, keys):
+            if key in stored_units:
+                review_points.extend(
+                    {**point, "codeline": point["codeline"] + unit.start_line - 1}
+                    for point in stored_units[key].result.get("review_points", [])
+                )
+
+        usage = {}
+        triage_verdicts = None
+        answered_model_id = None
+        unseen = [(unit, key) for unit, key in zip(units, keys) if key not in stored_units]
+        logger.info(f"単位ごとのレビュー 単位数:{len(units)} 保存済み:{len(units) - len(unseen)}")
+        if unseen:
+            # --- 保存されていない単位だけを1回のレビューにまとめる ---
+            packed_source, line_numbers = extract_regions(
+                source_code, [(unit.start_line, unit.end_line) for unit, _ in unseen]
+            )
+            packed_result, usage = self._review_with_llm(
+                packed_source, language, coding_rules, points_limit, api_key_id, deadline, related_files
+            )
+            triage_verdicts = packed_result.get("triage_verdicts")
+            answered_model_id = packed_result.get("answered_model_id")
+            new_points = restore_codelines(packed_result.get("review_points") or [], line_numbers)
+            review_points.extend(new_points)
+
+            if points_limit and len(new_points) >= points_limit:
+                logger.info(f"指摘事項が上限件数({points_limit})に達したため、単位ごとのレビュー結果を保存しません")
+            elif answered_model_id:
+                logger.info(f"追加のリクエストで別のモデルが応答したため、単位ごとのレビュー結果を保存しません モデル:{answered_model_id}")
+            else:
+                self._save_unit_reviews(unseen, new_points, rule_set_version)
+
+        review_result = {"review_result": "OK", "review_points": []}
+        if triage_verdicts is not None:
+            review_result["triage_verdicts"] = triage_verdicts
+        if answered_model_id:
+            review_result["answered_model_id"] = answered_model_id
+        return merge_review_points(review_result, review_points), usage
+
+    def _save_unit_reviews(self, unseen: List[Tuple[SourceUnit, str]], new_points: List[Dict], rule_set_version: str):
+        """今回レビューした単位ごとに、単位の先頭からの行番号に付け替えた指摘事項を保存する"""
+        unit_reviews = []
+        for unit, key in unseen:
+            unit_points = [
+                {**point, "codeline": point["codeline"] - unit.start_line + 1}
+                for point in new_points
+                if point["codeline"] is not None and unit.start_line <= point["codeline"] <= unit.end_line
+            ]
+            unit_reviews.append(StoredReview(
+                review_key=key,
+                content_hash=unit.unit_hash,
+                rule_set_version=rule_set_version,
+                model_id=self.model_config.model_id,
+                result={"review_result": "NG" if unit_points else "OK", "review_points": unit_points},
+            ))
+        try:
+            self.result_store.batch_save(unit_reviews)
+        except Exception:
+            logger.exception("単位ごとのレビュー結果の保存に失敗しました")
+
+    def _review_packed(
+        self,
+        source_codes: List[str],
+        language: str,
+        coding_rules: CodingRules,
+        points_limit: int,
+        api_key_id: Optional[str],
+        deadline: Optional[Deadline],
+    ) -> List[Optional[Dict]]:
+        """
+        同じ言語の複数のソースコードを1回の呼び出しでレビューし、ソースコードごとに結果を保存する
+        ファイルIDごとに分けて出力させるため、構造化出力・短縮形式は使わずテキストのJSONで受け取ります。
+        Bedrockのトークン使用量は、ソースコードの数で等分して保存します(割り切れない分は最初のソースコードに含めます)。
+        Returns:
+            ソースコードごとのコードレビュー結果(出力から取り出せなかったものはNone)
+        """
+        # --- 機械的に判定できるルールはローカルで検査する(同じ言語のため、LLMで確認するルールは共通) ---
+        local_checks = [self._check_locally(source_code, language, coding_rules) for source_code in source_codes]
+        prompt_rules = local_checks[0][1]
+        if not prompt_rules.total_count:
+            return [None] * len(source_codes)
+
+        # --- 入力トークン削減のためにソースコードを正規化し、区切りの行で連結する ---
+        normalized_sources = [self.normalizer.normalize(source_code) if self.normalizer else None for source_code in source_codes]
+        prompt_source_codes = [
+            normalized.text if normalized else source_code for source_code, normalized in zip(source_codes, normalized_sources)
+        ]
+
+        # --- 重複コードの候補をファイルごとにローカルで検出し、プロンプトで示す ---
+        detects_clones = self.clone_detector and DUPLICATED_CODE_RULE_ID in prompt_rules.rule_ids
+        packed_sources = [
+            PackedSource(
+                file_id=f"f{number}",
+                source_code=prompt_source_code,
+                duplicate_candidates=tuple(self.clone_detector.detect(prompt_source_code, language)) if detects_clones else (),
+            )
+            for number, prompt_source_code in enumerate(prompt_source_codes, start=1)
+        ]
+        prompt = PackedReviewPrompt(packed_sources, language, prompt_rules, max_points=points_limit)
+
+        def request() -> Tuple[Dict[str, Optional[Dict]], Dict]:
+            response = self._converse(self._create_request(prompt, use_tool=False), deadline, kind="packed")
+            response_text = "".join(block.get("text", "") for block in response["output"]["message"]["content"])
+            logger.info(f"bedrock response:{response_text}")
+            sections = split_packed_result(response_text, packed_sources)
+            answered_model_id = self._answered_model_id(response)
+            if answered_model_id:
+                for section in sections.values():
+                    if section is not None:
+                        section["answered_model_id"] = answered_model_id
+            return sections, response.get("usage", {})
+
+        sections, usage = self._within_token_budget(estimate_tokens(prompt.create_user_prompt()), api_key_id, request)
+        logger.info(
+            f"まとめてレビューしました ファイル数:{len(source_codes)} "
+            f"結果を取り出せたファイル数:{sum(1 for section in sections.values() if section is not None)}"
+        )
+
+        # --- ソースコードごとに、ローカル検査の指摘事項と統合して保存する ---
+        results: List[Optional[Dict]] = []
+        for source_code, packed_source, normalized, (local_review_points, _), file_usage in zip(
+            source_codes, packed_sources, normalized_sources, local_checks, split_usage(usage, len(source_codes))
+        ):
+            review_result = sections[packed_source.file_id]
+            if review_result is None:
+                results.append(None)
+                continue
+            if normalized:
+                normalized.remap_review_points(review_result)
+            source_hash, result_key, _ = self._review_keys(source_code, language, coding_rules, points_limit)
+            results.append(self._finish_review(
+                review_result, local_review_points, points_limit, source_hash, result_key, coding_rules, file_usage
+            ))
+        return results
+
+    def _plan_reuse(self, scope: str, source_code: str, language: str) -> Optional[ReusePlan]:
+        """近似重複の提出を探し、その指摘事項の流用方法を求める(流用できない場合はNone)"""
+        if not self.near_duplicates:
+            return None
+        neighbor = self.near_duplicates.find(scope, source_code, language)
+        if not neighbor:
+            return None
+        plan = plan_reuse(neighbor, source_code, self.near_duplicates.config)
+        if plan:
+            logger.info(
+                f"近似重複の提出の指摘事項を流用します key={neighbor.review_key} 類似度:{neighbor.similarity:.2f} "
+                f"流用した指摘数:{len(plan.review_points)} レビューする範囲:{plan.regions}"
+            )
+        return plan
+
+    def _review_with_triage(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        deadline: Optional[Deadline] = None,
+        max_points: int = 0,
+        related_files: str = "",
+        outline: bool = False,
+    ) -> Tuple[Dict, Dict]:
+        """
+        一次判定でNGとなったカテゴリだけを詳細レビューする
+        Returns:
+            (コードレビュー結果(一次判定の結果 triage_verdicts を含む), Bedrockのトークン使用量の合計)
+            カテゴリごとの判定 category_verdicts は、ローカル検査の指摘事項と統合した後に求めます。
+        """
+        triage_verdicts, usage = self._request_triage(source_code, language, coding_rules, deadline)
+        ng_categories = [category for category, verdict in triage_verdicts.items() if verdict == VERDICT_NG]
+        logger.info(f"一次判定 NGのカテゴリ:{ng_categories}")
+
+        # --- NGのカテゴリを詳細レビューする(並列の場合はカテゴリごとに依頼する) ---
+        groups = [[category] for category in ng_categories] if self.triage_parallel else [ng_categories]
+        groups = [group for group in groups if group]
+        review_points = []
+        detail_results = []
+        if len(groups) == 1:
+            detail_results.append(self._request_review(
+                source_code, language, coding_rules.including_categories(groups[0]), deadline,
+                max_points=max_points, related_files=related_files, outline=outline,
+            ))
+        elif groups:
+            with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="detail-review") as executor:
+                futures = [
+                    executor.submit(
+                        self._request_review,
+                        source_code, language, coding_rules.including_categories(group), deadline, max_points,
+                        related_files, outline,
+                    )
+                    for group in groups
+                ]
+                detail_results = [future.result() for future in futures]
+        answered_model_id = None
+        for detail_result, detail_usage in detail_results:
+            review_points.extend(detail_result.get("review_points") or [])
+            usage = sum_bedrock_usage(usage, detail_usage)
+            answered_model_id = answered_model_id or detail_result.get("answered_model_id")
+
+        review_result = {
+            "review_result": "NG" if review_points else "OK",
+            "review_points": review_points,
+            "triage_verdicts": triage_verdicts,
+        }
+        if answered_model_id:
+            review_result["answered_model_id"] = answered_model_id
+        return review_result, usage
+
+    def _request_triage(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        deadline: Optional[Deadline] = None,
+    ) -> Tuple[Dict[str, str], Dict]:
+        """
+        高速なモデルにカテゴリごとのOK/NGの判定を依頼する
+        一次判定に失敗した場合は、すべてのカテゴリをNG(詳細レビューの対象)とします。
+        Returns:
+            (カテゴリ名ごとの判定, Bedrockのトークン使用量)
+        """
+        prompt_source_code = self.normalizer.normalize(source_code).text if self.normalizer else source_code
+        prompt = TriagePrompt(prompt_source_code, language, coding_rules)
+        request = {
+            "modelId": self.triage_model.model_id,
+            "messages": [{
+                "role": "user",
+                "content": [{"text": prompt.create_user_prompt()}],
+            }],
+            "system": [{
+                "text": prompt.create_system_prompt(),
+            }],
+            "inferenceConfig": {
+                "maxTokens": self.triage_model.token_max,
+                "temperature": self.triage_model.temperature,
+                "topP": self.triage_model.top_p,
+            },
+        }
+        try:
+            response = self._converse(request, deadline, kind="triage")
+        except Boto3Exception:
+            logger.exception(f"一次判定に失敗したため、すべてのカテゴリを詳細レビューします モデル:{self.triage_model.model_id}")
+            return {category: VERDICT_NG for category in coding_rules.categories}, {}
+
+        response_text = "".join(block.get("text", "") for block in response["output"]["message"]["content"])
+        logger.info(f"triage response:{response_text}")
+        return parse_verdicts(response_text, coding_rules.categories), response.get("usage", {})
+
+    def _request_review(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        deadline: Optional[Deadline] = None,
+        max_points: int = 0,
+        related_files: str = "",
+        outline: bool = False,
+    ) -> Tuple[Dict, Dict]:
+        """
+        Bedrockにコードレビューを依頼する
+        Returns:
+            (コードレビュー結果, Bedrockのトークン使用量)
+        """
+        # --- 入力トークン削減のためにソースコードを正規化 ---
+        normalized_source = None
+        prompt_source_code = source_code
+        if self.normalizer:
+            normalized_source = self.normalizer.normalize(source_code)
+            prompt_source_code = normalized_source.text
+            logger.info(
+                f"ソースコードを正規化しました 削減文字数:{normalized_source.saved_chars} "
+                f"削減推定トークン数:{normalized_source.saved_tokens}"
+            )
+
+        # --- 重複コードの候補をローカルで検出し、プロンプトで示す ---
+        duplicate_candidates = None
+        if self.clone_detector and DUPLICATED_CODE_RULE_ID in coding_rules.rule_ids:
+            duplicate_candidates = self.clone_detector.detect(prompt_source_code, language)
+            logger.info(f"重複コードの候補数:{len(duplicate_candidates)}")
+
         # --- コードレビュー用のプロンプトを作成 ---
         prompt = CodeReviewPrompt(
-            source_code=source_code,
+            source_code=prompt_source_code,
             language=language,
             coding_rules=coding_rules,
+            duplicate_candidates=duplicate_candidates,
+            response_schema=self.response_schema,
+            max_points=max_points,
+            related_files=related_files,
+            outline=outline,
         )
-        system_prompt_text = prompt.create_system_prompt()
-        user_prompt_text = prompt.create_user_prompt()
 
         logger.info("プロンプトを開始します....")
         logger.info(f"モデル:{self.model_config.model_id}")
         logger.info(f"コーディングルール数:{coding_rules.total_count}")
-        logger.info(f"プロンプト文字列長:{len(system_prompt_text) + len(user_prompt_text)}")
 
         # --- Bedrockにメッセージ(プロンプト)を送信 ---
+        use_tool = self.tool_use and self.model_config.model_id not in self._models_without_tool_use
         try:
-            response = self.bedrock.converse(
-                modelId=self.model_config.model_id,
-                messages=[{
-                    "role": "user",
-                    "content": [{"text": user_prompt_text}],
-                }],
-                system=[{
-                    "text": system_prompt_text,
-                }],
-                inferenceConfig={
-                    "maxTokens": self.model_config.token_max,
-                    "temperature": self.model_config.temperature,
-                    "topP": self.model_config.top_p,
-                },
+            response = self._converse(self._create_request(prompt, use_tool), deadline, kind="detail")
+        except Boto3Exception as error:
+            # --- 構造化出力に対応していないモデルはテキストの出力形式で再度依頼する ---
+            if not use_tool or not self._is_tool_use_unsupported(error):
+                raise
+            logger.warning(f"モデルが構造化出力に対応していないため、テキストの出力形式で依頼します モデル:{self.model_config.model_id}")
+            self._models_without_tool_use.add(self.model_config.model_id)
+            response = self._converse(self._create_request(prompt, use_tool=False), deadline, kind="detail")
+
+        # --- レスポンスデータ(フィードバック)を取得 ---
+        review_result = self._parse_review_result(response)
+        logger.info(f'bedrock usage:{response["usage"]}')
+
+        # --- 短縮形式で出力させた場合は公開しているレスポンス形式に展開する ---
+        if self.response_schema:
+            review_result = self.response_schema.expand(review_result, coding_rules)
+
+        # --- 指摘行を元のソースコードの行番号に戻す ---
+        if normalized_source:
+            normalized_source.remap_review_points(review_result)
+
+        # --- 追加のリクエストで別のモデルが応答した場合は、結果を保存しないよう記録する ---
+        answered_model_id = self._answered_model_id(response)
+        if answered_model_id:
+            review_result["answered_model_id"] = answered_model_id
+
+        return review_result, response.get("usage", {})
+
+    def _create_request(self, prompt: CodeReviewPrompt, use_tool: bool) -> Dict[str, Any]:
+        """Converse APIのパラメータを作成する(構造化出力の場合はtoolConfigを含める)"""
+        system_prompt_text = prompt.create_tool_system_prompt() if use_tool else prompt.create_system_prompt()
+        user_prompt_text = prompt.create_user_prompt()
+        logger.info(f"プロンプト文字列長:{len(system_prompt_text) + len(user_prompt_text)} 構造化出力:{use_tool}")
+
+        request = {
+            "modelId": self.model_config.model_id,
+            "messages": [{
+                "role": "user",
+                "content": [{"text": user_prompt_text}],
+            }],
+            "system": [{
+                "text": system_prompt_text,
+            }],
+            "inferenceConfig": {
+                "maxTokens": self.model_config.token_max,
+                "temperature": self.model_config.temperature,
+                "topP": self.model_config.top_p,
+            },
+        }
+        if use_tool:
+            request["toolConfig"] = prompt.create_tool_config()
+        return request
+
+    def _converse(self, request: Dict[str, Any], deadline: Optional[Deadline], kind: str = "") -> Dict[str, Any]:
+        """Converse APIを呼び出す(kind は応答時間を記録する呼び出しの種類: triage / detail / packed)"""
+        if self.hedger:
+            return self.hedger.converse(
+                request, lambda hedged_request: self._converse_once(hedged_request, deadline), deadline, kind=kind
             )
+        return self._converse_once(request, deadline)
+
+    def _answered_model_id(self, response: Dict[str, Any]) -> Optional[str]:
+        """追加のリクエストで詳細レビューのモデル以外が応答した場合は、そのモデルのID"""
+        model_id = response.get("modelId")
+        return model_id if model_id and model_id != self.model_config.model_id else None
 
+    def _converse_once(self, request: Dict[str, Any], deadline: Optional[Deadline]) -> Dict[str, Any]:
+        if deadline and self.invoker:
+            # --- 期限に合わせてタイムアウト・maxTokens・再試行を調整する ---
+            return self.invoker.converse(request, deadline)
+        try:
+            return self.bedrock.converse(**request)
         except ClientError as error:
             raise Boto3Exception(service="bedrock") from error
 
-        # --- レスポンスデータ(フィードバック)を取得 ---
-        response_text = response["output"]["message"]["content"][0]["text"]
+    @staticmethod
+    def _is_tool_use_unsupported(error: Boto3Exception) -> bool:
+        """モデルが構造化出力(Tool use・ツール指定)に対応していないことを表すエラーか"""
+        return error.reason == "ValidationException" and "tool" in str(error.__cause__).lower()
+
+    @staticmethod
+    def _parse_review_result(response: Dict[str, Any]) -> Dict:
+        """Converse APIのレスポンスからレビュー結果を取り出す(ツールの呼び出しがあればその引数を使う)"""
+        content = response["output"]["message"]["content"]
+        for block in content:
+            tool_use = block.get("toolUse")
+            if tool_use and tool_use.get("name") == REVIEW_TOOL_NAME:
+                logger.info(f'bedrock tool input:{tool_use["input"]}')
+                return tool_use["input"]
+
+        response_text = next(block["text"] for block in content if "text" in block)
         logger.info(f'bedrock response:{response_text}')
-        logger.info(f'bedrock usage:{response["usage"]}')
+        return json_codec.loads(response_text)
 
-        review_result = json.loads(response_text)
-        return review_result
+    def _find_stored_result(self, result_key: str) -> Optional[Dict]:
+        stored_review = self._find_stored_review(result_key)
+        return stored_review.result if stored_review else None
+
+    def _find_stored_review(self, result_key: str) -> Optional[StoredReview]:
+        if not self.result_store:
+            return None
+        try:
+            return self.result_store.get(result_key)
+        except Exception:
+            # --- 保存先の障害でレビュー自体を失敗させない ---
+            logger.exception(f"保存済みレビュー結果の取得に失敗しました key={result_key}")
+            return None
+
+    def _save_review(self, review: StoredReview):
+        if not self.result_store:
+            return
+        try:
+            self.result_store.save(review)
+        except Exception:
+            logger.exception(f"レビュー結果の保存に失敗しました key={review.review_key}")
 
 
 class CodeReviewServiceContext:
+    def __init__(self):
+        # Bedrockクライアントの作成を直列化するロック(boto3のセッションからのクライアント作成はスレッドセーフではない)
+        self._bedrock_client_lock = threading.RLock()
+        # (リージョン, 読み込みタイムアウトの区分)ごとのBedrockクライアント
+        self._bedrock_clients_with_timeout: Dict[Tuple[Optional[str], int], Any] = {}
+
     @property
     @lru_cache(maxsize=None)
     def ssm_config_loader(self) -> SsmConfigLoader:
@@ -124,15 +952,162 @@ class CodeReviewServiceContext:
     def bedrock_config(self) -> dict:
         return self.ssm_config_loader.load_config("bedrock")
 
+    @property
+    @lru_cache(maxsize=None)
+    def review_config(self) -> dict:
+        return self.ssm_config_loader.load_config("review")
+
+    @property
+    @lru_cache(maxsize=None)
+    def dynamodb_config(self) -> dict:
+        return self.ssm_config_loader.load_config("dynamodb")
+
     @property
     @lru_cache(maxsize=None)
     def ssm_client(self):
         return boto3.client("ssm")
 
+    @property
+    @lru_cache(maxsize=None)
+    def dynamodb_client(self):
+        return boto3.client("dynamodb")
+
+    @property
+    @lru_cache(maxsize=None)
+    def sqs_client(self):
+        return boto3.client("sqs")
+
     @property
     @lru_cache(maxsize=None)
     def bedrock_client(self):
-        return boto3.client("bedrock-runtime")
+        if self.bedrock_pool:
+            return self.bedrock_pool
+        return self.create_bedrock_client()
+
+    @property
+    @lru_cache(maxsize=None)
+    def bedrock_session(self) -> boto3.Session:
+        """Bedrockクライアントの作成に使う専用のセッションを提供します。"""
+        return boto3.Session()
+
+    def create_bedrock_client(self, region: Optional[str] = None, config: Optional[Config] = None):
+        """
+        専用のセッションからBedrockクライアントを作成します。
+        レビューの並列実行(プロジェクト・カテゴリごとの詳細レビュー・追加のリクエスト)のスレッドから呼ばれるため、ロックを取って作成します。
+        """
+        with self._bedrock_client_lock:
+            return self.bedrock_session.client("bedrock-runtime", region_name=region, config=config)
+
+    def bedrock_client_with_timeout(self, read_timeout: int, region: Optional[str] = None):
+        """
+        読み込みタイムアウト(秒)の区分ごとに、botocoreの再試行を無効にしたBedrockクライアントを提供します。
+        区分ごとに一度だけ作成して使い回します。リージョンを指定した場合は、振り分けを行わずそのリージョンに送ります。
+        """
+        bucket = read_timeout_bucket(read_timeout)
+        with self._bedrock_client_lock:
+            client = self._bedrock_clients_with_timeout.get((region, bucket))
+            if client is None:
+                config = Config(
+                    read_timeout=bucket,
+                    connect_timeout=min(5, bucket),
+                    retries={"total_max_attempts": 1},
+                )
+                if region is None and self.bedrock_pool:
+                    client = self.bedrock_pool.with_clients(
+                        lambda pool_region: self.create_bedrock_client(pool_region, config)
+                    )
+                else:
+                    client = self.create_bedrock_client(region, config)
+                self._bedrock_clients_with_timeout[(region, bucket)] = client
+            return client
+
+    @property
+    @lru_cache(maxsize=None)
+    def bedrock_pool(self) -> Optional[BedrockClientPool]:
+        """複数のリージョンに振り分けるBedrockクライアントを提供します。接続先が未設定の場合はNoneです。"""
+        endpoints = BedrockEndpoint.from_config(self.bedrock_config)
+        if not endpoints:
+            return None
+        return BedrockClientPool(
+            endpoints,
+            self.create_bedrock_client,
+            model_id=self.bedrock_config.get("ModelId"),
+            config=PoolConfig.from_config(self.bedrock_config.get("Pool", {})),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def bedrock_invoker(self) -> BedrockInvoker:
+        """処理の期限に合わせてBedrockを呼び出すインスタンスを提供します。"""
+        return BedrockInvoker(
+            self.bedrock_client_with_timeout,
+            InvokerConfig.from_config(self.review_config.get("Deadline", {})),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def hedged_converse(self) -> Optional[HedgedConverse]:
+        """応答の遅いBedrockの呼び出しに追加のリクエストを送るインスタンスを提供します。無効化されている場合はNoneです。"""
+        hedging_config = self.review_config.get("Hedging", {})
+        if str(hedging_config.get("Enabled", "false")).lower() != "true":
+            return None
+
+        hedge_converse = None
+        if hedging_config.get("Region"):
+            # --- 追加のリクエストを別リージョンに送る(期限がある場合は期限に合わせて呼び出す) ---
+            region = hedging_config["Region"]
+            hedge_client = self.create_bedrock_client(region)
+            hedge_invoker = BedrockInvoker(
+                lambda read_timeout: self.bedrock_client_with_timeout(read_timeout, region),
+                InvokerConfig.from_config(self.review_config.get("Deadline", {})),
+            )
+
+            def hedge_converse(request: Dict[str, Any], deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+                if deadline:
+                    return hedge_invoker.converse(request, deadline)
+                try:
+                    return hedge_client.converse(**request)
+                except ClientError as error:
+                    raise Boto3Exception(service="bedrock") from error
+
+        return HedgedConverse(
+            HedgingConfig.from_config(hedging_config),
+            hedge_model_id=hedging_config.get("ModelId") or None,
+            hedge_converse=hedge_converse,
+            primary_model_id=self.model_config.model_id,
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def single_flight(self) -> Optional[SingleFlight]:
+        """同じレビューの同時実行をまとめるインスタンスを提供します。無効化されている場合はNoneです。"""
+        single_flight_config = self.review_config.get("SingleFlight", {})
+        if str(single_flight_config.get("Enabled", "true")).lower() != "true":
+            return None
+        # --- コンテナ間でまとめるには、待っている側が結果を読めるようレビュー結果の保存先も必要 ---
+        lease_store = None
+        table_name = self.dynamodb_config.get("ReviewLockTableName")
+        if table_name and self.result_store:
+            lease_store = LeaseFromDynamoDB(self.dynamodb_client, table_name)
+        return SingleFlight(
+            lease_store,
+            lease_seconds=float(single_flight_config.get("LeaseSeconds", 60)),
+            poll_seconds=float(single_flight_config.get("PollSeconds", 0.5)),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def near_duplicate_index(self) -> Optional[NearDuplicateIndex]:
+        """近似重複の提出の索引を提供します。テーブル未設定または無効化されている場合はNoneです。"""
+        near_duplicate_config = self.review_config.get("NearDuplicate", {})
+        table_name = self.dynamodb_config.get("NearDuplicateTableName")
+        if not table_name or str(near_duplicate_config.get("Enabled", "false")).lower() != "true":
+            return None
+        config = NearDuplicateConfig.from_config(near_duplicate_config)
+        return NearDuplicateIndex(
+            NearDuplicateFromDynamoDB(self.dynamodb_client, table_name, ttl_days=config.ttl_days),
+            config,
+        )
 
     @property
     @lru_cache(maxsize=None)
@@ -151,6 +1126,113 @@ class CodeReviewServiceContext:
             bedrock_config["TopP"]
         )
 
+    @property
+    @lru_cache(maxsize=None)
+    def result_store(self) -> Optional[IReviewResultRepository]:
+        """レビュー結果の保存先を提供します。テーブル未設定の場合はNoneです。"""
+        table_name = self.dynamodb_config.get("ReviewResultTableName")
+        if not table_name:
+            return None
+        return ReviewResultFromDynamoDB(
+            self.dynamodb_client,
+            table_name,
+            ttl_days=int(self.dynamodb_config.get("ReviewResultTtlDays", 30)),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def token_meter(self) -> Optional[TokenMeter]:
+        """トークン使用量の計測インスタンスを提供します。テーブル未設定の場合はNoneです。"""
+        table_name = self.dynamodb_config.get("TokenUsageTableName")
+        if not table_name:
+            return None
+        budget_config = self.review_config.get("TokenBudget", {})
+        return TokenMeter(
+            TokenUsageFromDynamoDB(
+                self.dynamodb_client,
+                table_name,
+                shard_count=int(budget_config.get("ShardCount", 4)),
+            ),
+            daily_token_budget=int(budget_config.get("DailyLimit", 0)),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def rate_limiter(self) -> Optional[TokenRateLimiter]:
+        """Bedrockの1分あたりのトークン数の流量制御インスタンスを提供します。未設定の場合はNoneです。"""
+        table_name = self.dynamodb_config.get("RateLimitTableName")
+        tokens_per_minute = int(self.review_config.get("RateLimit", {}).get("TokensPerMinute", 0))
+        if not table_name or tokens_per_minute <= 0:
+            return None
+        return TokenRateLimiter(
+            TokenBucketFromDynamoDB(self.dynamodb_client, table_name),
+            tokens_per_minute,
+            bucket_id=self.model_config.model_id,
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def triage_model_config(self) -> Optional[CodeReviewModelConfig]:
+        """一次判定に使う高速なモデルの設定を提供します。モデル未設定の場合はNone(一次判定を行わない)です。"""
+        triage_config = self.review_config.get("Triage", {})
+        if not triage_config.get("ModelId"):
+            return None
+        return CodeReviewModelConfig(
+            triage_config["ModelId"],
+            triage_config.get("MaxTokens", 256),
+            triage_config.get("Temperature", 0.0),
+            triage_config.get("TopP", 1.0),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def response_schema(self) -> Optional[CompactResponseSchema]:
+        """モデルの出力を短縮形式にする場合に、その形式を提供します。従来の形式の場合はNoneです。"""
+        schema_config = self.review_config.get("ResponseSchema", {})
+        if schema_config.get("Mode", "full").lower() != "compact":
+            return None
+        return CompactResponseSchema(
+            include_suggestion=str(schema_config.get("IncludeSuggestion", "true")).lower() == "true",
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def source_normalizer(self) -> Optional[SourceNormalizer]:
+        """ソースコードの正規化インスタンスを提供します。無効化されている場合はNoneです。"""
+        normalization_config = self.review_config.get("Normalization", {})
+        if str(normalization_config.get("Enabled", "true")).lower() != "true":
+            return None
+        return SourceNormalizer(NormalizerConfig.from_config(normalization_config))
+
+    @property
+    @lru_cache(maxsize=None)
+    def static_check_engine(self) -> Optional[StaticCheckEngine]:
+        """ローカル検査エンジンを提供します。無効化されている場合はNoneです。"""
+        static_check_config = self.review_config.get("StaticCheck", {})
+        if str(static_check_config.get("Enabled", "true")).lower() != "true":
+            return None
+        checks = [NonAsciiIdentifierCheck()]
+        if self.clone_detection_mode == "report":
+            checks.append(DuplicatedCodeCheck(self.clone_detector))
+        return StaticCheckEngine(checks)
+
+    @property
+    @lru_cache(maxsize=None)
+    def clone_detection_mode(self) -> str:
+        """
+        重複コード検出の使い方
+        hint: 検出結果をプロンプトで示す / report: 検出結果をそのまま指摘する / off: 使用しない
+        """
+        return str(self.review_config.get("CloneDetection", {}).get("Mode", "hint")).lower()
+
+    @property
+    @lru_cache(maxsize=None)
+    def clone_detector(self) -> Optional[CloneDetector]:
+        """重複コード検出インスタンスを提供します。無効化されている場合はNoneです。"""
+        if self.clone_detection_mode not in ("hint", "report"):
+            return None
+        return CloneDetector(CloneDetectorConfig.from_config(self.review_config.get("CloneDetection", {})))
+
     @property
     @lru_cache(maxsize=None)
     def code_review_service(self) -> CodeReviewService:
@@ -158,5 +1240,63 @@ class CodeReviewServiceContext:
         return CodeReviewService(
             self.bedrock_client,
             self.model_config,
-            self.rule_provider
+            self.rule_provider,
+            result_store=self.result_store,
+            normalizer=self.source_normalizer,
+            static_checker=self.static_check_engine,
+            clone_detector=self.clone_detector if self.clone_detection_mode == "hint" else None,
+            token_meter=self.token_meter,
+            rate_limiter=self.rate_limiter,
+            invoker=self.bedrock_invoker,
+            response_schema=self.response_schema,
+            max_points=int(self.review_config.get("ReviewPoints", {}).get("MaxPoints", 0)),
+            tool_use=str(self.review_config.get("ToolUse", {}).get("Enabled", "false")).lower() == "true",
+            triage_model=self.triage_model_config,
+            triage_parallel=str(self.review_config.get("Triage", {}).get("Parallel", "false")).lower() == "true",
+            hedger=self.hedged_converse,
+            single_flight=self.single_flight,
+            near_duplicates=self.near_duplicate_index,
+            unit_memo=str(self.review_config.get("UnitMemo", {}).get("Enabled", "false")).lower() == "true",
+            outline=self.outline_config,
+            packing=self.packing_config,
         )
+
+    @property
+    @lru_cache(maxsize=None)
+    def outline_config(self) -> Optional[OutlineConfig]:
+        """大きなソースコードをアウトラインでレビューする設定を提供します。無効化されている場合はNoneです。"""
+        outline_config = self.review_config.get("Outline", {})
+        if str(outline_config.get("Enabled", "false")).lower() != "true":
+            return None
+        return OutlineConfig.from_config(outline_config)
+
+    @property
+    @lru_cache(maxsize=None)
+    def packing_config(self) -> Optional[PackingConfig]:
+        """小さなソースコードをまとめてレビューする設定を提供します。無効化されている場合はNoneです。"""
+        packing_config = self.review_config.get("Packing", {})
+        if str(packing_config.get("Enabled", "false")).lower() != "true":
+            return None
+        return PackingConfig.from_config(packing_config)
+
+    @property
+    @lru_cache(maxsize=None)
+    def project_review_service(self) -> ProjectReviewService:
+        """複数ファイルのプロジェクトのコードレビューサービスインスタンスを提供します。"""
+        return ProjectReviewService(
+            self.code_review_service,
+            ProjectConfig.from_config(self.review_config.get("Project", {})),
+        )
+
+    @property
+    @lru_cache(maxsize=None)
+    def webhook_notifier(self) -> WebhookNotifier:
+        """レビュー結果のコールバック配信インスタンスを提供します。"""
+        dead_letter_table_name = self.dynamodb_config.get("WebhookDeadLetterTableName")
+        dead_letter_store = None
+        if dead_letter_table_name:
+            dead_letter_store = DeadLetterFromDynamoDB(self.dynamodb_client, dead_letter_table_name)
+        # --- 配信キューが設定されている場合は、キューを処理するLambdaが配信する ---
+        queue_url = os.environ.get("WEBHOOK_QUEUE_URL")
+        queue = WebhookQueueFromSQS(self.sqs_client, queue_url) if queue_url else None
+        return WebhookNotifier(dead_letter_store=dead_letter_store, queue=queue)
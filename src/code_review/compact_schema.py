@@ -0,0 +1,113 @@
+import json
+from typing import Any, Dict, List
+
+from code_review.rules import CodingRules
+
+
+# 指摘事項の短縮キーと、公開しているレスポンス形式(prompt.RESPONSE_FORMAT)のキーの対応
+COMPACT_POINT_KEYS = {
+    "l": "location",
+    "n": "codeline",
+    "c": "category",
+    "o": "overview",
+    "d": "details",
+    "s": "suggestion",
+}
+
+
+class CompactResponseSchema:
+    """
+    モデルの出力を短縮したレスポンス形式
+    出力トークン数を減らすため、キーを1文字にし、カテゴリ名の代わりにカテゴリ番号を出力させます。
+    サーバー側で公開しているレスポンス形式(prompt.RESPONSE_FORMAT)に展開してから返却します。
+    """
+    def __init__(self, include_suggestion: bool = True):
+        # Falseの場合は修正案を出力させない(展開後のsuggestionは空文字列)
+        self.include_suggestion = include_suggestion
+
+    def response_format(self) -> str:
+        """プロンプトに含める短縮形式のレスポンス例"""
+        point = {"l": "", "n": 0, "c": 0, "o": "", "d": ""}
+        if self.include_suggestion:
+            point["s"] = ""
+        return json.dumps({"r": "", "p": [point]}, separators=(",", ":"))
+
+    def json_schema(self) -> Dict[str, Any]:
+        """構造化出力(Tool use)用の短縮形式のJSONスキーマ"""
+        properties = {
+            "l": {"type": "string", "description": "The function name or global variable's name where the issue is."},
+            "n": {"type": "integer", "description": "The exact starting line number (1-based) where the issue begins."},
+            "c": {
+                "type": "integer",
+                "description": "The number in square brackets in front of the category of Review Perspectives.",
+            },
+            "o": {"type": "string", "description": "Brief description of the issue."},
+            "d": {"type": "string", "description": "Detailed description of the issue."},
+        }
+        if self.include_suggestion:
+            properties["s"] = {"type": "string", "description": "Specific correction proposals for the issue."}
+        return {
+            "type": "object",
+            "properties": {
+                "r": {"type": "string", "enum": ["OK", "NG"], "description": '"OK" if there are no issues, otherwise "NG".'},
+                "p": {
+                    "type": "array",
+                    "items": {"type": "object", "properties": properties, "required": list(properties)},
+                },
+            },
+            "required": ["r", "p"],
+        }
+
+    def response_rules(self) -> str:
+        """プロンプトに含める各キーの説明"""
+        rules = [
+            '- If there are no issues, set "r" to "OK" and "p" to an empty list ([]).',
+            '- If there are issues, set "r" to "NG" and add an object to the "p" list for each identified issue.',
+            "- `l`: Describe the location to identify the specific part of the code. "
+            "If the issue is within a function, provide the function name. If it's a global variable, provide its variable's name.",
+            "- `n`: Provide the **exact starting line number** (integer) from the source code where the identified issue begins or is most prominent. "
+            "Line numbering starts at 1 for the first line of the [Source Code]. Blank lines and lines with only comments should be counted as one line.",
+            "- `c`: The number (integer) in square brackets in front of the category of Review Perspectives.",
+            "- `o`: Briefly describe the issue.",
+            "- `d`: Provide a detailed description of the issue.",
+        ]
+        if self.include_suggestion:
+            rules.append(
+                "- `s`: Specific correction proposals or recommended actions for the problems described in `d` "
+                "(including code snippets if possible)."
+            )
+        return "".join([f"{rule}\n" for rule in rules])
+
+    def expand(self, compact_result: Dict[str, Any], coding_rules: CodingRules) -> Dict[str, Any]:
+        """
+        短縮形式のレビュー結果を公開しているレスポンス形式に展開する
+        Args:
+            compact_result: モデルが出力した短縮形式のレビュー結果
+            coding_rules: プロンプトに含めたコーディングルール(カテゴリ番号の参照先)
+        Returns:
+            コードレビュー結果(prompt.RESPONSE_FORMATの形式)
+        """
+        # --- モデルが短縮形式に従わなかった場合はそのまま返す ---
+        if "review_result" in compact_result:
+            return compact_result
+
+        categories = coding_rules.categories
+        review_points: List[Dict[str, Any]] = []
+        for compact_point in compact_result.get("p") or []:
+            point = {key: compact_point.get(short_key, "") for short_key, key in COMPACT_POINT_KEYS.items()}
+            point["codeline"] = compact_point.get("n")
+            point["category"] = self._category_name(compact_point.get("c"), categories)
+            review_points.append(point)
+        return {
+            "review_result": compact_result.get("r", "NG" if review_points else "OK"),
+            "review_points": review_points,
+        }
+
+    @staticmethod
+    def _category_name(category: Any, categories: List[str]) -> str:
+        """カテゴリ番号をカテゴリ名に戻す(カテゴリ名が出力された場合はそのまま使う)"""
+        if isinstance(category, str) and category.isdigit():
+            category = int(category)
+        if isinstance(category, int) and not isinstance(category, bool) and 1 <= category <= len(categories):
+            return categories[category - 1]
+        return category if isinstance(category, str) else ""
@@ -0,0 +1,33 @@
+import hashlib
+
+
+def content_hash(source_code: str, language: str) -> str:
+    """
+    ソースコードと言語種別からレビュー対象を識別するハッシュ値を求める
+    Args:
+        source_code: ソースコード文字列
+        language: プログラミング言語種別を表した文字列
+    Returns:
+        SHA-256の16進文字列
+    """
+    digest = hashlib.sha256()
+    digest.update(language.strip().lower().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(source_code.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def review_key(source_hash: str, rule_set_version: str, model_id: str, options: str = "") -> str:
+    """
+    レビュー結果を一意に識別するキーを求める
+    同じソースコード・ルールセット・モデル・オプションの組み合わせであれば同じキーになります。
+    Args:
+        source_hash: content_hashで求めたハッシュ値
+        rule_set_version: CodingRules.version
+        model_id: BedrockのモデルID
+        options: レビュー結果に影響するオプション(指摘事項の上限など)を表す文字列。空の場合はキーに含めない
+    """
+    key = f"{source_hash}:{rule_set_version}:{model_id}"
+    if options:
+        key += f":{options}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
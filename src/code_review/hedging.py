@@ -0,0 +1,238 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from code_review.bedrock_invoker import OPERATION_NAME
+from code_review.token_meter import sum_bedrock_usage
+from common.deadline import Deadline
+from common.exception import DeadlineExceededError
+from common.stats import percentile
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+@dataclass(frozen=True)
+class HedgingConfig:
+    # 追加のリクエストを送るまでの待ち時間とする、最近の応答時間のパーセンタイル
+    percentile: float = 95.0
+
+    # 追加のリクエストの上限(全リクエストに対する割合, %)
+    budget_percent: float = 5.0
+
+    # 待ち時間を決めるのに必要な応答時間の件数。これに満たない間は追加のリクエストを送らない
+    min_samples: int = 20
+
+    # 応答時間を保持する件数
+    window: int = 200
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "HedgingConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+        return cls(
+            percentile=float(config.get("Percentile", defaults.percentile)),
+            budget_percent=float(config.get("BudgetPercent", defaults.budget_percent)),
+            min_samples=int(config.get("MinSamples", defaults.min_samples)),
+            window=int(config.get("Window", defaults.window)),
+        )
+
+
+class LatencyTracker:
+    """最近の応答時間を保持し、パーセンタイル値を求めるクラス"""
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            latencies = list(self._latencies)
+        return percentile(latencies, p)
+
+
+class HedgeBudget:
+    """
+    追加のリクエストの割合を制限するクラス
+    リクエストごとに ratio だけ枠を貯め、追加のリクエストで1つ消費します(貯められる枠は max_credits まで)。
+    """
+    def __init__(self, ratio: float, max_credits: float = 10.0):
+        self.ratio = ratio
+        self.max_credits = max_credits
+        self._credits = 0.0
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._credits = min(self.max_credits, self._credits + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            # 割合の加算で生じる浮動小数点の誤差は許容する
+            if self._credits < 1.0 - 1e-9:
+                return False
+            self._credits -= 1.0
+            return True
+
+
+class HedgedConverse:
+    """
+    Bedrockの呼び出しが最近の応答時間のパーセンタイル値を超えても返らない場合に、同じリクエストを追加で送るクラス
+    先に成功した応答を使い、もう一方の応答は待たずに破棄します。
+    破棄した応答のトークンも課金されるため、使った応答のusageに加えて返します(未完了の場合は同じ使用量とみなします)。
+    追加のリクエストは、別のモデルや別リージョンのクライアントに送ることもできます。
+    別のモデルに送った追加のリクエストの応答を使った場合は、レスポンスの modelId に応答したモデルのIDを設定します。
+    応答時間はモデルと呼び出しの種類(一次判定・詳細レビュー・まとめたレビューなど)ごとに記録します。
+    """
+    def __init__(
+        self,
+        config: Optional[HedgingConfig] = None,
+        hedge_model_id: Optional[str] = None,
+        hedge_converse: Optional[Callable[[Dict[str, Any], Optional[Deadline]], Dict[str, Any]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_workers: int = 8,
+        primary_model_id: Optional[str] = None,
+    ):
+        self.config = config or HedgingConfig()
+        # 追加のリクエストで使うモデルID(未指定の場合は同じモデル)
+        self.hedge_model_id = hedge_model_id
+        # hedge_model_id に置き換える対象のモデルID(詳細レビューのモデル)。一次判定など他のモデルへのリクエストは置き換えない
+        self.primary_model_id = primary_model_id
+        # 追加のリクエストの送信先(リクエストと期限を受け取る。未指定の場合は最初のリクエストと同じ送信先)
+        self.hedge_converse = hedge_converse
+        self.clock = clock
+        self.budget = HedgeBudget(self.config.budget_percent / 100)
+        self._latencies: Dict[Tuple[Optional[str], str], LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def latencies(self, model_id: Optional[str], kind: str = "") -> LatencyTracker:
+        """モデルと呼び出しの種類ごとの応答時間"""
+        with self._lock:
+            tracker = self._latencies.get((model_id, kind))
+            if tracker is None:
+                tracker = self._latencies[(model_id, kind)] = LatencyTracker(self.config.window)
+            return tracker
+
+    def hedge_delay(self, model_id: Optional[str], kind: str = "") -> Optional[float]:
+        """追加のリクエストを送るまでの待ち時間(応答時間の件数が足りない場合はNone)"""
+        latencies = self.latencies(model_id, kind)
+        if len(latencies) < self.config.min_samples:
+            return None
+        return latencies.percentile(self.config.percentile)
+
+    def converse(
+        self,
+        request: Dict[str, Any],
+        converse: Callable[[Dict[str, Any]], Dict[str, Any]],
+        deadline: Optional[Deadline] = None,
+        kind: str = "",
+    ) -> Dict[str, Any]:
+        """
+        必要に応じて追加のリクエストを送りながらConverse APIを呼び出す
+        Args:
+            request: Converse APIのパラメータ
+            converse: 最初のリクエストの送信に使う関数
+            deadline: 処理の期限(応答を待つのは期限まで)
+            kind: 呼び出しの種類(応答時間を分けて記録する単位)
+        Returns:
+            先に成功したリクエストのレスポンス(追加のリクエストを送った場合、usageは両方の合計)
+        Raises:
+            DeadlineExceededError: 期限までに応答が返らなかった場合
+        """
+        self.budget.on_request()
+        primary = self._submit(converse, request, kind)
+        delay = self.hedge_delay(request.get("modelId"), kind)
+        if delay is None:
+            return self._result(primary, deadline)
+
+        timeout = delay if deadline is None else min(delay, deadline.remaining_seconds())
+        done, _ = wait([primary], timeout=timeout)
+        if done or not self.budget.try_acquire():
+            return self._result(primary, deadline)
+
+        logger.info(f"応答が{delay:.2f}秒を超えたため、追加のリクエストを送ります")
+        hedge_request = request
+        if self.hedge_model_id and request.get("modelId") == self.primary_model_id:
+            hedge_request = {**request, "modelId": self.hedge_model_id}
+
+        def send_hedge(hedged_request: Dict[str, Any]) -> Dict[str, Any]:
+            if self.hedge_converse:
+                response = self.hedge_converse(hedged_request, deadline)
+            else:
+                response = converse(hedged_request)
+            if hedged_request is not request:
+                # --- 別のモデルが応答したことを呼び出し元で判別できるようにする ---
+                response = {**response, "modelId": hedged_request["modelId"]}
+            return response
+
+        hedge = self._submit(send_hedge, hedge_request, kind)
+        return self._first_success([primary, hedge], deadline)
+
+    def _submit(self, converse: Callable[[Dict[str, Any]], Dict[str, Any]], request: Dict[str, Any], kind: str = "") -> Future:
+        started = self.clock()
+        latencies = self.latencies(request.get("modelId"), kind)
+        future = self._executor.submit(converse, request)
+
+        def record(completed: Future):
+            if not completed.exception():
+                latencies.record(self.clock() - started)
+
+        future.add_done_callback(record)
+        return future
+
+    @staticmethod
+    def _result(future: Future, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        """期限まで応答を待つ"""
+        try:
+            return future.result(timeout=deadline.remaining_seconds() if deadline else None)
+        except FutureTimeoutError:
+            raise DeadlineExceededError.timed_out(OPERATION_NAME)
+
+    @staticmethod
+    def _first_success(futures: List[Future], deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        先に成功した結果を返す(両方失敗した場合は最初のリクエストのエラーを送出する)
+        破棄するリクエストのトークン使用量は、返すレスポンスのusageに加えます。
+        """
+        pending = set(futures)
+        while pending:
+            done, pending = wait(
+                pending, timeout=deadline.remaining_seconds() if deadline else None, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                raise DeadlineExceededError.timed_out(OPERATION_NAME)
+            for future in done:
+                if not future.exception():
+                    discarded = next(other for other in futures if other is not future)
+                    return _with_discarded_usage(future.result(), discarded)
+        return futures[0].result()
+
+
+def _with_discarded_usage(response: Dict[str, Any], discarded: Future) -> Dict[str, Any]:
+    """
+    破棄するリクエストのトークン使用量を、使うレスポンスのusageに加える
+    破棄するリクエストが未完了の場合は、同じリクエストのため使うレスポンスと同じ使用量とみなします。
+    失敗した場合は課金されないものとして加えません。
+    """
+    usage = response.get("usage") or {}
+    if not discarded.done():
+        discarded_usage = usage
+    elif discarded.exception():
+        return response
+    else:
+        discarded_usage = discarded.result().get("usage") or {}
+    total_usage = sum_bedrock_usage(usage, discarded_usage)
+    logger.info(f"破棄したリクエストを含めたトークン使用量:{total_usage}")
+    return {**response, "usage": total_usage}
@@ -1,9 +1,21 @@
-import json
-import base64
+import os
 import logging
+from typing import Any, Dict, List
 
 from code_review.code_review import CodeReviewService, CodeReviewServiceContext
-from common.exception import RequestParameterError
+from code_review.project import ProjectFile
+from code_review.source_decoder import SourceLimits, decode_project_files, decode_source, is_project_request
+from code_review.static_check import language_from_path
+from code_review.webhook import is_valid_callback_url, parse_webhook_message
+from common.deadline import Deadline
+from common.exception import (
+    CapacityExceededError,
+    DeadlineExceededError,
+    PayloadTooLargeError,
+    QuotaExceededError,
+    RequestParameterError,
+)
+from common.request import get_api_key_id, get_header, get_query_parameter, load_json_body
 from common.response import ApiResponseBuilder
 
 
@@ -11,6 +23,10 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 container = CodeReviewServiceContext()
+source_limits = SourceLimits.from_environ(os.environ)
+
+# Lambdaのタイムアウトまでに応答を返すために残しておく秒数
+deadline_safety_margin_seconds = float(os.environ.get("DEADLINE_SAFETY_MARGIN_SECONDS", 1.5))
 
 
 def code_review_handler(event, context):
@@ -24,33 +40,103 @@ def code_review_handler(event, context):
         API Gatewayが期待するレスポンス形式の辞書。
     """
     try:
-        # --- リクエストの解析と検証 ---
-        body = event.get("body")
-        if isinstance(body, str):
-            body = json.loads(body)
+        # --- 処理の期限(Lambdaの残り実行時間から応答を返す余裕を差し引いた時刻) ---
+        deadline = Deadline.from_lambda_context(context, deadline_safety_margin_seconds)
 
-        # --- ソースコード文字列取得 ---
-        source_base64 = body.get("source_base64")
-        if not source_base64:
-            raise RequestParameterError.not_found("source_base64")
+        # --- リクエストの解析と検証(明らかに大きいリクエストは解析前に拒否する) ---
+        raw_body = event.get("body")
+        if isinstance(raw_body, str) and len(raw_body) > source_limits.max_request_chars:
+            raise PayloadTooLargeError.exceeded("body", f"{source_limits.max_request_chars} chars")
+        body = load_json_body(event)
 
-        # --- Base64化を期待 ---
-        try:
-            source_code = base64.b64decode(source_base64).decode("utf-8")
-        except (base64.binascii.Error, UnicodeDecodeError) as error:
-            raise RequestParameterError.invalid_format("source_base64", "Base64デコードに失敗") from error
+        project_files = None
+        if is_project_request(body):
+            # --- プロジェクトのファイル取得(ファイルの配列 / zip+Base64) ---
+            project_files = load_project_files(body)
+        else:
+            # --- ソースコード文字列取得(gzip+Base64 / Base64 / テキスト) ---
+            source_code = decode_source(body, source_limits)
+
+            # --- プログラミング言語取得 ---
+            language = body.get("language")
+            if not language:
+                raise RequestParameterError.not_found("language")
+
+        # --- 指摘事項の上限件数取得(任意) ---
+        max_points = body.get("max_points")
+        if max_points is not None and (type(max_points) is not int or max_points <= 0):
+            raise RequestParameterError.invalid_format("max_points", "正の整数ではありません")
 
-        # --- プログラミング言語取得 ---
-        language = body.get("language")
-        if not language:
-            raise RequestParameterError.not_found("language")
+        # --- コールバックURL取得(任意) ---
+        callback_url = body.get("callback_url")
+        api_key = None
+        if callback_url:
+            if not is_valid_callback_url(callback_url):
+                raise RequestParameterError.invalid_format("callback_url", "送信できるhttp(s)のURLではありません")
+            # --- 署名鍵にはリクエストに使用したAPIキーを用いる ---
+            api_key = get_header(event, "x-api-key")
+            if not api_key:
+                raise RequestParameterError.not_found("x-api-key")
 
-        # --- コードレビューの実行 ---
-        code_review_service: CodeReviewService = container.code_review_service
-        review_result = code_review_service.excute_review(source_code, language)
+        # --- コードレビューの実行(プロジェクトの場合はファイルごとに並列に実行する) ---
+        if project_files is not None:
+            review_result = container.project_review_service.excute_review(
+                project_files,
+                api_key_id=get_api_key_id(event),
+                deadline=deadline,
+                max_points=max_points,
+            )
+        else:
+            code_review_service: CodeReviewService = container.code_review_service
+            review_result = code_review_service.excute_review(
+                source_code,
+                language,
+                api_key_id=get_api_key_id(event),
+                deadline=deadline,
+                max_points=max_points,
+            )
 
-        # --- レスポンスの整形 ---
-        return ApiResponseBuilder.success(review_result)
+        # --- 結果をコールバックURLへ配信(キューがない場合は期限内に同期的に配信する) ---
+        if callback_url:
+            request_id = context.aws_request_id if context else "Unknown"
+            container.webhook_notifier.notify(
+                callback_url,
+                api_key,
+                {"request_id": request_id, "review": review_result},
+                deadline=deadline,
+            )
+
+        # --- レスポンスの整形(項目の絞り込み・圧縮) ---
+        fields = get_query_parameter(event, "fields") or body.get("fields")
+        return ApiResponseBuilder() \
+            .with_body(review_result) \
+            .with_fields(fields) \
+            .with_compression(get_header(event, "Accept-Encoding")) \
+            .build()
+
+    except PayloadTooLargeError as error:
+        # --- リクエストサイズ超過 ---
+        request_id = context.aws_request_id if context else "Unknown"
+        logger.warning(f"リクエストサイズが上限を超えています RequestId:{request_id} Parameter: {error.parameter_name}")
+        return ApiResponseBuilder.payload_too_large(f"'{error.parameter_name}' is too large")
+
+    except CapacityExceededError as error:
+        # --- サービス全体の処理能力の超過(Bedrockのスロットリングを待たずに即座に返す) ---
+        request_id = context.aws_request_id if context else "Unknown"
+        logger.warning(f"処理能力の上限に達しています RequestId:{request_id} RetryAfter: {error.retry_after_seconds}")
+        return ApiResponseBuilder.service_unavailable(str(error), error.retry_after_seconds)
+
+    except DeadlineExceededError as error:
+        # --- 期限切れ(Lambdaのタイムアウトで強制終了される前に応答を返す) ---
+        request_id = context.aws_request_id if context else "Unknown"
+        logger.warning(f"期限までに処理を完了できませんでした RequestId:{request_id} Operation: {error.operation}")
+        return ApiResponseBuilder.gateway_timeout("The review could not be completed in time")
+
+    except QuotaExceededError as error:
+        # --- 利用枠の超過 ---
+        request_id = context.aws_request_id if context else "Unknown"
+        logger.warning(f"利用枠を超えています RequestId:{request_id} Reason: {error}")
+        return ApiResponseBuilder.too_many_requests(str(error), error.retry_after_seconds)
 
     except RequestParameterError as error:
         # --- リクエスト異常系 ---
@@ -63,3 +149,47 @@ def code_review_handler(event, context):
         request_id = context.aws_request_id if context else "Unknown"
         logger.exception(f"予期せぬエラーが発生しました RequestId:{request_id} ")
         return ApiResponseBuilder.internal_server_error("An internal server error occurred")
+
+
+def webhook_handler(event, context):
+    """
+    コールバックの配信キュー(SQS)のハンドラー関数。
+    メッセージごとに期限内で配信(再送を含む)し、配信できなかったものはデッドレターとして記録します。
+    想定外の例外で処理できなかったメッセージだけを batchItemFailures として返し、SQSに再配信させます。
+    Args:
+        event (Dict): SQSのイベント
+        context (Dict): Lambdaランタイムコンテキスト
+    Returns:
+        部分的なバッチ応答({"batchItemFailures": [{"itemIdentifier": メッセージID}]})
+    """
+    deadline = Deadline.from_lambda_context(context, deadline_safety_margin_seconds)
+    failures = []
+    for record in event.get("Records", []):
+        try:
+            message = parse_webhook_message(record["body"])
+            container.webhook_notifier.deliver(
+                message["callback_url"], message["secret"], message["payload"], deadline=deadline
+            )
+        except Exception:
+            logger.exception(f"コールバックの配信依頼を処理できませんでした MessageId:{record.get('messageId')}")
+            failures.append({"itemIdentifier": record.get("messageId")})
+    return {"batchItemFailures": failures}
+
+
+def load_project_files(body: Dict[str, Any]) -> List[ProjectFile]:
+    """
+    リクエストボディからプロジェクトのファイルを取り出し、ファイルごとの言語種別を決める
+    言語種別は language の指定を優先し、指定がない場合は拡張子から求めます。
+    zipファイル内の、拡張子から言語種別が決まらないファイルはレビューの対象外とします。
+    Raises:
+        PayloadTooLargeError: サイズ上限・ファイル数の上限を超えた場合
+        RequestParameterError: ファイルがない、復号できない、または言語種別が決まらない場合
+    """
+    language = body.get("language")
+    project_files = []
+    for path, source_code in decode_project_files(body, source_limits, lambda path: bool(language_from_path(path))):
+        file_language = language or language_from_path(path)
+        if not file_language:
+            raise RequestParameterError.invalid_format("language", f"'{path}' の言語種別を拡張子から判定できません")
+        project_files.append(ProjectFile(path=path, language=file_language, source_code=source_code))
+    return project_files
@@ -0,0 +1,396 @@
+import zlib
+import time
+import random
+import difflib
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_review.clone_detect import normalized_tokens
+from code_review.result_store import BATCH_RETRY_MAX, BATCH_WRITE_LIMIT
+from common import json_codec
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# MinHashの置換に使う素数(2^31 - 1)。係数・ハッシュ値をこれ未満にし、積が64ビット整数に収まるようにする
+_MERSENNE_PRIME = (1 << 31) - 1
+
+# DynamoDBの1アイテムの上限(400KB)に対して余裕を持たせた保存上限
+MAX_DOCUMENT_BYTES = 350 * 1024
+
+
+@dataclass(frozen=True)
+class NearDuplicateConfig:
+    # 類似度(Jaccard係数の推定値)がこの値以上の提出を近似重複とみなす
+    threshold: float = 0.85
+
+    # MinHashの署名の長さ(bands × rows)
+    num_perm: int = 64
+
+    # LSHのバンド数
+    bands: int = 16
+
+    # シングル(連続する字句)の長さ
+    shingle_tokens: int = 5
+
+    # 変更された行の割合がこれを超える場合は、差分だけのレビューをせずに全体をレビューする
+    max_changed_ratio: float = 0.3
+
+    # 差分だけをレビューする場合に含める前後の行数
+    context_lines: int = 2
+
+    # 索引の保存期間(日)
+    ttl_days: int = 30
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "NearDuplicateConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+        return cls(
+            threshold=float(config.get("Threshold", defaults.threshold)),
+            num_perm=int(config.get("NumPerm", defaults.num_perm)),
+            bands=int(config.get("Bands", defaults.bands)),
+            shingle_tokens=int(config.get("ShingleTokens", defaults.shingle_tokens)),
+            max_changed_ratio=float(config.get("MaxChangedRatio", defaults.max_changed_ratio)),
+            context_lines=int(config.get("ContextLines", defaults.context_lines)),
+            ttl_days=int(config.get("TtlDays", defaults.ttl_days)),
+        )
+
+
+class MinHasher:
+    """
+    正規化した字句のシングルからMinHashの署名を求めるクラス
+    識別子・数値は正規化するため、変数名だけが異なる提出は同じ署名になります。
+    """
+    def __init__(self, num_perm: int = 64, shingle_tokens: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_tokens = shingle_tokens
+        generator = random.Random(seed)
+        self._a = [generator.randrange(1, _MERSENNE_PRIME) for _ in range(num_perm)]
+        self._b = [generator.randrange(0, _MERSENNE_PRIME) for _ in range(num_perm)]
+
+    def shingles(self, source_code: str, language: str) -> List[int]:
+        """シングルごとのハッシュ値(重複なし)"""
+        tokens, _ = normalized_tokens(source_code, language)
+        k = self.shingle_tokens
+        if len(tokens) < k:
+            return [zlib.crc32(" ".join(tokens).encode("utf-8")) % _MERSENNE_PRIME] if tokens else []
+        return list({
+            zlib.crc32(" ".join(tokens[index:index + k]).encode("utf-8")) % _MERSENNE_PRIME
+            for index in range(len(tokens) - k + 1)
+        })
+
+    def signature(self, source_code: str, language: str) -> List[int]:
+        """MinHashの署名"""
+        shingles = self.shingles(source_code, language)
+        if not shingles:
+            return [_MERSENNE_PRIME] * self.num_perm
+        return [
+            min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+            for a, b in zip(self._a, self._b)
+        ]
+
+    @staticmethod
+    def similarity(signature: List[int], other: List[int]) -> float:
+        """2つの署名からJaccard係数を推定する"""
+        if not signature or len(signature) != len(other):
+            return 0.0
+        return sum(1 for value, other_value in zip(signature, other) if value == other_value) / len(signature)
+
+
+def lsh_bands(signature: List[int], bands: int) -> List[str]:
+    """署名をバンドに分け、バンドごとのハッシュ値を求める(同じバンドを持つ提出が候補となる)"""
+    rows = max(1, len(signature) // bands)
+    keys = []
+    for band in range(bands):
+        rows_bytes = array("I", signature[band * rows:(band + 1) * rows]).tobytes()
+        keys.append(f"{band}:{hashlib.blake2b(rows_bytes, digest_size=8).hexdigest()}")
+    return keys
+
+
+def index_scope(language: str, rule_set_version: str, model_id: str, options: str = "") -> str:
+    """レビュー結果を流用できる範囲(言語・ルールセット・モデル・オプションが同じ提出)を表すキー"""
+    key = f"{language.strip().lower()}:{rule_set_version}:{model_id}:{options}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class IndexedSource:
+    # レビュー結果のキー(fingerprint.review_key)
+    review_key: str
+
+    # MinHashの署名
+    signature: List[int]
+
+    # レビューしたソースコードとLLMの指摘事項(圧縮済み)
+    document: bytes
+
+
+@dataclass(frozen=True)
+class Neighbor:
+    # 近似重複と判定したレビュー結果のキー
+    review_key: str
+
+    # 推定した類似度
+    similarity: float
+
+    # レビューしたソースコード
+    source_code: str
+
+    # LLMの指摘事項(ローカル検査の指摘事項・件数の絞り込みを含まない)
+    review_points: List[Dict]
+
+
+def encode_document(source_code: str, review_points: List[Dict]) -> bytes:
+    return zlib.compress(json_codec.dumps_bytes({"source": source_code, "points": review_points}))
+
+
+def decode_document(document: bytes) -> Tuple[str, List[Dict]]:
+    decoded = json_codec.loads(zlib.decompress(document))
+    return decoded["source"], decoded["points"]
+
+
+class INearDuplicateStore(ABC):
+    """近似重複の索引の保存先のインターフェース"""
+    @abstractmethod
+    def add(self, scope: str, bands: List[str], source: IndexedSource):
+        """提出を索引に追加する"""
+        pass
+
+    @abstractmethod
+    def find(self, scope: str, bands: List[str]) -> List[IndexedSource]:
+        """いずれかのバンドが一致する提出を取得する"""
+        pass
+
+
+class NearDuplicateFromMemory(INearDuplicateStore):
+    """プロセス内で完結する索引(ローカル実行・テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bands: Dict[str, str] = {}
+        self._sources: Dict[str, IndexedSource] = {}
+
+    def add(self, scope: str, bands: List[str], source: IndexedSource):
+        with self._lock:
+            for band in bands:
+                self._bands[f"{scope}#{band}"] = source.review_key
+            self._sources[f"{scope}#{source.review_key}"] = source
+
+    def find(self, scope: str, bands: List[str]) -> List[IndexedSource]:
+        with self._lock:
+            review_keys = dict.fromkeys(self._bands[key] for key in (f"{scope}#{band}" for band in bands) if key in self._bands)
+            return [self._sources[f"{scope}#{review_key}"] for review_key in review_keys]
+
+
+class NearDuplicateFromDynamoDB(INearDuplicateStore):
+    """
+    近似重複の索引をDynamoDBに保存するクラス
+    バンドごとのアイテムには最後に追加した提出のキーだけを持たせ、1回のBatchGetItemで候補を求めます。
+    署名と圧縮したソースコード・指摘事項は提出ごとのアイテムに保存します。
+    """
+    def __init__(self, dynamodb_client: "DynamoDBClient", table_name: str, ttl_days: int = 30, sleep=time.sleep):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.ttl_days = ttl_days
+        self.sleep = sleep
+
+    def add(self, scope: str, bands: List[str], source: IndexedSource):
+        if len(source.document) > MAX_DOCUMENT_BYTES:
+            logger.warning(f"ソースコードが大きすぎるため索引に追加しません key={source.review_key}")
+            return
+        expires_at = {"N": str(int((datetime.now() + timedelta(days=self.ttl_days)).timestamp()))}
+        items = [{
+            "index_key": {"S": self._source_key(scope, source.review_key)},
+            "signature": {"B": array("I", source.signature).tobytes()},
+            "document": {"B": source.document},
+            "expires_at": expires_at,
+        }]
+        for band in bands:
+            items.append({
+                "index_key": {"S": f"{scope}#{band}"},
+                "review_key": {"S": source.review_key},
+                "expires_at": expires_at,
+            })
+        for start in range(0, len(items), BATCH_WRITE_LIMIT):
+            request = {self.table_name: [{"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_LIMIT]]}
+            for attempt in range(BATCH_RETRY_MAX):
+                response = self.dynamodb_client.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems") or {}
+                if not request:
+                    break
+                self.sleep(0.05 * (2 ** attempt))
+            if request:
+                logger.warning(
+                    f"索引の一部を追加できませんでした key={source.review_key} count={len(request.get(self.table_name, []))}"
+                )
+
+    def find(self, scope: str, bands: List[str]) -> List[IndexedSource]:
+        band_items = self._batch_get([f"{scope}#{band}" for band in bands], "review_key")
+        review_keys = list(dict.fromkeys(item["review_key"]["S"] for item in band_items))
+        if not review_keys:
+            return []
+
+        source_items = self._batch_get([self._source_key(scope, key) for key in review_keys], "index_key, signature, document")
+        sources = []
+        for item in source_items:
+            signature = array("I")
+            signature.frombytes(item["signature"]["B"])
+            sources.append(IndexedSource(
+                review_key=item["index_key"]["S"].rsplit("#", 1)[1],
+                signature=signature.tolist(),
+                document=item["document"]["B"],
+            ))
+        return sources
+
+    def _batch_get(self, keys: List[str], projection: str) -> List[Dict]:
+        response = self.dynamodb_client.batch_get_item(RequestItems={
+            self.table_name: {
+                "Keys": [{"index_key": {"S": key}} for key in keys],
+                "ProjectionExpression": projection,
+            }
+        })
+        if response.get("UnprocessedKeys"):
+            logger.warning("索引の一部を取得できませんでした")
+        return response.get("Responses", {}).get(self.table_name, [])
+
+    @staticmethod
+    def _source_key(scope: str, review_key: str) -> str:
+        return f"{scope}#source#{review_key}"
+
+
+class NearDuplicateIndex:
+    """
+    レビュー済みの提出のMinHash/LSH索引
+    変数名や空行だけが異なる提出を見つけ、そのLLMの指摘事項を流用できるようにします。
+    """
+    def __init__(self, store: INearDuplicateStore, config: Optional[NearDuplicateConfig] = None):
+        self.store = store
+        self.config = config or NearDuplicateConfig()
+        self.hasher = MinHasher(self.config.num_perm, self.config.shingle_tokens)
+
+    def find(self, scope: str, source_code: str, language: str) -> Optional[Neighbor]:
+        """類似度がしきい値以上で最も類似した提出を求める(見つからない場合や索引の障害時はNone)"""
+        signature = self.hasher.signature(source_code, language)
+        try:
+            candidates = self.store.find(scope, lsh_bands(signature, self.config.bands))
+        except Exception:
+            logger.exception("近似重複の索引を参照できませんでした")
+            return None
+
+        best, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = MinHasher.similarity(signature, candidate.signature)
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is None or best_similarity < self.config.threshold:
+            return None
+
+        neighbor_source, review_points = decode_document(best.document)
+        return Neighbor(
+            review_key=best.review_key,
+            similarity=best_similarity,
+            source_code=neighbor_source,
+            review_points=review_points,
+        )
+
+    def add(self, scope: str, review_key: str, source_code: str, language: str, review_points: List[Dict]):
+        """レビューした提出を索引に追加する(索引の障害はレビュー結果に影響させない)"""
+        signature = self.hasher.signature(source_code, language)
+        source = IndexedSource(review_key, signature, encode_document(source_code, review_points))
+        try:
+            self.store.add(scope, lsh_bands(signature, self.config.bands), source)
+        except Exception:
+            logger.exception(f"近似重複の索引に追加できませんでした key={review_key}")
+
+
+@dataclass(frozen=True)
+class ReusePlan:
+    # 流用する指摘事項(行番号は新しいソースコードに合わせたもの)
+    review_points: List[Dict]
+
+    # LLMにレビューを依頼する行範囲(1始まり、両端を含む)。空の場合は流用した指摘事項だけで完結する
+    regions: List[Tuple[int, int]]
+
+
+def _comparable(line: str) -> str:
+    """空白の違いを無視して行を比較するための文字列"""
+    return " ".join(line.split())
+
+
+def plan_reuse(neighbor: Neighbor, source_code: str, config: NearDuplicateConfig) -> Optional[ReusePlan]:
+    """
+    近似重複の提出の指摘事項を、行の対応付け(difflib)で新しいソースコードに移し替える
+    変更のない行の指摘事項は行番号を付け替えて流用し、変更された行は前後の行と合わせてLLMにレビューを依頼する範囲とします。
+    行番号のない指摘事項は、どの行に対応するか判断できないため流用しません。
+    空行だけの変更はレビューの対象にしません。
+    Returns:
+        流用の計画(変更された行の割合が大きすぎる場合はNone)
+    """
+    neighbor_lines = [_comparable(line) for line in neighbor.source_code.splitlines()]
+    lines = [_comparable(line) for line in source_code.splitlines()]
+    matcher = difflib.SequenceMatcher(None, neighbor_lines, lines, autojunk=False)
+
+    line_map: Dict[int, int] = {}
+    changed_lines: List[int] = []
+    for tag, neighbor_start, neighbor_end, start, end in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(neighbor_end - neighbor_start):
+                line_map[neighbor_start + offset + 1] = start + offset + 1
+        else:
+            changed_lines.extend(line + 1 for line in range(start, end) if lines[line])
+
+    if lines and len(changed_lines) / len(lines) > config.max_changed_ratio:
+        return None
+
+    review_points = [
+        {**point, "codeline": line_map[point["codeline"]]}
+        for point in neighbor.review_points
+        if point.get("codeline") is not None and point["codeline"] in line_map
+    ]
+
+    regions: List[Tuple[int, int]] = []
+    for line in changed_lines:
+        start, end = max(1, line - config.context_lines), min(len(lines), line + config.context_lines)
+        if regions and start <= regions[-1][1] + 1:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return ReusePlan(review_points=review_points, regions=regions)
+
+
+def extract_regions(source_code: str, regions: List[Tuple[int, int]]) -> Tuple[str, List[int]]:
+    """
+    行範囲だけを取り出したソースコードを作る(範囲の間は空行で区切る)
+    Returns:
+        (取り出したソースコード, 取り出したソースコードの行ごとの元の行番号。区切りの空行は0)
+    """
+    lines = source_code.splitlines()
+    extracted: List[str] = []
+    line_numbers: List[int] = []
+    for start, end in regions:
+        if extracted:
+            extracted.append("")
+            line_numbers.append(0)
+        extracted.extend(lines[start - 1:end])
+        line_numbers.extend(range(start, end + 1))
+    return "\n".join(extracted) + "\n", line_numbers
+
+
+def restore_codelines(review_points: List[Dict], line_numbers: List[int]) -> List[Dict]:
+    """取り出したソースコードに対する指摘事項の行番号を、元のソースコードの行番号に戻す"""
+    restored = []
+    for point in review_points:
+        codeline = point.get("codeline")
+        if isinstance(codeline, int) and 1 <= codeline <= len(line_numbers) and line_numbers[codeline - 1]:
+            restored.append({**point, "codeline": line_numbers[codeline - 1]})
+        else:
+            restored.append({**point, "codeline": None})
+    return restored
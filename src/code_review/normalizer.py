@@ -0,0 +1,230 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from code_review.tokens import estimate_tokens
+
+
+# 自動生成コード領域の開始・終了の目印
+GENERATED_REGION_MARKERS: Tuple[Tuple[Pattern, Pattern], ...] = (
+    (re.compile(r"^\s*#region\b.*\bgenerated\b", re.IGNORECASE), re.compile(r"^\s*#endregion\b", re.IGNORECASE)),
+    (re.compile(r"^\s*(//|#)\s*<auto-generated", re.IGNORECASE), re.compile(r"^\s*(//|#)\s*</auto-generated>", re.IGNORECASE)),
+    (re.compile(r"^\s*(//|#)\s*BEGIN GENERATED", re.IGNORECASE), re.compile(r"^\s*(//|#)\s*END GENERATED", re.IGNORECASE)),
+)
+
+# データリテラルだけで構成された行(数値・文字列のカンマ区切り)
+_DATA_LITERAL_LINE = re.compile(
+    r"""^\s*[\[{(]?\s*(?:(?:-?(?:0x[0-9a-fA-F]+|\d+(?:\.\d+)?)[fFlLuUdDmM]?|"[^"\\]*"|'[^'\\]*')\s*,\s*)+"""
+    r"""(?:-?(?:0x[0-9a-fA-F]+|\d+(?:\.\d+)?)[fFlLuUdDmM]?|"[^"\\]*"|'[^'\\]*')?\s*[\]})]?[,;]?\s*$"""
+)
+
+# 文字列リテラル(エスケープを考慮)
+_STRING_LITERAL = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+
+
+@dataclass(frozen=True)
+class NormalizerConfig:
+    # 行末の空白を削除する
+    strip_trailing_whitespace: bool = True
+
+    # インデントをタブ・空白混在から空白に統一し、1階層あたりの幅を揃える(0で無効)
+    indent_width: int = 2
+
+    # タブ1文字の幅
+    tab_size: int = 4
+
+    # 連続する空行を1行にまとめる
+    collapse_blank_lines: bool = True
+
+    # この文字数を超える文字列リテラルを目印に置き換える(0で無効)
+    max_literal_chars: int = 200
+
+    # この文字数以上のBase64風の文字列を目印に置き換える(0で無効)
+    min_base64_chars: int = 120
+
+    # この行数以上続くデータリテラル行をまとめる(0で無効)
+    min_data_literal_lines: int = 8
+
+    # 自動生成コード領域をまとめる
+    collapse_generated_regions: bool = True
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "NormalizerConfig":
+        """SSMから読み込んだ設定(文字列の辞書)から生成する"""
+        defaults = cls()
+
+        def to_bool(key: str, default: bool) -> bool:
+            return str(config.get(key, default)).lower() in ("true", "1", "yes")
+
+        return cls(
+            strip_trailing_whitespace=to_bool("StripTrailingWhitespace", defaults.strip_trailing_whitespace),
+            indent_width=int(config.get("IndentWidth", defaults.indent_width)),
+            tab_size=int(config.get("TabSize", defaults.tab_size)),
+            collapse_blank_lines=to_bool("CollapseBlankLines", defaults.collapse_blank_lines),
+            max_literal_chars=int(config.get("MaxLiteralChars", defaults.max_literal_chars)),
+            min_base64_chars=int(config.get("MinBase64Chars", defaults.min_base64_chars)),
+            min_data_literal_lines=int(config.get("MinDataLiteralLines", defaults.min_data_literal_lines)),
+            collapse_generated_regions=to_bool("CollapseGeneratedRegions", defaults.collapse_generated_regions),
+        )
+
+
+@dataclass
+class NormalizedSource:
+    # 正規化後のソースコード
+    text: str
+
+    # 正規化後の行番号(1始まり)から元の行番号への対応表。line_map[i]が i+1 行目の元の行番号
+    line_map: List[int] = field(default_factory=list)
+
+    # 正規化前の文字数
+    original_chars: int = 0
+
+    # 削減した推定トークン数
+    saved_tokens: int = 0
+
+    @property
+    def saved_chars(self) -> int:
+        return self.original_chars - len(self.text)
+
+    def to_original_line(self, line: int) -> int:
+        """正規化後の行番号を元の行番号に変換する"""
+        if not self.line_map:
+            return line
+        index = min(max(int(line), 1), len(self.line_map)) - 1
+        return self.line_map[index]
+
+    def remap_review_points(self, review_result: Dict) -> Dict:
+        """レビュー結果のcodelineを元のソースコードの行番号に書き換える"""
+        for point in review_result.get("review_points") or []:
+            if isinstance(point.get("codeline"), int):
+                point["codeline"] = self.to_original_line(point["codeline"])
+        return review_result
+
+
+class SourceNormalizer:
+    """
+    プロンプトに含める前にソースコードを正規化し、入力トークンを削減するクラス
+    レビューに影響しない領域(大きなデータリテラル・Base64・自動生成コードなど)は目印に置き換え、
+    行番号の対応表を保持して、レビュー結果の行番号を元のソースコードに戻せるようにします。
+    """
+    def __init__(self, config: Optional[NormalizerConfig] = None):
+        self.config = config or NormalizerConfig()
+        self._base64 = None
+        if self.config.min_base64_chars:
+            self._base64 = re.compile(r"[A-Za-z0-9+/]{%d,}={0,2}" % self.config.min_base64_chars)
+
+    def normalize(self, source_code: str) -> NormalizedSource:
+        lines = source_code.splitlines()
+        output: List[Tuple[str, int]] = []
+        indent_unit = self._detect_indent_unit(lines)
+
+        index = 0
+        while index < len(lines):
+            # --- 自動生成コード領域 ---
+            region_end = self._find_generated_region_end(lines, index)
+            if region_end is not None:
+                output.append((self._marker(self._normalize_line(lines[index], indent_unit), "generated code", index, region_end), index + 1))
+                index = region_end + 1
+                continue
+
+            # --- 連続するデータリテラル行 ---
+            literal_end = self._find_data_literal_end(lines, index)
+            if literal_end is not None:
+                output.append((self._marker(self._normalize_line(lines[index], indent_unit), "data literal", index, literal_end), index + 1))
+                index = literal_end + 1
+                continue
+
+            line = self._normalize_line(lines[index], indent_unit)
+
+            # --- 連続する空行 ---
+            if not line.strip() and self.config.collapse_blank_lines and output and not output[-1][0].strip():
+                index += 1
+                continue
+
+            output.append((line, index + 1))
+            index += 1
+
+        text = "\n".join(line for line, _ in output)
+        if source_code.endswith("\n") and output:
+            text += "\n"
+        saved_tokens = estimate_tokens(source_code) - estimate_tokens(text)
+
+        # --- 削減できない(文字数が減らない・推定トークン数が増える)場合は元のソースコードをそのまま使う ---
+        if saved_tokens < 0 or len(text) >= len(source_code):
+            return NormalizedSource(text=source_code, original_chars=len(source_code))
+        return NormalizedSource(
+            text=text,
+            line_map=[original_line for _, original_line in output],
+            original_chars=len(source_code),
+            saved_tokens=saved_tokens,
+        )
+
+    def _normalize_line(self, line: str, indent_unit: int) -> str:
+        if self.config.strip_trailing_whitespace:
+            line = line.rstrip()
+
+        if self.config.indent_width and indent_unit:
+            body = line.lstrip(" \t")
+            columns = len(line[:len(line) - len(body)].expandtabs(self.config.tab_size))
+            line = " " * (columns // indent_unit * self.config.indent_width + columns % indent_unit) + body
+
+        if self.config.max_literal_chars:
+            line = _STRING_LITERAL.sub(self._replace_long_literal, line)
+        if self._base64:
+            line = self._base64.sub(lambda match: f"<<base64 {len(match.group(0))} chars>>", line)
+        return line
+
+    def _replace_long_literal(self, match) -> str:
+        literal = match.group(0)
+        if len(literal) <= self.config.max_literal_chars:
+            return literal
+        quote = literal[0]
+        return f"{quote}<<string {len(literal) - 2} chars>>{quote}"
+
+    def _detect_indent_unit(self, lines: List[str]) -> int:
+        """
+        1階層あたりのインデント幅(空白換算の桁数)を求める
+        前の行からインデントが深くなった幅のうち最も多いものを1階層とします。
+        ドキュメントコメントの継続行(" * ")は1桁ずれているため数えません。
+        揃える幅以下の場合は、揃えても短くならないため0(揃えない)を返します。
+        """
+        deltas: Counter = Counter()
+        previous = 0
+        for line in lines:
+            body = line.lstrip(" \t")
+            if not body or body.startswith("*"):
+                continue
+            width = len(line[:len(line) - len(body)].expandtabs(self.config.tab_size))
+            if width > previous:
+                deltas[width - previous] += 1
+            previous = width
+        if not deltas:
+            return 0
+        # 最も多い幅(同数の場合は小さい方)
+        unit = min(deltas, key=lambda delta: (-deltas[delta], delta))
+        return unit if unit > self.config.indent_width else 0
+
+    def _find_generated_region_end(self, lines: List[str], start: int) -> Optional[int]:
+        if not self.config.collapse_generated_regions:
+            return None
+        for begin_marker, end_marker in GENERATED_REGION_MARKERS:
+            if begin_marker.search(lines[start]):
+                for index in range(start + 1, len(lines)):
+                    if end_marker.search(lines[index]):
+                        return index
+        return None
+
+    def _find_data_literal_end(self, lines: List[str], start: int) -> Optional[int]:
+        min_lines = self.config.min_data_literal_lines
+        if not min_lines or not _DATA_LITERAL_LINE.match(lines[start]):
+            return None
+        end = start
+        while end + 1 < len(lines) and _DATA_LITERAL_LINE.match(lines[end + 1]):
+            end += 1
+        return end if end - start + 1 >= min_lines else None
+
+    @staticmethod
+    def _marker(first_line: str, kind: str, start: int, end: int) -> str:
+        indent = first_line[:len(first_line) - len(first_line.lstrip(" \t"))]
+        return f"{indent}<<{kind} omitted: original lines {start + 1}-{end + 1}>>"
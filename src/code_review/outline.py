@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from code_review.static_check import LANGUAGE_SYNTAXES, extract_identifiers, mask_comments_and_strings, resolve_language
+from code_review.tokens import estimate_tokens
+from code_review.units import UNIT_KIND_MODULE, split_units
+
+
+# アウトラインでレビューした結果の review_mode の値
+REVIEW_MODE_OUTLINE = "outline"
+
+# アウトラインに残す宣言の種別
+_DECLARATION_KINDS = ("class", "function")
+
+# 宣言の行から本体の開始までとみなす最大行数(複数行にわたる引数リストなど)
+_MAX_HEADER_LINES = 6
+
+# 宣言の直前に続く属性・デコレータとして残す最大行数
+_MAX_ATTRIBUTE_LINES = 3
+
+
+@dataclass(frozen=True)
+class OutlineConfig:
+    # この推定トークン数を超えるソースコードはアウトラインでレビューする
+    threshold_tokens: int = 8000
+
+    # 関数・クラスごとに残す本体の先頭の行数(空行を除く)
+    body_lines: int = 3
+
+    # 関数・クラス以外の行のまとまり(import文・フィールドなど)ごとに残す先頭の行数(空行を除く)
+    module_lines: int = 10
+
+    @classmethod
+    def from_config(cls, config: dict) -> "OutlineConfig":
+        """SSMパラメータ(review/Outline)から設定を読み込む。未設定の項目は既定値とする"""
+        defaults = cls()
+        return cls(
+            threshold_tokens=int(config.get("ThresholdTokens", defaults.threshold_tokens)),
+            body_lines=int(config.get("BodyLines", defaults.body_lines)),
+            module_lines=int(config.get("ModuleLines", defaults.module_lines)),
+        )
+
+
+@dataclass(frozen=True)
+class Outline:
+    # アウトラインのソースコード(省略した行は、元の行範囲を示すコメント1行に置き換える)
+    text: str
+
+    # アウトラインの行ごとの元の行番号(省略を示すコメントの行は0)
+    line_numbers: List[int]
+
+
+def extract_outline(source_code: str, language: str, config: OutlineConfig = OutlineConfig()) -> Optional[Outline]:
+    """
+    ソースコードを、宣言の行・識別子と本体の先頭の数行だけのアウトラインにする
+    命名・分割・重複など構造についてのレビューに必要な行だけを残し、元の行番号との対応表を返します。
+    本体の行を残しても閾値を超える場合は、宣言の行だけにします。
+    Returns:
+        アウトライン(未対応の言語、または宣言が見つからない場合はNone)
+    """
+    syntax = LANGUAGE_SYNTAXES.get(resolve_language(language))
+    if not syntax:
+        return None
+    declaration_lines = sorted({
+        identifier.line for identifier in extract_identifiers(source_code, language)
+        if identifier.kind in _DECLARATION_KINDS
+    })
+    if not declaration_lines:
+        return None
+
+    lines = source_code.splitlines()
+    masked_lines = mask_comments_and_strings(source_code, syntax).splitlines()
+    outline = None
+    for body_lines in sorted({config.body_lines, 0}, reverse=True):
+        kept = _kept_lines(source_code, language, masked_lines, declaration_lines, body_lines, config.module_lines)
+        outline = _build(lines, kept, syntax.line_comments[0])
+        if estimate_tokens(outline.text) <= config.threshold_tokens:
+            break
+    return outline
+
+
+def _kept_lines(
+    source_code: str,
+    language: str,
+    masked_lines: List[str],
+    declaration_lines: List[int],
+    body_lines: int,
+    module_lines: int,
+) -> Set[int]:
+    """アウトラインに残す行番号の集合"""
+    kept: Set[int] = set()
+
+    def keep_leading(start: int, end: int, count: int):
+        """start行目から end行目までの、空行・コメントだけの行を除く先頭の count 行を残す"""
+        for number in range(start, end + 1):
+            if count <= 0:
+                break
+            if masked_lines[number - 1].strip():
+                kept.add(number)
+                count -= 1
+
+    for line in declaration_lines:
+        # --- 直前の属性・デコレータ ---
+        number = line - 1
+        while number >= 1 and line - number <= _MAX_ATTRIBUTE_LINES and masked_lines[number - 1].strip().startswith(("@", "[")):
+            kept.add(number)
+            number -= 1
+
+        # --- 宣言の行から本体の開始(波括弧・コロン)まで ---
+        header_end = line
+        while header_end < min(len(masked_lines), line + _MAX_HEADER_LINES - 1):
+            text = masked_lines[header_end - 1].rstrip()
+            if "{" in text or text.endswith(":") or text.endswith(";"):
+                break
+            header_end += 1
+        kept.update(range(line, header_end + 1))
+
+        # --- 本体の先頭の数行 ---
+        keep_leading(header_end + 1, len(masked_lines), body_lines)
+
+    # --- 関数・クラス以外の行(import文・フィールド・名前空間など)の先頭 ---
+    for unit in split_units(source_code, language):
+        if unit.kind == UNIT_KIND_MODULE:
+            keep_leading(unit.start_line, unit.end_line, module_lines)
+    return kept
+
+
+def _build(lines: List[str], kept: Set[int], line_comment: str) -> Outline:
+    """残す行を並べ、省略した範囲を元の行範囲を示すコメント1行に置き換える"""
+    text_lines: List[str] = []
+    line_numbers: List[int] = []
+    omitted: List[int] = []
+
+    def flush():
+        non_blank = [number for number in omitted if lines[number - 1].strip()]
+        if len(omitted) == 1 and non_blank:
+            # 1行だけの省略はコメントに置き換えても短くならないため、そのまま残す
+            text_lines.append(lines[omitted[0] - 1])
+            line_numbers.append(omitted[0])
+        elif non_blank:
+            first = lines[non_blank[0] - 1]
+            indent = first[:len(first) - len(first.lstrip())]
+            text_lines.append(f"{indent}{line_comment} ... ({len(omitted)} lines omitted: {omitted[0]}-{omitted[-1]})")
+            line_numbers.append(0)
+        omitted.clear()
+
+    for number, line in enumerate(lines, start=1):
+        if number in kept:
+            flush()
+            text_lines.append(line)
+            line_numbers.append(number)
+        else:
+            omitted.append(number)
+    flush()
+    return Outline(text="\n".join(text_lines) + "\n", line_numbers=line_numbers)
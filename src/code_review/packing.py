@@ -0,0 +1,172 @@
+import re
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from code_review.clone_detect import ClonePair
+from code_review.prompt import RESPONSE_FIELD_RULES, RESPONSE_FORMAT, CodeReviewPrompt
+from code_review.rules import CodingRules
+
+
+# まとめたソースコードの各ファイルの区切りの行
+FILE_BEGIN = "===== BEGIN FILE {file_id} ====="
+FILE_END = "===== END FILE {file_id} ====="
+
+
+@dataclass(frozen=True)
+class PackingConfig:
+    # 1回の呼び出しにまとめるソースコードの推定トークン数の合計の上限
+    max_prompt_tokens: int = 4000
+
+    # まとめる対象とするソースコードの推定トークン数の上限(これを超えるものは個別にレビューする)
+    max_source_tokens: int = 800
+
+    # 1回の呼び出しにまとめる最大ファイル数
+    max_files: int = 8
+
+    @classmethod
+    def from_config(cls, config: dict) -> "PackingConfig":
+        """SSMパラメータ(review/Packing)から設定を読み込む。未設定の項目は既定値とする"""
+        defaults = cls()
+        return cls(
+            max_prompt_tokens=int(config.get("MaxPromptTokens", defaults.max_prompt_tokens)),
+            max_source_tokens=int(config.get("MaxSourceTokens", defaults.max_source_tokens)),
+            max_files=int(config.get("MaxFiles", defaults.max_files)),
+        )
+
+
+@dataclass(frozen=True)
+class PackedSource:
+    # プロンプト内でファイルを識別するID(f1, f2, ...)
+    file_id: str
+
+    # ソースコード文字列
+    source_code: str
+
+    # ローカルで検出した重複コードの候補(行番号はファイルの先頭から)
+    duplicate_candidates: Tuple[ClonePair, ...] = ()
+
+
+def pack(sizes: Sequence[int], config: PackingConfig = PackingConfig()) -> List[List[int]]:
+    """
+    推定トークン数の一覧を、先頭から順に上限の範囲でまとめる
+    Returns:
+        1回の呼び出しにまとめる番号の一覧のリスト
+    """
+    groups: List[List[int]] = []
+    group: List[int] = []
+    group_tokens = 0
+    for index, size in enumerate(sizes):
+        if group and (group_tokens + size > config.max_prompt_tokens or len(group) >= config.max_files):
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(index)
+        group_tokens += size
+    if group:
+        groups.append(group)
+    return groups
+
+
+class PackedReviewPrompt(CodeReviewPrompt):
+    """
+    同じ言語の小さなソースコードを区切りの行で連結し、1回の呼び出しでレビューさせるプロンプト
+    レビューの観点・応答のルールは通常のプロンプトと同じで、ファイルIDごとのレビュー結果を1つのJSONで出力させます。
+    指摘行は各ファイルの先頭からの行番号で出力させます。
+    """
+    def __init__(self, sources: List[PackedSource], language: str, coding_rules: CodingRules, max_points: int = 0):
+        super().__init__(source_code="", language=language, coding_rules=coding_rules, max_points=max_points)
+        self.sources = sources
+
+    def create_user_prompt(self) -> str:
+        blocks = []
+        for source in self.sources:
+            source_code = source.source_code if source.source_code.endswith("\n") else source.source_code + "\n"
+            blocks.append(
+                f"{FILE_BEGIN.format(file_id=source.file_id)}\n{source_code}{FILE_END.format(file_id=source.file_id)}\n"
+            )
+        return "".join(blocks)
+
+    def create_duplicate_candidates(self) -> str:
+        """ローカルで検出した重複コードの候補(行範囲)を、ファイルIDごとに示す"""
+        candidates = "".join(
+            f"- {source.file_id}: {candidate.describe()}\n"
+            for source in self.sources
+            for candidate in source.duplicate_candidates
+        )
+        if not candidates:
+            return ""
+        return \
+f"""
+[Duplicate Code Candidates]
+A static analyzer detected the following duplicated line ranges (line numbers are counted within each file). When reviewing duplicated code, check these ranges instead of scanning the whole file.
+{candidates}"""
+
+    def create_response_field_rules(self) -> str:
+        file_ids = ", ".join(source.file_id for source in self.sources)
+        begin = FILE_BEGIN.format(file_id="<file id>")
+        end = FILE_END.format(file_id="<file id>")
+        return \
+f"""- The [Source Code] contains {len(self.sources)} independent files. Each file starts with a line "{begin}" and ends with a line "{end}".
+- Review each file separately, and output a single JSON object whose keys are the file IDs ({file_ids}) and whose values are the review result of that file in the [Response Format].
+- Include an entry for every file ID, even if the file has no issues.
+- In the following rules, the [Source Code] means each file: line 1 is the line right after its BEGIN line, and the BEGIN/END lines are not counted.
+{RESPONSE_FIELD_RULES}"""
+
+    def create_response_format(self) -> str:
+        return f'{{"<file id>": {RESPONSE_FORMAT}}}'
+
+
+def split_usage(usage: Dict[str, int], count: int) -> List[Dict[str, int]]:
+    """
+    まとめてレビューしたBedrockのトークン使用量を、ソースコードの数で等分する
+    割り切れない分は最初のソースコードに含め、合計が元の使用量と一致するようにします。
+    """
+    usages: List[Dict[str, int]] = [{} for _ in range(count)]
+    for key, value in usage.items():
+        if not isinstance(value, int):
+            continue
+        share, remainder = divmod(value, count)
+        for index, file_usage in enumerate(usages):
+            file_usage[key] = share + (remainder if index == 0 else 0)
+    return usages
+
+
+def split_packed_result(response_text: str, sources: List[PackedSource]) -> Dict[str, Optional[Dict]]:
+    """
+    まとめてレビューさせた出力を、ファイルIDごとのレビュー結果に分ける
+    出力全体を1つのJSONとしては解析せず、ファイルIDごとに値を取り出すため、
+    出力が途中で打ち切られた場合も、完結しているファイルの結果は使えます。
+    Returns:
+        ファイルIDごとのレビュー結果(取り出せなかった・形式が正しくないファイルはNone)
+    """
+    decoder = json.JSONDecoder()
+    results: Dict[str, Optional[Dict]] = {}
+    for source in sources:
+        results[source.file_id] = None
+        line_count = len(source.source_code.splitlines())
+        for match in re.finditer(r'"%s"\s*:\s*(?=\{)' % re.escape(source.file_id), response_text):
+            try:
+                section, _ = decoder.raw_decode(response_text, match.end())
+            except ValueError:
+                continue
+            result = _validate(section, line_count)
+            if result is not None:
+                results[source.file_id] = result
+                break
+    return results
+
+
+def _validate(section, line_count: int) -> Optional[Dict]:
+    """1ファイルのレビュー結果がRESPONSE_FORMATの形式で、指摘行がファイルの範囲内か確認する"""
+    if not isinstance(section, dict) or section.get("review_result") not in ("OK", "NG"):
+        return None
+    review_points = section.get("review_points") or []
+    if not isinstance(review_points, list):
+        return None
+    for point in review_points:
+        if not isinstance(point, dict):
+            return None
+        codeline = point.get("codeline")
+        if codeline is not None and (not isinstance(codeline, int) or not 1 <= codeline <= max(1, line_count)):
+            return None
+    return {"review_result": section["review_result"], "review_points": review_points}
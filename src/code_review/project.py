@@ -0,0 +1,251 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from code_review.fingerprint import content_hash
+from code_review.static_check import LANGUAGE_SYNTAXES, extract_identifiers, mask_comments_and_strings, resolve_language
+from common.deadline import Deadline
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# 要約に含める宣言の種別
+_DECLARATION_KINDS = ("class", "function")
+
+# どのファイルにも現れるため、ファイル間の関係の判定に使わない名前
+_COMMON_NAMES = frozenset(["main", "Main", "constructor", "toString", "ToString", "Equals", "GetHashCode", "Dispose"])
+
+# 参照している名前として取り出す語
+_WORD = re.compile(r"[^\W\d]\w*")
+
+# 要約に含める宣言の行の最大文字数
+_DECLARATION_MAX_CHARS = 120
+
+
+@dataclass(frozen=True)
+class ProjectConfig:
+    # 同時にレビューするファイル数
+    max_workers: int = 4
+
+    # 1ファイルのレビューに添える関連ファイルの最大数
+    max_neighbors: int = 3
+
+    # 1ファイルの要約に含める宣言の最大数
+    max_declarations: int = 20
+
+    # 1ファイルのレビューに添える要約の合計の最大文字数
+    max_summary_chars: int = 2000
+
+    # 要約をプロセス内に保持する最大ファイル数
+    cache_entries: int = 1024
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ProjectConfig":
+        """SSMパラメータ(review/Project)から設定を読み込む。未設定の項目は既定値とする"""
+        defaults = cls()
+        return cls(
+            max_workers=int(config.get("MaxWorkers", defaults.max_workers)),
+            max_neighbors=int(config.get("MaxNeighbors", defaults.max_neighbors)),
+            max_declarations=int(config.get("MaxDeclarations", defaults.max_declarations)),
+            max_summary_chars=int(config.get("MaxSummaryChars", defaults.max_summary_chars)),
+            cache_entries=int(config.get("CacheEntries", defaults.cache_entries)),
+        )
+
+
+@dataclass(frozen=True)
+class ProjectFile:
+    # プロジェクト内のパス
+    path: str
+
+    # プログラミング言語種別
+    language: str
+
+    # ソースコード文字列
+    source_code: str
+
+
+@dataclass(frozen=True)
+class FileSummary:
+    # 宣言している名前(関数・クラス)
+    definitions: FrozenSet[str]
+
+    # 宣言の行(本体を除く、行番号順)
+    declarations: Tuple[str, ...]
+
+    # 参照している名前(コメント・文字列を除く)
+    references: FrozenSet[str]
+
+
+def summarize(source_code: str, language: str, max_declarations: int = 20) -> FileSummary:
+    """
+    ソースコードから、他のファイルのレビューに添える要約を作成する
+    構文解析は行わず、static_check.extract_identifiers で検出した関数・クラスの宣言の行を要約とします。
+    """
+    lines = source_code.splitlines()
+    identifiers = sorted(
+        (identifier for identifier in extract_identifiers(source_code, language) if identifier.kind in _DECLARATION_KINDS),
+        key=lambda identifier: identifier.line,
+    )
+    declarations: List[str] = []
+    for identifier in identifiers:
+        line = lines[identifier.line - 1].strip()[:_DECLARATION_MAX_CHARS]
+        if line and line not in declarations:
+            declarations.append(line)
+
+    syntax = LANGUAGE_SYNTAXES.get(resolve_language(language))
+    masked = mask_comments_and_strings(source_code, syntax) if syntax else source_code
+    return FileSummary(
+        definitions=frozenset(identifier.name for identifier in identifiers),
+        declarations=tuple(declarations[:max_declarations]),
+        references=frozenset(_WORD.findall(masked)),
+    )
+
+
+class FileSummaryCache:
+    """
+    ファイルの要約をソースコードのハッシュ値ごとに保持するクラス
+    プロジェクトの各ファイルは提出ごとにほとんど変わらないため、変更のないファイルは要約を作り直しません。
+    要約はローカルで作成できるため、保存先を持たずプロセス内(LRU)にだけ保持します。
+    """
+    def __init__(self, max_entries: int = 1024, max_declarations: int = 20):
+        self.max_entries = max(1, max_entries)
+        self.max_declarations = max_declarations
+        self._lock = threading.Lock()
+        self._summaries: "OrderedDict[str, FileSummary]" = OrderedDict()
+
+    def get(self, source_code: str, language: str) -> FileSummary:
+        """要約を取得する(保持していない場合は作成して保持する)"""
+        key = content_hash(source_code, language)
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+
+        summary = summarize(source_code, language, self.max_declarations)
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+        return summary
+
+
+class SymbolIndex:
+    """
+    プロジェクトのファイル間の関係(宣言と参照)の索引
+    あるファイルのレビューには、参照している名前を宣言しているファイル・宣言している名前を参照しているファイル・
+    同じ名前を宣言しているファイル(重複した定義の候補)を関連ファイルとして添えます。
+    """
+    def __init__(self, files: List[ProjectFile], summaries: List[FileSummary]):
+        self.files = files
+        self.summaries = summaries
+
+    def neighbors(self, index: int, max_neighbors: int) -> List[int]:
+        """関連の強い順に、関連ファイルの番号を求める"""
+        summary = self.summaries[index]
+        definitions = summary.definitions - _COMMON_NAMES
+        scored: List[Tuple[int, str, int]] = []
+        for other_index, other in enumerate(self.summaries):
+            if other_index == index:
+                continue
+            other_definitions = other.definitions - _COMMON_NAMES
+            # 同じ名前の宣言(重複した定義の候補)は、参照よりも重く数える
+            score = (
+                2 * len({name for name in definitions & other_definitions if not name.startswith("__")})
+                + len(summary.references & other_definitions)
+                + len(other.references & definitions)
+            )
+            if score:
+                scored.append((-score, self.files[other_index].path, other_index))
+        return [other_index for _, _, other_index in sorted(scored)[:max_neighbors]]
+
+    def related_files(self, index: int, config: ProjectConfig) -> str:
+        """関連ファイルの要約をプロンプトに添える形式で作成する(最大文字数を超える宣言は省く)"""
+        blocks: List[str] = []
+        remaining = config.max_summary_chars
+        for other_index in self.neighbors(index, config.max_neighbors):
+            header = f"- {self.files[other_index].path}"
+            if len(header) + 1 > remaining:
+                break
+            block = [header]
+            remaining -= len(header) + 1
+            for declaration in self.summaries[other_index].declarations:
+                line = f"  {declaration}"
+                if len(line) + 1 > remaining:
+                    break
+                block.append(line)
+                remaining -= len(line) + 1
+            blocks.append("\n".join(block))
+        return "\n".join(blocks)
+
+
+class ProjectReviewService:
+    """
+    複数のファイルからなるプロジェクトをレビューするクラス
+    各ファイルは関連ファイルの要約だけを添えて個別にレビューするため、プロジェクト全体をプロンプトに含めません。
+    ファイルごとのレビューは並列に行い、結果はファイルごとにまとめて返します。
+    """
+    def __init__(
+        self,
+        review_service: "CodeReviewService",
+        config: ProjectConfig = ProjectConfig(),
+        summary_cache: Optional[FileSummaryCache] = None,
+    ):
+        self.review_service = review_service
+        self.config = config
+        self.summary_cache = summary_cache or FileSummaryCache(config.cache_entries, config.max_declarations)
+
+    def excute_review(
+        self,
+        files: List[ProjectFile],
+        api_key_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        max_points: Optional[int] = None,
+    ) -> Dict:
+        """
+        プロジェクトのコードレビューを実行する
+        Args:
+            files: プロジェクトのファイルの一覧
+            api_key_id: リクエストに使用されたAPIキーのID(トークン使用量の集計単位)
+            deadline: 処理の期限(Lambdaの残り実行時間)
+            max_points: ファイルごとの指摘事項の上限件数
+        Returns:
+            プロジェクトのコードレビュー結果
+            {"review_result": いずれかのファイルがNGの場合は"NG", "files": [{"path", "language", ファイルのレビュー結果}]}
+        """
+        # --- 宣言と参照の索引をローカルで作成する(要約はソースコードのハッシュ値ごとに再利用する) ---
+        index = SymbolIndex(files, [self.summary_cache.get(file.source_code, file.language) for file in files])
+
+        def review(file_index: int) -> Dict:
+            file = files[file_index]
+            related_files = index.related_files(file_index, self.config)
+            logger.info(f"ファイルをレビューします path={file.path} 関連ファイルの要約:{len(related_files)}文字")
+            return self.review_service.excute_review(
+                file.source_code,
+                file.language,
+                api_key_id=api_key_id,
+                deadline=deadline,
+                max_points=max_points,
+                related_files=related_files,
+            )
+
+        # --- ファイルごとに並列にレビューする ---
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.config.max_workers, len(files))), thread_name_prefix="project-review"
+        ) as executor:
+            file_results = list(executor.map(review, range(len(files))))
+
+        results = [
+            {"path": file.path, "language": file.language, **file_result}
+            for file, file_result in zip(files, file_results)
+        ]
+        return {
+            "review_result": "NG" if any(result.get("review_result") == "NG" for result in results) else "OK",
+            "files": results,
+        }
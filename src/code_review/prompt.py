@@ -1,5 +1,8 @@
 import json
+from typing import List, Optional
 
+from code_review.clone_detect import ClonePair
+from code_review.compact_schema import CompactResponseSchema
 from code_review.rules import CodingRules
 
 
@@ -17,18 +20,189 @@ RESPONSE_FORMAT = json.dumps({
     ]
 })
 
+# 構造化出力(Tool use)でレビュー結果を受け取るツールの名前
+REVIEW_TOOL_NAME = "submit_review"
+
+# RESPONSE_FORMATと同じ構造のJSONスキーマ(構造化出力用)。各キーの説明はRESPONSE_FIELD_RULESに対応する
+RESPONSE_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "review_result": {
+            "type": "string",
+            "enum": ["OK", "NG"],
+            "description": '"OK" if there are no issues, "NG" if there are issues.',
+        },
+        "review_points": {
+            "type": "array",
+            "description": "One object for each identified issue. Empty if there are no issues.",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "location": {
+                        "type": "string",
+                        "description": "The function name if the issue is within a function, or the variable's name if it's a global variable.",
+                    },
+                    "codeline": {
+                        "type": "integer",
+                        "description": "The exact starting line number (1-based) where the issue begins. Blank lines and comment lines are counted.",
+                    },
+                    "category": {"type": "string", "description": "Category of Review Perspectives."},
+                    "overview": {"type": "string", "description": "Brief description of the issue."},
+                    "details": {"type": "string", "description": "Detailed description of the issue."},
+                    "suggestion": {
+                        "type": "string",
+                        "description": "Specific correction proposals for the issue (including code snippets if possible).",
+                    },
+                },
+                "required": ["location", "codeline", "category", "overview", "details", "suggestion"],
+            },
+        },
+    },
+    "required": ["review_result", "review_points"],
+}
+
+# RESPONSE_FORMATの各キーの説明
+RESPONSE_FIELD_RULES = \
+"""- If there are no issues, set "review_result" to "OK" and "review_points" to an empty list ([]).
+- If there are issues, set "review_result" to "NG" and add an object to the "review_points" list for each identified issue.
+- `location`: Describe the location to identify the specific part of the code. If the issue is within a function, provide the function name. If it's a global variable, provide its variable's name.
+- `codeline`: Provide the **exact starting line number** (integer) from the source code where the identified issue begins or is most prominent. Line numbering starts at 1 for the first line of the [Source Code]. Blank lines and lines with only comments should be counted as one line.
+- `category`: Category of Review Perspectives.
+- `overview`: Briefly describe the issue.
+- `details`: Provide a detailed description of the issue.
+- `suggestion`: Specific correction proposals or recommended actions for the problems described in `details` (including code snippets if possible).
+"""
+
 
 class CodeReviewPrompt:
-    def __init__(self, source_code: str, language: str, coding_rules: CodingRules):
+    def __init__(
+        self,
+        source_code: str,
+        language: str,
+        coding_rules: CodingRules,
+        duplicate_candidates: Optional[List[ClonePair]] = None,
+        response_schema: Optional[CompactResponseSchema] = None,
+        max_points: int = 0,
+        related_files: str = "",
+        outline: bool = False,
+    ):
         self.source_code = source_code
         self.language = language
         self.coding_rules = coding_rules
+        self.duplicate_candidates = duplicate_candidates or []
+        # 指定した場合は短縮形式で出力させる(カテゴリは番号で参照させる)
+        self.response_schema = response_schema
+        # 指摘事項の上限件数(0の場合は上限なし)
+        self.max_points = max_points
+        # 同じプロジェクトの関連ファイルの要約(宣言の一覧)
+        self.related_files = related_files
+        # Trueの場合、ソースコードは大きなファイルのアウトライン(本体の大部分を省略したもの)
+        self.outline = outline
 
     def create_user_prompt(self) -> str:
         return self.source_code
 
+    def create_duplicate_candidates(self) -> str:
+        """ローカルで検出した重複コードの候補(行範囲)を、重複コードの観点の手がかりとして示す"""
+        if not self.duplicate_candidates:
+            return ""
+        candidates = "".join([f"- {candidate.describe()}\n" for candidate in self.duplicate_candidates])
+        return \
+f"""
+[Duplicate Code Candidates]
+A static analyzer detected the following duplicated line ranges. When reviewing duplicated code, check these ranges instead of scanning the whole file.
+{candidates}"""
+
+    def create_related_files(self) -> str:
+        """同じプロジェクトの関連ファイルの要約を、ファイルをまたぐ問題(重複した定義など)の手がかりとして示す"""
+        if not self.related_files:
+            return ""
+        return \
+f"""
+[Related Files]
+The source code is one file of a multi-file project. The following are summaries (declarations only) of other files in the project that it depends on, that depend on it, or that declare the same names.
+Use them only to find cross-file issues such as duplicated definitions or inconsistent usage. Report only issues located in the [Source Code], never in these files.
+{self.related_files}
+"""
+
+    def create_outline_note(self) -> str:
+        """ソースコードがアウトラインであることと、レビューの対象を構造についての観点に絞ることを示す"""
+        if not self.outline:
+            return ""
+        return \
+f"""
+[Outline]
+The source code is too large to review in full and has been reduced to an outline: declarations and the first lines of each body are kept, and each run of omitted lines is replaced by a "... (N lines omitted: A-B)" comment that shows the original line range.
+Review only what can be judged from the outline, such as naming, decomposition (overly long or overloaded classes and functions) and duplication. Do not report issues in the omitted code, and never point at the omission comments.
+"""
+
+    def create_response_field_rules(self) -> str:
+        """[Response Format]の各キーの説明(短縮形式でない場合)"""
+        return RESPONSE_FIELD_RULES
+
+    def create_response_format(self) -> str:
+        """[Response Format]のJSON形式(短縮形式でない場合)"""
+        return RESPONSE_FORMAT
+
+    def create_review_points_limit(self) -> str:
+        """指摘事項の件数の上限と、上限を超える場合に残す指摘事項の優先順位を示す"""
+        if self.max_points <= 0:
+            return ""
+        return \
+f"""- Report **at most {self.max_points}** issues. List them in order of severity, most severe first: security vulnerabilities and crashes, then incorrect behavior, then maintainability, then readability and style.
+- If there are more than {self.max_points} issues, report only the {self.max_points} most severe ones and omit the rest.
+"""
+
+    def create_tool_config(self) -> dict:
+        """構造化出力用のtoolConfig(レビュー結果を受け取るツールの呼び出しを強制する)"""
+        json_schema = self.response_schema.json_schema() if self.response_schema else RESPONSE_JSON_SCHEMA
+        return {
+            "tools": [{
+                "toolSpec": {
+                    "name": REVIEW_TOOL_NAME,
+                    "description": "Submit the result of the source code review.",
+                    "inputSchema": {"json": json_schema},
+                },
+            }],
+            "toolChoice": {"tool": {"name": REVIEW_TOOL_NAME}},
+        }
+
+    def create_tool_system_prompt(self) -> str:
+        """構造化出力用のシステムプロンプト(出力形式はtoolConfigのJSONスキーマで指定するため、形式の説明を含めない)"""
+        rules = self.coding_rules.to_indexed_string() if self.response_schema else self.coding_rules.to_string()
+        duplicate_candidates = self.create_duplicate_candidates()
+        related_files = self.create_related_files()
+        outline_note = self.create_outline_note()
+        review_points_limit = self.create_review_points_limit()
+        return \
+f"""You are a professional and experienced **{self.language}**  engineer specializing in source code reviews.
+Please review the source code strictly according to the specified [Review Perspectives] **only**.
+**Under no circumstances** should you point out matters not described in the [Review Perspectives].
+[Review Perspectives] are described in the structure "Category:Review Perspectives"
+Your response must strictly follow the [Response Rules].
+
+[Response Rules]
+- Submit the review result by calling the `{REVIEW_TOOL_NAME}` tool exactly once.
+- Response content (the values within the tool input) must be in **Japanese**.
+- Please output your answer in a **"desu"** or **"masu"** tone in Japanese.
+{review_points_limit}
+[Review Perspectives]
+{rules}
+{duplicate_candidates}{related_files}{outline_note}"""
+
     def create_system_prompt(self) -> str:
-        rules = self.coding_rules.to_string()
+        if self.response_schema:
+            rules = self.coding_rules.to_indexed_string()
+            response_field_rules = self.response_schema.response_rules()
+            response_format = self.response_schema.response_format()
+        else:
+            rules = self.coding_rules.to_string()
+            response_field_rules = self.create_response_field_rules()
+            response_format = self.create_response_format()
+        duplicate_candidates = self.create_duplicate_candidates()
+        related_files = self.create_related_files()
+        outline_note = self.create_outline_note()
+        review_points_limit = self.create_review_points_limit()
         return \
 f"""You are a professional and experienced **{self.language}**  engineer specializing in source code reviews.
 Please review the source code strictly according to the specified [Review Perspectives] **only**.
@@ -44,18 +218,10 @@ Your response must strictly follow the [Response Rules].
 - If you include double quotes (") in a JSON string value, be sure to escape them as **'\"'**.
 - Response content (the values within the JSON) must be in **Japanese**.
 - Please output your answer in a **"desu"** or **"masu"** tone in Japanese.
-- If there are no issues, set "review_result" to "OK" and "review_points" to an empty list ([]).
-- If there are issues, set "review_result" to "NG" and add an object to the "review_points" list for each identified issue.
-- `location`: Describe the location to identify the specific part of the code. If the issue is within a function, provide the function name. If it's a global variable, provide its variable's name.
-- `codeline`: Provide the **exact starting line number** (integer) from the source code where the identified issue begins or is most prominent. Line numbering starts at 1 for the first line of the [Source Code]. Blank lines and lines with only comments should be counted as one line.
-- `category`: Category of Review Perspectives.
-- `overview`: Briefly describe the issue.
-- `details`: Provide a detailed description of the issue.
-- `suggestion`: Specific correction proposals or recommended actions for the problems described in `details` (including code snippets if possible).
-
+{response_field_rules}{review_points_limit}
 [Review Perspectives]
 {rules}
-
+{duplicate_candidates}{related_files}{outline_note}
 [Response Format]
-{RESPONSE_FORMAT}
+{response_format}
 """
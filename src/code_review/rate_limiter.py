@@ -0,0 +1,197 @@
+import math
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from common.exception import CapacityExceededError
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ITokenBucketStore(ABC):
+    """複数のコンテナで共有するトークンバケットの保存先のインターフェース"""
+    @abstractmethod
+    def try_acquire(self, bucket_id: str, tokens: float, capacity: float, refill_per_second: float, now: float) -> float:
+        """
+        バケットからトークンを取り出す
+        Returns:
+            取り出せた場合は0、取り出せなかった場合は取り出せるようになるまでの秒数
+        """
+        pass
+
+    @abstractmethod
+    def refund(self, bucket_id: str, tokens: float):
+        """トークンをバケットに戻す(負の値の場合は追加で消費する)"""
+        pass
+
+
+def _refill(stored_tokens: float, updated_at: float, capacity: float, refill_per_second: float, now: float) -> float:
+    """前回更新からの経過時間に応じて補充したトークン数を求める"""
+    return min(capacity, stored_tokens + max(0.0, now - updated_at) * refill_per_second)
+
+
+class TokenBucketFromMemory(ITokenBucketStore):
+    """プロセス内で完結するトークンバケット(ローカル実行・テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def try_acquire(self, bucket_id: str, tokens: float, capacity: float, refill_per_second: float, now: float) -> float:
+        with self._lock:
+            stored_tokens, updated_at = self._buckets.get(bucket_id, (capacity, now))
+            available = _refill(stored_tokens, updated_at, capacity, refill_per_second, now)
+            if available < tokens:
+                return (tokens - available) / refill_per_second
+            self._buckets[bucket_id] = (available - tokens, now)
+            return 0.0
+
+    def refund(self, bucket_id: str, tokens: float):
+        with self._lock:
+            if bucket_id in self._buckets:
+                stored_tokens, updated_at = self._buckets[bucket_id]
+                self._buckets[bucket_id] = (stored_tokens + tokens, updated_at)
+
+
+class TokenBucketFromDynamoDB(ITokenBucketStore):
+    """
+    DynamoDBの条件付き書き込みで共有するトークンバケット
+    取り出しは「読み込んだ時点の値から変わっていないこと」を条件に書き込み(楽観的排他制御)、
+    競合した場合は読み直して再試行します。返却はUpdateItemのADDで行います。
+    """
+    def __init__(self, dynamodb_client: "DynamoDBClient", table_name: str, max_attempts: int = 5, contention_retry_seconds: float = 1.0):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.max_attempts = max_attempts
+        self.contention_retry_seconds = contention_retry_seconds
+
+    def try_acquire(self, bucket_id: str, tokens: float, capacity: float, refill_per_second: float, now: float) -> float:
+        for _ in range(self.max_attempts):
+            item = self.dynamodb_client.get_item(
+                TableName=self.table_name,
+                Key={"bucket_id": {"S": bucket_id}},
+                ConsistentRead=True,
+            ).get("Item")
+
+            if item:
+                available = _refill(
+                    float(item["tokens"]["N"]), float(item["updated_at"]["N"]), capacity, refill_per_second, now
+                )
+                condition = {
+                    "ConditionExpression": "tokens = :previous_tokens AND updated_at = :previous_updated_at",
+                    "ExpressionAttributeValues": {
+                        ":previous_tokens": item["tokens"],
+                        ":previous_updated_at": item["updated_at"],
+                    },
+                }
+            else:
+                available = capacity
+                condition = {"ConditionExpression": "attribute_not_exists(bucket_id)"}
+
+            if available < tokens:
+                return (tokens - available) / refill_per_second
+
+            try:
+                self.dynamodb_client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "bucket_id": {"S": bucket_id},
+                        "tokens": {"N": f"{available - tokens:.3f}"},
+                        "updated_at": {"N": f"{now:.3f}"},
+                    },
+                    **condition,
+                )
+                return 0.0
+            except ClientError as error:
+                if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+
+        # --- 競合が続く場合は混雑しているとみなす ---
+        logger.warning(f"トークンバケットの更新が競合しました bucket_id={bucket_id}")
+        return self.contention_retry_seconds
+
+    def refund(self, bucket_id: str, tokens: float):
+        self.dynamodb_client.update_item(
+            TableName=self.table_name,
+            Key={"bucket_id": {"S": bucket_id}},
+            UpdateExpression="ADD tokens :tokens",
+            ConditionExpression="attribute_exists(bucket_id)",
+            ExpressionAttributeValues={":tokens": {"N": f"{tokens:.3f}"}},
+        )
+
+
+@dataclass(frozen=True)
+class Reservation:
+    # 予約したバケットのID
+    bucket_id: str
+
+    # 予約したトークン数
+    tokens: int
+
+
+class TokenRateLimiter:
+    """
+    Bedrockの1分あたりのトークン数の上限を、全コンテナで共有するトークンバケットで守るクラス
+    呼び出し前に見込みのトークン数を予約し、呼び出し後に実際の使用量との差を精算します。
+    バケットが空の場合はBedrockのスロットリングを待たずに CapacityExceededError で即座に拒否します。
+    """
+    def __init__(
+        self,
+        store: ITokenBucketStore,
+        tokens_per_minute: int,
+        bucket_id: str = "bedrock",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.capacity = tokens_per_minute
+        self.refill_per_second = tokens_per_minute / 60.0
+        self.bucket_id = bucket_id
+        self.clock = clock
+
+    def reserve(self, tokens: int) -> Optional[Reservation]:
+        """
+        トークンを予約する
+        Returns:
+            予約(保存先の障害で予約できなかった場合はNone)
+        Raises:
+            CapacityExceededError: バケットのトークンが足りない場合
+        """
+        # バケットの容量を超える予約は永久に成立しないため、容量までに丸める
+        tokens = min(tokens, self.capacity)
+        try:
+            wait_seconds = self.store.try_acquire(
+                self.bucket_id, tokens, self.capacity, self.refill_per_second, self.clock()
+            )
+        except Exception:
+            # --- 保存先の障害でレビュー自体を失敗させない ---
+            logger.exception(f"トークンバケットを参照できませんでした bucket_id={self.bucket_id}")
+            return None
+
+        if wait_seconds > 0:
+            logger.warning(f"トークンバケットが空のためリクエストを拒否します tokens={tokens} wait={wait_seconds:.1f}s")
+            raise CapacityExceededError.tokens_per_minute(math.ceil(wait_seconds))
+        return Reservation(bucket_id=self.bucket_id, tokens=tokens)
+
+    def settle(self, reservation: Optional[Reservation], actual_tokens: int):
+        """予約したトークン数と実際の使用量の差をバケットに戻す(超過した場合は追加で消費する)"""
+        if reservation:
+            self._refund(reservation, reservation.tokens - actual_tokens)
+
+    def cancel(self, reservation: Optional[Reservation]):
+        """Bedrockを呼び出せなかった場合に、予約したトークンをすべて戻す"""
+        if reservation:
+            self._refund(reservation, reservation.tokens)
+
+    def _refund(self, reservation: Reservation, tokens: int):
+        if not tokens:
+            return
+        try:
+            self.store.refund(reservation.bucket_id, tokens)
+        except Exception:
+            logger.exception(f"トークンバケットの精算に失敗しました bucket_id={reservation.bucket_id}")
@@ -0,0 +1,226 @@
+import zlib
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from common import json_codec
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandardは任意の依存ライブラリ
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# DynamoDBの1アイテムの上限(400KB)に対して余裕を持たせた保存上限
+MAX_ITEM_BYTES = 350 * 1024
+
+# BatchGetItem / BatchWriteItem の1回あたりの上限件数
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+
+# 未処理アイテムの再試行回数
+BATCH_RETRY_MAX = 5
+
+
+@dataclass(frozen=True)
+class StoredReview:
+    # レビュー結果を一意に識別するキー(fingerprint.review_key)
+    review_key: str
+
+    # ソースコードのハッシュ値(fingerprint.content_hash)
+    content_hash: str
+
+    # ルールセットのバージョン(CodingRules.version)
+    rule_set_version: str
+
+    # BedrockのモデルID
+    model_id: str
+
+    # レビュー結果(prompt.RESPONSE_FORMAT形式)
+    result: Dict
+
+    # Bedrockのトークン使用量(response["usage"])
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class IReviewResultRepository(ABC):
+    """レビュー結果リポジトリのインターフェース"""
+    @abstractmethod
+    def save(self, review: StoredReview) -> bool:
+        """レビュー結果を永続化する。保存できなかった場合はFalseを返す"""
+        pass
+
+    @abstractmethod
+    def get(self, review_key: str) -> Optional[StoredReview]:
+        """レビュー結果を取得する"""
+        pass
+
+    @abstractmethod
+    def batch_get(self, review_keys: List[str]) -> Dict[str, StoredReview]:
+        """複数のレビュー結果をまとめて取得する。戻り値はキーとレビュー結果の辞書"""
+        pass
+
+    @abstractmethod
+    def batch_save(self, reviews: List[StoredReview]) -> int:
+        """複数のレビュー結果をまとめて永続化する。戻り値は保存した件数"""
+        pass
+
+
+class ResultCodec:
+    """レビュー結果本文の圧縮・展開を担当するクラス(zlib / zstd)"""
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+
+    def __init__(self, name: str = ZLIB, level: int = 6):
+        if name == self.ZSTD and zstandard is None:
+            logger.warning("zstandardが利用できないためzlibで圧縮します")
+            name = self.ZLIB
+        if name not in (self.ZLIB, self.ZSTD):
+            raise ValueError(f"未対応の圧縮方式です: {name}")
+        self.name = name
+        self.level = level
+
+    def compress(self, result: Dict) -> bytes:
+        raw = json_codec.dumps_bytes(result)
+        if self.name == self.ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return zlib.compress(raw, self.level)
+
+    @classmethod
+    def decompress(cls, name: str, data: bytes) -> Dict:
+        if name == cls.ZSTD:
+            if zstandard is None:
+                raise ValueError("zstdで圧縮されたレビュー結果を展開できません")
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            raw = zlib.decompress(data)
+        return json_codec.loads(raw)
+
+
+class ReviewResultFromDynamoDB(IReviewResultRepository):
+    """DynamoDBへのレビュー結果の永続化を担当するクラス"""
+    def __init__(
+        self,
+        dynamodb_client: "DynamoDBClient",
+        table_name: str,
+        ttl_days: int = 30,
+        codec: Optional[ResultCodec] = None,
+        sleep=time.sleep,
+    ):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.ttl_days = ttl_days
+        self.codec = codec or ResultCodec()
+        self.sleep = sleep
+
+    def save(self, review: StoredReview) -> bool:
+        """レビュー結果をDynamoDBに保存する"""
+        item = self._to_item(review)
+        if item is None:
+            return False
+        self.dynamodb_client.put_item(TableName=self.table_name, Item=item)
+        return True
+
+    def get(self, review_key: str) -> Optional[StoredReview]:
+        """レビュー結果をDynamoDBから取得する"""
+        response = self.dynamodb_client.get_item(
+            TableName=self.table_name,
+            Key={"review_key": {"S": review_key}},
+        )
+        item = response.get("Item")
+        if not item or self._is_expired(item):
+            return None
+        return self._from_item(item)
+
+    def batch_get(self, review_keys: List[str]) -> Dict[str, StoredReview]:
+        """レビュー結果をBatchGetItemでまとめて取得する"""
+        unique_keys = list(dict.fromkeys(review_keys))
+        found: Dict[str, StoredReview] = {}
+
+        for start in range(0, len(unique_keys), BATCH_GET_LIMIT):
+            request = {
+                self.table_name: {
+                    "Keys": [{"review_key": {"S": key}} for key in unique_keys[start:start + BATCH_GET_LIMIT]],
+                }
+            }
+            for attempt in range(BATCH_RETRY_MAX):
+                response = self.dynamodb_client.batch_get_item(RequestItems=request)
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    if not self._is_expired(item):
+                        review = self._from_item(item)
+                        found[review.review_key] = review
+                request = response.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+                self.sleep(0.05 * (2 ** attempt))
+            else:
+                logger.warning(f"未処理のキーが残りました count={len(request[self.table_name]['Keys'])}")
+
+        return found
+
+    def batch_save(self, reviews: List[StoredReview]) -> int:
+        """レビュー結果をBatchWriteItemでまとめて保存する"""
+        items = [item for item in (self._to_item(review) for review in reviews) if item is not None]
+        saved = 0
+
+        for start in range(0, len(items), BATCH_WRITE_LIMIT):
+            chunk = items[start:start + BATCH_WRITE_LIMIT]
+            request = {self.table_name: [{"PutRequest": {"Item": item}} for item in chunk]}
+            for attempt in range(BATCH_RETRY_MAX):
+                response = self.dynamodb_client.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems") or {}
+                if not request:
+                    break
+                self.sleep(0.05 * (2 ** attempt))
+            unprocessed = len(request.get(self.table_name, [])) if request else 0
+            if unprocessed:
+                logger.warning(f"未処理のアイテムが残りました count={unprocessed}")
+            saved += len(chunk) - unprocessed
+
+        return saved
+
+    def _to_item(self, review: StoredReview) -> Optional[Dict]:
+        body = self.codec.compress(review.result)
+        if len(body) > MAX_ITEM_BYTES:
+            logger.warning(f"レビュー結果が大きすぎるため保存しません key={review.review_key} bytes={len(body)}")
+            return None
+
+        now = datetime.now()
+        return {
+            "review_key": {"S": review.review_key},
+            "content_hash": {"S": review.content_hash},
+            "rule_set_version": {"S": review.rule_set_version},
+            "model_id": {"S": review.model_id},
+            "input_tokens": {"N": str(review.usage.get("inputTokens", 0))},
+            "output_tokens": {"N": str(review.usage.get("outputTokens", 0))},
+            "codec": {"S": self.codec.name},
+            "body": {"B": body},
+            "saved_at": {"S": now.isoformat()},
+            "expires_at": {"N": str(int((now + timedelta(days=self.ttl_days)).timestamp()))},
+        }
+
+    def _from_item(self, item: Dict) -> StoredReview:
+        return StoredReview(
+            review_key=item["review_key"]["S"],
+            content_hash=item["content_hash"]["S"],
+            rule_set_version=item["rule_set_version"]["S"],
+            model_id=item["model_id"]["S"],
+            result=ResultCodec.decompress(item["codec"]["S"], item["body"]["B"]),
+            usage={
+                "inputTokens": int(item["input_tokens"]["N"]),
+                "outputTokens": int(item["output_tokens"]["N"]),
+            },
+        )
+
+    @staticmethod
+    def _is_expired(item: Dict) -> bool:
+        # --- TTLによる削除は遅延するため、期限切れのアイテムは読み取り時に除外する ---
+        expires_at = item.get("expires_at")
+        return bool(expires_at) and int(expires_at["N"]) < time.time()
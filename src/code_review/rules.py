@@ -1,6 +1,7 @@
 import json
+import hashlib
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set
 
 
 class RuleProviderBase(ABC):
@@ -8,6 +9,8 @@ class RuleProviderBase(ABC):
     def load_rules(self) -> dict:
         """
         Example: {"category1": ["rule1-1", "rule1-2"], "category2": ["rule2-1"]}
+        ルールは文字列のほか、ルールIDを付けたオブジェクトでも定義できます。
+        Example: {"category1": [{"id": "rule-id", "value": "rule1-1"}]}
         """
         pass
 
@@ -27,24 +30,66 @@ class CodingRulesFromFile(RuleProviderBase):
 
 class CodingRules:
     def __init__(self):
-        self._rules: List[str] = []
+        self._rules: List[Dict[str, Optional[str]]] = []
 
     @property
     def total_count(self) -> int:
         return len(self._rules)
 
-    def add(self, category: str, rule: str):
+    @property
+    def version(self) -> str:
+        """ルールセットの内容から求めたバージョン(ハッシュ値の先頭16桁)"""
+        return hashlib.sha256(self.to_string().encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def rule_ids(self) -> Set[str]:
+        """ルールIDが付けられたルールのID一覧"""
+        return {rule["id"] for rule in self._rules if rule.get("id")}
+
+    def add(self, category: str, rule: str, rule_id: Optional[str] = None):
         if not category or not rule:
             raise ValueError("Coding Rule cannot be empty.")
         self._rules.append({
             "category": category,
-            "value": rule
+            "value": rule,
+            "id": rule_id,
         })
 
+    @property
+    def categories(self) -> List[str]:
+        """ルールのカテゴリ一覧(重複なし・追加順)"""
+        return list(dict.fromkeys(rule["category"] for rule in self._rules))
+
+    def find(self, rule_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """ルールIDからルール({"category", "value", "id"})を取得する"""
+        for rule in self._rules:
+            if rule.get("id") == rule_id:
+                return rule
+        return None
+
+    def excluding(self, rule_ids: Iterable[str]) -> "CodingRules":
+        """指定したルールIDのルールを除いたルールセットを返す"""
+        excluded_ids = set(rule_ids)
+        coding_rules = CodingRules()
+        coding_rules._rules = [rule for rule in self._rules if rule.get("id") not in excluded_ids]
+        return coding_rules
+
+    def including_categories(self, categories: Iterable[str]) -> "CodingRules":
+        """指定したカテゴリのルールだけのルールセットを返す"""
+        included_categories = set(categories)
+        coding_rules = CodingRules()
+        coding_rules._rules = [rule for rule in self._rules if rule["category"] in included_categories]
+        return coding_rules
+
     def to_string(self) -> str:
         rules_string = "".join([f"- {rule['category']}: {rule['value']}\n" for rule in self._rules])
         return rules_string
 
+    def to_indexed_string(self) -> str:
+        """カテゴリを番号(categoriesの1始まりの位置)で参照できるように、番号付きで出力する"""
+        numbers = {category: number for number, category in enumerate(self.categories, start=1)}
+        return "".join([f"- [{numbers[rule['category']]}] {rule['category']}: {rule['value']}\n" for rule in self._rules])
+
 
 class CodingRulesBuilder:
     def __init__(self, rule_provider: RuleProviderBase):
@@ -66,4 +111,9 @@ class CodingRulesBuilder:
     def _add_rules_by_category(self, category: str):
         rules_for_category = self._all_rules.get(category, [])
         for rule in rules_for_category:
-            self.coding_rules.add(category, rule)
+            # --- ルールIDを付けたオブジェクト形式にも対応する ---
+            if isinstance(rule, dict):
+                rule_id, rule = rule.get("id"), rule.get("value")
+            else:
+                rule_id = None
+            self.coding_rules.add(category, rule, rule_id)
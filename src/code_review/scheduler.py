@@ -0,0 +1,204 @@
+import heapq
+import time
+import logging
+import threading
+import itertools
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from code_review.code_review import CodeReviewService
+from code_review.fingerprint import content_hash
+from code_review.tokens import estimate_tokens
+from common import json_codec
+from common.deadline import Deadline
+from common.stats import percentiles
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# --- 優先度クラスの境界(推定トークン数の上限値, クラス名) ---
+PRIORITY_CLASSES: Tuple[Tuple[int, str], ...] = (
+    (1000, "small"),
+    (8000, "medium"),
+)
+LARGEST_PRIORITY_CLASS = "large"
+
+
+def priority_class(estimated_tokens: int) -> str:
+    """推定トークン数から優先度クラス名を求める"""
+    for upper_bound, name in PRIORITY_CLASSES:
+        if estimated_tokens < upper_bound:
+            return name
+    return LARGEST_PRIORITY_CLASS
+
+
+@dataclass
+class ReviewJob:
+    # 重複判定用のハッシュ値(ソースコード + 言語種別)
+    job_hash: str
+
+    # ソースコード文字列
+    source_code: str
+
+    # プログラミング言語種別
+    language: str
+
+    # 投入した利用者の識別子
+    user_id: str
+
+    # 推定トークン数
+    estimated_tokens: int
+
+    # 投入時刻(単調増加時計)
+    submitted_at: float
+
+    # 同一内容のジョブを待っている呼び出し元
+    waiters: List[Future] = field(default_factory=list)
+
+
+class ReviewScheduler:
+    """
+    待ち行列に積まれたコードレビューを短いものから順に実行するスケジューラ
+    優先度は「推定トークン数 + 利用者ごとの公平性ペナルティ - 待ち時間による加齢」で決まり、
+    値が小さいジョブから実行します。同一内容の待ちジョブは1回の実行にまとめます。
+    ジョブは最初に投入した利用者のAPIキーIDでトークン予算を確認・記録し、処理の期限内で実行します。
+    """
+    def __init__(
+        self,
+        service: CodeReviewService,
+        aging_tokens_per_second: float = 100.0,
+        fairness_penalty_tokens: float = 2000.0,
+        clock: Callable[[], float] = time.monotonic,
+        wait_time_window: int = 1000,
+        job_timeout_seconds: float = 60.0,
+    ):
+        self.service = service
+        self.aging_tokens_per_second = aging_tokens_per_second
+        self.fairness_penalty_tokens = fairness_penalty_tokens
+        self.clock = clock
+        # 期限を指定せずに実行する場合の、1件のジョブの処理時間の上限(秒)
+        self.job_timeout_seconds = job_timeout_seconds
+
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # 利用者ごとの待ち行列(ヒープ)。キーは時間に依存しない基本スコア
+        self._queues: Dict[str, List[Tuple[float, int, ReviewJob]]] = defaultdict(list)
+        self._pending: Dict[str, ReviewJob] = {}
+        self._dispatched: Dict[str, int] = defaultdict(int)
+        self._wait_times: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=wait_time_window))
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, source_code: str, language: str, user_id: str) -> Future:
+        """
+        レビュージョブを待ち行列に追加する
+        Args:
+            source_code: ソースコード文字列
+            language: プログラミング言語種別を表した文字列
+            user_id: 投入した利用者の識別子(APIキーIDなど)
+        Returns:
+            レビュー結果を受け取るFuture
+        """
+        waiter: Future = Future()
+        job_hash = content_hash(source_code, language)
+
+        with self._lock:
+            # --- 同一内容の待ちジョブがあれば相乗りする ---
+            pending_job = self._pending.get(job_hash)
+            if pending_job:
+                pending_job.waiters.append(waiter)
+                logger.info(f"同一内容のジョブに集約しました hash={job_hash[:12]} waiters={len(pending_job.waiters)}")
+                return waiter
+
+            job = ReviewJob(
+                job_hash=job_hash,
+                source_code=source_code,
+                language=language,
+                user_id=user_id,
+                estimated_tokens=estimate_tokens(source_code),
+                submitted_at=self.clock(),
+                waiters=[waiter],
+            )
+            # 加齢は全ジョブ共通の線形関数のため、投入時刻を基本スコアに織り込めば順序は時間に依存しない
+            base_score = job.estimated_tokens + self.aging_tokens_per_second * job.submitted_at
+            heapq.heappush(self._queues[user_id], (base_score, next(self._sequence), job))
+            self._pending[job_hash] = job
+
+        return waiter
+
+    def run_next(self, deadline: Optional[Deadline] = None) -> bool:
+        """
+        最も優先度の高いジョブを1件実行する
+        Args:
+            deadline: 処理の期限(Lambdaの残り実行時間)。指定しない場合は job_timeout_seconds 後を期限とする
+        Returns:
+            ジョブを実行した場合はTrue、待ち行列が空の場合はFalse
+        """
+        job = self._pop_next()
+        if job is None:
+            return False
+
+        wait_seconds = self.clock() - job.submitted_at
+        with self._lock:
+            self._wait_times[priority_class(job.estimated_tokens)].append(wait_seconds)
+
+        try:
+            result = self.service.excute_review(
+                job.source_code,
+                job.language,
+                api_key_id=job.user_id,
+                deadline=deadline or Deadline.after(self.job_timeout_seconds, self.clock),
+            )
+        except Exception as error:
+            for waiter in job.waiters:
+                waiter.set_exception(error)
+        else:
+            for waiter in job.waiters:
+                waiter.set_result(result)
+        return True
+
+    def drain(self, deadline: Optional[Deadline] = None) -> int:
+        """待ち行列が空になるか期限を過ぎるまでジョブを実行し、実行件数を返す"""
+        executed = 0
+        while (deadline is None or deadline.remaining_seconds() > 0) and self.run_next(deadline):
+            executed += 1
+        return executed
+
+    def wait_time_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """優先度クラスごとの待ち時間(秒)のパーセンタイル値を返す"""
+        with self._lock:
+            snapshot = {name: list(values) for name, values in self._wait_times.items()}
+        return {name: percentiles(values) for name, values in snapshot.items() if values}
+
+    def export_metrics(self):
+        """優先度クラスごとの待ち時間パーセンタイルをログに出力する"""
+        logger.info(f"queue wait time percentiles:{json_codec.dumps(self.wait_time_percentiles())}")
+
+    def _pop_next(self) -> Optional[ReviewJob]:
+        with self._lock:
+            best_user = None
+            best_score = None
+            for user_id, queue in self._queues.items():
+                if not queue:
+                    continue
+                score = queue[0][0] + self.fairness_penalty_tokens * self._dispatched[user_id]
+                if best_score is None or score < best_score:
+                    best_user, best_score = user_id, score
+
+            if best_user is None:
+                # --- 待ち行列が空になったら公平性の計数をリセットする ---
+                self._queues.clear()
+                self._dispatched.clear()
+                return None
+
+            _, _, job = heapq.heappop(self._queues[best_user])
+            self._dispatched[best_user] += 1
+            del self._pending[job.job_hash]
+            return job
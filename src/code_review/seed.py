@@ -0,0 +1,215 @@
+"""
+演習課題のコーパスによるレビュー結果の事前投入
+
+課題の雛形・模範解答のディレクトリ(testdata/ など)の各ファイルを CodeReviewService でレビューし、
+設定されている保存先にオンラインの処理と同じキーで結果を保存します。
+学期始めに同じ課題のレビューが一斉にBedrockへ送られることを防ぐため、利用開始前に実行します。
+
+実行方法:
+    PARAMETER_PATH_PREFIX=/<SystemName>/<Enviroment>/codereview/ \\
+    PYTHONPATH=src python -m code_review.seed testdata --concurrency 4
+
+review/Packing を有効にして --batch-size を指定すると、小さなファイルを言語ごとにまとめて
+1回のBedrockの呼び出しでレビューします(CodeReviewService.excute_reviews)。
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from code_review.code_review import CodeReviewService, CodeReviewServiceContext
+from code_review.source_decoder import SourceLimits, decode_source
+from code_review.static_check import EXTENSION_LANGUAGES
+from common.exception import CapacityExceededError, PayloadTooLargeError, RequestParameterError
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# 1ファイルのレビュー結果
+STATUS_SEEDED = "seeded"
+STATUS_WARM = "warm"
+STATUS_FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class SeedSource:
+    # ファイルのパス
+    path: str
+
+    # プログラミング言語種別
+    language: str
+
+    # ソースコード文字列(APIで受け取った場合と同じく、BOM・改行コードはそのまま)
+    source_code: str
+
+
+def load_sources(
+    directory: str,
+    languages: Mapping[str, str] = EXTENSION_LANGUAGES,
+    limits: SourceLimits = SourceLimits(),
+) -> Tuple[List[SeedSource], List[str]]:
+    """
+    ディレクトリ以下のソースコードを読み込む
+    言語種別が決まらないファイル・APIのサイズ上限を超えるファイルは対象外とします。
+    Returns:
+        (投入対象のソースコードの一覧, 対象外としたファイルのパスの一覧)
+    """
+    sources: List[SeedSource] = []
+    skipped: List[str] = []
+    for root, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            language = languages.get(os.path.splitext(name)[1].lower())
+            if not language:
+                skipped.append(path)
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                # --- オンラインの処理と同じ復号・上限の確認を行う(保存するキーを一致させるため) ---
+                source_code = decode_source({"source": data.decode("utf-8")}, limits)
+            except (UnicodeDecodeError, PayloadTooLargeError, RequestParameterError):
+                logger.warning(f"APIで受け付けられないファイルのため対象外とします path={path}")
+                skipped.append(path)
+                continue
+            sources.append(SeedSource(path=path, language=language, source_code=source_code))
+    return sources, skipped
+
+
+class CorpusSeeder:
+    """
+    ソースコードの一覧を同時実行数を制限してレビューし、結果を保存するクラス
+    保存済みのものはレビューしません。Bedrockの1分あたりのトークン数の上限に達した場合は、
+    指定された秒数だけ待ってから再試行します。
+    batch_size が2以上の場合は、その件数ごとに excute_reviews でまとめてレビューします。
+    """
+    def __init__(
+        self,
+        service: CodeReviewService,
+        concurrency: int = 4,
+        max_points: Sequence[Optional[int]] = (None,),
+        max_retries: int = 5,
+        sleep: Callable[[float], None] = time.sleep,
+        batch_size: int = 1,
+    ):
+        self.service = service
+        self.concurrency = max(1, concurrency)
+        # オンラインのリクエストで指定される max_points ごとにキーが異なるため、指定された値ごとに投入する
+        self.max_points = list(max_points) or [None]
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.batch_size = max(1, batch_size)
+
+    def seed(self, sources: Sequence[SeedSource]) -> Dict[str, int]:
+        """
+        レビュー結果を投入する
+        Returns:
+            結果ごとの件数({"seeded": レビューした件数, "warm": 保存済みの件数, "failed": 失敗した件数})
+        """
+        batches = [
+            (list(sources[start:start + self.batch_size]), max_points)
+            for max_points in self.max_points
+            for start in range(0, len(sources), self.batch_size)
+        ]
+        counts = {STATUS_SEEDED: 0, STATUS_WARM: 0, STATUS_FAILED: 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for statuses in executor.map(lambda batch: self._seed_batch(*batch), batches):
+                for status in statuses:
+                    counts[status] += 1
+        return counts
+
+    def _seed_batch(self, batch: List[SeedSource], max_points: Optional[int]) -> List[str]:
+        statuses: List[str] = []
+        pending: List[SeedSource] = []
+        paths = ",".join(source.path for source in batch)
+        try:
+            for source in batch:
+                if self.service.is_review_stored(source.source_code, source.language, max_points=max_points):
+                    logger.info(f"保存済みです path={source.path} max_points={max_points}")
+                    statuses.append(STATUS_WARM)
+                else:
+                    pending.append(source)
+            if not pending:
+                return statuses
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if len(pending) == 1:
+                        self.service.excute_review(pending[0].source_code, pending[0].language, max_points=max_points)
+                    else:
+                        self.service.excute_reviews(
+                            [(source.source_code, source.language) for source in pending], max_points=max_points
+                        )
+                    logger.info(f"レビュー結果を保存しました path={paths} max_points={max_points}")
+                    return statuses + [STATUS_SEEDED] * len(pending)
+                except CapacityExceededError as error:
+                    if attempt >= self.max_retries:
+                        raise
+                    wait_seconds = error.retry_after_seconds or 1
+                    logger.info(f"混雑しているため{wait_seconds}秒後に再試行します path={paths}")
+                    self.sleep(wait_seconds)
+        except Exception:
+            logger.exception(f"レビュー結果を保存できませんでした path={paths} max_points={max_points}")
+        return statuses + [STATUS_FAILED] * (len(batch) - len(statuses))
+
+
+def _parse_language(value: str) -> Tuple[str, str]:
+    extension, separator, language = value.partition("=")
+    if not separator or not extension or not language:
+        raise argparse.ArgumentTypeError(f"'{value}' は '.拡張子=言語' の形式ではありません")
+    if not extension.startswith("."):
+        extension = "." + extension
+    return extension.lower(), language
+
+
+def main(argv: Optional[Sequence[str]] = None, container: Optional[CodeReviewServiceContext] = None) -> int:
+    parser = argparse.ArgumentParser(description="演習課題のコーパスをレビューし、レビュー結果を事前に保存します")
+    parser.add_argument("directory", help="雛形・模範解答のソースコードを置いたディレクトリ")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時にレビューするファイル数(既定値: 4)")
+    parser.add_argument(
+        "--max-points", type=int, action="append", dest="max_points",
+        help="リクエストで指定される指摘事項の上限件数(複数指定可。省略時は指定なしのリクエストと同じキー)",
+    )
+    parser.add_argument("--max-retries", type=int, default=5, help="混雑時に再試行する回数(既定値: 5)")
+    parser.add_argument(
+        "--batch-size", type=int, default=1,
+        help="まとめてレビューするファイル数(既定値: 1。review/Packing が有効な場合は小さなファイルを1回の呼び出しにまとめる)",
+    )
+    parser.add_argument(
+        "--language", type=_parse_language, action="append", default=[], metavar=".EXT=LANGUAGE",
+        help="拡張子とプログラミング言語種別の対応を追加・変更する(例: .py=Python)",
+    )
+    args = parser.parse_args(argv)
+
+    container = container or CodeReviewServiceContext()
+    service: CodeReviewService = container.code_review_service
+    if not service.result_store:
+        logger.error("レビュー結果の保存先が設定されていません(dynamodb/ReviewResultTableName)")
+        return 1
+
+    languages = {**EXTENSION_LANGUAGES, **dict(args.language)}
+    sources, skipped = load_sources(args.directory, languages, SourceLimits.from_environ(os.environ))
+    counts = CorpusSeeder(
+        service,
+        concurrency=args.concurrency,
+        max_points=args.max_points or [None],
+        max_retries=args.max_retries,
+        batch_size=args.batch_size,
+    ).seed(sources)
+
+    print(
+        f"seeded={counts[STATUS_SEEDED]} warm={counts[STATUS_WARM]} "
+        f"failed={counts[STATUS_FAILED]} skipped={len(skipped)}"
+    )
+    return 1 if counts[STATUS_FAILED] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import copy
+import time
+import uuid
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from botocore.exceptions import ClientError
+
+from common.deadline import Deadline
+from common.exception import DeadlineExceededError
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+OPERATION_NAME = "review:SingleFlight"
+
+
+class ILeaseStore(ABC):
+    """複数のコンテナで共有する、キーごとの短時間のロック(リース)の保存先のインターフェース"""
+    @abstractmethod
+    def try_acquire(self, key: str, owner: str, lease_seconds: float, now: float) -> bool:
+        """ロックを取得する(他の所有者のロックが期限切れの場合は奪う)。取得できなかった場合はFalseを返す"""
+        pass
+
+    @abstractmethod
+    def release(self, key: str, owner: str):
+        """自分が所有しているロックを解放する"""
+        pass
+
+
+class LeaseFromMemory(ILeaseStore):
+    """プロセス内で完結するロック(ローカル実行・テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def try_acquire(self, key: str, owner: str, lease_seconds: float, now: float) -> bool:
+        with self._lock:
+            current = self._leases.get(key)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[key] = (owner, now + lease_seconds)
+            return True
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+
+class LeaseFromDynamoDB(ILeaseStore):
+    """
+    DynamoDBの条件付き書き込みで共有するロック
+    ロックが存在しないか期限切れの場合だけ書き込み、解放は所有者が一致する場合だけ削除します。
+    解放されなかったロックはTTLで削除されます。
+    """
+    def __init__(self, dynamodb_client: "DynamoDBClient", table_name: str):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+
+    def try_acquire(self, key: str, owner: str, lease_seconds: float, now: float) -> bool:
+        try:
+            self.dynamodb_client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "lock_key": {"S": key},
+                    "owner": {"S": owner},
+                    "expires_at": {"N": str(int(now + lease_seconds) + 1)},
+                },
+                ConditionExpression="attribute_not_exists(lock_key) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(int(now))}},
+            )
+            return True
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            return False
+
+    def release(self, key: str, owner: str):
+        try:
+            self.dynamodb_client.delete_item(
+                TableName=self.table_name,
+                Key={"lock_key": {"S": key}},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "owner"},
+                ExpressionAttributeValues={":owner": {"S": owner}},
+            )
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+
+
+class SingleFlight:
+    """
+    同じキーのレビューが同時に依頼された場合に、Bedrockの呼び出しを1回にまとめるクラス
+    コンテナ内では実行中の処理のFutureを共有し、コンテナ間ではキーごとのロックを取得できた1つのコンテナだけが処理を実行します。
+    ロックを取得できなかったコンテナは、実行中のコンテナが保存するレビュー結果を待ちます。
+    呼び出し元ごとに異なる理由の失敗(APIキーごとの利用枠など)は、待っていた呼び出し元がそれぞれ実行し直します。
+    """
+    def __init__(
+        self,
+        lease_store: Optional[ILeaseStore] = None,
+        lease_seconds: float = 60.0,
+        poll_seconds: float = 0.5,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.lease_store = lease_store
+        # ロックの有効期間(秒)。実行中のコンテナが異常終了した場合は、この時間が過ぎると他のコンテナが処理を引き継ぐ
+        self.lease_seconds = lease_seconds
+        # 他のコンテナの結果を確認する間隔(秒)
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def run(
+        self,
+        key: str,
+        execute: Callable[[], Dict],
+        load_result: Callable[[], Optional[Dict]],
+        deadline: Optional[Deadline] = None,
+        rerun_on: Tuple[Type[BaseException], ...] = (),
+    ) -> Dict:
+        """
+        キーごとに1回だけ処理を実行し、その結果を同時に依頼されたすべての呼び出し元に返す
+        Args:
+            key: 同じ結果となる依頼を識別するキー(fingerprint.review_key)
+            execute: 処理(結果の保存まで行うこと)
+            load_result: 他のコンテナが保存した結果を取得する関数(未保存の場合はNone)
+            deadline: 処理の期限。結果を待つ間に期限を過ぎる場合は打ち切る
+            rerun_on: 実行した呼び出し元に固有の例外。待っていた呼び出し元には送出せず、自身の処理として実行し直す
+        Raises:
+            DeadlineExceededError: 期限までに他の呼び出し元の結果が得られない場合
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            logger.info(f"実行中の同じレビューの結果を待ちます key={key}")
+            try:
+                return copy.deepcopy(self._wait(future, deadline))
+            except rerun_on as error:
+                logger.info(f"実行中の同じレビューが失敗したため、実行し直します key={key} error={type(error).__name__}")
+                return self.run(key, execute, load_result, deadline, rerun_on)
+
+        try:
+            result = self._run_once(key, execute, load_result, deadline)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _run_once(self, key: str, execute: Callable[[], Dict], load_result: Callable[[], Optional[Dict]], deadline: Optional[Deadline]) -> Dict:
+        """他のコンテナと調整して処理を実行するか、他のコンテナの結果を待つ"""
+        if not self.lease_store:
+            return execute()
+
+        waited = False
+        while True:
+            try:
+                acquired = self.lease_store.try_acquire(key, self._owner, self.lease_seconds, self.clock())
+            except Exception:
+                # --- ロックの保存先の障害でレビュー自体を失敗させない ---
+                logger.exception(f"ロックを取得できなかったため、そのまま実行します key={key}")
+                return execute()
+
+            if acquired:
+                # --- 待っている間に結果が保存された場合は実行しない ---
+                result = load_result() if waited else None
+                if result is None:
+                    result = self._execute_with_lease(key, execute)
+                else:
+                    self._release(key)
+                return result
+
+            if not waited:
+                logger.info(f"他のコンテナで実行中の同じレビューの結果を待ちます key={key}")
+                waited = True
+            if deadline:
+                deadline.check(OPERATION_NAME, self.poll_seconds)
+            self.sleep(self.poll_seconds)
+            result = load_result()
+            if result is not None:
+                return result
+
+    def _execute_with_lease(self, key: str, execute: Callable[[], Dict]) -> Dict:
+        try:
+            return execute()
+        finally:
+            self._release(key)
+
+    def _release(self, key: str):
+        try:
+            self.lease_store.release(key, self._owner)
+        except Exception:
+            logger.exception(f"ロックの解放に失敗しました key={key}")
+
+    @staticmethod
+    def _wait(future: Future, deadline: Optional[Deadline]) -> Dict:
+        timeout = deadline.remaining_seconds() if deadline else None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise DeadlineExceededError.timed_out(OPERATION_NAME)
@@ -0,0 +1,252 @@
+import io
+import re
+import zlib
+import base64
+import zipfile
+import binascii
+import codecs
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Tuple
+
+from common.exception import PayloadTooLargeError, RequestParameterError
+
+
+# Base64文字列を一度に復号する文字数(4の倍数)
+BASE64_CHUNK_CHARS = 64 * 1024
+
+# Base64のアルファベット以外の文字(改行など)。従来のb64decodeと同様に読み飛ばす
+_NON_BASE64_CHARS = re.compile(r"[^A-Za-z0-9+/=]")
+
+
+@dataclass(frozen=True)
+class SourceLimits:
+    # ソースコードの最大バイト数(UTF-8)
+    max_bytes: int = 200 * 1024
+
+    # ソースコードの最大行数
+    max_lines: int = 5000
+
+    # プロジェクトのレビューで受け付ける最大ファイル数(バイト数の上限はプロジェクト全体に適用する)
+    max_files: int = 20
+
+    @property
+    def max_request_chars(self) -> int:
+        """JSON解析前のリクエストボディの最大文字数(エスケープ・Base64化による膨張を見込んだ値)"""
+        return self.max_bytes * 2 + 4096
+
+    @classmethod
+    def from_environ(cls, environ: Mapping[str, str]) -> "SourceLimits":
+        """環境変数(MAX_SOURCE_BYTES, MAX_SOURCE_LINES, MAX_PROJECT_FILES)から上限値を読み込む"""
+        defaults = cls()
+        return cls(
+            max_bytes=int(environ.get("MAX_SOURCE_BYTES", defaults.max_bytes)),
+            max_lines=int(environ.get("MAX_SOURCE_LINES", defaults.max_lines)),
+            max_files=int(environ.get("MAX_PROJECT_FILES", defaults.max_files)),
+        )
+
+
+class _SourceAccumulator:
+    """復号したバイト列を上限を確認しながらUTF-8文字列に組み立てるクラス"""
+    def __init__(self, parameter_name: str, limits: SourceLimits):
+        self.parameter_name = parameter_name
+        self.limits = limits
+        self.total_bytes = 0
+        self.total_lines = 1
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._parts = []
+
+    def feed(self, data: bytes):
+        self.total_bytes += len(data)
+        if self.total_bytes > self.limits.max_bytes:
+            raise PayloadTooLargeError.exceeded(self.parameter_name, f"{self.limits.max_bytes} bytes")
+        self.total_lines += data.count(b"\n")
+        if self.total_lines > self.limits.max_lines:
+            raise PayloadTooLargeError.exceeded(self.parameter_name, f"{self.limits.max_lines} lines")
+        try:
+            self._parts.append(self._decoder.decode(data))
+        except UnicodeDecodeError as error:
+            raise RequestParameterError.invalid_format(self.parameter_name, "UTF-8デコードに失敗") from error
+
+    def finish(self) -> str:
+        try:
+            self._parts.append(self._decoder.decode(b"", final=True))
+        except UnicodeDecodeError as error:
+            raise RequestParameterError.invalid_format(self.parameter_name, "UTF-8デコードに失敗") from error
+        return "".join(self._parts)
+
+
+def _iter_base64_chunks(parameter_name: str, encoded: str) -> Iterator[bytes]:
+    """Base64文字列を一定サイズごとに復号して返す"""
+    carry = ""
+    for start in range(0, len(encoded), BASE64_CHUNK_CHARS):
+        chunk = carry + _NON_BASE64_CHARS.sub("", encoded[start:start + BASE64_CHUNK_CHARS])
+        aligned = len(chunk) - len(chunk) % 4
+        carry = chunk[aligned:]
+        if aligned:
+            yield _b64decode(parameter_name, chunk[:aligned])
+    if carry:
+        yield _b64decode(parameter_name, carry)
+
+
+def _b64decode(parameter_name: str, chunk: str) -> bytes:
+    try:
+        return base64.b64decode(chunk, validate=True)
+    except binascii.Error as error:
+        raise RequestParameterError.invalid_format(parameter_name, "Base64デコードに失敗") from error
+
+
+def _decode_plain(body: Dict[str, Any], limits: SourceLimits) -> str:
+    source = body["source"]
+    if not isinstance(source, str):
+        raise RequestParameterError.invalid_format("source", "文字列ではありません")
+    accumulator = _SourceAccumulator("source", limits)
+    accumulator.feed(source.encode("utf-8"))
+    return accumulator.finish()
+
+
+def _decode_base64(body: Dict[str, Any], limits: SourceLimits) -> str:
+    source_base64 = body["source_base64"]
+    # --- 復号後のサイズは文字数から見積もれるため、明らかに大きい場合は復号せずに拒否する ---
+    if len(source_base64) > limits.max_request_chars:
+        raise PayloadTooLargeError.exceeded("source_base64", f"{limits.max_bytes} bytes")
+
+    accumulator = _SourceAccumulator("source_base64", limits)
+    for data in _iter_base64_chunks("source_base64", source_base64):
+        accumulator.feed(data)
+    return accumulator.finish()
+
+
+def _decode_gzip_base64(body: Dict[str, Any], limits: SourceLimits) -> str:
+    accumulator = _SourceAccumulator("source_gzip_base64", limits)
+    # wbits=32+15: gzip/zlibのヘッダーを自動判別する
+    decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+    try:
+        for data in _iter_base64_chunks("source_gzip_base64", body["source_gzip_base64"]):
+            while data:
+                # --- 展開後のサイズを上限+1バイトまでに制限し、圧縮爆弾を途中で止める ---
+                accumulator.feed(decompressor.decompress(data, limits.max_bytes + 1 - accumulator.total_bytes))
+                data = decompressor.unconsumed_tail
+        accumulator.feed(decompressor.flush())
+    except zlib.error as error:
+        raise RequestParameterError.invalid_format("source_gzip_base64", "gzip展開に失敗") from error
+    if not decompressor.eof:
+        raise RequestParameterError.invalid_format("source_gzip_base64", "gzipデータが途中で終わっています")
+    return accumulator.finish()
+
+
+def decode_source(body: Dict[str, Any], limits: SourceLimits) -> str:
+    """
+    リクエストボディからソースコード文字列を取り出す
+    source_gzip_base64(gzip圧縮+Base64), source_base64(Base64), source(テキスト)の順に参照し、
+    復号・展開は少しずつ行いながらバイト数・行数の上限を確認します。
+    Args:
+        body: リクエストボディ
+        limits: ソースコードのサイズ上限
+    Returns:
+        ソースコード文字列
+    Raises:
+        PayloadTooLargeError: サイズ上限を超えた場合
+        RequestParameterError: ソースコードがない、または復号できない場合
+    """
+    if body.get("source_gzip_base64"):
+        return _decode_gzip_base64(body, limits)
+    if body.get("source_base64"):
+        return _decode_base64(body, limits)
+    if body.get("source"):
+        return _decode_plain(body, limits)
+    raise RequestParameterError.not_found("source_base64")
+
+
+# zipファイル内の、展開の対象としないディレクトリ(macOSのリソースフォーク)
+_ZIP_IGNORED_PREFIXES = ("__MACOSX/",)
+
+
+def _decode_project_entries(files: Any, limits: SourceLimits) -> List[Tuple[str, str]]:
+    if not isinstance(files, list) or not files:
+        raise RequestParameterError.invalid_format("files", "空でない配列ではありません")
+    if len(files) > limits.max_files:
+        raise PayloadTooLargeError.exceeded("files", f"{limits.max_files} files")
+
+    decoded: List[Tuple[str, str]] = []
+    total_bytes = 0
+    for entry in files:
+        path = entry.get("path") if isinstance(entry, dict) else None
+        if not isinstance(path, str) or not path:
+            raise RequestParameterError.not_found("files[].path")
+        if any(path == decoded_path for decoded_path, _ in decoded):
+            raise RequestParameterError.invalid_format("files", f"パス '{path}' が重複しています")
+        if total_bytes >= limits.max_bytes:
+            raise PayloadTooLargeError.exceeded("files", f"{limits.max_bytes} bytes")
+        # --- バイト数の上限はプロジェクト全体の残りで確認する ---
+        source_code = decode_source(entry, replace(limits, max_bytes=limits.max_bytes - total_bytes))
+        total_bytes += len(source_code.encode("utf-8"))
+        decoded.append((path, source_code))
+    return decoded
+
+
+def _decode_project_zip(body: Dict[str, Any], limits: SourceLimits, accept_path: Callable[[str], bool]) -> List[Tuple[str, str]]:
+    encoded = body["project_zip_base64"]
+    if len(encoded) > limits.max_request_chars:
+        raise PayloadTooLargeError.exceeded("project_zip_base64", f"{limits.max_bytes} bytes")
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(_iter_base64_chunks("project_zip_base64", encoded))))
+    except zipfile.BadZipFile as error:
+        raise RequestParameterError.invalid_format("project_zip_base64", "zip展開に失敗") from error
+
+    decoded: List[Tuple[str, str]] = []
+    total_bytes = 0
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith(_ZIP_IGNORED_PREFIXES) or not accept_path(info.filename):
+                continue
+            if len(decoded) >= limits.max_files:
+                raise PayloadTooLargeError.exceeded("project_zip_base64", f"{limits.max_files} files")
+            # --- ヘッダーのサイズは信用せず、少しずつ展開しながら上限を確認する(圧縮爆弾を途中で止める) ---
+            accumulator = _SourceAccumulator(
+                "project_zip_base64", replace(limits, max_bytes=limits.max_bytes - total_bytes)
+            )
+            try:
+                with archive.open(info) as f:
+                    for data in iter(lambda: f.read(BASE64_CHUNK_CHARS), b""):
+                        accumulator.feed(data)
+            except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as error:
+                # RuntimeError: 暗号化されたファイル / NotImplementedError: 未対応の圧縮方式
+                raise RequestParameterError.invalid_format("project_zip_base64", "zip展開に失敗") from error
+            total_bytes += accumulator.total_bytes
+            decoded.append((info.filename, accumulator.finish()))
+
+    if not decoded:
+        raise RequestParameterError.invalid_format("project_zip_base64", "レビューの対象となるファイルがありません")
+    return decoded
+
+
+def decode_project_files(
+    body: Dict[str, Any],
+    limits: SourceLimits,
+    accept_path: Callable[[str], bool] = lambda path: True,
+) -> List[Tuple[str, str]]:
+    """
+    リクエストボディからプロジェクトのファイルの一覧を取り出す
+    files(ファイルごとの path と、source_gzip_base64 / source_base64 / source のいずれか)、
+    project_zip_base64(zip+Base64)の順に参照します。
+    バイト数の上限はプロジェクト全体、行数の上限はファイルごとに確認します。
+    Args:
+        body: リクエストボディ
+        limits: ソースコードのサイズ上限
+        accept_path: zipファイル内のファイルをレビューの対象とするか判定する関数(対象外のファイルは展開しない)
+    Returns:
+        (ファイルのパス, ソースコード文字列)の一覧
+    Raises:
+        PayloadTooLargeError: サイズ上限・ファイル数の上限を超えた場合
+        RequestParameterError: ファイルがない、または復号できない場合
+    """
+    if body.get("files") is not None:
+        return _decode_project_entries(body["files"], limits)
+    if body.get("project_zip_base64"):
+        return _decode_project_zip(body, limits, accept_path)
+    raise RequestParameterError.not_found("files")
+
+
+def is_project_request(body: Dict[str, Any]) -> bool:
+    """プロジェクト(複数ファイル)のレビューのリクエストか判定する"""
+    return body.get("files") is not None or bool(body.get("project_zip_base64"))
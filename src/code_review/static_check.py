@@ -0,0 +1,370 @@
+import os
+import re
+import bisect
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from code_review.rules import CodingRules
+
+
+# --- 識別子(Unicodeの文字を含む)と、型名として現れない予約語 ---
+_NAME = r"(?P<name>[^\W\d]\w*)"
+_CSHARP_TYPE = r"(?!(?:return|new|await|throw|else|yield|using|case|goto|in|is|as|out|ref)\b)[^\W\d][\w.]*(?:<[^;{}()\n]*>)?(?:\[\s*,*\s*\])*\??"
+_CSHARP_MODIFIERS = r"(?:(?:public|private|protected|internal|static|async|virtual|override|abstract|sealed|extern|unsafe|new|partial|readonly|const|volatile)\s+)*"
+_TYPESCRIPT_MODIFIERS = r"(?:(?:public|private|protected|static|async|readonly|abstract|override|get|set)\s+)*"
+_TYPESCRIPT_KEYWORDS = frozenset(["if", "for", "while", "switch", "catch", "function", "return", "constructor"])
+
+
+@dataclass(frozen=True)
+class Identifier:
+    # 識別子名
+    name: str
+
+    # 宣言されている行番号(1始まり)
+    line: int
+
+    # 種別(function / class / variable / parameter)
+    kind: str
+
+
+@dataclass(frozen=True)
+class LanguageSyntax:
+    # 行コメントの開始記号
+    line_comments: Tuple[str, ...]
+
+    # ブロックコメントの(開始記号, 終了記号)
+    block_comments: Tuple[Tuple[str, str], ...]
+
+    # 文字列リテラルの(開始記号, 終了記号, エスケープ, 複数行可否)。前方一致するため長いものから並べる
+    strings: Tuple[Tuple[str, str, Optional[str], bool], ...]
+
+    # 宣言を検出する(種別, 正規表現)。正規表現は名前を "name" グループで取り出す
+    declarations: Tuple[Tuple[str, Pattern], ...]
+
+    # 引数リストを "params" グループで取り出す正規表現
+    parameter_lists: Tuple[Pattern, ...] = ()
+
+    # 引数名が引数定義の先頭にあるか(Python/TypeScript)、末尾にあるか(C#)
+    parameter_name_first: bool = True
+
+
+def _compile(pattern: str) -> Pattern:
+    return re.compile(pattern, re.MULTILINE)
+
+
+LANGUAGE_SYNTAXES: Dict[str, LanguageSyntax] = {
+    "csharp": LanguageSyntax(
+        line_comments=("//",),
+        block_comments=(("/*", "*/"),),
+        strings=(
+            ('"""', '"""', None, True),
+            ('$@"', '"', '""', True),
+            ('@$"', '"', '""', True),
+            ('@"', '"', '""', True),
+            ('"', '"', "\\", False),
+            ("'", "'", "\\", False),
+        ),
+        declarations=(
+            ("class", _compile(r"\b(?:class|struct|interface|enum|record)\s+" + _NAME)),
+            ("function", _compile(r"^\s*" + _CSHARP_MODIFIERS + _CSHARP_TYPE + r"\s+" + _NAME + r"\s*(?:<[^>\n]*>)?\s*\(")),
+            ("variable", _compile(
+                r"^\s*" + _CSHARP_MODIFIERS + _CSHARP_TYPE + r"\s+" + _NAME + r"\s*(?:=(?!=)|;|,|\{\s*(?:get|set|init)\b)"
+            )),
+            ("variable", _compile(r"\bvar\s+" + _NAME)),
+            ("variable", _compile(r"\b(?:foreach|for)\s*\(\s*" + _CSHARP_TYPE + r"\s+" + _NAME + r"\s*(?:in\b|=)")),
+        ),
+        parameter_lists=(
+            _compile(r"^\s*" + _CSHARP_MODIFIERS + _CSHARP_TYPE + r"\s+[^\W\d]\w*\s*(?:<[^>\n]*>)?\s*\((?P<params>[^)]*)\)"),
+        ),
+        parameter_name_first=False,
+    ),
+    "typescript": LanguageSyntax(
+        line_comments=("//",),
+        block_comments=(("/*", "*/"),),
+        strings=(
+            ("`", "`", "\\", True),
+            ('"', '"', "\\", False),
+            ("'", "'", "\\", False),
+        ),
+        declarations=(
+            ("function", _compile(r"\bfunction\s*\*?\s*" + _NAME)),
+            ("class", _compile(r"\b(?:class|interface|enum|type)\s+" + _NAME)),
+            ("variable", _compile(r"\b(?:const|let|var)\s+" + _NAME)),
+            ("variable", _compile(r"^\s*(?:(?:public|private|protected|static|readonly)\s+)+" + _NAME + r"\s*[?!]?\s*[:=]")),
+            ("function", _compile(
+                r"^\s*" + _TYPESCRIPT_MODIFIERS + _NAME + r"\s*(?:<[^>\n]*>)?\s*\([^)\n]*\)\s*(?::\s*[^{;\n]+)?\{"
+            )),
+        ),
+        parameter_lists=(
+            _compile(r"\bfunction\s*\*?\s*\w*\s*(?:<[^>\n]*>)?\s*\((?P<params>[^)]*)\)"),
+            _compile(r"\((?P<params>[^()]*)\)\s*(?::\s*[^=\n]+)?=>"),
+        ),
+    ),
+    "python": LanguageSyntax(
+        line_comments=("#",),
+        block_comments=(),
+        strings=(
+            ('"""', '"""', "\\", True),
+            ("'''", "'''", "\\", True),
+            ('"', '"', "\\", False),
+            ("'", "'", "\\", False),
+        ),
+        declarations=(
+            ("function", _compile(r"^\s*(?:async\s+)?def\s+" + _NAME)),
+            ("class", _compile(r"^\s*class\s+" + _NAME)),
+            ("variable", _compile(r"^\s*(?:self\.)?" + _NAME + r"\s*(?::[^=\n]+)?=(?!=)")),
+            ("variable", _compile(r"\bfor\s+" + _NAME + r"\s+in\b")),
+        ),
+        parameter_lists=(
+            _compile(r"\bdef\s+[^\W\d]\w*\s*\((?P<params>[^)]*)\)"),
+        ),
+    ),
+}
+
+# リクエストで指定される言語種別の表記ゆれ
+LANGUAGE_ALIASES: Dict[str, str] = {
+    "c#": "csharp",
+    "csharp": "csharp",
+    "cs": "csharp",
+    "typescript": "typescript",
+    "ts": "typescript",
+    "python": "python",
+    "py": "python",
+}
+
+# 拡張子ごとのプログラミング言語種別(APIのリクエストで指定される値と同じ表記にする)
+EXTENSION_LANGUAGES: Dict[str, str] = {
+    ".cs": "C#",
+    ".ts": "TypeScript",
+    ".py": "Python",
+}
+
+
+def resolve_language(language: str) -> Optional[str]:
+    """言語種別の文字列から構文定義のキーを求める(未対応の言語はNone)"""
+    return LANGUAGE_ALIASES.get((language or "").strip().lower())
+
+
+def language_from_path(path: str) -> Optional[str]:
+    """ファイルの拡張子から言語種別を求める(未対応の拡張子はNone)"""
+    return EXTENSION_LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+def mask_comments_and_strings(source_code: str, syntax: LanguageSyntax) -> str:
+    """コメントと文字列リテラルを空白に置き換える(改行は残すため行番号は変わらない)"""
+    masked = list(source_code)
+    index = 0
+    length = len(source_code)
+
+    def blank(start: int, end: int):
+        for position in range(start, min(end, length)):
+            if masked[position] != "\n":
+                masked[position] = " "
+
+    while index < length:
+        # --- 行コメント ---
+        line_comment = next((mark for mark in syntax.line_comments if source_code.startswith(mark, index)), None)
+        if line_comment:
+            end = source_code.find("\n", index)
+            end = length if end < 0 else end
+            blank(index, end)
+            index = end
+            continue
+
+        # --- ブロックコメント ---
+        block_comment = next((pair for pair in syntax.block_comments if source_code.startswith(pair[0], index)), None)
+        if block_comment:
+            end = source_code.find(block_comment[1], index + len(block_comment[0]))
+            end = length if end < 0 else end + len(block_comment[1])
+            blank(index, end)
+            index = end
+            continue
+
+        # --- 文字列リテラル ---
+        string = next((entry for entry in syntax.strings if source_code.startswith(entry[0], index)), None)
+        if string:
+            start_mark, end_mark, escape, multiline = string
+            position = index + len(start_mark)
+            while position < length:
+                if escape and source_code.startswith(escape, position):
+                    position += len(escape) + (1 if escape == "\\" else 0)
+                    continue
+                if source_code.startswith(end_mark, position):
+                    position += len(end_mark)
+                    break
+                if source_code[position] == "\n" and not multiline:
+                    break
+                position += 1
+            blank(index, position)
+            index = position
+            continue
+
+        index += 1
+
+    return "".join(masked)
+
+
+def extract_identifiers(source_code: str, language: str) -> List[Identifier]:
+    """
+    ソースコードから宣言されている識別子(関数・クラス・変数・引数名)を取り出す
+    構文解析は行わず、コメントと文字列を除いた上で宣言の形を正規表現で検出する軽量な実装です。
+    Args:
+        source_code: ソースコード文字列
+        language: プログラミング言語種別を表した文字列
+    Returns:
+        識別子の一覧(未対応の言語では空)
+    """
+    syntax = LANGUAGE_SYNTAXES.get(resolve_language(language))
+    if not syntax:
+        return []
+
+    masked = mask_comments_and_strings(source_code, syntax)
+    line_starts = [0] + [match.end() for match in re.finditer("\n", masked)]
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_right(line_starts, offset)
+
+    found: Dict[Tuple[str, int], Identifier] = {}
+
+    def add(name: str, offset: int, kind: str):
+        identifier = Identifier(name=name, line=line_of(offset), kind=kind)
+        found.setdefault((identifier.name, identifier.line), identifier)
+
+    for kind, pattern in syntax.declarations:
+        for match in pattern.finditer(masked):
+            name = match.group("name")
+            if kind == "function" and name in _TYPESCRIPT_KEYWORDS:
+                continue
+            add(name, match.start("name"), kind)
+
+    for pattern in syntax.parameter_lists:
+        for match in pattern.finditer(masked):
+            offset = match.start("params")
+            for parameter in match.group("params").split(","):
+                name_match = _parameter_name(parameter, syntax.parameter_name_first)
+                if name_match:
+                    add(name_match.group("name"), offset + name_match.start("name"), "parameter")
+                offset += len(parameter) + 1
+
+    return sorted(found.values(), key=lambda identifier: (identifier.line, identifier.name))
+
+
+_PARAMETER_MODIFIERS = re.compile(r"^\s*(?:\[[^\]]*\]\s*)*(?:(?:public|private|protected|readonly|ref|out|in|params|this)\s+)*[.*]*")
+
+
+def _parameter_name(parameter: str, name_first: bool) -> Optional["re.Match"]:
+    """引数定義の文字列から引数名の位置を求める"""
+    if name_first:
+        prefix = _PARAMETER_MODIFIERS.match(parameter)
+        return re.compile(r"\s*" + _NAME).match(parameter, prefix.end())
+    definition = parameter.split("=", 1)[0].rstrip()
+    return re.compile(_NAME + r"$").search(definition)
+
+
+class IStaticCheck(ABC):
+    """ルールIDに対応付けられた、LLMを使わずに判定できる検査のインターフェース"""
+    # 対応するコーディングルールのID
+    rule_id: str = ""
+
+    def supports(self, language: str) -> bool:
+        """指定した言語を検査できるか(既定では識別子を取り出せる言語のみ)"""
+        return resolve_language(language) in LANGUAGE_SYNTAXES
+
+    @abstractmethod
+    def check(self, source_code: str, language: str, rule: Dict[str, Optional[str]]) -> List[Dict]:
+        """
+        検査を実行する
+        Args:
+            source_code: ソースコード文字列
+            language: プログラミング言語種別を表した文字列
+            rule: 対象のコーディングルール({"category", "value", "id"})
+        Returns:
+            prompt.RESPONSE_FORMAT の review_points と同じ形式の指摘事項
+        """
+        pass
+
+
+class NonAsciiIdentifierCheck(IStaticCheck):
+    """
+    関数名・変数名に英字以外の文字(非ASCII文字)が使われていないかを検査する
+    ローマ字・綴りの誤りなど、ASCII文字の名前が英単語であるかは判定できないため、そのルールはLLMでレビューします。
+    """
+    rule_id = "non-ascii-identifiers"
+
+    KIND_LABELS = {
+        "function": "関数名",
+        "class": "型名",
+        "variable": "変数名",
+        "parameter": "引数名",
+    }
+
+    def check(self, source_code: str, language: str, rule: Dict[str, Optional[str]]) -> List[Dict]:
+        review_points = []
+        reported: Set[str] = set()
+        for identifier in extract_identifiers(source_code, language):
+            if identifier.name in reported or identifier.name.isascii():
+                continue
+            reported.add(identifier.name)
+            label = self.KIND_LABELS.get(identifier.kind, "識別子")
+            review_points.append({
+                "location": identifier.name,
+                "codeline": identifier.line,
+                "category": rule["category"],
+                "overview": f"{label}「{identifier.name}」に英字以外の文字が使われています。",
+                "details": f"{label}には英字以外の文字(日本語など)を使用しないルールです。「{identifier.name}」には英字以外の文字が含まれています。",
+                "suggestion": f"「{identifier.name}」を役割を表す英単語の名前に変更してください。",
+            })
+        return review_points
+
+
+class StaticCheckEngine:
+    """
+    ルールIDをキーとしてローカルの検査を実行するクラス
+    検査できるルールはプロンプトから除外し、LLMの入出力トークンを削減するために使用します。
+    """
+    def __init__(self, checks: Optional[Iterable[IStaticCheck]] = None):
+        if checks is None:
+            checks = [NonAsciiIdentifierCheck()]
+        self.checks: Dict[str, IStaticCheck] = {check.rule_id: check for check in checks}
+
+    def covered_rule_ids(self, coding_rules: CodingRules, language: str) -> Set[str]:
+        """ルールセットのうち、指定した言語でローカルに検査できるルールIDを返す"""
+        return {rule_id for rule_id in coding_rules.rule_ids & set(self.checks) if self.checks[rule_id].supports(language)}
+
+    def run(self, source_code: str, language: str, coding_rules: CodingRules) -> List[Dict]:
+        """ローカルに検査できるルールを実行し、指摘事項を返す"""
+        review_points = []
+        for rule_id in sorted(self.covered_rule_ids(coding_rules, language)):
+            review_points.extend(self.checks[rule_id].check(source_code, language, coding_rules.find(rule_id)))
+        return review_points
+
+
+def cap_review_points(review_result: Dict, local_points: List[Dict], max_points: int) -> List[Dict]:
+    """
+    指摘事項の合計がmax_points件以内になるように絞り込む
+    LLMの指摘事項は重大度の高い順に出力させているため先頭から残し、ローカル検査の指摘事項は残りの件数だけ残します。
+    絞り込んだ場合はレビュー結果の review_points_capped を true にします。
+    Returns:
+        残したローカル検査の指摘事項
+    """
+    review_points = list(review_result.get("review_points") or [])
+    kept_points = review_points[:max_points]
+    kept_local_points = local_points[:max_points - len(kept_points)]
+    review_result["review_points"] = kept_points
+    review_result["review_points_capped"] = (
+        len(kept_points) < len(review_points) or len(kept_local_points) < len(local_points)
+    )
+    return kept_local_points
+
+
+def merge_review_points(review_result: Dict, local_points: List[Dict]) -> Dict:
+    """
+    LLMのレビュー結果にローカル検査の指摘事項を加える
+    LLMの指摘事項は重大度の高い順に出力させているため、その順序を保ったまま末尾にローカル検査の指摘事項を加えます。
+    """
+    if not local_points:
+        return review_result
+    review_result["review_points"] = list(review_result.get("review_points") or []) + list(local_points)
+    review_result["review_result"] = "NG"
+    return review_result
@@ -0,0 +1,202 @@
+import time
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from common.exception import QuotaExceededError
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def usage_day(timestamp: float) -> str:
+    """集計単位となる日付(UTC, YYYY-MM-DD)を求める"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def seconds_until_next_day(timestamp: float) -> int:
+    """次の集計日(UTC 0時)までの秒数を求める"""
+    return SECONDS_PER_DAY - int(timestamp) % SECONDS_PER_DAY
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    # 入力トークン数
+    input_tokens: int = 0
+
+    # 出力トークン数
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @classmethod
+    def from_bedrock_usage(cls, usage: Dict[str, int]) -> "TokenUsage":
+        """Bedrockのレスポンスのusage({"inputTokens", "outputTokens"})から生成する"""
+        return cls(
+            input_tokens=int((usage or {}).get("inputTokens", 0)),
+            output_tokens=int((usage or {}).get("outputTokens", 0)),
+        )
+
+
+def sum_bedrock_usage(*usages: Dict[str, int]) -> Dict[str, int]:
+    """複数回のBedrockの呼び出しのusageを合計する"""
+    total: Dict[str, int] = {}
+    for usage in usages:
+        for key in ("inputTokens", "outputTokens", "totalTokens"):
+            if key in (usage or {}):
+                total[key] = total.get(key, 0) + int(usage[key])
+    return total
+
+
+class ITokenUsageRepository(ABC):
+    """利用キーごと・日ごとのトークン使用量リポジトリのインターフェース"""
+    @abstractmethod
+    def add(self, api_key_id: str, day: str, usage: TokenUsage):
+        """トークン使用量を加算する"""
+        pass
+
+    @abstractmethod
+    def get(self, api_key_id: str, day: str) -> TokenUsage:
+        """トークン使用量の合計を取得する"""
+        pass
+
+
+class TokenUsageFromMemory(ITokenUsageRepository):
+    """プロセス内でトークン使用量を集計するクラス(ローカル実行・テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usages: Dict[Tuple[str, str], TokenUsage] = defaultdict(TokenUsage)
+
+    def add(self, api_key_id: str, day: str, usage: TokenUsage):
+        with self._lock:
+            current = self._usages[(api_key_id, day)]
+            self._usages[(api_key_id, day)] = TokenUsage(
+                input_tokens=current.input_tokens + usage.input_tokens,
+                output_tokens=current.output_tokens + usage.output_tokens,
+            )
+
+    def get(self, api_key_id: str, day: str) -> TokenUsage:
+        with self._lock:
+            return self._usages.get((api_key_id, day), TokenUsage())
+
+
+class TokenUsageFromDynamoDB(ITokenUsageRepository):
+    """
+    トークン使用量をDynamoDBで集計するクラス
+    加算はUpdateItemのADDで行うため、複数のLambdaから同時に加算しても値は失われません。
+    アクセスの集中する利用キーでも1アイテムに書き込みが偏らないよう、カウンタを shard_count 個に分割し、
+    加算時は無作為に選んだシャードへ、取得時は全シャードを合計します。
+    """
+    def __init__(
+        self,
+        dynamodb_client: "DynamoDBClient",
+        table_name: str,
+        shard_count: int = 4,
+        ttl_days: int = 35,
+        choose_shard: Callable[[int], int] = random.randrange,
+    ):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.shard_count = max(1, shard_count)
+        self.ttl_days = ttl_days
+        self.choose_shard = choose_shard
+
+    @staticmethod
+    def usage_key(api_key_id: str, day: str) -> str:
+        return f"{api_key_id}#{day}"
+
+    def add(self, api_key_id: str, day: str, usage: TokenUsage):
+        """トークン使用量をいずれかのシャードに加算する"""
+        expires_at = int((datetime.now() + timedelta(days=self.ttl_days)).timestamp())
+        self.dynamodb_client.update_item(
+            TableName=self.table_name,
+            Key={
+                "usage_key": {"S": self.usage_key(api_key_id, day)},
+                "shard": {"N": str(self.choose_shard(self.shard_count))},
+            },
+            UpdateExpression="ADD input_tokens :input_tokens, output_tokens :output_tokens "
+                             "SET expires_at = if_not_exists(expires_at, :expires_at)",
+            ExpressionAttributeValues={
+                ":input_tokens": {"N": str(usage.input_tokens)},
+                ":output_tokens": {"N": str(usage.output_tokens)},
+                ":expires_at": {"N": str(expires_at)},
+            },
+        )
+
+    def get(self, api_key_id: str, day: str) -> TokenUsage:
+        """全シャードのトークン使用量を合計して取得する"""
+        input_tokens = output_tokens = 0
+        paginator = self.dynamodb_client.get_paginator("query")
+        pages = paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression="usage_key = :usage_key",
+            ExpressionAttributeValues={":usage_key": {"S": self.usage_key(api_key_id, day)}},
+            ProjectionExpression="input_tokens, output_tokens",
+        )
+        for page in pages:
+            for item in page.get("Items", []):
+                input_tokens += int(item.get("input_tokens", {}).get("N", 0))
+                output_tokens += int(item.get("output_tokens", {}).get("N", 0))
+        return TokenUsage(input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+class TokenMeter:
+    """
+    利用キーごとに1日のトークン使用量を記録し、予算を超えたリクエストを拒否するクラス
+    API Gatewayの使用量プランはリクエスト数でしか制限できないため、実際のコストであるトークン数で制限します。
+    """
+    def __init__(
+        self,
+        repository: ITokenUsageRepository,
+        daily_token_budget: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.repository = repository
+        # 0以下の場合は予算による制限を行わない(記録のみ)
+        self.daily_token_budget = daily_token_budget
+        self.clock = clock
+
+    def check_budget(self, api_key_id: Optional[str], estimated_tokens: int = 0):
+        """
+        Bedrockの呼び出し前に、当日の使用量と見込みのトークン数が予算内か確認する
+        Raises:
+            QuotaExceededError: 予算を超える場合
+        """
+        if not api_key_id or self.daily_token_budget <= 0:
+            return
+        now = self.clock()
+        try:
+            used = self.repository.get(api_key_id, usage_day(now)).total_tokens
+        except Exception:
+            # --- 集計先の障害でレビュー自体を失敗させない ---
+            logger.exception(f"トークン使用量の取得に失敗しました api_key_id={api_key_id}")
+            return
+        if used + estimated_tokens > self.daily_token_budget:
+            logger.warning(
+                f"トークン予算を超えています api_key_id={api_key_id} used={used} "
+                f"estimated={estimated_tokens} budget={self.daily_token_budget}"
+            )
+            raise QuotaExceededError.token_budget(self.daily_token_budget, seconds_until_next_day(now))
+
+    def record(self, api_key_id: Optional[str], usage: Dict[str, int]):
+        """Bedrockのレスポンスのusageを当日の使用量に加算する"""
+        if not api_key_id:
+            return
+        token_usage = TokenUsage.from_bedrock_usage(usage)
+        if not token_usage.total_tokens:
+            return
+        try:
+            self.repository.add(api_key_id, usage_day(self.clock()), token_usage)
+        except Exception:
+            logger.exception(f"トークン使用量の記録に失敗しました api_key_id={api_key_id}")
@@ -0,0 +1,20 @@
+import math
+
+
+# 1トークンあたりの概算文字数(ASCII文字)
+ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストの入力トークン数を概算する
+    ASCII文字は約4文字で1トークン、それ以外(日本語など)は1文字1トークンとして数えます。
+    Args:
+        text: 対象の文字列
+    Returns:
+        概算トークン数
+    """
+    if not text:
+        return 0
+    ascii_count = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_count / ASCII_CHARS_PER_TOKEN) + (len(text) - ascii_count)
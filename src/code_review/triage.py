@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from code_review.rules import CodingRules
+from common import json_codec
+
+
+VERDICT_OK = "OK"
+VERDICT_NG = "NG"
+
+# カテゴリの判定を行った段階
+PHASE_TRIAGE = "triage"
+PHASE_DETAIL = "detail"
+PHASE_LOCAL = "local"
+
+
+class TriagePrompt:
+    """
+    カテゴリごとにOK/NGだけを判定させる、一次判定用のプロンプト
+    指摘内容を出力させないため、高速なモデルで少ない出力トークン数で判定できます。
+    """
+    def __init__(self, source_code: str, language: str, coding_rules: CodingRules):
+        self.source_code = source_code
+        self.language = language
+        self.coding_rules = coding_rules
+
+    def create_user_prompt(self) -> str:
+        return self.source_code
+
+    def create_system_prompt(self) -> str:
+        rules = self.coding_rules.to_indexed_string()
+        response_format = json_codec.dumps({str(number): "OK" for number in range(1, len(self.coding_rules.categories) + 1)})
+        return \
+f"""You are a professional and experienced **{self.language}** engineer specializing in source code reviews.
+For each category of the [Review Perspectives], decide whether the source code satisfies **all** of its perspectives.
+[Review Perspectives] are described in the structure "[Category number] Category:Review Perspectives"
+
+[Response Rules]
+- Output only a single JSON object whose keys are the category numbers and whose values are "OK" or "NG".
+- Use "NG" if there is at least one issue in the category, or if you are not sure.
+- Do not include any other text.
+
+[Review Perspectives]
+{rules}
+[Response Format]
+{response_format}
+"""
+
+
+def parse_verdicts(response_text: str, categories: List[str]) -> Dict[str, str]:
+    """
+    一次判定の出力をカテゴリ名ごとの判定に変換する
+    解析できない出力や判定のないカテゴリは、詳細レビューで確認するためNGとして扱います。
+    """
+    data = None
+    start, end = response_text.find("{"), response_text.rfind("}")
+    if 0 <= start < end:
+        try:
+            data = json_codec.loads(response_text[start:end + 1])
+        except ValueError:
+            data = None
+    if not isinstance(data, dict):
+        data = {}
+
+    verdicts = {}
+    for number, category in enumerate(categories, start=1):
+        verdict = str(data.get(str(number), "")).strip().upper()
+        verdicts[category] = VERDICT_OK if verdict == VERDICT_OK else VERDICT_NG
+    return verdicts
+
+
+@dataclass(frozen=True)
+class CategoryVerdict:
+    # カテゴリ名
+    category: str
+
+    # 判定結果(OK/NG)
+    verdict: str
+
+    # 判定を行った段階(triage: 一次判定, detail: 詳細レビュー)
+    phase: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"category": self.category, "verdict": self.verdict, "phase": self.phase}
+
+
+def category_verdicts(
+    triage_verdicts: Dict[str, str],
+    review_points: List[Dict],
+    categories: Optional[List[str]] = None,
+) -> List[CategoryVerdict]:
+    """
+    カテゴリごとの最終的な判定を求める
+    一次判定でOKのカテゴリはその判定を、NGのカテゴリは詳細レビューで指摘事項があったかどうかを判定とします。
+    review_points にはローカル検査の指摘事項も含めます。一次判定でOKのカテゴリに指摘事項がある場合(ローカル検査の指摘)と、
+    ルールがすべてローカルで検査され一次判定の対象とならなかったカテゴリは、ローカル検査の結果を判定とします。
+    Args:
+        categories: ルール全体のカテゴリ一覧(省略時は一次判定の対象のカテゴリ)
+    """
+    ng_categories = {point.get("category") for point in review_points}
+    verdicts = []
+    for category in categories or list(triage_verdicts):
+        verdict = VERDICT_NG if category in ng_categories else VERDICT_OK
+        triage_verdict = triage_verdicts.get(category)
+        if triage_verdict == VERDICT_NG:
+            verdicts.append(CategoryVerdict(category, verdict, PHASE_DETAIL))
+        elif triage_verdict == VERDICT_OK and verdict == VERDICT_OK:
+            verdicts.append(CategoryVerdict(category, VERDICT_OK, PHASE_TRIAGE))
+        else:
+            verdicts.append(CategoryVerdict(category, verdict, PHASE_LOCAL))
+    return verdicts
@@ -0,0 +1,167 @@
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from code_review.static_check import LANGUAGE_SYNTAXES, mask_comments_and_strings, resolve_language
+
+
+# 関数・クラスなどの単位の種別
+UNIT_KIND_DEFINITION = "definition"
+UNIT_KIND_MODULE = "module"
+
+# Pythonのトップレベルの定義(デコレータを含む)
+_PYTHON_DEFINITION = re.compile(r"^(?:@|def\s|async\s+def\s|class\s)")
+
+# 内側の階層を単位とする、名前空間・型の定義
+_CONTAINER = re.compile(r"\b(?:namespace|class|struct|interface|record|enum|module)\b")
+
+
+@dataclass(frozen=True)
+class SourceUnit:
+    # 種別(definition: 関数・クラス・メソッド / module: それ以外の行のまとまり)
+    kind: str
+
+    # 行範囲(1始まり、両端を含む)
+    start_line: int
+    end_line: int
+
+    # 単位のソースコード(行末の空白を除く)
+    text: str
+
+    @property
+    def unit_hash(self) -> str:
+        """単位の内容のハッシュ値(ファイル内の位置には依存しない)"""
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+
+def unit_key(scope: str, unit: SourceUnit) -> str:
+    """
+    単位ごとのレビュー結果を識別するキーを求める
+    Args:
+        scope: near_duplicate.index_scope で求めた、言語・ルールセット・モデル・オプションを表すキー
+    """
+    return hashlib.sha256(f"unit:{scope}:{unit.unit_hash}".encode("utf-8")).hexdigest()
+
+
+def split_units(source_code: str, language: str) -> List[SourceUnit]:
+    """
+    ソースコードを関数・クラス・メソッドの単位に分ける
+    Pythonはトップレベルの定義、波括弧の言語は名前空間・クラスだけを含む階層を降りた先の各ブロックを単位とします。
+    単位に含まれない行(import文など)は連続する行ごとにまとめ、ファイル全体を漏れなく分けます。
+    未対応の言語はファイル全体を1つの単位とします。
+    """
+    lines = source_code.splitlines()
+    language_key = resolve_language(language)
+    syntax = LANGUAGE_SYNTAXES.get(language_key)
+    if not lines:
+        return []
+    if not syntax:
+        return [_unit(lines, UNIT_KIND_MODULE, 1, len(lines))]
+
+    masked_lines = mask_comments_and_strings(source_code, syntax).splitlines()
+    if language_key == "python":
+        ranges = _python_definitions(masked_lines)
+    else:
+        ranges = _brace_definitions(masked_lines)
+
+    units: List[SourceUnit] = []
+    next_line = 1
+    for start, end in ranges:
+        if start > next_line:
+            units.extend(_module_units(lines, next_line, start - 1))
+        units.append(_unit(lines, UNIT_KIND_DEFINITION, start, end))
+        next_line = end + 1
+    if next_line <= len(lines):
+        units.extend(_module_units(lines, next_line, len(lines)))
+    return units
+
+
+def _unit(lines: List[str], kind: str, start: int, end: int) -> SourceUnit:
+    text = "\n".join(line.rstrip() for line in lines[start - 1:end])
+    return SourceUnit(kind=kind, start_line=start, end_line=end, text=text)
+
+
+def _module_units(lines: List[str], start: int, end: int) -> List[SourceUnit]:
+    """定義以外の行を単位にする(空行だけの範囲は単位にしない)"""
+    if not any(line.strip() for line in lines[start - 1:end]):
+        return []
+    return [_unit(lines, UNIT_KIND_MODULE, start, end)]
+
+
+def _python_definitions(masked_lines: List[str]) -> List[Tuple[int, int]]:
+    """トップレベルの def / class の行範囲(デコレータを含み、末尾の空行を除く)"""
+    # --- インデントのない行(複数行にわたる引数の閉じ括弧は除く)で定義の範囲を区切る ---
+    top_lines = [
+        number for number, line in enumerate(masked_lines, start=1)
+        if line.strip() and not line[0].isspace() and line[0] not in ")]}"
+    ]
+    ranges: List[Tuple[int, int]] = []
+    index = 0
+    while index < len(top_lines):
+        start = top_lines[index]
+        if not _PYTHON_DEFINITION.match(masked_lines[start - 1]):
+            index += 1
+            continue
+        # --- デコレータは続く定義と同じ範囲にする ---
+        while index < len(top_lines) - 1 and masked_lines[top_lines[index] - 1].startswith("@"):
+            index += 1
+        index += 1
+        end = (top_lines[index] if index < len(top_lines) else len(masked_lines) + 1) - 1
+        while end > start and not masked_lines[end - 1].strip():
+            end -= 1
+        ranges.append((start, end))
+    return ranges
+
+
+def _brace_definitions(masked_lines: List[str]) -> List[Tuple[int, int]]:
+    """
+    波括弧のブロックの行範囲
+    ブロックが1つだけの階層(名前空間・クラス)は、その内側の階層を対象にします。
+    各ブロックは、前のブロックの終わりの次の空行でない行(シグネチャ・属性・ドキュメントコメント)から始まります。
+    """
+    blocks = _blocks_by_depth(masked_lines)
+    depth = 0
+    while len(blocks.get(depth, [])) == 1 and blocks.get(depth + 1) and _is_container(masked_lines, blocks[depth][0][0]):
+        depth += 1
+    if depth not in blocks:
+        return []
+
+    ranges: List[Tuple[int, int]] = []
+    # --- 外側のブロックの開始行より後から探す ---
+    floor = 0
+    if depth:
+        floor = blocks[depth - 1][0][0]
+    for open_line, close_line in blocks[depth]:
+        start = max(floor + 1, ranges[-1][1] + 1 if ranges else 1)
+        while start < open_line and not masked_lines[start - 1].strip():
+            start += 1
+        if open_line == close_line:
+            # 1行で閉じるブロック(プロパティの get; set; など)は単位にせず、前後の単位に含める
+            continue
+        ranges.append((start, close_line))
+    return ranges
+
+
+def _is_container(masked_lines: List[str], open_line: int) -> bool:
+    """ブロックが名前空間・型の定義か(開始の波括弧の行か、その直前の空行でない行で判定する)"""
+    header = masked_lines[open_line - 1]
+    if header.strip() == "{":
+        header = next((line for line in reversed(masked_lines[:open_line - 1]) if line.strip()), "")
+    return bool(_CONTAINER.search(header))
+
+
+def _blocks_by_depth(masked_lines: List[str]) -> dict:
+    """深さごとのブロックの(開始行, 終了行)の一覧"""
+    blocks: dict = {}
+    stack: List[Tuple[int, int]] = []
+    for number, line in enumerate(masked_lines, start=1):
+        for char in line:
+            if char == "{":
+                stack.append((len(stack), number))
+            elif char == "}" and stack:
+                depth, open_line = stack.pop()
+                blocks.setdefault(depth, []).append((open_line, number))
+    for depth in blocks:
+        blocks[depth].sort()
+    return blocks
@@ -0,0 +1,252 @@
+import hmac
+import time
+import uuid
+import socket
+import hashlib
+import logging
+import ipaddress
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import urllib3
+
+from common import json_codec
+from common.deadline import Deadline
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+SIGNATURE_HEADER = "X-Review-Signature"
+TIMESTAMP_HEADER = "X-Review-Timestamp"
+
+
+def is_valid_callback_url(
+    callback_url: str,
+    resolve: Optional[Callable[[str], List[str]]] = None,
+) -> bool:
+    """
+    コールバックURLとして受け付けられるか判定する
+    http/https かつホスト名があり、ホスト名を解決したすべてのアドレスがインターネット上のアドレスである場合に受け付けます。
+    ループバック・リンクローカル(メタデータ 169.254.169.254 など)・プライベートアドレスなどへの送信は拒否します。
+    Args:
+        callback_url: コールバックURL
+        resolve: ホスト名をIPアドレスの一覧に解決する関数(テスト用。既定はDNSによる解決)
+    """
+    try:
+        parsed = urlparse(callback_url)
+        hostname = parsed.hostname
+        parsed.port
+    except ValueError:
+        return False
+    if parsed.scheme not in ("http", "https") or not hostname:
+        return False
+    try:
+        addresses = (resolve or _resolve_host)(hostname)
+    except (OSError, UnicodeError):
+        return False
+    return bool(addresses) and all(_is_public_address(address) for address in addresses)
+
+
+def _resolve_host(hostname: str) -> List[str]:
+    return sorted({info[4][0] for info in socket.getaddrinfo(hostname, None)})
+
+
+def _is_public_address(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+    except ValueError:
+        return False
+    # --- IPv4射影アドレス(::ffff:127.0.0.1 など)は元のIPv4アドレスで判定する ---
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """
+    コールバック本文の署名を作成する
+    署名対象は "<timestamp>.<body>" で、HMAC-SHA256の16進文字列を "sha256=" に続けて返します。
+    Args:
+        secret: 署名鍵(リクエストに使用したAPIキー)
+        timestamp: UNIX時刻(秒)の文字列
+        body: 送信する本文
+    """
+    message = timestamp.encode("utf-8") + b"." + body
+    digest = hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+class IDeadLetterStore(ABC):
+    """配信できなかったコールバックの保管先のインターフェース"""
+    @abstractmethod
+    def save(self, callback_url: str, payload: Dict[str, Any], reason: str, attempts: int):
+        """配信できなかったコールバックを記録する"""
+        pass
+
+
+class DeadLetterFromDynamoDB(IDeadLetterStore):
+    """配信できなかったコールバックをDynamoDBに記録するクラス"""
+    def __init__(self, dynamodb_client: "DynamoDBClient", table_name: str, retention_days: int = 14):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.retention_days = retention_days
+
+    def save(self, callback_url: str, payload: Dict[str, Any], reason: str, attempts: int):
+        """配信できなかったコールバックをDynamoDBに保存する"""
+        now = datetime.now()
+        expires_at = int((now + timedelta(days=self.retention_days)).timestamp())
+        self.dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={
+                "dead_letter_id": {"S": str(uuid.uuid4())},
+                "callback_url": {"S": callback_url},
+                "payload": {"S": json_codec.dumps(payload)},
+                "reason": {"S": reason},
+                "attempts": {"N": str(attempts)},
+                "failed_at": {"S": now.isoformat()},
+                "expires_at": {"N": str(expires_at)},
+            },
+        )
+
+
+class WebhookQueueFromSQS:
+    """
+    コールバックの配信依頼をSQSのキューに送るクラス
+    配信はキューを処理するLambda(main.webhook_handler)が行うため、APIのLambdaが応答を返した後に
+    実行環境が凍結されても配信は失われません。キューはサーバー側暗号化を有効にしてください(署名鍵を含むため)。
+    """
+    def __init__(self, sqs_client: "SQSClient", queue_url: str):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+
+    def enqueue(self, callback_url: str, secret: str, payload: Dict[str, Any]):
+        """配信依頼をキューに送る"""
+        self.sqs_client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json_codec.dumps({"callback_url": callback_url, "secret": secret, "payload": payload}),
+        )
+
+
+def parse_webhook_message(body: str) -> Dict[str, Any]:
+    """
+    キューのメッセージ本文から配信依頼を取り出す
+    Returns:
+        {"callback_url", "secret", "payload"}
+    """
+    message = json_codec.loads(body)
+    return {"callback_url": message["callback_url"], "secret": message["secret"], "payload": message["payload"]}
+
+
+class WebhookNotifier:
+    """
+    レビュー結果をコールバックURLへPOSTするクラス
+    キューが設定されている場合は配信依頼をキューに送り、キューを処理するLambdaが配信します。
+    キューがない場合は、リクエストの期限内に同期的に配信します(応答後のLambdaは凍結されるため、バックグラウンドでは配信しません)。
+    失敗時は指数バックオフで再送し、再送上限に達した場合はデッドレターとして記録します。
+    送信の直前にも宛先のアドレスを確認し、リダイレクトには従いません。
+    """
+    # 再送対象とするHTTPステータス
+    RETRYABLE_STATUS = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+    def __init__(
+        self,
+        http: Optional[urllib3.PoolManager] = None,
+        dead_letter_store: Optional[IDeadLetterStore] = None,
+        max_attempts: int = 4,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 8.0,
+        timeout_seconds: float = 5.0,
+        sleep: Callable[[float], None] = time.sleep,
+        queue: Optional[WebhookQueueFromSQS] = None,
+        url_validator: Callable[[str], bool] = is_valid_callback_url,
+    ):
+        self.http = http or urllib3.PoolManager(retries=False)
+        self.dead_letter_store = dead_letter_store
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.timeout_seconds = timeout_seconds
+        self.timeout = urllib3.Timeout(total=timeout_seconds)
+        self.sleep = sleep
+        self.queue = queue
+        self.url_validator = url_validator
+
+    def notify(self, callback_url: str, secret: str, payload: Dict[str, Any], deadline: Optional[Deadline] = None) -> bool:
+        """
+        コールバックを配信する(キューがある場合は配信依頼を送るだけで戻る)
+        キューへの送信に失敗した場合は、期限内に同期的に配信します。
+        Returns:
+            配信依頼を送った、または配信に成功した場合はTrue
+        """
+        if self.queue:
+            try:
+                self.queue.enqueue(callback_url, secret, payload)
+                return True
+            except Exception:
+                logger.exception(f"コールバックの配信依頼をキューに送れませんでした url={callback_url}")
+        return self.deliver(callback_url, secret, payload, deadline)
+
+    def deliver(
+        self, callback_url: str, secret: str, payload: Dict[str, Any], deadline: Optional[Deadline] = None
+    ) -> bool:
+        """
+        コールバックを同期的に配信する(再送を含む)
+        期限を指定した場合は、送信のタイムアウトと再送の待ち時間が期限内に収まる範囲でだけ送信します。
+        Returns:
+            配信に成功した場合はTrue、デッドレターとなった場合はFalse
+        """
+        body = json_codec.dumps_bytes(payload)
+        reason = "UnknownError"
+        # 実際に送信した回数
+        attempts = 0
+
+        for attempt in range(1, self.max_attempts + 1):
+            # --- 名前解決の結果が変わっている場合(DNSリバインディング)に備え、送信の直前にも宛先を確認する ---
+            if not self.url_validator(callback_url):
+                reason = "ForbiddenAddress"
+                break
+            if deadline and not deadline.has_time_for(self.timeout_seconds):
+                reason = "DeadlineExceeded"
+                break
+            attempts += 1
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                TIMESTAMP_HEADER: timestamp,
+                SIGNATURE_HEADER: sign_payload(secret, timestamp, body),
+            }
+            try:
+                response = self.http.request(
+                    "POST", callback_url, body=body, headers=headers, timeout=self.timeout, redirect=False
+                )
+                if 200 <= response.status < 300:
+                    logger.info(f"コールバックを配信しました url={callback_url} attempt={attempt}")
+                    return True
+                reason = f"HTTP {response.status}"
+                if response.status not in self.RETRYABLE_STATUS:
+                    break
+            except urllib3.exceptions.HTTPError as error:
+                reason = type(error).__name__
+
+            if attempt < self.max_attempts:
+                delay = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (attempt - 1)))
+                if deadline and not deadline.has_time_for(delay + self.timeout_seconds):
+                    break
+                logger.info(f"コールバックを再送します url={callback_url} reason={reason} delay={delay}")
+                self.sleep(delay)
+
+        logger.error(f"コールバックを配信できませんでした url={callback_url} reason={reason} attempts={attempts}")
+        self._save_dead_letter(callback_url, payload, reason, attempts)
+        return False
+
+    def _save_dead_letter(self, callback_url: str, payload: Dict[str, Any], reason: str, attempts: int):
+        if not self.dead_letter_store:
+            return
+        try:
+            self.dead_letter_store.save(callback_url, payload, reason, attempts)
+        except Exception:
+            logger.exception(f"デッドレターを保存できませんでした url={callback_url}")
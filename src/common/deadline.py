@@ -0,0 +1,57 @@
+import time
+from typing import Any, Callable, Optional
+
+from common.exception import DeadlineExceededError
+
+
+class Deadline:
+    """
+    リクエストの処理を打ち切るべき時刻を表すクラス
+    Lambdaの残り実行時間から作成してサービス層へ引き渡し、外部呼び出しのタイムアウトや再試行の判断に使います。
+    """
+    def __init__(self, expires_at: float, clock: Callable[[], float] = time.monotonic):
+        self.expires_at = expires_at
+        self.clock = clock
+
+    @classmethod
+    def after(cls, seconds: float, clock: Callable[[], float] = time.monotonic) -> "Deadline":
+        """現在から指定した秒数後を期限とする"""
+        return cls(clock() + seconds, clock)
+
+    @classmethod
+    def from_lambda_context(
+        cls,
+        context: Any,
+        safety_margin_seconds: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> Optional["Deadline"]:
+        """
+        Lambdaコンテキストの残り実行時間から、応答を返すための余裕を差し引いた期限を作成する
+        Returns:
+            期限(残り実行時間を取得できない場合はNone)
+        """
+        get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+        if get_remaining_time is None:
+            return None
+        remaining_millis = get_remaining_time()
+        if not isinstance(remaining_millis, (int, float)):
+            return None
+        return cls.after(remaining_millis / 1000 - safety_margin_seconds, clock)
+
+    def remaining_seconds(self) -> float:
+        """期限までの残り秒数(期限を過ぎている場合は0)"""
+        return max(0.0, self.expires_at - self.clock())
+
+    def has_time_for(self, seconds: float) -> bool:
+        """指定した秒数の処理を期限内に終えられるか"""
+        return self.remaining_seconds() >= seconds
+
+    def check(self, operation: str, required_seconds: float = 0.0):
+        """
+        処理を始める前に、期限内に終えられるか確認する
+        Raises:
+            DeadlineExceededError: 残り時間が足りない場合
+        """
+        remaining_seconds = self.remaining_seconds()
+        if remaining_seconds <= 0 or remaining_seconds < required_seconds:
+            raise DeadlineExceededError.before(operation, remaining_seconds)
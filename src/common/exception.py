@@ -1,3 +1,5 @@
+from typing import Optional
+
 from botocore.exceptions import ClientError
 
 
@@ -24,6 +26,56 @@ class RequestParameterError(ApplicationException):
         return cls(message, parameter_name)
 
 
+class PayloadTooLargeError(RequestParameterError):
+    """リクエストパラメータのサイズが上限を超えた場合の例外クラス。"""
+    @classmethod
+    def exceeded(cls, parameter_name: str, limit: str) -> "PayloadTooLargeError":
+        """パラメータのサイズが上限を超えた場合に送出する例外を生成します。"""
+        message = f"パラメータ '{parameter_name}' のサイズが上限({limit})を超えています。"
+        return cls(message, parameter_name)
+
+
+class QuotaExceededError(ApplicationException):
+    """利用枠(トークン予算・レート制限など)を超えた場合の例外クラス。"""
+    def __init__(self, message: str, retry_after_seconds: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+    @classmethod
+    def token_budget(cls, limit: int, retry_after_seconds: int) -> "QuotaExceededError":
+        """1日あたりのトークン予算を超えた場合に送出する例外を生成します。"""
+        message = f"1日あたりのトークン予算({limit} tokens)を超えています。"
+        return cls(message, retry_after_seconds)
+
+
+class CapacityExceededError(QuotaExceededError):
+    """サービス全体の処理能力(Bedrockの1分あたりのトークン数など)を超えた場合の例外クラス。"""
+    @classmethod
+    def tokens_per_minute(cls, retry_after_seconds: int) -> "CapacityExceededError":
+        """1分あたりのトークン数の上限に達した場合に送出する例外を生成します。"""
+        message = "混雑しているため、しばらくしてから再度実行してください。"
+        return cls(message, retry_after_seconds)
+
+
+class DeadlineExceededError(ApplicationException):
+    """処理の期限(Lambdaの残り実行時間)までに完了できない場合の例外クラス。"""
+    def __init__(self, message: str, operation: str):
+        super().__init__(message)
+        self.operation = operation
+
+    @classmethod
+    def before(cls, operation: str, remaining_seconds: float) -> "DeadlineExceededError":
+        """処理を始める前に、残り時間が足りないと判断した場合に送出する例外を生成します。"""
+        message = f"残り時間({remaining_seconds:.1f}秒)では '{operation}' を完了できません。"
+        return cls(message, operation)
+
+    @classmethod
+    def timed_out(cls, operation: str) -> "DeadlineExceededError":
+        """処理が期限までに完了しなかった場合に送出する例外を生成します。"""
+        message = f"'{operation}' が期限までに完了しませんでした。"
+        return cls(message, operation)
+
+
 class Boto3Exception(ApplicationException):
     def __init__(self, service: str, reason: str = None):
         super().__init__()
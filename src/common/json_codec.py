@@ -0,0 +1,42 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjsonは任意の依存ライブラリ
+    orjson = None
+
+
+def codec_name() -> str:
+    """利用中のJSONコーデック名を返す"""
+    return "orjson" if orjson else "json"
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    JSON文字列を解析する
+    orjsonが利用可能であればorjsonを使用し、なければ標準ライブラリで解析します。
+    解析エラーはどちらの場合もjson.JSONDecodeError(ValueError)として送出されます。
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    オブジェクトをUTF-8のJSONバイト列に変換する
+    非ASCII文字はエスケープせず(ensure_ascii=False相当)、区切り文字の空白は出力しません。
+    """
+    if orjson:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            # --- orjsonが扱えない値(64bitを超える整数など)は標準ライブラリで変換する ---
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """オブジェクトをJSON文字列に変換する(ensure_ascii=False相当)"""
+    return dumps_bytes(obj).decode("utf-8")
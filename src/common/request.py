@@ -0,0 +1,38 @@
+import base64
+from typing import Any, Dict, Optional
+
+from common import json_codec
+
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """ヘッダー名の大文字・小文字を区別せずにリクエストヘッダーの値を取得する"""
+    headers = event.get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def get_query_parameter(event: Dict[str, Any], name: str) -> Optional[str]:
+    """クエリ文字列パラメータの値を取得する"""
+    parameters = event.get("queryStringParameters") or {}
+    return parameters.get(name)
+
+
+def get_api_key_id(event: Dict[str, Any]) -> Optional[str]:
+    """リクエストに使用されたAPIキーのID(API Gatewayが付与するrequestContext.identity.apiKeyId)を取得する"""
+    identity = (event.get("requestContext") or {}).get("identity") or {}
+    return identity.get("apiKeyId")
+
+
+def load_json_body(event: Dict[str, Any]) -> Any:
+    """
+    API Gatewayのリクエストボディを取得する
+    バイナリメディアタイプとしてBase64化されたボディ(isBase64Encoded)は復号してから解析します。
+    """
+    body = event.get("body")
+    if isinstance(body, str):
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body)
+        body = json_codec.loads(body)
+    return body
@@ -1,5 +1,79 @@
-import json
-from typing import Any, Dict, Optional
+import gzip
+import base64
+from typing import Any, Dict, List, Optional
+
+from common import json_codec
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotliは任意の依存ライブラリ
+    brotli = None
+
+
+# 圧縮を行う最小のボディサイズ(バイト)
+COMPRESSION_MIN_BYTES = 1024
+
+
+def parse_fields(fields: str) -> Dict[str, Any]:
+    """
+    項目指定文字列を項目ツリーに変換する
+    カンマ区切りで項目を指定し、ドット区切りで入れ子の項目を指定します。
+    ドットを含まない項目は、直前のドット区切り項目と同じ親の項目として扱います。
+    (例) "review_result,review_points.location,codeline"
+        → {"review_result": {}, "review_points": {"location": {}, "codeline": {}}}
+    """
+    tree: Dict[str, Any] = {}
+    parent_path: List[str] = []
+    for field in fields.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        path = field.split(".")
+        if len(path) > 1:
+            parent_path = path[:-1]
+        else:
+            path = parent_path + path
+        current_level = tree
+        for part in path:
+            current_level = current_level.setdefault(part, {})
+    return tree
+
+
+def project_fields(value: Any, tree: Dict[str, Any]) -> Any:
+    """項目ツリーに含まれる項目だけを残した値を返す(配列は要素ごとに適用)"""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project_fields(element, tree) for element in value]
+    if isinstance(value, dict):
+        return {key: project_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Accept-Encodingヘッダーから利用する圧縮方式(br / gzip)を決定する"""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for entry in accept_encoding.split(","):
+        name, _, params = entry.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    candidates = ["br", "gzip"] if brotli else ["gzip"]
+    best = None
+    for name in candidates:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (name, quality)
+    return best[0] if best else None
 
 
 class ApiResponseBuilder:
@@ -7,6 +81,9 @@ class ApiResponseBuilder:
         self.status_code = status_code
         self.headers = {"Content-Type": "application/json"}
         self.body: Optional[Any] = None
+        self.fields: Optional[Dict[str, Any]] = None
+        self.encoding: Optional[str] = None
+        self.compression_min_bytes = COMPRESSION_MIN_BYTES
 
     def with_body(self, body: Any) -> "ApiResponseBuilder":
         """レスポンスのボディを設定します。"""
@@ -23,22 +100,50 @@ class ApiResponseBuilder:
         self.headers["Content-Type"] = content_type
         return self
 
+    def with_fields(self, fields: Optional[str]) -> "ApiResponseBuilder":
+        """JSONボディに含める項目を絞り込みます。(例: "review_points.location,codeline,overview")"""
+        self.fields = parse_fields(fields) if fields else None
+        return self
+
+    def with_compression(
+        self, accept_encoding: Optional[str], min_bytes: int = COMPRESSION_MIN_BYTES
+    ) -> "ApiResponseBuilder":
+        """Accept-Encodingに応じて、一定サイズ以上のボディを圧縮します。"""
+        self.encoding = negotiate_encoding(accept_encoding)
+        self.compression_min_bytes = min_bytes
+        return self
+
     def build(self) -> Dict[str, Any]:
         """設定された内容から最終的なレスポンス辞書を構築します。"""
         response_body = ""
         if self.body:
             # Content-TypeがJSONならdumpsする
             if self.headers.get("Content-Type") == "application/json":
-                response_body = json.dumps(self.body, ensure_ascii=False)
+                body = project_fields(self.body, self.fields) if self.fields else self.body
+                response_body = json_codec.dumps(body)
             else:
                 response_body = str(self.body)
 
-        return {
+        response = {
             "statusCode": self.status_code,
             "headers": self.headers,
             "body": response_body,
         }
 
+        # --- 圧縮(API GatewayへはBase64化したバイナリとして返す) ---
+        encoded_body = response_body.encode("utf-8")
+        if self.encoding and len(encoded_body) >= self.compression_min_bytes:
+            if self.encoding == "br":
+                compressed = brotli.compress(encoded_body)
+            else:
+                compressed = gzip.compress(encoded_body)
+            self.headers["Content-Encoding"] = self.encoding
+            self.headers["Vary"] = "Accept-Encoding"
+            response["body"] = base64.b64encode(compressed).decode("ascii")
+            response["isBase64Encoded"] = True
+
+        return response
+
     @staticmethod
     def success(body: Any, status_code: int = 200) -> Dict[str, Any]:
         """成功レスポンスを生成します。"""
@@ -55,6 +160,34 @@ class ApiResponseBuilder:
         """400 Bad Requestエラーレスポンスを生成します。"""
         return ApiResponseBuilder.error(message, 400)
 
+    @staticmethod
+    def payload_too_large(message: str) -> Dict[str, Any]:
+        """413 Payload Too Largeエラーレスポンスを生成します。"""
+        return ApiResponseBuilder.error(message, 413)
+
+    @staticmethod
+    def retry_later(message: str, status_code: int, retry_after_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """再試行を促すエラーレスポンスを生成します。再試行までの秒数はRetry-Afterヘッダーで返します。"""
+        builder = ApiResponseBuilder(status_code).with_body({"message": message})
+        if retry_after_seconds is not None:
+            builder.with_headers({"Retry-After": str(max(0, int(retry_after_seconds)))})
+        return builder.build()
+
+    @staticmethod
+    def too_many_requests(message: str, retry_after_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """429 Too Many Requestsエラーレスポンスを生成します。"""
+        return ApiResponseBuilder.retry_later(message, 429, retry_after_seconds)
+
+    @staticmethod
+    def service_unavailable(message: str, retry_after_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """503 Service Unavailableエラーレスポンスを生成します。"""
+        return ApiResponseBuilder.retry_later(message, 503, retry_after_seconds)
+
+    @staticmethod
+    def gateway_timeout(message: str) -> Dict[str, Any]:
+        """504 Gateway Timeoutエラーレスポンスを生成します。"""
+        return ApiResponseBuilder.error(message, 504)
+
     @staticmethod
     def internal_server_error(message: str = "An internal server error occurred.") -> Dict[str, Any]:
         """500 Internal Server Errorレスポンスを生成します。"""
@@ -0,0 +1,24 @@
+import math
+from typing import Dict, Iterable, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    最近傍順位法でパーセンタイル値を求める
+    Args:
+        values: 値の集合(未ソートで可)
+        p: パーセンタイル(0〜100)
+    Returns:
+        パーセンタイル値。値が空の場合は0.0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def percentiles(values: Sequence[float], points: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+    """複数のパーセンタイル値を {"p50": ..., "p90": ...} の形式でまとめて求める"""
+    ordered = sorted(values)
+    return {f"p{point:g}": percentile(ordered, point) for point in points}
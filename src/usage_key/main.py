@@ -1,9 +1,9 @@
-import json
 import logging
 
 from usage_key.domain import User
 from usage_key.usage_key import UsageKeyServiceContext
 from common.exception import RequestParameterError
+from common.request import load_json_body
 from common.response import ApiResponseBuilder
 
 
@@ -27,9 +27,7 @@ def issutance_request_handler(event, context):
     """
     try:
         # --- リクエストの解析と検証 ---
-        body = event["body"]
-        if isinstance(body, str):
-            body = json.loads(event["body"])
+        body = load_json_body(event)
 
         # --- 利用者名取得 ---
         username = body.get("username")
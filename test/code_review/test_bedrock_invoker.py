@@ -0,0 +1,132 @@
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+from code_review.bedrock_invoker import BedrockInvoker, InvokerConfig, read_timeout_bucket
+from common.deadline import Deadline
+from common.exception import Boto3Exception, DeadlineExceededError
+
+
+def create_request(max_tokens=1000):
+    return {
+        "modelId": "test-model",
+        "messages": [{"role": "user", "content": [{"text": "review"}]}],
+        "inferenceConfig": {"maxTokens": max_tokens, "temperature": 0.5, "topP": 1.0},
+    }
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+
+class TestInvokerConfig(unittest.TestCase):
+    """InvokerConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = InvokerConfig.from_config({"MaxAttempts": "5", "OutputTokensPerSecond": "100"})
+        self.assertEqual(config.max_attempts, 5)
+        self.assertEqual(config.output_tokens_per_second, 100)
+        self.assertEqual(config.min_output_tokens, 256)
+        self.assertEqual(config.min_call_seconds, 2.0 + 256 / 100)
+
+
+class TestReadTimeoutBucket(unittest.TestCase):
+    """read_timeout_bucketのテストクラス"""
+
+    def test_read_timeout_bucket(self):
+        """正常系: 読み込みタイムアウトを区分に切り下げ、範囲外の値は最小・最大の区分とすることをテスト"""
+        self.assertEqual(read_timeout_bucket(10), 10)
+        self.assertEqual(read_timeout_bucket(29), 20)
+        self.assertEqual(read_timeout_bucket(0), 1)
+        self.assertEqual(read_timeout_bucket(5000), 900)
+
+
+class TestBedrockInvoker(unittest.TestCase):
+    """BedrockInvokerのテストクラス"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.client = MagicMock()
+        self.client.converse.return_value = {"output": {}, "stopReason": "end_turn"}
+        self.factory = MagicMock(return_value=self.client)
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        self.invoker = BedrockInvoker(self.factory, InvokerConfig(), sleep=sleep)
+
+    def deadline(self, seconds):
+        return Deadline.after(seconds, lambda: self.now)
+
+    def test_converse(self):
+        """正常系: 残り時間を読み込みタイムアウトとし、十分な時間があればmaxTokensを変えないことをテスト"""
+        response = self.invoker.converse(create_request(), self.deadline(25.5))
+
+        self.assertEqual(response["stopReason"], "end_turn")
+        self.factory.assert_called_once_with(25)
+        self.assertEqual(self.client.converse.call_args.kwargs["inferenceConfig"]["maxTokens"], 1000)
+
+    def test_shrink_max_tokens(self):
+        """正常系: 残り時間で出力しきれない場合はmaxTokensを縮めることをテスト"""
+        request = create_request()
+        self.invoker.converse(request, self.deadline(12))
+
+        self.assertEqual(self.client.converse.call_args.kwargs["inferenceConfig"]["maxTokens"], (12 - 2) * 50)
+        # 元のリクエストは変更しない
+        self.assertEqual(request["inferenceConfig"]["maxTokens"], 1000)
+
+    def test_not_enough_time(self):
+        """異常系: 最小の出力トークン数も出力できない残り時間ではBedrockを呼び出さないことをテスト"""
+        with self.assertRaises(DeadlineExceededError):
+            self.invoker.converse(create_request(), self.deadline(5))
+        self.client.converse.assert_not_called()
+
+    def test_truncated_by_shrunk_max_tokens(self):
+        """異常系: 縮めたmaxTokensで出力が打ち切られた場合はDeadlineExceededErrorを送出することをテスト"""
+        self.client.converse.return_value = {"output": {}, "stopReason": "max_tokens"}
+        with self.assertRaises(DeadlineExceededError):
+            self.invoker.converse(create_request(), self.deadline(12))
+
+    def test_read_timeout(self):
+        """異常系: 読み込みタイムアウトはDeadlineExceededErrorとなることをテスト"""
+        self.client.converse.side_effect = ReadTimeoutError(endpoint_url="https://bedrock")
+        with self.assertRaises(DeadlineExceededError):
+            self.invoker.converse(create_request(), self.deadline(25))
+
+    def test_retry(self):
+        """正常系: 再試行可能なエラーは待ち時間を倍にしながら再試行することをテスト"""
+        self.client.converse.side_effect = [
+            client_error("ThrottlingException"),
+            client_error("ServiceUnavailableException"),
+            {"output": {}, "stopReason": "end_turn"},
+        ]
+
+        self.invoker.converse(create_request(), self.deadline(25))
+
+        self.assertEqual(self.client.converse.call_count, 3)
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+        self.assertEqual([call.args[0] for call in self.factory.call_args_list], [25, 24, 23])
+
+    def test_skip_retry_without_time(self):
+        """異常系: 期限までに終えられない再試行は行わずBoto3Exceptionを送出することをテスト"""
+        self.client.converse.side_effect = client_error("ThrottlingException")
+
+        with self.assertRaises(Boto3Exception) as context:
+            self.invoker.converse(create_request(), self.deadline(7.5))
+
+        self.assertEqual(context.exception.reason, "ThrottlingException")
+        self.assertEqual(self.client.converse.call_count, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_not_retryable_error(self):
+        """異常系: 再試行しても成功しないエラーは即座にBoto3Exceptionを送出することをテスト"""
+        self.client.converse.side_effect = client_error("ValidationException")
+
+        with self.assertRaises(Boto3Exception):
+            self.invoker.converse(create_request(), self.deadline(25))
+
+        self.assertEqual(self.client.converse.call_count, 1)
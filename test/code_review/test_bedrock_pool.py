@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from code_review.bedrock_pool import BedrockClientPool, BedrockEndpoint, PoolConfig
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+
+class StubClient:
+    """リージョンごとのBedrockクライアントの代わり(指定した回数だけエラーを返す)"""
+    def __init__(self, region: str, errors=()):
+        self.region = region
+        self.errors = list(errors)
+        self.requests = []
+
+    def converse(self, **request):
+        self.requests.append(request)
+        if self.errors:
+            raise client_error(self.errors.pop(0))
+        return {"region": self.region, "modelId": request["modelId"]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBedrockEndpoint(unittest.TestCase):
+    """BedrockEndpointのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの bedrock/Endpoints の設定から名前順に生成されることをテスト"""
+        endpoints = BedrockEndpoint.from_config({
+            "ModelId": "model-id",
+            "Endpoints": {
+                "west": {"Region": "us-west-2", "ModelId": "us.model-id", "Weight": "2"},
+                "east": {"Region": "us-east-1"},
+            },
+        })
+        self.assertEqual(endpoints, [
+            BedrockEndpoint(name="east", region="us-east-1"),
+            BedrockEndpoint(name="west", region="us-west-2", model_id="us.model-id", weight=2.0),
+        ])
+        self.assertEqual(BedrockEndpoint.from_config({"ModelId": "model-id"}), [])
+
+
+class TestPoolConfig(unittest.TestCase):
+    """PoolConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = PoolConfig.from_config({"FailureThreshold": "3", "EjectionSeconds": "5"})
+        self.assertEqual(config.failure_threshold, 3)
+        self.assertEqual(config.ejection_seconds, 5.0)
+        self.assertEqual(config.max_ejection_seconds, 120.0)
+
+
+class TestBedrockClientPool(unittest.TestCase):
+    """BedrockClientPoolのテストクラス"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.clients = {}
+        self.endpoints = [
+            BedrockEndpoint(name="east", region="us-east-1"),
+            BedrockEndpoint(name="west", region="us-west-2", model_id="us.model-id"),
+        ]
+
+    def create_pool(self, errors=None, **kwargs) -> BedrockClientPool:
+        def client_factory(region):
+            self.clients[region] = StubClient(region, (errors or {}).get(region, ()))
+            return self.clients[region]
+
+        return BedrockClientPool(self.endpoints, client_factory, model_id="model-id", clock=self.clock, **kwargs)
+
+    def test_least_outstanding(self):
+        """正常系: 処理中のリクエストが少ない接続先が選ばれることをテスト"""
+        pool = self.create_pool()
+        first = pool._acquire(set())
+        second = pool._acquire(set())
+        self.assertEqual([first.endpoint.name, second.endpoint.name], ["east", "west"])
+
+    def test_weighted(self):
+        """正常系: 重みの大きい接続先に処理中のリクエストが多く割り当てられることをテスト"""
+        self.endpoints = [
+            BedrockEndpoint(name="east", region="us-east-1", weight=3),
+            BedrockEndpoint(name="west", region="us-west-2"),
+        ]
+        pool = self.create_pool()
+        names = [pool._acquire(set()).endpoint.name for _ in range(4)]
+        self.assertEqual(names.count("east"), 3)
+
+    def test_endpoint_model_id(self):
+        """正常系: 接続先のモデルIDは既定のモデルへのリクエストだけに使われることをテスト"""
+        self.endpoints = self.endpoints[1:]
+        pool = self.create_pool()
+        self.assertEqual(pool.converse(modelId="model-id")["modelId"], "us.model-id")
+        self.assertEqual(pool.converse(modelId="triage-model")["modelId"], "triage-model")
+
+    def test_throttled_endpoint_is_ejected(self):
+        """正常系: スロットリングされた接続先を切り離して別の接続先で再試行し、時間の経過で戻すことをテスト"""
+        pool = self.create_pool(errors={"us-east-1": ["ThrottlingException"]})
+
+        response = pool.converse(modelId="model-id")
+        self.assertEqual(response["region"], "us-west-2")
+        stats = pool.stats()
+        self.assertEqual((stats["east"]["throttles"], stats["east"]["ejected"]), (1, True))
+
+        # 切り離している間は振り分けない
+        self.assertEqual(pool.converse(modelId="model-id")["region"], "us-west-2")
+        self.assertEqual(len(self.clients["us-east-1"].requests), 1)
+
+        # 切り離す時間が過ぎると振り分け対象に戻る
+        self.clock.now = PoolConfig().ejection_seconds
+        self.assertFalse(pool.stats()["east"]["ejected"])
+        self.assertEqual(pool.converse(modelId="model-id")["region"], "us-east-1")
+
+    def test_ejection_backoff(self):
+        """正常系: 続けて切り離すごとに切り離す時間が延びることをテスト"""
+        self.endpoints = self.endpoints[:1]
+        pool = self.create_pool(errors={"us-east-1": ["ThrottlingException"] * 2})
+
+        for _ in range(2):
+            with self.assertRaises(ClientError):
+                pool.converse(modelId="model-id")
+        self.assertEqual(pool._states[0].ejected_until, 20.0)
+
+    def test_all_endpoints_throttled(self):
+        """異常系: すべての接続先でスロットリングされた場合はClientErrorを送出することをテスト"""
+        pool = self.create_pool(errors={"us-east-1": ["ThrottlingException"], "us-west-2": ["ThrottlingException"]})
+        with self.assertRaises(ClientError):
+            pool.converse(modelId="model-id")
+        self.assertEqual(pool.stats()["west"]["errors"], 1)
+
+    def test_non_retryable_error(self):
+        """異常系: 再試行できないエラーは切り離さず、別の接続先でも再試行しないことをテスト"""
+        pool = self.create_pool(errors={"us-east-1": ["ValidationException"]})
+        with self.assertRaises(ClientError):
+            pool.converse(modelId="model-id")
+        self.assertFalse(pool.stats()["east"]["ejected"])
+        self.assertNotIn("us-west-2", self.clients)
+
+    def test_with_clients(self):
+        """正常系: クライアントの生成方法が異なるプールでも接続先の状態を共有することをテスト"""
+        pool = self.create_pool(errors={"us-east-1": ["ThrottlingException"]})
+        other_client = MagicMock()
+        other_pool = pool.with_clients(lambda region: other_client)
+
+        pool.converse(modelId="model-id")
+        other_pool.converse(modelId="model-id")
+
+        other_client.converse.assert_called_once_with(modelId="us.model-id")
+        self.assertEqual(pool.stats()["west"]["requests"], 2)
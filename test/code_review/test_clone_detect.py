@@ -0,0 +1,96 @@
+import unittest
+
+from code_review.clone_detect import CloneDetector, CloneDetectorConfig, DuplicatedCodeCheck
+
+
+DUPLICATED_BLOCK = """\
+    total = 0
+    for item in items:
+        if item.price > 100:
+            total += item.price * 2
+        else:
+            total += item.price
+    print(total)
+    return total
+"""
+
+SOURCE_WITH_CLONE = (
+    "def calc_a(items):\n"
+    + DUPLICATED_BLOCK
+    + "\n\ndef unrelated(x):\n    return x + 1\n\n"
+    + "def calc_b(goods):\n"
+    + DUPLICATED_BLOCK.replace("total", "amount").replace("item", "good")
+)
+
+
+class TestCloneDetectorConfig(unittest.TestCase):
+    """CloneDetectorConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = CloneDetectorConfig.from_config({"MinTokens": "30", "MaxPairs": "3"})
+        self.assertEqual(config.min_tokens, 30)
+        self.assertEqual(config.max_pairs, 3)
+        self.assertEqual(config.window, 8)
+
+
+class TestCloneDetector(unittest.TestCase):
+    """CloneDetectorのテストクラス"""
+
+    def setUp(self):
+        self.detector = CloneDetector(CloneDetectorConfig(min_tokens=30))
+
+    def test_detect_renamed_clone(self):
+        """正常系: 変数名だけが異なる重複ブロックの行範囲を検出できることをテスト"""
+        pairs = self.detector.detect(SOURCE_WITH_CLONE, "python")
+
+        self.assertEqual(len(pairs), 1)
+        pair = pairs[0]
+        self.assertEqual((pair.first_start_line, pair.first_end_line), (1, 9))
+        self.assertEqual((pair.second_start_line, pair.second_end_line), (15, 23))
+        self.assertGreaterEqual(pair.token_count, 30)
+        self.assertEqual(pair.describe(), f"lines 1-9 and lines 15-23 ({pair.token_count} tokens)")
+
+    def test_ignores_comments_and_strings(self):
+        """正常系: コメントや文字列の中だけが一致する場合は重複と見なさないことをテスト"""
+        comment = "# " + " ".join(["value = compute(value) + 1"] * 10)
+        source_code = f"def a():\n    {comment}\n    return 1\n\ndef b():\n    {comment}\n    return 2\n"
+        self.assertEqual(self.detector.detect(source_code, "python"), [])
+
+    def test_short_source(self):
+        """正常系: 最小トークン数に満たないソースコードでは何も検出しないことをテスト"""
+        self.assertEqual(self.detector.detect("x = 1\n", "python"), [])
+
+    def test_min_lines(self):
+        """正常系: 最小行数に満たない重複は検出しないことをテスト"""
+        detector = CloneDetector(CloneDetectorConfig(min_tokens=30, min_lines=20))
+        self.assertEqual(detector.detect(SOURCE_WITH_CLONE, "python"), [])
+
+    def test_unsupported_language(self):
+        """正常系: 未対応の言語でもコメント等を除かずに重複を検出できることをテスト"""
+        pairs = self.detector.detect(SOURCE_WITH_CLONE, "Ruby")
+        self.assertEqual(len(pairs), 1)
+
+    def test_repeated_source_is_fast(self):
+        """正常系: 同じ内容が繰り返される大きなソースコードでも重複を検出できることをテスト"""
+        source_code = SOURCE_WITH_CLONE * 100
+        pairs = CloneDetector().detect(source_code, "python")
+        self.assertTrue(pairs)
+        self.assertLessEqual(len(pairs), CloneDetectorConfig().max_pairs)
+
+
+class TestDuplicatedCodeCheck(unittest.TestCase):
+    """DuplicatedCodeCheckのテストクラス"""
+
+    def test_check(self):
+        """正常系: 検出した重複が後に現れる側の行番号で指摘されることをテスト"""
+        rule = {"category": "Maintainability", "value": "No duplicates.", "id": "duplicated-code"}
+        check = DuplicatedCodeCheck(CloneDetector(CloneDetectorConfig(min_tokens=30)))
+
+        review_points = check.check(SOURCE_WITH_CLONE, "python", rule)
+
+        self.assertEqual(len(review_points), 1)
+        self.assertEqual(review_points[0]["codeline"], 15)
+        self.assertEqual(review_points[0]["category"], "Maintainability")
+        self.assertIn("1行目から9行目", review_points[0]["details"])
+        self.assertTrue(check.supports("COBOL"))
@@ -1,5 +1,8 @@
+import json
 import os
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, PropertyMock, patch
 
 from botocore.exceptions import ClientError
@@ -7,8 +10,24 @@ from botocore.exceptions import ClientError
 from code_review.code_review import (
     CodeReviewModelConfig, CodeReviewService, CodeReviewServiceContext
 )
+from code_review.normalizer import SourceNormalizer
+from code_review.static_check import StaticCheckEngine
+from code_review.clone_detect import CloneDetector, ClonePair, DuplicatedCodeCheck
+from code_review.token_meter import TokenMeter, TokenUsageFromDynamoDB
+from code_review.tokens import estimate_tokens
+from code_review.rate_limiter import TokenBucketFromDynamoDB, TokenRateLimiter
+from code_review.bedrock_invoker import BedrockInvoker
+from code_review.bedrock_pool import BedrockClientPool
+from code_review.compact_schema import CompactResponseSchema
+from code_review.hedging import HedgedConverse, HedgingConfig
+from code_review.single_flight import LeaseFromDynamoDB, SingleFlight
+from code_review.near_duplicate import NearDuplicateConfig, NearDuplicateFromMemory, NearDuplicateIndex
+from code_review.outline import OutlineConfig
+from code_review.packing import PackingConfig
+from code_review.result_store import IReviewResultRepository, StoredReview
 from code_review.rules import RuleProviderBase
-from common.exception import Boto3Exception
+from common.deadline import Deadline
+from common.exception import Boto3Exception, CapacityExceededError, QuotaExceededError
 
 
 class TestCodeReviewModelConfig(unittest.TestCase):
@@ -43,6 +62,23 @@ class TestCodeReviewModelConfig(unittest.TestCase):
             CodeReviewModelConfig("m", "2048", "0.7", "invalid")
 
 
+NEAR_DUPLICATE_SOURCE = """\
+def calc(items):
+    total = 0
+    for item in items:
+        if item.price > 100:
+            total += item.price * 2
+        else:
+            total += item.price
+    print(total)
+    return total
+
+
+def main():
+    calc([])
+"""
+
+
 class TestCodeReviewService(unittest.TestCase):
     """CodeReviewServiceのテストクラス"""
 
@@ -109,6 +145,779 @@ class TestCodeReviewService(unittest.TestCase):
 
         self.assertEqual(result, {"review_result": "OK"})
 
+    def test_excute_review_returns_stored_result(self):
+        """正常系: 保存済みのレビュー結果がある場合はBedrockを呼び出さずに返すことをテスト"""
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.return_value = StoredReview(
+            review_key="key", content_hash="hash", rule_set_version="v1",
+            model_id="test-model", result={"review_result": "OK", "review_points": []},
+        )
+        self.service.result_store = mock_store
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result, {"review_result": "OK", "review_points": []})
+        self.mock_bedrock_client.converse.assert_not_called()
+
+    def test_excute_review_saves_result(self):
+        """正常系: Bedrockのレビュー結果がトークン使用量と共に保存されることをテスト"""
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.return_value = None
+        self.service.result_store = mock_store
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+
+        self.service.excute_review("print('hello')", "python")
+        self.service.excute_review("print('hello')", "python")
+
+        saved: StoredReview = mock_store.save.call_args[0][0]
+        self.assertEqual(saved.model_id, "test-model")
+        self.assertEqual(saved.usage, {"inputTokens": 10, "outputTokens": 5})
+        self.assertEqual(saved.result, {"review_result": "OK", "review_points": []})
+        # 同じ入力であれば同じキーで参照・保存される
+        self.assertEqual(mock_store.get.call_args_list[0], mock_store.get.call_args_list[1])
+        self.assertEqual(saved.review_key, mock_store.get.call_args[0][0])
+
+    def test_excute_review_store_error_is_ignored(self):
+        """異常系: 保存先でエラーが発生してもレビュー結果が返ることをテスト"""
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.side_effect = Exception("unavailable")
+        mock_store.save.side_effect = Exception("unavailable")
+        self.service.result_store = mock_store
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK"}'}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result, {"review_result": "OK"})
+
+    def test_excute_review_with_normalizer(self):
+        """正常系: 正規化したソースコードでプロンプトを作成し、指摘行が元の行番号に戻ることをテスト"""
+        self.service.normalizer = SourceNormalizer()
+        source_code = "int a = 1;   \n\n\n\nint b = 2;\n"
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "NG", "review_points": [{"codeline": 3}]}'}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review(source_code, "C#")
+
+        converse_kwargs = self.mock_bedrock_client.converse.call_args[1]
+        self.assertEqual(converse_kwargs["messages"][0]["content"][0]["text"], "int a = 1;\n\nint b = 2;\n")
+        self.assertEqual(result["review_points"][0]["codeline"], 5)
+
+    def test_excute_review_with_static_checker(self):
+        """正常系: ローカルで検査できるルールがプロンプトから除外され、指摘事項がLLMの結果と統合されることをテスト"""
+        self.mock_rule_provider.load_rules.return_value = {
+            "Readability": [
+                {"id": "non-ascii-identifiers", "value": "Names use ASCII only."},
+                {"id": "english-identifiers", "value": "Names use English words."},
+                "Names are descriptive.",
+            ],
+        }
+        self.service.static_checker = StaticCheckEngine()
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "NG", "review_points": [{"codeline": 3, "category": "Readability"}]}'}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("x = 1\n\n値 = 2\n合計 = 3\n", "python")
+
+        system_prompt = self.mock_bedrock_client.converse.call_args[1]["system"][0]["text"]
+        self.assertNotIn("Names use ASCII only.", system_prompt)
+        # ローマ字などASCII文字の名前が英単語であるかはLLMでレビューする
+        self.assertIn("Names use English words.", system_prompt)
+        self.assertIn("Names are descriptive.", system_prompt)
+        self.assertEqual(result["review_result"], "NG")
+        self.assertEqual([point["codeline"] for point in result["review_points"]], [3, 3, 4])
+        # LLMの指摘事項が先頭に残り、ローカル検査の指摘事項は末尾に加わる
+        self.assertNotIn("location", result["review_points"][0])
+        self.assertEqual(result["review_points"][1]["location"], "値")
+
+    def test_excute_review_all_rules_checked_locally(self):
+        """正常系: すべてのルールをローカルで検査できる場合はBedrockを呼び出さないことをテスト"""
+        self.mock_rule_provider.load_rules.return_value = {
+            "Readability": [{"id": "non-ascii-identifiers", "value": "Names use ASCII only."}],
+        }
+        self.service.static_checker = StaticCheckEngine()
+
+        result = self.service.excute_review("count = 1\n", "python")
+
+        self.assertEqual(result, {"review_result": "OK", "review_points": []})
+        self.mock_bedrock_client.converse.assert_not_called()
+
+    def test_excute_review_with_duplicate_candidates(self):
+        """正常系: 重複コードのルールがある場合に、検出した重複範囲がプロンプトに含まれることをテスト"""
+        self.mock_rule_provider.load_rules.return_value = {
+            "Maintainability": [{"id": "duplicated-code", "value": "Duplicated code is avoided."}],
+        }
+        mock_detector = MagicMock(spec=CloneDetector)
+        mock_detector.detect.return_value = [ClonePair(1, 5, 10, 14, 60)]
+        self.service.clone_detector = mock_detector
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {},
+        }
+
+        self.service.excute_review("print('hello')", "python")
+
+        mock_detector.detect.assert_called_once_with("print('hello')", "python")
+        system_prompt = self.mock_bedrock_client.converse.call_args[1]["system"][0]["text"]
+        self.assertIn("- lines 1-5 and lines 10-14 (60 tokens)", system_prompt)
+
+    def test_excute_review_with_token_meter(self):
+        """正常系: Bedrock呼び出し前に予算を確認し、呼び出し後に使用量を記録することをテスト"""
+        mock_meter = MagicMock(spec=TokenMeter)
+        self.service.token_meter = mock_meter
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+
+        self.service.excute_review("print('hello')", "python", api_key_id="key-1")
+
+        mock_meter.check_budget.assert_called_once_with("key-1", estimate_tokens("print('hello')"))
+        mock_meter.record.assert_called_once_with("key-1", {"inputTokens": 10, "outputTokens": 5})
+
+    def test_excute_review_token_budget_exceeded(self):
+        """異常系: トークン予算を超える場合はBedrockを呼び出さずにQuotaExceededErrorを送出することをテスト"""
+        mock_meter = MagicMock(spec=TokenMeter)
+        mock_meter.check_budget.side_effect = QuotaExceededError.token_budget(100, 60)
+        self.service.token_meter = mock_meter
+
+        with self.assertRaises(QuotaExceededError):
+            self.service.excute_review("print('hello')", "python", api_key_id="key-1")
+
+        self.mock_bedrock_client.converse.assert_not_called()
+        mock_meter.record.assert_not_called()
+
+    def test_excute_review_with_rate_limiter(self):
+        """正常系: 見込みのトークン数を予約してからBedrockを呼び出し、実際の使用量で精算することをテスト"""
+        mock_limiter = MagicMock(spec=TokenRateLimiter)
+        self.service.rate_limiter = mock_limiter
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+
+        self.service.excute_review("print('hello')", "python")
+
+        mock_limiter.reserve.assert_called_once_with(estimate_tokens("print('hello')") + 1024)
+        mock_limiter.settle.assert_called_once_with(mock_limiter.reserve.return_value, 15)
+        mock_limiter.cancel.assert_not_called()
+
+    def test_excute_review_rate_limited(self):
+        """異常系: トークンバケットが空の場合はBedrockを呼び出さずにCapacityExceededErrorを送出することをテスト"""
+        mock_limiter = MagicMock(spec=TokenRateLimiter)
+        mock_limiter.reserve.side_effect = CapacityExceededError.tokens_per_minute(3)
+        self.service.rate_limiter = mock_limiter
+
+        with self.assertRaises(CapacityExceededError):
+            self.service.excute_review("print('hello')", "python")
+
+        self.mock_bedrock_client.converse.assert_not_called()
+
+    def test_excute_review_rate_limiter_cancel_on_error(self):
+        """異常系: Bedrockの呼び出しに失敗した場合は予約したトークンを戻すことをテスト"""
+        mock_limiter = MagicMock(spec=TokenRateLimiter)
+        self.service.rate_limiter = mock_limiter
+        error_response = {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}
+        self.mock_bedrock_client.converse.side_effect = ClientError(error_response, 'Converse')
+
+        with self.assertRaises(Boto3Exception):
+            self.service.excute_review("print('hello')", "python")
+
+        mock_limiter.cancel.assert_called_once_with(mock_limiter.reserve.return_value)
+        mock_limiter.settle.assert_not_called()
+
+    def test_excute_review_with_deadline(self):
+        """正常系: 期限が指定された場合は期限に合わせた呼び出しを行うことをテスト"""
+        mock_invoker = MagicMock(spec=BedrockInvoker)
+        mock_invoker.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+        self.service.invoker = mock_invoker
+        deadline = Deadline.after(20)
+
+        result = self.service.excute_review("print('hello')", "python", deadline=deadline)
+
+        self.assertEqual(result["review_result"], "OK")
+        request, passed_deadline = mock_invoker.converse.call_args.args
+        self.assertIs(passed_deadline, deadline)
+        self.assertEqual(request["modelId"], "test-model")
+        self.assertEqual(request["inferenceConfig"]["maxTokens"], 1024)
+        self.mock_bedrock_client.converse.assert_not_called()
+
+    def test_excute_review_with_compact_schema(self):
+        """正常系: 短縮形式で出力させた結果が公開しているレスポンス形式に展開されることをテスト"""
+        self.service.response_schema = CompactResponseSchema()
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"r":"NG","p":[{"l":"f","n":1,"c":1,"o":"o","d":"d","s":"s"}]}'}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result["review_result"], "NG")
+        self.assertEqual(result["review_points"][0]["category"], "TestCategory")
+        self.assertEqual(result["review_points"][0]["location"], "f")
+        system_prompt = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn("- [1] TestCategory: Test Rule 1", system_prompt)
+
+    def test_excute_review_max_points(self):
+        """正常系: 指摘事項が上限件数までに絞り込まれ、絞り込んだことが示されることをテスト"""
+        self.service.max_points = 3
+        points = [{"codeline": line, "category": "TestCategory"} for line in (9, 1, 5)]
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({"review_result": "NG", "review_points": points})}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("print('hello')", "python", max_points=2)
+
+        self.assertEqual([point["codeline"] for point in result["review_points"]], [9, 1])
+        self.assertTrue(result["review_points_capped"])
+        system_prompt = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn("Report **at most 2** issues", system_prompt)
+
+    def test_excute_review_max_points_default(self):
+        """正常系: リクエストで指定しない場合はサービスの既定値が上限となり、既定値を超える指定は既定値に抑えられることをテスト"""
+        self.service.max_points = 3
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("print('hello')", "python", max_points=10)
+
+        self.assertFalse(result["review_points_capped"])
+        system_prompt = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn("Report **at most 3** issues", system_prompt)
+
+    def test_excute_review_with_tool_use(self):
+        """正常系: 構造化出力の場合はツールの呼び出しを強制し、その引数をレビュー結果とすることをテスト"""
+        self.service.tool_use = True
+        review_input = {"review_result": "NG", "review_points": [{"codeline": 1, "category": "TestCategory"}]}
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"toolUse": {"toolUseId": "t1", "name": "submit_review", "input": review_input}}]}},
+            "usage": {},
+        }
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result, review_input)
+        request = self.mock_bedrock_client.converse.call_args.kwargs
+        self.assertEqual(request["toolConfig"]["toolChoice"], {"tool": {"name": "submit_review"}})
+        self.assertNotIn("[Response Format]", request["system"][0]["text"])
+
+    def test_excute_review_tool_use_unsupported(self):
+        """正常系: 構造化出力に対応していないモデルはテキストの出力形式で再度依頼し、以降もテキストの出力形式を使うことをテスト"""
+        self.service.tool_use = True
+        error_response = {'Error': {'Code': 'ValidationException', 'Message': "This model doesn't support tool use."}}
+        text_response = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {},
+        }
+        self.mock_bedrock_client.converse.side_effect = [ClientError(error_response, 'Converse'), text_response, text_response]
+
+        result = self.service.excute_review("print('hello')", "python")
+        self.service.excute_review("print('world')", "python")
+
+        self.assertEqual(result["review_result"], "OK")
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 3)
+        first, second, third = self.mock_bedrock_client.converse.call_args_list
+        self.assertIn("toolConfig", first.kwargs)
+        self.assertNotIn("toolConfig", second.kwargs)
+        self.assertIn("[Response Format]", second.kwargs["system"][0]["text"])
+        self.assertNotIn("toolConfig", third.kwargs)
+
+    def test_excute_review_tool_use_other_validation_error(self):
+        """異常系: 構造化出力と関係のないエラーは再度依頼せずにBoto3Exceptionを送出することをテスト"""
+        self.service.tool_use = True
+        error_response = {'Error': {'Code': 'ValidationException', 'Message': 'Input is too long.'}}
+        self.mock_bedrock_client.converse.side_effect = ClientError(error_response, 'Converse')
+
+        with self.assertRaises(Boto3Exception):
+            self.service.excute_review("print('hello')", "python")
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+
+    def _setup_triage(self, triage_text, detail_points=()):
+        """一次判定と詳細レビューで異なる応答を返すようにBedrockのモックを設定する"""
+        self.mock_rule_provider.load_rules.return_value = {
+            "Readability": ["Use clear names."],
+            "Security": ["Validate input."],
+        }
+        self.service.triage_model = CodeReviewModelConfig("fast-model", "256", "0", "1")
+
+        def converse(**request):
+            if request["modelId"] == "fast-model":
+                return {"output": {"message": {"content": [{"text": triage_text}]}}, "usage": {"inputTokens": 100, "outputTokens": 5}}
+            categories = request["system"][0]["text"]
+            points = [point for point in detail_points if f"- {point['category']}:" in categories]
+            result = {"review_result": "NG" if points else "OK", "review_points": points}
+            return {"output": {"message": {"content": [{"text": json.dumps(result)}]}}, "usage": {"inputTokens": 200, "outputTokens": 50}}
+
+        self.mock_bedrock_client.converse.side_effect = converse
+
+    def test_excute_review_triage_all_ok(self):
+        """正常系: 一次判定ですべてのカテゴリがOKの場合は詳細レビューを行わないことをテスト"""
+        self._setup_triage('{"1": "OK", "2": "OK"}')
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        self.assertEqual(result["review_result"], "OK")
+        self.assertEqual(result["category_verdicts"], [
+            {"category": "Readability", "verdict": "OK", "phase": "triage"},
+            {"category": "Security", "verdict": "OK", "phase": "triage"},
+        ])
+
+    def test_excute_review_triage_detail_only_ng(self):
+        """正常系: 一次判定でNGのカテゴリだけを詳細レビューし、トークン使用量を合計することをテスト"""
+        self._setup_triage('{"1": "OK", "2": "NG"}', [{"codeline": 1, "category": "Security"}])
+        mock_token_meter = MagicMock(spec=TokenMeter)
+        self.service.token_meter = mock_token_meter
+
+        result = self.service.excute_review("print('hello')", "python", api_key_id="key-1")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+        detail_prompt = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn("- Security: Validate input.", detail_prompt)
+        self.assertNotIn("Readability", detail_prompt)
+        self.assertEqual(result["review_result"], "NG")
+        self.assertEqual(result["category_verdicts"][1], {"category": "Security", "verdict": "NG", "phase": "detail"})
+        mock_token_meter.record.assert_called_once_with("key-1", {"inputTokens": 300, "outputTokens": 55})
+
+    def test_excute_review_triage_parallel(self):
+        """正常系: 並列の場合はNGのカテゴリごとに詳細レビューを依頼することをテスト"""
+        self._setup_triage('{"1": "NG", "2": "NG"}', [{"codeline": 1, "category": "Readability"}])
+        self.service.triage_parallel = True
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 3)
+        self.assertEqual(result["category_verdicts"], [
+            {"category": "Readability", "verdict": "NG", "phase": "detail"},
+            {"category": "Security", "verdict": "OK", "phase": "detail"},
+        ])
+
+    def test_excute_review_triage_with_static_checker(self):
+        """正常系: カテゴリごとの判定がローカル検査の指摘事項と統合した後に、ルール全体のカテゴリについて求められることをテスト"""
+        self._setup_triage('{"1": "OK", "2": "OK"}')
+        self.mock_rule_provider.load_rules.return_value = {
+            "Readability": ["Use clear names."],
+            "Security": ["Validate input."],
+            "Naming": [{"id": "non-ascii-identifiers", "value": "Names use ASCII only."}],
+        }
+        self.service.static_checker = StaticCheckEngine()
+
+        result = self.service.excute_review("値 = 1\n", "python")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        self.assertEqual(result["review_result"], "NG")
+        self.assertNotIn("triage_verdicts", result)
+        self.assertEqual(result["category_verdicts"], [
+            {"category": "Readability", "verdict": "OK", "phase": "triage"},
+            {"category": "Security", "verdict": "OK", "phase": "triage"},
+            {"category": "Naming", "verdict": "NG", "phase": "local"},
+        ])
+
+    def test_excute_review_triage_all_rules_checked_locally(self):
+        """正常系: すべてのルールをローカルで検査した場合も、カテゴリごとの判定を返すことをテスト"""
+        self._setup_triage('{"1": "OK"}')
+        self.mock_rule_provider.load_rules.return_value = {
+            "Naming": [{"id": "non-ascii-identifiers", "value": "Names use ASCII only."}],
+        }
+        self.service.static_checker = StaticCheckEngine()
+
+        result = self.service.excute_review("count = 1\n", "python")
+
+        self.mock_bedrock_client.converse.assert_not_called()
+        self.assertEqual(result["category_verdicts"], [{"category": "Naming", "verdict": "OK", "phase": "local"}])
+
+    def test_excute_review_triage_error(self):
+        """異常系: 一次判定に失敗した場合はすべてのカテゴリを詳細レビューすることをテスト"""
+        self._setup_triage("")
+        detail = self.mock_bedrock_client.converse.side_effect
+        error_response = {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}
+
+        def converse(**request):
+            if request["modelId"] == "fast-model":
+                raise ClientError(error_response, 'Converse')
+            return detail(**request)
+
+        self.mock_bedrock_client.converse.side_effect = converse
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+        self.assertEqual([verdict["phase"] for verdict in result["category_verdicts"]], ["detail", "detail"])
+
+    def test_excute_review_with_hedger(self):
+        """正常系: 追加のリクエストを送るインスタンスが指定された場合はそれを経由してBedrockを呼び出すことをテスト"""
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+        self.service.hedger = HedgedConverse()
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result["review_result"], "OK")
+        self.assertEqual(len(self.service.hedger.latencies("test-model", "detail")), 1)
+        self.assertEqual(self.mock_bedrock_client.converse.call_args.kwargs["modelId"], "test-model")
+
+    def test_excute_review_hedged_usage(self):
+        """正常系: 追加のリクエストを送った場合は、破棄したリクエストを含めたトークン使用量を記録・精算することをテスト"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def converse(**request):
+            calls.append(request)
+            if len(calls) == 1:
+                release.wait(5)
+            return {
+                "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+                "usage": {"inputTokens": 10, "outputTokens": 5},
+            }
+
+        self.mock_bedrock_client.converse.side_effect = converse
+        self.service.hedger = HedgedConverse(HedgingConfig(budget_percent=100, min_samples=1))
+        self.service.hedger.latencies("test-model", "detail").record(0.01)
+        mock_token_meter = MagicMock(spec=TokenMeter)
+        self.service.token_meter = mock_token_meter
+        mock_rate_limiter = MagicMock(spec=TokenRateLimiter)
+        self.service.rate_limiter = mock_rate_limiter
+
+        self.service.excute_review("print('hello')", "python", api_key_id="key-1")
+
+        self.assertEqual(len(calls), 2)
+        mock_token_meter.record.assert_called_once_with("key-1", {"inputTokens": 20, "outputTokens": 10})
+        mock_rate_limiter.settle.assert_called_once_with(mock_rate_limiter.reserve.return_value, 30)
+
+    def test_excute_review_hedged_other_model(self):
+        """正常系: 追加のリクエストで別のモデルが応答した場合は、詳細レビューのモデルのキーでレビュー結果を保存しないことをテスト"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def converse(**request):
+            calls.append(request)
+            if len(calls) == 1:
+                release.wait(5)
+            return {
+                "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+                "usage": {"inputTokens": 10, "outputTokens": 5},
+            }
+
+        self.mock_bedrock_client.converse.side_effect = converse
+        self.service.hedger = HedgedConverse(
+            HedgingConfig(budget_percent=100, min_samples=1), hedge_model_id="fallback-model", primary_model_id="test-model"
+        )
+        self.service.hedger.latencies("test-model", "detail").record(0.01)
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.return_value = None
+        self.service.result_store = mock_store
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual([call["modelId"] for call in calls], ["test-model", "fallback-model"])
+        self.assertEqual(result["review_result"], "OK")
+        self.assertNotIn("answered_model_id", result)
+        mock_store.save.assert_not_called()
+
+    def test_excute_review_with_single_flight(self):
+        """正常系: 保存済みの結果がない場合はレビュー結果のキーで1回の実行にまとめることをテスト"""
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": '{"review_result": "OK", "review_points": []}'}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.return_value = None
+        self.service.result_store = mock_store
+        mock_single_flight = MagicMock(spec=SingleFlight)
+        mock_single_flight.run.side_effect = lambda key, execute, load_result, deadline, rerun_on: execute()
+        self.service.single_flight = mock_single_flight
+
+        result = self.service.excute_review("print('hello')", "python")
+
+        self.assertEqual(result["review_result"], "OK")
+        key, _, load_result, deadline = mock_single_flight.run.call_args.args
+        self.assertEqual(key, mock_store.save.call_args.args[0].review_key)
+        self.assertIsNone(deadline)
+        # 利用枠の超過はAPIキーごとのため、待っていた依頼は実行し直す
+        self.assertEqual(mock_single_flight.run.call_args.kwargs["rerun_on"], (QuotaExceededError,))
+        # 他のコンテナの結果は保存先から読み込む
+        mock_store.get.return_value = mock_store.save.call_args.args[0]
+        self.assertEqual(load_result(), result)
+
+    def _bedrock_response(self, review_points):
+        text = json.dumps({"review_result": "NG" if review_points else "OK", "review_points": review_points})
+        return {
+            "output": {"message": {"content": [{"text": text}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+
+    def test_excute_review_reuses_near_duplicate(self):
+        """正常系: 空行・インデントだけが異なる提出は、Bedrockを呼び出さずに行番号を付け替えた指摘事項を流用することをテスト"""
+        self.service.near_duplicates = NearDuplicateIndex(NearDuplicateFromMemory(), NearDuplicateConfig(threshold=0.8))
+        point = {"location": "x", "codeline": 3, "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([point])
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        result = self.service.excute_review("\n" + NEAR_DUPLICATE_SOURCE.replace("    ", "  "), "python")
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        self.assertEqual(result["review_result"], "NG")
+        self.assertEqual([point["codeline"] for point in result["review_points"]], [4])
+
+    def test_excute_review_near_duplicate_changed_lines(self):
+        """正常系: 近似重複の提出では変更された行の前後だけをレビューし、行番号を元のソースコードに戻すことをテスト"""
+        self.service.near_duplicates = NearDuplicateIndex(
+            NearDuplicateFromMemory(), NearDuplicateConfig(threshold=0.5, context_lines=1)
+        )
+        first_point = {"location": "x", "codeline": 2, "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([first_point])
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        changed_source = NEAR_DUPLICATE_SOURCE.replace("return total", "return total * 2")
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([{**first_point, "codeline": 2}])
+        result = self.service.excute_review(changed_source, "python")
+
+        prompt_text = self.mock_bedrock_client.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        self.assertIn("return total * 2", prompt_text)
+        self.assertNotIn("def calc(items):", prompt_text)
+        changed_line = changed_source.splitlines().index("    return total * 2") + 1
+        # 今回レビューした範囲の指摘事項の後に、流用した指摘事項が加わる
+        self.assertEqual([point["codeline"] for point in result["review_points"]], [changed_line, 2])
+
+    def _dict_result_store(self):
+        """辞書に保存するレビュー結果の保存先"""
+        stored = {}
+        mock_store = MagicMock(spec=IReviewResultRepository)
+        mock_store.get.side_effect = lambda key: stored.get(key)
+        mock_store.batch_get.side_effect = lambda keys: {key: stored[key] for key in keys if key in stored}
+        mock_store.save.side_effect = lambda review: stored.__setitem__(review.review_key, review)
+        mock_store.batch_save.side_effect = lambda reviews: [stored.__setitem__(review.review_key, review) for review in reviews]
+        return mock_store
+
+    def test_excute_review_related_files(self):
+        """正常系: 関連ファイルの要約がプロンプトに含まれ、要約ごとに別のレビュー結果として保存されることをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([])
+        related_files = "- models.py\n  def calc(items):"
+
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python", related_files=related_files)
+        system_text = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn(related_files, system_text)
+
+        # 要約が同じ場合は保存済みの結果を使い、要約がない場合は改めてレビューする
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python", related_files=related_files)
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+        self.assertTrue(self.service.is_review_stored(NEAR_DUPLICATE_SOURCE, "python"))
+
+    def test_excute_review_outline(self):
+        """正常系: 閾値を超えるソースコードはアウトラインでレビューし、元の行番号の指摘事項に review_mode を付けて返すことをテスト"""
+        self.service.outline = OutlineConfig(threshold_tokens=30, body_lines=1)
+        point = {"location": "calc", "codeline": 1, "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([point, {**point, "codeline": 3}])
+
+        result = self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        request = self.mock_bedrock_client.converse.call_args.kwargs
+        prompt_text = request["messages"][0]["content"][0]["text"]
+        self.assertIn("lines omitted", prompt_text)
+        self.assertLess(len(prompt_text), len(NEAR_DUPLICATE_SOURCE))
+        self.assertIn("[Outline]", request["system"][0]["text"])
+        self.assertEqual(result["review_mode"], "outline")
+        # 1行目: def calc(items): / 3行目: 省略を示すコメント(行番号なし)
+        self.assertEqual([point["codeline"] for point in result["review_points"]], [1, None])
+
+    def test_excute_review_outline_unavailable(self):
+        """正常系: 閾値を超えてもアウトラインを作成できない場合は全体をレビューし、全体のレビューとして保存することをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.outline = OutlineConfig(threshold_tokens=30, body_lines=1)
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([])
+
+        result = self.service.excute_review(NEAR_DUPLICATE_SOURCE, "unknown-language")
+
+        prompt_text = self.mock_bedrock_client.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        self.assertEqual(prompt_text, NEAR_DUPLICATE_SOURCE)
+        self.assertNotIn("review_mode", result)
+
+        # 保存した結果のキーはアウトラインを使わない場合と同じ
+        self.service.outline = None
+        self.assertEqual(self.service.excute_review(NEAR_DUPLICATE_SOURCE, "unknown-language"), result)
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+
+    def test_excute_review_below_outline_threshold(self):
+        """正常系: 閾値以下のソースコードはそのままレビューし、review_mode を付けないことをテスト"""
+        self.service.outline = OutlineConfig(threshold_tokens=10000)
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([])
+
+        result = self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        prompt_text = self.mock_bedrock_client.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        self.assertEqual(prompt_text, NEAR_DUPLICATE_SOURCE)
+        self.assertNotIn("review_mode", result)
+
+    def test_excute_review_unit_memo(self):
+        """正常系: 変更された関数だけをレビューし、保存済みの単位の指摘事項とファイル全体の行番号で組み立てることをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.unit_memo = True
+        point = {"location": "x", "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+
+        # 1回目: すべての単位を空行で区切ってレビューする(calcの2行目とmainの2行目を指摘)
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response(
+            [{**point, "codeline": 2}, {**point, "codeline": 12}]
+        )
+        first_result = self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+        self.assertEqual([p["codeline"] for p in first_result["review_points"]], [2, 13])
+
+        # 2回目: mainだけを変更し、前に2行追加する
+        changed_source = "import os\n\n" + NEAR_DUPLICATE_SOURCE.replace("    calc([])", "    calc([1])")
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([{**point, "codeline": 5}])
+        result = self.service.excute_review(changed_source, "python")
+
+        prompt_text = self.mock_bedrock_client.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        self.assertIn("calc([1])", prompt_text)
+        self.assertIn("import os", prompt_text)
+        self.assertNotIn("total = 0", prompt_text)
+        # calcの指摘は保存済みの結果から、mainの指摘は今回のレビューから、いずれも変更後の行番号で返す
+        main_line = changed_source.splitlines().index("    calc([1])") + 1
+        self.assertEqual([p["codeline"] for p in result["review_points"]], [4, main_line])
+
+    def test_excute_review_unit_memo_capped(self):
+        """正常系: 指摘事項が上限件数に達した場合は、単位ごとのレビュー結果を保存しないことをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.unit_memo = True
+        self.service.max_points = 1
+        point = {"location": "x", "codeline": 2, "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([point])
+
+        self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        self.service.result_store.batch_save.assert_not_called()
+
+    def test_excute_review_unit_memo_triage(self):
+        """正常系: 一次判定と単位ごとのレビューを併用した場合も、カテゴリごとの判定を返すことをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.unit_memo = True
+        self._setup_triage('{"1": "OK", "2": "OK"}')
+
+        result = self.service.excute_review(NEAR_DUPLICATE_SOURCE, "python")
+
+        self.assertNotIn("triage_verdicts", result)
+        self.assertEqual([verdict["phase"] for verdict in result["category_verdicts"]], ["triage", "triage"])
+
+    def test_excute_review_unit_memo_single_unit(self):
+        """正常系: 単位が1つしかない場合はファイル全体をレビューすることをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.unit_memo = True
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([])
+
+        self.service.excute_review("print('hello')", "python")
+
+        self.service.result_store.batch_get.assert_not_called()
+
+    def _packed_response(self, sections):
+        return {
+            "output": {"message": {"content": [{"text": json.dumps(sections)}]}},
+            "usage": {"inputTokens": 100, "outputTokens": 40},
+        }
+
+    def test_excute_reviews_packed(self):
+        """正常系: 小さなソースコードを1回の呼び出しでレビューし、ファイルごとの結果を個別のレビューと同じキーで保存することをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.packing = PackingConfig()
+        point = {"location": "b", "codeline": 2, "category": "TestCategory", "overview": "o", "details": "d", "suggestion": "s"}
+        self.mock_bedrock_client.converse.return_value = self._packed_response({
+            "f1": {"review_result": "OK", "review_points": []},
+            "f2": {"review_result": "NG", "review_points": [point]},
+        })
+        sources = [("a = 1\n", "python"), ("b = 2\nprint(b)\n", "python")]
+
+        results = self.service.excute_reviews(sources)
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        request = self.mock_bedrock_client.converse.call_args.kwargs
+        self.assertIn("===== BEGIN FILE f2 =====\nb = 2\n", request["messages"][0]["content"][0]["text"])
+        self.assertNotIn("toolConfig", request)
+        self.assertEqual(results[0], {"review_result": "OK", "review_points": []})
+        self.assertEqual([p["codeline"] for p in results[1]["review_points"]], [2])
+
+        # 保存した結果は個別のレビューでも使われる(使用量はファイル数で等分する)
+        self.assertEqual(self.service.excute_review("b = 2\nprint(b)\n", "python"), results[1])
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+        saved = self.service.result_store.save.call_args_list[0].args[0]
+        self.assertEqual(saved.usage, {"inputTokens": 50, "outputTokens": 20})
+
+    def test_excute_reviews_packed_with_duplicate_candidates(self):
+        """正常系: まとめたプロンプトにファイルごとの重複コードの候補が含まれ、使用量の端数が失われないことをテスト"""
+        self.service.result_store = self._dict_result_store()
+        self.service.packing = PackingConfig()
+        self.mock_rule_provider.load_rules.return_value = {
+            "Maintainability": [{"id": "duplicated-code", "value": "Duplicated code is avoided."}],
+        }
+        mock_detector = MagicMock(spec=CloneDetector)
+        mock_detector.detect.side_effect = lambda source_code, language: (
+            [ClonePair(1, 2, 3, 4, 20)] if source_code.startswith("b") else []
+        )
+        self.service.clone_detector = mock_detector
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({
+                "f1": {"review_result": "OK", "review_points": []},
+                "f2": {"review_result": "OK", "review_points": []},
+            })}]}},
+            "usage": {"inputTokens": 101, "outputTokens": 41},
+        }
+
+        self.service.excute_reviews([("a = 1\n", "python"), ("b = 2\nprint(b)\n", "python")])
+
+        self.assertEqual(mock_detector.detect.call_count, 2)
+        system_prompt = self.mock_bedrock_client.converse.call_args.kwargs["system"][0]["text"]
+        self.assertIn("- f2: lines 1-2 and lines 3-4 (20 tokens)", system_prompt)
+        self.assertNotIn("- f1:", system_prompt)
+        saved_usages = [call.args[0].usage for call in self.service.result_store.save.call_args_list]
+        self.assertEqual(saved_usages, [{"inputTokens": 51, "outputTokens": 21}, {"inputTokens": 50, "outputTokens": 20}])
+
+    def test_excute_reviews_packed_fallback(self):
+        """異常系: 出力から結果を取り出せなかったファイル・大きなファイルは個別にレビューすることをテスト"""
+        self.service.packing = PackingConfig(max_source_tokens=20)
+        large_source = "value = 1\n" * 20
+        responses = [
+            self._packed_response({"f1": {"review_result": "OK", "review_points": []}, "f2": {"review_result": "??"}}),
+            self._bedrock_response([]),
+            self._bedrock_response([]),
+        ]
+        self.mock_bedrock_client.converse.side_effect = responses
+
+        results = self.service.excute_reviews([("a = 1\n", "python"), ("b = 2\n", "python"), (large_source, "python")])
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 3)
+        individual_prompts = [
+            call.kwargs["messages"][0]["content"][0]["text"] for call in self.mock_bedrock_client.converse.call_args_list[1:]
+        ]
+        self.assertEqual(individual_prompts, ["b = 2\n", large_source])
+        self.assertEqual([result["review_result"] for result in results], ["OK", "OK", "OK"])
+
+    def test_excute_reviews_without_packing(self):
+        """正常系: packing が設定されていない場合は、ソースコードごとに個別にレビューすることをテスト"""
+        self.mock_bedrock_client.converse.return_value = self._bedrock_response([])
+
+        results = self.service.excute_reviews([("a = 1\n", "python"), ("b = 2\n", "python")])
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+        self.assertEqual(len(results), 2)
+
     def test_excute_review_boto3_error(self):
         """異常系: Bedrock API呼び出しでClientErrorが発生した場合にBoto3Exceptionを送出することをテスト"""
         error_response = {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}
@@ -132,26 +941,48 @@ class TestCodeReviewServiceContext(unittest.TestCase):
         CodeReviewServiceContext.rule_provider.fget.cache_clear()
         CodeReviewServiceContext.model_config.fget.cache_clear()
         CodeReviewServiceContext.code_review_service.fget.cache_clear()
+        CodeReviewServiceContext.dynamodb_config.fget.cache_clear()
+        CodeReviewServiceContext.dynamodb_client.fget.cache_clear()
+        CodeReviewServiceContext.sqs_client.fget.cache_clear()
+        CodeReviewServiceContext.webhook_notifier.fget.cache_clear()
+        CodeReviewServiceContext.result_store.fget.cache_clear()
+        CodeReviewServiceContext.review_config.fget.cache_clear()
+        CodeReviewServiceContext.source_normalizer.fget.cache_clear()
+        CodeReviewServiceContext.static_check_engine.fget.cache_clear()
+        CodeReviewServiceContext.clone_detection_mode.fget.cache_clear()
+        CodeReviewServiceContext.clone_detector.fget.cache_clear()
+        CodeReviewServiceContext.token_meter.fget.cache_clear()
+        CodeReviewServiceContext.rate_limiter.fget.cache_clear()
+        CodeReviewServiceContext.bedrock_invoker.fget.cache_clear()
+        CodeReviewServiceContext.response_schema.fget.cache_clear()
+        CodeReviewServiceContext.triage_model_config.fget.cache_clear()
+        CodeReviewServiceContext.hedged_converse.fget.cache_clear()
+        CodeReviewServiceContext.bedrock_pool.fget.cache_clear()
+        CodeReviewServiceContext.single_flight.fget.cache_clear()
+        CodeReviewServiceContext.near_duplicate_index.fget.cache_clear()
+        CodeReviewServiceContext.project_review_service.fget.cache_clear()
+        CodeReviewServiceContext.outline_config.fget.cache_clear()
+        CodeReviewServiceContext.packing_config.fget.cache_clear()
+        CodeReviewServiceContext.bedrock_session.fget.cache_clear()
 
         self.context = CodeReviewServiceContext()
 
+    @patch.object(CodeReviewServiceContext, 'bedrock_pool', new_callable=PropertyMock, return_value=None)
+    @patch("code_review.code_review.boto3.Session")
     @patch("code_review.code_review.boto3.client")
-    def test_clients_cached(self, mock_boto3_client):
+    def test_clients_cached(self, mock_boto3_client, mock_boto3_session, mock_bedrock_pool):
         """ssm_clientとbedrock_clientがキャッシュされることをテスト"""
         # ssm_clientのテスト
         ssm_client1 = self.context.ssm_client
         ssm_client2 = self.context.ssm_client
         self.assertIs(ssm_client1, ssm_client2)
-        mock_boto3_client.assert_called_with("ssm")
+        mock_boto3_client.assert_called_once_with("ssm")
 
-        # bedrock_clientのテスト
+        # bedrock_clientのテスト(専用のセッションから作成する)
         bedrock_client1 = self.context.bedrock_client
         bedrock_client2 = self.context.bedrock_client
         self.assertIs(bedrock_client1, bedrock_client2)
-        mock_boto3_client.assert_called_with("bedrock-runtime")
-
-        # boto3.clientの呼び出し回数がそれぞれ1回であることを確認
-        self.assertEqual(mock_boto3_client.call_count, 2)
+        mock_boto3_session.return_value.client.assert_called_once_with("bedrock-runtime", region_name=None, config=None)
 
     @patch("code_review.code_review.SsmConfigLoader")
     def test_ssm_config_loader_cached(self, MockSsmConfigLoader):
@@ -204,11 +1035,28 @@ class TestCodeReviewServiceContext(unittest.TestCase):
         """code_review_serviceがキャッシュされることをテスト"""
         with patch.object(CodeReviewServiceContext, 'bedrock_client', new_callable=PropertyMock) as mock_bedrock_client, \
              patch.object(CodeReviewServiceContext, 'model_config', new_callable=PropertyMock) as mock_model_config, \
-             patch.object(CodeReviewServiceContext, 'rule_provider', new_callable=PropertyMock) as mock_rule_provider:
+             patch.object(CodeReviewServiceContext, 'rule_provider', new_callable=PropertyMock) as mock_rule_provider, \
+             patch.object(CodeReviewServiceContext, 'result_store', new_callable=PropertyMock) as mock_result_store, \
+             patch.object(CodeReviewServiceContext, 'source_normalizer', new_callable=PropertyMock) as mock_normalizer, \
+             patch.object(CodeReviewServiceContext, 'static_check_engine', new_callable=PropertyMock) as mock_static_check, \
+             patch.object(CodeReviewServiceContext, 'clone_detector', new_callable=PropertyMock) as mock_clone_detector, \
+             patch.object(CodeReviewServiceContext, 'token_meter', new_callable=PropertyMock) as mock_token_meter, \
+             patch.object(CodeReviewServiceContext, 'rate_limiter', new_callable=PropertyMock) as mock_rate_limiter, \
+             patch.object(CodeReviewServiceContext, 'bedrock_invoker', new_callable=PropertyMock) as mock_bedrock_invoker, \
+             patch.object(CodeReviewServiceContext, 'response_schema', new_callable=PropertyMock) as mock_response_schema, \
+             patch.object(CodeReviewServiceContext, 'triage_model_config', new_callable=PropertyMock) as mock_triage_model_config, \
+             patch.object(CodeReviewServiceContext, 'hedged_converse', new_callable=PropertyMock) as mock_hedged_converse, \
+             patch.object(CodeReviewServiceContext, 'single_flight', new_callable=PropertyMock) as mock_single_flight, \
+             patch.object(CodeReviewServiceContext, 'near_duplicate_index', new_callable=PropertyMock) as mock_near_duplicate_index, \
+             patch.object(CodeReviewServiceContext, 'outline_config', new_callable=PropertyMock) as mock_outline_config, \
+             patch.object(CodeReviewServiceContext, 'packing_config', new_callable=PropertyMock) as mock_packing_config, \
+             patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
 
             mock_bedrock_client.return_value = MagicMock()
             mock_model_config.return_value = MagicMock()
             mock_rule_provider.return_value = MagicMock()
+            mock_result_store.return_value = MagicMock()
+            mock_review_config.return_value = {}
 
             service1 = self.context.code_review_service
             service2 = self.context.code_review_service
@@ -217,7 +1065,25 @@ class TestCodeReviewServiceContext(unittest.TestCase):
             MockCodeReviewService.assert_called_once_with(
                 mock_bedrock_client.return_value,
                 mock_model_config.return_value,
-                mock_rule_provider.return_value
+                mock_rule_provider.return_value,
+                result_store=mock_result_store.return_value,
+                normalizer=mock_normalizer.return_value,
+                static_checker=mock_static_check.return_value,
+                clone_detector=mock_clone_detector.return_value,
+                token_meter=mock_token_meter.return_value,
+                rate_limiter=mock_rate_limiter.return_value,
+                invoker=mock_bedrock_invoker.return_value,
+                response_schema=mock_response_schema.return_value,
+                max_points=0,
+                tool_use=False,
+                triage_model=mock_triage_model_config.return_value,
+                triage_parallel=False,
+                hedger=mock_hedged_converse.return_value,
+                single_flight=mock_single_flight.return_value,
+                near_duplicates=mock_near_duplicate_index.return_value,
+                unit_memo=False,
+                outline=mock_outline_config.return_value,
+                packing=mock_packing_config.return_value,
             )
 
     def test_bedrock_config_cached(self):
@@ -242,3 +1108,301 @@ class TestCodeReviewServiceContext(unittest.TestCase):
             self.assertEqual(config1, mock_config_data)  # 内容が正しい
             # SsmConfigLoader.load_configが "bedrock" を引数に1回だけ呼び出されたことを確認
             mock_loader_instance.load_config.assert_called_once_with("bedrock")
+
+    @patch("code_review.code_review.WebhookNotifier")
+    @patch("code_review.code_review.DeadLetterFromDynamoDB")
+    def test_webhook_notifier_with_dead_letter_table(self, MockDeadLetterFromDynamoDB, MockWebhookNotifier):
+        """webhook_notifierがデッドレターテーブル設定時にDynamoDBの保管先を使うことをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock) as mock_dynamodb_client:
+            mock_dynamodb_config.return_value = {"WebhookDeadLetterTableName": "dead-letter-table"}
+
+            notifier1 = self.context.webhook_notifier
+            notifier2 = self.context.webhook_notifier
+
+            self.assertIs(notifier1, notifier2)
+            MockDeadLetterFromDynamoDB.assert_called_once_with(mock_dynamodb_client.return_value, "dead-letter-table")
+            MockWebhookNotifier.assert_called_once_with(dead_letter_store=MockDeadLetterFromDynamoDB.return_value, queue=None)
+
+    @patch("code_review.code_review.WebhookNotifier")
+    def test_webhook_notifier_without_dead_letter_table(self, MockWebhookNotifier):
+        """webhook_notifierがデッドレターテーブル未設定時に保管先なしで生成されることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config:
+            mock_dynamodb_config.return_value = {}
+
+            self.context.webhook_notifier
+
+            MockWebhookNotifier.assert_called_once_with(dead_letter_store=None, queue=None)
+
+    @patch.dict(os.environ, {"WEBHOOK_QUEUE_URL": "https://sqs.example/queue"})
+    @patch("code_review.code_review.WebhookQueueFromSQS")
+    @patch("code_review.code_review.WebhookNotifier")
+    def test_webhook_notifier_with_queue(self, MockWebhookNotifier, MockWebhookQueueFromSQS):
+        """webhook_notifierが配信キューの設定時にSQSのキューへ配信依頼を送ることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'sqs_client', new_callable=PropertyMock) as mock_sqs_client:
+            mock_dynamodb_config.return_value = {}
+
+            self.context.webhook_notifier
+
+            MockWebhookQueueFromSQS.assert_called_once_with(mock_sqs_client.return_value, "https://sqs.example/queue")
+            MockWebhookNotifier.assert_called_once_with(dead_letter_store=None, queue=MockWebhookQueueFromSQS.return_value)
+
+    @patch("code_review.code_review.ReviewResultFromDynamoDB")
+    def test_result_store(self, MockReviewResultFromDynamoDB):
+        """result_storeがテーブル設定時にDynamoDBのリポジトリを提供し、未設定時はNoneとなることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock) as mock_dynamodb_client:
+            mock_dynamodb_config.return_value = {"ReviewResultTableName": "review-table", "ReviewResultTtlDays": "7"}
+
+            store = self.context.result_store
+
+            self.assertIs(store, MockReviewResultFromDynamoDB.return_value)
+            MockReviewResultFromDynamoDB.assert_called_once_with(
+                mock_dynamodb_client.return_value, "review-table", ttl_days=7
+            )
+
+            CodeReviewServiceContext.result_store.fget.cache_clear()
+            mock_dynamodb_config.return_value = {}
+            self.assertIsNone(self.context.result_store)
+
+    @patch("code_review.code_review.SourceNormalizer")
+    def test_source_normalizer(self, MockSourceNormalizer):
+        """source_normalizerが既定で有効となり、設定で無効化できることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"Normalization": {"IndentWidth": "4"}}
+            self.assertIs(self.context.source_normalizer, MockSourceNormalizer.return_value)
+            self.assertEqual(MockSourceNormalizer.call_args[0][0].indent_width, 4)
+
+            CodeReviewServiceContext.source_normalizer.fget.cache_clear()
+            mock_review_config.return_value = {"Normalization": {"Enabled": "false"}}
+            self.assertIsNone(self.context.source_normalizer)
+
+    @patch("code_review.code_review.StaticCheckEngine")
+    def test_static_check_engine(self, MockStaticCheckEngine):
+        """static_check_engineが既定で有効となり、設定で無効化できることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {}
+            self.assertIs(self.context.static_check_engine, MockStaticCheckEngine.return_value)
+
+            CodeReviewServiceContext.static_check_engine.fget.cache_clear()
+            mock_review_config.return_value = {"StaticCheck": {"Enabled": "false"}}
+            self.assertIsNone(self.context.static_check_engine)
+
+    def test_clone_detector_modes(self):
+        """重複コード検出がhintではプロンプト用、reportではローカル検査として使われ、offでは使われないことをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"CloneDetection": {"Mode": "report", "MinTokens": "80"}}
+            self.assertEqual(self.context.clone_detector.config.min_tokens, 80)
+            checks = self.context.static_check_engine.checks
+            self.assertIsInstance(checks["duplicated-code"], DuplicatedCodeCheck)
+
+            for prop in ("clone_detection_mode", "clone_detector", "static_check_engine"):
+                getattr(CodeReviewServiceContext, prop).fget.cache_clear()
+            mock_review_config.return_value = {"CloneDetection": {"Mode": "off"}}
+            self.assertIsNone(self.context.clone_detector)
+            self.assertNotIn("duplicated-code", self.context.static_check_engine.checks)
+
+    def test_token_meter(self):
+        """token_meterがテーブル名と予算の設定から生成され、テーブル未設定の場合はNoneとなることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock):
+            mock_dynamodb_config.return_value = {"TokenUsageTableName": "usage-table"}
+            mock_review_config.return_value = {"TokenBudget": {"DailyLimit": "50000", "ShardCount": "8"}}
+
+            token_meter = self.context.token_meter
+            self.assertEqual(token_meter.daily_token_budget, 50000)
+            self.assertIsInstance(token_meter.repository, TokenUsageFromDynamoDB)
+            self.assertEqual(token_meter.repository.table_name, "usage-table")
+            self.assertEqual(token_meter.repository.shard_count, 8)
+
+            CodeReviewServiceContext.token_meter.fget.cache_clear()
+            mock_dynamodb_config.return_value = {}
+            self.assertIsNone(self.context.token_meter)
+
+    def test_rate_limiter(self):
+        """rate_limiterがテーブル名と1分あたりのトークン数の設定から生成され、未設定の場合はNoneとなることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config, \
+             patch.object(CodeReviewServiceContext, 'model_config', new_callable=PropertyMock) as mock_model_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock):
+            mock_dynamodb_config.return_value = {"RateLimitTableName": "bucket-table"}
+            mock_review_config.return_value = {"RateLimit": {"TokensPerMinute": "60000"}}
+            mock_model_config.return_value.model_id = "model-a"
+
+            rate_limiter = self.context.rate_limiter
+            self.assertEqual(rate_limiter.capacity, 60000)
+            self.assertEqual(rate_limiter.bucket_id, "model-a")
+            self.assertIsInstance(rate_limiter.store, TokenBucketFromDynamoDB)
+
+            CodeReviewServiceContext.rate_limiter.fget.cache_clear()
+            mock_review_config.return_value = {}
+            self.assertIsNone(self.context.rate_limiter)
+
+    @patch.object(CodeReviewServiceContext, 'bedrock_pool', new_callable=PropertyMock, return_value=None)
+    @patch("code_review.code_review.boto3.Session")
+    def test_bedrock_invoker(self, mock_boto3_session, mock_bedrock_pool):
+        """bedrock_invokerが読み込みタイムアウトの区分ごとにbotocoreの再試行を無効にしたクライアントを使い回すことをテスト"""
+        mock_create_client = mock_boto3_session.return_value.client
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"Deadline": {"MaxAttempts": "2"}}
+
+            invoker = self.context.bedrock_invoker
+            self.assertEqual(invoker.config.max_attempts, 2)
+
+            client = invoker.client_factory(10)
+            self.assertIs(invoker.client_factory(10), client)
+            self.assertIs(invoker.client_factory(14), client)
+            self.assertEqual(mock_create_client.call_count, 1)
+            config = mock_create_client.call_args.kwargs["config"]
+            self.assertEqual(config.read_timeout, 10)
+            self.assertEqual(config.retries, {"total_max_attempts": 1})
+
+    @patch.object(CodeReviewServiceContext, 'bedrock_pool', new_callable=PropertyMock, return_value=None)
+    @patch("code_review.code_review.boto3.Session")
+    def test_bedrock_client_with_timeout_threads(self, mock_boto3_session, mock_bedrock_pool):
+        """複数のスレッドから同時に呼ばれても、区分ごとに1つのクライアントだけを作成することをテスト"""
+        mock_boto3_session.return_value.client.side_effect = lambda *args, **kwargs: object()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(self.context.bedrock_client_with_timeout, [30, 31, 44] * 10))
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertEqual(mock_boto3_session.return_value.client.call_count, 1)
+        mock_boto3_session.assert_called_once_with()
+
+    def test_response_schema(self):
+        """response_schemaが短縮形式の設定の場合だけ生成されることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"ResponseSchema": {"Mode": "compact", "IncludeSuggestion": "false"}}
+            response_schema = self.context.response_schema
+            self.assertIsInstance(response_schema, CompactResponseSchema)
+            self.assertFalse(response_schema.include_suggestion)
+
+            CodeReviewServiceContext.response_schema.fget.cache_clear()
+            mock_review_config.return_value = {}
+            self.assertIsNone(self.context.response_schema)
+
+    def test_triage_model_config(self):
+        """triage_model_configが一次判定のモデル設定から生成され、モデル未設定の場合はNoneとなることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"Triage": {"ModelId": "fast-model", "MaxTokens": "128"}}
+            triage_model_config = self.context.triage_model_config
+            self.assertEqual(triage_model_config.model_id, "fast-model")
+            self.assertEqual(triage_model_config.token_max, 128)
+            self.assertEqual(triage_model_config.temperature, 0.0)
+
+            CodeReviewServiceContext.triage_model_config.fget.cache_clear()
+            mock_review_config.return_value = {}
+            self.assertIsNone(self.context.triage_model_config)
+
+    def test_packing_config(self):
+        """packing_configがまとめてレビューする設定から生成され、無効の場合はNoneとなることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config:
+            mock_review_config.return_value = {"Packing": {"Enabled": "true", "MaxFiles": "4"}}
+            packing_config = self.context.packing_config
+            self.assertEqual(packing_config.max_files, 4)
+            self.assertEqual(packing_config.max_prompt_tokens, PackingConfig().max_prompt_tokens)
+
+            CodeReviewServiceContext.packing_config.fget.cache_clear()
+            mock_review_config.return_value = {"Packing": {"MaxFiles": "4"}}
+            self.assertIsNone(self.context.packing_config)
+
+    @patch("code_review.code_review.boto3.Session")
+    def test_hedged_converse(self, mock_boto3_session):
+        """hedged_converseが有効な場合だけ生成され、リージョン指定時は別リージョンのクライアントに送ることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config, \
+             patch.object(CodeReviewServiceContext, 'model_config', new_callable=PropertyMock) as mock_model_config:
+            mock_review_config.return_value = {
+                "Hedging": {"Enabled": "true", "Percentile": "90", "ModelId": "other-model", "Region": "us-west-2"}
+            }
+            mock_model_config.return_value = CodeReviewModelConfig("review-model", "1000", "0", "1")
+            hedged_converse = self.context.hedged_converse
+            self.assertEqual(hedged_converse.config.percentile, 90.0)
+            self.assertEqual(hedged_converse.hedge_model_id, "other-model")
+            self.assertEqual(hedged_converse.primary_model_id, "review-model")
+            mock_boto3_client = mock_boto3_session.return_value.client
+            mock_boto3_client.assert_called_once_with("bedrock-runtime", region_name="us-west-2", config=None)
+
+            error_response = {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}
+            mock_boto3_client.return_value.converse.side_effect = ClientError(error_response, 'Converse')
+            with self.assertRaises(Boto3Exception):
+                hedged_converse.hedge_converse({"modelId": "other-model"})
+
+            # 期限がある場合は、期限に合わせたタイムアウトのクライアントで呼び出す
+            mock_boto3_client.reset_mock()
+            mock_boto3_client.return_value.converse.side_effect = None
+            mock_boto3_client.return_value.converse.return_value = {"output": {}}
+            request = {"modelId": "other-model", "inferenceConfig": {"maxTokens": 100}}
+            self.assertEqual(hedged_converse.hedge_converse(request, Deadline.after(30)), {"output": {}})
+            self.assertEqual(mock_boto3_client.call_args.kwargs["region_name"], "us-west-2")
+            self.assertLessEqual(mock_boto3_client.call_args.kwargs["config"].read_timeout, 30)
+
+            CodeReviewServiceContext.hedged_converse.fget.cache_clear()
+            mock_review_config.return_value = {}
+            self.assertIsNone(self.context.hedged_converse)
+
+    @patch("code_review.code_review.boto3.Session")
+    def test_bedrock_pool(self, mock_boto3_session):
+        """bedrock_poolが接続先の設定から生成され、bedrock_clientとタイムアウト付きのクライアントで状態を共有することをテスト"""
+        with patch.object(CodeReviewServiceContext, 'bedrock_config', new_callable=PropertyMock) as mock_bedrock_config:
+            mock_bedrock_config.return_value = {
+                "ModelId": "model-id",
+                "Endpoints": {
+                    "east": {"Region": "us-east-1", "Weight": "2"},
+                    "west": {"Region": "us-west-2", "ModelId": "us.model-id"},
+                },
+            }
+            pool = self.context.bedrock_pool
+            self.assertIsInstance(pool, BedrockClientPool)
+            self.assertIs(self.context.bedrock_client, pool)
+            self.assertEqual([endpoint.weight for endpoint in pool.endpoints], [2.0, 1.0])
+            self.assertEqual(pool.model_id, "model-id")
+
+            mock_create_client = mock_boto3_session.return_value.client
+            timeout_pool = self.context.bedrock_client_with_timeout(10)
+            self.assertIs(self.context.bedrock_client_with_timeout(10), timeout_pool)
+            timeout_pool.converse(modelId="model-id")
+            self.assertEqual(mock_create_client.call_args.args, ("bedrock-runtime",))
+            self.assertEqual(mock_create_client.call_args.kwargs["region_name"], "us-east-1")
+            self.assertEqual(mock_create_client.call_args.kwargs["config"].read_timeout, 10)
+            self.assertEqual(pool.stats()["east"]["requests"], 1)
+
+            CodeReviewServiceContext.bedrock_pool.fget.cache_clear()
+            mock_bedrock_config.return_value = {"ModelId": "model-id"}
+            self.assertIsNone(self.context.bedrock_pool)
+
+    def test_single_flight(self):
+        """single_flightがロックのテーブルとレビュー結果の保存先がある場合だけコンテナ間でまとめることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock), \
+             patch.object(CodeReviewServiceContext, 'result_store', new_callable=PropertyMock) as mock_result_store:
+            mock_review_config.return_value = {"SingleFlight": {"LeaseSeconds": "30"}}
+            mock_dynamodb_config.return_value = {"ReviewLockTableName": "lock-table"}
+            single_flight = self.context.single_flight
+            self.assertIsInstance(single_flight.lease_store, LeaseFromDynamoDB)
+            self.assertEqual(single_flight.lease_seconds, 30.0)
+
+            CodeReviewServiceContext.single_flight.fget.cache_clear()
+            mock_result_store.return_value = None
+            self.assertIsNone(self.context.single_flight.lease_store)
+
+            CodeReviewServiceContext.single_flight.fget.cache_clear()
+            mock_review_config.return_value = {"SingleFlight": {"Enabled": "false"}}
+            self.assertIsNone(self.context.single_flight)
+
+    def test_near_duplicate_index(self):
+        """near_duplicate_indexがテーブルの設定があり有効化されている場合だけ生成されることをテスト"""
+        with patch.object(CodeReviewServiceContext, 'review_config', new_callable=PropertyMock) as mock_review_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_config', new_callable=PropertyMock) as mock_dynamodb_config, \
+             patch.object(CodeReviewServiceContext, 'dynamodb_client', new_callable=PropertyMock):
+            mock_review_config.return_value = {"NearDuplicate": {"Enabled": "true", "Threshold": "0.9"}}
+            mock_dynamodb_config.return_value = {"NearDuplicateTableName": "near-duplicate-table"}
+            index = self.context.near_duplicate_index
+            self.assertEqual(index.config.threshold, 0.9)
+            self.assertEqual(index.store.table_name, "near-duplicate-table")
+
+            CodeReviewServiceContext.near_duplicate_index.fget.cache_clear()
+            mock_review_config.return_value = {}
+            self.assertIsNone(self.context.near_duplicate_index)
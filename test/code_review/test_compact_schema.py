@@ -0,0 +1,63 @@
+import json
+import unittest
+
+from code_review.compact_schema import CompactResponseSchema
+from code_review.rules import CodingRules
+
+
+class TestCompactResponseSchema(unittest.TestCase):
+    """CompactResponseSchemaのテストクラス"""
+
+    def setUp(self):
+        self.coding_rules = CodingRules()
+        self.coding_rules.add("Readability", "Use clear variable names.")
+        self.coding_rules.add("Security", "Validate input.")
+
+    def test_response_format(self):
+        """正常系: 修正案を省略する場合はレスポンス例にsを含めないことをテスト"""
+        point = json.loads(CompactResponseSchema().response_format())["p"][0]
+        self.assertEqual(set(point), {"l", "n", "c", "o", "d", "s"})
+
+        schema = CompactResponseSchema(include_suggestion=False)
+        point = json.loads(schema.response_format())["p"][0]
+        self.assertNotIn("s", point)
+        self.assertNotIn("`s`", schema.response_rules())
+
+    def test_expand(self):
+        """正常系: 短縮形式のレビュー結果が公開しているレスポンス形式に展開されることをテスト"""
+        compact_result = {
+            "r": "NG",
+            "p": [
+                {"l": "main", "n": 3, "c": 2, "o": "概要", "d": "詳細", "s": "修正案"},
+                {"l": "calc", "n": 8, "c": "1", "o": "概要2", "d": "詳細2"},
+            ],
+        }
+
+        review_result = CompactResponseSchema().expand(compact_result, self.coding_rules)
+
+        self.assertEqual(review_result, {
+            "review_result": "NG",
+            "review_points": [
+                {
+                    "location": "main", "codeline": 3, "category": "Security",
+                    "overview": "概要", "details": "詳細", "suggestion": "修正案",
+                },
+                {
+                    "location": "calc", "codeline": 8, "category": "Readability",
+                    "overview": "概要2", "details": "詳細2", "suggestion": "",
+                },
+            ],
+        })
+
+    def test_expand_unknown_category(self):
+        """正常系: 範囲外のカテゴリ番号は空文字列、カテゴリ名が出力された場合はそのまま使うことをテスト"""
+        compact_result = {"r": "NG", "p": [{"n": 1, "c": 9}, {"n": 2, "c": "Security"}, {"n": 3, "c": True}]}
+
+        review_result = CompactResponseSchema().expand(compact_result, self.coding_rules)
+
+        self.assertEqual([point["category"] for point in review_result["review_points"]], ["", "Security", ""])
+
+    def test_expand_full_format(self):
+        """正常系: モデルが従来の形式で出力した場合はそのまま返すことをテスト"""
+        review_result = {"review_result": "OK", "review_points": []}
+        self.assertIs(CompactResponseSchema().expand(review_result, self.coding_rules), review_result)
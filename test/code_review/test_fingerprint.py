@@ -0,0 +1,35 @@
+import unittest
+
+from code_review.fingerprint import content_hash, review_key
+
+
+class TestContentHash(unittest.TestCase):
+    """content_hashのテストクラス"""
+
+    def test_same_input_same_hash(self):
+        """正常系: 同一内容であれば同じハッシュ値になり、言語の表記揺れを吸収することをテスト"""
+        self.assertEqual(content_hash("print(1)", "python"), content_hash("print(1)", " Python "))
+
+    def test_different_input_different_hash(self):
+        """正常系: ソースコードまたは言語が異なればハッシュ値が変わることをテスト"""
+        base = content_hash("print(1)", "python")
+        self.assertNotEqual(base, content_hash("print(2)", "python"))
+        self.assertNotEqual(base, content_hash("print(1)", "ruby"))
+
+
+class TestReviewKey(unittest.TestCase):
+    """review_keyのテストクラス"""
+
+    def test_review_key(self):
+        """正常系: ソース・ルールセット・モデルのいずれかが異なればキーが変わることをテスト"""
+        base = review_key("hash", "v1", "model-a")
+        self.assertEqual(base, review_key("hash", "v1", "model-a"))
+        self.assertNotEqual(base, review_key("hash2", "v1", "model-a"))
+        self.assertNotEqual(base, review_key("hash", "v2", "model-a"))
+        self.assertNotEqual(base, review_key("hash", "v1", "model-b"))
+
+    def test_review_key_options(self):
+        """正常系: オプションを指定した場合はキーが変わり、空の場合は指定しない場合と同じキーになることをテスト"""
+        base = review_key("hash", "v1", "model-a")
+        self.assertEqual(base, review_key("hash", "v1", "model-a", options=""))
+        self.assertNotEqual(base, review_key("hash", "v1", "model-a", options="max_points=10"))
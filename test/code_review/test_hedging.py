@@ -0,0 +1,200 @@
+import threading
+import unittest
+
+from code_review.hedging import HedgeBudget, HedgedConverse, HedgingConfig, LatencyTracker
+from common.deadline import Deadline
+from common.exception import Boto3Exception, DeadlineExceededError
+
+
+class TestHedgingConfig(unittest.TestCase):
+    """HedgingConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = HedgingConfig.from_config({"Percentile": "90", "BudgetPercent": "10"})
+        self.assertEqual(config.percentile, 90.0)
+        self.assertEqual(config.budget_percent, 10.0)
+        self.assertEqual(config.min_samples, 20)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    """LatencyTrackerのテストクラス"""
+
+    def test_percentile(self):
+        """正常系: 保持件数を超えた古い応答時間を除いてパーセンタイル値を求めることをテスト"""
+        tracker = LatencyTracker(window=10)
+        for seconds in range(1, 21):
+            tracker.record(float(seconds))
+
+        self.assertEqual(len(tracker), 10)
+        self.assertEqual(tracker.percentile(50), 15.0)
+        self.assertEqual(tracker.percentile(100), 20.0)
+
+
+class TestHedgeBudget(unittest.TestCase):
+    """HedgeBudgetのテストクラス"""
+
+    def test_ratio(self):
+        """正常系: 追加のリクエストがリクエスト数の割合までに制限されることをテスト"""
+        budget = HedgeBudget(ratio=0.1)
+        granted = 0
+        for _ in range(100):
+            budget.on_request()
+            granted += budget.try_acquire()
+        self.assertEqual(granted, 10)
+
+    def test_max_credits(self):
+        """正常系: 貯められる枠が上限までに制限されることをテスト"""
+        budget = HedgeBudget(ratio=1.0, max_credits=2)
+        for _ in range(10):
+            budget.on_request()
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+
+class TestHedgedConverse(unittest.TestCase):
+    """HedgedConverseのテストクラス"""
+
+    def setUp(self):
+        self.config = HedgingConfig(percentile=50, budget_percent=100, min_samples=3)
+        self.release = threading.Event()
+        self.requests = []
+
+    def tearDown(self):
+        # 破棄された呼び出しのスレッドを終了させる
+        self.release.set()
+
+    def create_hedger(self, model_id: str = "model", **kwargs) -> HedgedConverse:
+        hedger = HedgedConverse(self.config, **kwargs)
+        for _ in range(self.config.min_samples):
+            hedger.latencies(model_id).record(0.01)
+        return hedger
+
+    def slow_first_converse(self, request):
+        """最初の呼び出しだけ解放されるまで待つ"""
+        self.requests.append(request)
+        if len(self.requests) == 1:
+            self.release.wait(5)
+            return {"from": "primary"}
+        return {"from": "hedge", "modelId": request["modelId"]}
+
+    def test_fast_response(self):
+        """正常系: 待ち時間内に応答があれば追加のリクエストを送らないことをテスト"""
+        hedger = self.create_hedger()
+        response = hedger.converse({"modelId": "model"}, lambda request: {"from": "primary"})
+        self.assertEqual(response, {"from": "primary"})
+        self.assertEqual(len(hedger.latencies("model")), self.config.min_samples + 1)
+
+    def test_latencies_per_kind(self):
+        """正常系: 応答時間をモデル・呼び出しの種類ごとに記録し、件数が足りない種類では追加のリクエストを送らないことをテスト"""
+        hedger = self.create_hedger()
+        self.release.set()
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse, kind="packed")
+
+        self.assertEqual(response, {"from": "primary"})
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(hedger.latencies("model", "packed")), 1)
+        self.assertEqual(len(hedger.latencies("model")), self.config.min_samples)
+        self.assertIsNone(hedger.hedge_delay("other-model"))
+
+    def test_hedge_wins(self):
+        """正常系: 応答が遅い場合は追加のリクエストを送り、先に返った応答を使うことをテスト"""
+        hedger = self.create_hedger(hedge_model_id="other-model", primary_model_id="model")
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse)
+
+        self.assertEqual(response["from"], "hedge")
+        self.assertEqual(response["modelId"], "other-model")
+        self.assertEqual([request["modelId"] for request in self.requests], ["model", "other-model"])
+
+    def test_hedge_keeps_other_model(self):
+        """正常系: 詳細レビュー以外のモデル(一次判定など)へのリクエストはモデルIDを置き換えないことをテスト"""
+        hedger = self.create_hedger("fast-model", hedge_model_id="other-model", primary_model_id="model")
+        hedger.converse({"modelId": "fast-model"}, self.slow_first_converse)
+
+        self.assertEqual([request["modelId"] for request in self.requests], ["fast-model", "fast-model"])
+
+    def test_hedge_usage(self):
+        """正常系: 破棄したリクエストのトークン使用量が、使ったレスポンスのusageに加わることをテスト"""
+        def converse(request):
+            self.requests.append(request)
+            if len(self.requests) == 1:
+                self.release.wait(5)
+            return {"usage": {"inputTokens": 100, "outputTokens": 10}}
+
+        hedger = self.create_hedger()
+        response = hedger.converse({"modelId": "model"}, converse)
+
+        # 破棄したリクエストは未完了のため、同じ使用量とみなす
+        self.assertEqual(response["usage"], {"inputTokens": 200, "outputTokens": 20})
+
+    def test_hedge_converse(self):
+        """正常系: 追加のリクエストの送信先が指定された場合はそちらに送ることをテスト"""
+        hedge_requests = []
+        deadline = Deadline.after(10)
+        hedger = self.create_hedger(
+            hedge_converse=lambda request, hedge_deadline: hedge_requests.append((request, hedge_deadline)) or {"from": "region"}
+        )
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse, deadline)
+
+        self.assertEqual(response["from"], "region")
+        self.assertNotIn("modelId", response)
+        self.assertEqual(hedge_requests, [({"modelId": "model"}, deadline)])
+
+    def test_deadline_exceeded(self):
+        """異常系: 期限までに応答が返らない場合は待たずにDeadlineExceededErrorを送出することをテスト"""
+        def converse(request):
+            self.release.wait(5)
+            return {"from": "slow"}
+
+        hedger = self.create_hedger()
+        with self.assertRaises(DeadlineExceededError):
+            hedger.converse({"modelId": "model"}, converse, Deadline.after(0.2))
+        with self.assertRaises(DeadlineExceededError):
+            HedgedConverse(self.config).converse({"modelId": "model"}, converse, Deadline.after(0.1))
+
+    def test_without_samples(self):
+        """正常系: 応答時間の件数が足りない間は追加のリクエストを送らないことをテスト"""
+        hedger = HedgedConverse(self.config)
+        self.release.set()
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse)
+        self.assertEqual(response, {"from": "primary"})
+        self.assertEqual(len(self.requests), 1)
+
+    def test_budget_exhausted(self):
+        """正常系: 追加のリクエストの枠がない場合は最初のリクエストの応答を待つことをテスト"""
+        self.config = HedgingConfig(percentile=50, budget_percent=0, min_samples=3)
+        hedger = self.create_hedger()
+        threading.Timer(0.1, self.release.set).start()
+
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse)
+
+        self.assertEqual(response, {"from": "primary"})
+        self.assertEqual(len(self.requests), 1)
+
+    def test_hedge_error(self):
+        """正常系: 追加のリクエストが失敗した場合は最初のリクエストの応答を使うことをテスト"""
+        def hedge_converse(request, deadline):
+            threading.Timer(0.05, self.release.set).start()
+            raise Boto3Exception(service="bedrock")
+
+        hedger = self.create_hedger(hedge_converse=hedge_converse)
+        response = hedger.converse({"modelId": "model"}, self.slow_first_converse)
+        self.assertEqual(response, {"from": "primary"})
+
+    def test_both_error(self):
+        """異常系: 両方のリクエストが失敗した場合は最初のリクエストのエラーを送出することをテスト"""
+        primary_error = ValueError("primary")
+
+        def converse(request):
+            self.release.wait(5)
+            raise primary_error
+
+        def hedge_converse(request, deadline):
+            self.release.set()
+            raise Boto3Exception(service="bedrock")
+
+        hedger = self.create_hedger(hedge_converse=hedge_converse)
+        with self.assertRaises(ValueError) as context:
+            hedger.converse({"modelId": "model"}, converse)
+        self.assertIs(context.exception, primary_error)
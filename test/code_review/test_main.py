@@ -1,9 +1,13 @@
 import base64
+import gzip
 import json
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 
-from code_review.main import code_review_handler
+from code_review.main import code_review_handler, webhook_handler
+from code_review.project import ProjectFile
+from code_review.source_decoder import SourceLimits
+from common.exception import CapacityExceededError, DeadlineExceededError, QuotaExceededError
 
 
 class TestCodeReviewHandler(unittest.TestCase):
@@ -17,6 +21,7 @@ class TestCodeReviewHandler(unittest.TestCase):
         """テスト用のLambdaコンテキストを作成するヘルパーメソッド"""
         context = MagicMock()
         context.aws_request_id = "test-request-id"
+        context.get_remaining_time_in_millis.return_value = 30000
         return context
 
     @patch("code_review.main.container")
@@ -36,7 +41,7 @@ class TestCodeReviewHandler(unittest.TestCase):
 
         response = code_review_handler(event, context)
 
-        mock_service.excute_review.assert_called_once_with(source_code, "python")
+        mock_service.excute_review.assert_called_once_with(source_code, "python", api_key_id=None, deadline=ANY, max_points=None)
         self.assertEqual(response["statusCode"], 200)
         self.assertEqual(json.loads(response["body"]), mock_review_result)
 
@@ -59,10 +64,64 @@ class TestCodeReviewHandler(unittest.TestCase):
 
         response = code_review_handler(event, context)
 
-        mock_service.excute_review.assert_called_once_with(source_code, "python")
+        mock_service.excute_review.assert_called_once_with(source_code, "python", api_key_id=None, deadline=ANY, max_points=None)
         self.assertEqual(response["statusCode"], 200)
         self.assertEqual(json.loads(response["body"]), mock_review_result)
 
+    @patch("code_review.main.container")
+    def test_handler_fields_and_compression(self, mock_container):
+        """正常系: fieldsで項目が絞り込まれ、Accept-Encodingに応じて圧縮されることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.return_value = {
+            "review_result": "NG",
+            "review_points": [{"location": "main", "codeline": 1, "details": "詳細" * 1000}],
+        }
+        source_base64 = base64.b64encode(b"test").decode('utf-8')
+        event = self._create_event({"source_base64": source_base64, "language": "python"})
+        event["headers"] = {"Accept-Encoding": "gzip"}
+        event["queryStringParameters"] = {"fields": "review_points.location,codeline"}
+
+        response = code_review_handler(event, self._create_context())
+        self.assertEqual(response["statusCode"], 200)
+        self.assertNotIn("isBase64Encoded", response)
+        self.assertEqual(json.loads(response["body"]), {"review_points": [{"location": "main", "codeline": 1}]})
+
+        event["queryStringParameters"] = None
+        response = code_review_handler(event, self._create_context())
+        self.assertTrue(response["isBase64Encoded"])
+        body = json.loads(gzip.decompress(base64.b64decode(response["body"])))
+        self.assertEqual(body, mock_service.excute_review.return_value)
+
+    @patch("code_review.main.container")
+    def test_handler_source_gzip_base64(self, mock_container):
+        """正常系: gzip圧縮+Base64化されたソースコードが展開されてレビューされることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.return_value = {"review_result": "OK"}
+        source_code = "print('hello')"
+        event = self._create_event({
+            "source_gzip_base64": base64.b64encode(gzip.compress(source_code.encode('utf-8'))).decode('utf-8'),
+            "language": "python"
+        })
+
+        response = code_review_handler(event, self._create_context())
+
+        mock_service.excute_review.assert_called_once_with(source_code, "python", api_key_id=None, deadline=ANY, max_points=None)
+        self.assertEqual(response["statusCode"], 200)
+
+    @patch("code_review.main.source_limits", SourceLimits(max_bytes=10, max_lines=5))
+    @patch("code_review.main.container")
+    def test_handler_source_too_large(self, mock_container):
+        """異常系: ソースコードがサイズ上限を超える場合に413エラーが返ることをテスト"""
+        for body in (
+            {"source": "print('hello world')", "language": "python"},
+            {"source": "a\n" * 5, "language": "python"},
+            {"source": "a" * 100000, "language": "python"},
+        ):
+            response = code_review_handler(self._create_event(body), self._create_context())
+            self.assertEqual(response["statusCode"], 413)
+
+        mock_container.code_review_service.excute_review.assert_not_called()
+
     @patch("code_review.main.container")
     def test_handler_no_source_base64(self, mock_container):
         """異常系: source_base64がない場合に400エラーが返ることをテスト"""
@@ -103,6 +162,188 @@ class TestCodeReviewHandler(unittest.TestCase):
         self.assertIn("Invalid 'source_base64' parameter", response["body"])
         mock_container.code_review_service.excute_review.assert_not_called()
 
+    @patch("code_review.main.is_valid_callback_url", return_value=True)
+    @patch("code_review.main.container")
+    def test_handler_with_callback_url(self, mock_container, mock_is_valid_callback_url):
+        """正常系: callback_urlが指定された場合にAPIキーを署名鍵として配信が開始されることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_review_result = {"review_result": "OK", "review_points": []}
+        mock_service.excute_review.return_value = mock_review_result
+        source_base64 = base64.b64encode(b"test").decode('utf-8')
+        event = self._create_event({
+            "source_base64": source_base64,
+            "language": "python",
+            "callback_url": "https://example.com/hook",
+        })
+        event["headers"] = {"X-API-Key": "api-key-value"}
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 200)
+        mock_container.webhook_notifier.notify.assert_called_once_with(
+            "https://example.com/hook",
+            "api-key-value",
+            {"request_id": "test-request-id", "review": mock_review_result},
+            deadline=ANY,
+        )
+
+    @patch("code_review.main.container")
+    def test_handler_invalid_callback_url(self, mock_container):
+        """異常系: callback_urlがhttp(s)のURLでない場合に400エラーが返ることをテスト"""
+        source_base64 = base64.b64encode(b"test").decode('utf-8')
+        event = self._create_event({
+            "source_base64": source_base64,
+            "language": "python",
+            "callback_url": "file:///etc/passwd",
+        })
+        event["headers"] = {"x-api-key": "api-key-value"}
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertIn("Invalid 'callback_url' parameter", response["body"])
+        mock_container.code_review_service.excute_review.assert_not_called()
+
+    @patch("code_review.main.is_valid_callback_url", return_value=True)
+    @patch("code_review.main.container")
+    def test_handler_callback_without_api_key(self, mock_container, mock_is_valid_callback_url):
+        """異常系: callback_url指定時にAPIキーヘッダーがない場合に400エラーが返ることをテスト"""
+        source_base64 = base64.b64encode(b"test").decode('utf-8')
+        event = self._create_event({
+            "source_base64": source_base64,
+            "language": "python",
+            "callback_url": "https://example.com/hook",
+        })
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertIn("Invalid 'x-api-key' parameter", response["body"])
+        mock_container.webhook_notifier.notify.assert_not_called()
+
+    @patch("code_review.main.container")
+    def test_handler_passes_api_key_id(self, mock_container):
+        """正常系: API GatewayのAPIキーIDがレビュー処理に渡されることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.return_value = {"review_result": "OK"}
+        event = self._create_event({"source": "print(1)", "language": "python"})
+        event["requestContext"] = {"identity": {"apiKeyId": "key-id-1"}}
+
+        code_review_handler(event, self._create_context())
+
+        mock_service.excute_review.assert_called_once_with("print(1)", "python", api_key_id="key-id-1", deadline=ANY, max_points=None)
+
+    @patch("code_review.main.container")
+    def test_handler_quota_exceeded(self, mock_container):
+        """異常系: トークン予算を超えた場合にRetry-After付きの429エラーが返ることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.side_effect = QuotaExceededError.token_budget(1000, 120)
+        event = self._create_event({"source": "print(1)", "language": "python"})
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 429)
+        self.assertEqual(response["headers"]["Retry-After"], "120")
+
+    @patch("code_review.main.container")
+    def test_handler_capacity_exceeded(self, mock_container):
+        """異常系: Bedrockの1分あたりのトークン数の上限に達している場合にRetry-After付きの503エラーが返ることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.side_effect = CapacityExceededError.tokens_per_minute(3)
+        event = self._create_event({"source": "print(1)", "language": "python"})
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 503)
+        self.assertEqual(response["headers"]["Retry-After"], "3")
+
+    @patch("code_review.main.container")
+    def test_handler_max_points(self, mock_container):
+        """正常系: 指摘事項の上限件数がサービスに渡されることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.return_value = {"review_result": "OK", "review_points": []}
+        event = self._create_event({"source": "print(1)", "language": "python", "max_points": 5})
+
+        code_review_handler(event, self._create_context())
+
+        mock_service.excute_review.assert_called_once_with(
+            "print(1)", "python", api_key_id=None, deadline=ANY, max_points=5
+        )
+
+    @patch("code_review.main.container")
+    def test_handler_invalid_max_points(self, mock_container):
+        """異常系: 指摘事項の上限件数が正の整数でない場合に400エラーが返ることをテスト"""
+        for max_points in (0, -1, "5", 1.5, True):
+            event = self._create_event({"source": "print(1)", "language": "python", "max_points": max_points})
+
+            response = code_review_handler(event, self._create_context())
+
+            self.assertEqual(response["statusCode"], 400)
+            self.assertEqual(json.loads(response["body"]), {"message": "Invalid 'max_points' parameter"})
+        mock_container.code_review_service.excute_review.assert_not_called()
+
+    @patch("code_review.main.container")
+    def test_handler_project(self, mock_container):
+        """正常系: ファイルの配列を指定した場合に、拡張子から言語種別を決めてプロジェクトのレビューを行うことをテスト"""
+        mock_project_service = mock_container.project_review_service
+        mock_review_result = {"review_result": "OK", "files": [{"path": "a.py", "review_result": "OK", "review_points": []}]}
+        mock_project_service.excute_review.return_value = mock_review_result
+        event = self._create_event({
+            "files": [
+                {"path": "a.py", "source": "print(1)"},
+                {"path": "b.ts", "source_base64": base64.b64encode(b"let b = 1;").decode("ascii")},
+            ],
+            "max_points": 3,
+        })
+
+        response = code_review_handler(event, self._create_context())
+
+        mock_project_service.excute_review.assert_called_once_with(
+            [
+                ProjectFile(path="a.py", language="Python", source_code="print(1)"),
+                ProjectFile(path="b.ts", language="TypeScript", source_code="let b = 1;"),
+            ],
+            api_key_id=None, deadline=ANY, max_points=3,
+        )
+        mock_container.code_review_service.excute_review.assert_not_called()
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"]), mock_review_result)
+
+    @patch("code_review.main.container")
+    def test_handler_project_unknown_language(self, mock_container):
+        """異常系: 言語種別の指定がなく、拡張子からも判定できないファイルがある場合に400エラーが返ることをテスト"""
+        event = self._create_event({"files": [{"path": "Makefile", "source": "all:"}]})
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertEqual(json.loads(response["body"]), {"message": "Invalid 'language' parameter"})
+        mock_container.project_review_service.excute_review.assert_not_called()
+
+    @patch("code_review.main.container")
+    def test_handler_passes_deadline(self, mock_container):
+        """正常系: Lambdaの残り実行時間から応答を返す余裕を差し引いた期限が渡されることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.return_value = {"review_result": "OK", "review_points": []}
+        event = self._create_event({"source": "print(1)", "language": "python"})
+
+        code_review_handler(event, self._create_context())
+
+        deadline = mock_service.excute_review.call_args.kwargs["deadline"]
+        self.assertAlmostEqual(deadline.remaining_seconds(), 30 - 1.5, delta=1)
+
+    @patch("code_review.main.container")
+    def test_handler_deadline_exceeded(self, mock_container):
+        """異常系: 期限までにレビューを完了できない場合に504エラーが返ることをテスト"""
+        mock_service = mock_container.code_review_service
+        mock_service.excute_review.side_effect = DeadlineExceededError.timed_out("bedrock:Converse")
+        event = self._create_event({"source": "print(1)", "language": "python"})
+
+        response = code_review_handler(event, self._create_context())
+
+        self.assertEqual(response["statusCode"], 504)
+        self.assertEqual(json.loads(response["body"]), {"message": "The review could not be completed in time"})
+
     @patch("code_review.main.logger")
     @patch("code_review.main.container")
     def test_handler_internal_server_error(self, mock_container, mock_logger):
@@ -118,3 +359,30 @@ class TestCodeReviewHandler(unittest.TestCase):
         self.assertEqual(response["statusCode"], 500)
         self.assertIn("An internal server error occurred", response["body"])
         mock_logger.exception.assert_called_once()
+
+
+class TestWebhookHandler(unittest.TestCase):
+    """webhook_handlerのテストクラス"""
+
+    def _create_record(self, message_id, body):
+        return {"messageId": message_id, "body": body}
+
+    @patch("code_review.main.container")
+    def test_webhook_handler(self, mock_container):
+        """正常系: メッセージごとに期限付きで配信し、処理できなかったメッセージだけを再配信の対象とすることをテスト"""
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        message = {"callback_url": "https://example.com/hook", "secret": "key", "payload": {"a": 1}}
+        event = {"Records": [
+            self._create_record("m-1", json.dumps(message)),
+            self._create_record("m-2", "not json"),
+        ]}
+
+        response = webhook_handler(event, context)
+
+        self.assertEqual(response, {"batchItemFailures": [{"itemIdentifier": "m-2"}]})
+        mock_container.webhook_notifier.deliver.assert_called_once_with(
+            "https://example.com/hook", "key", {"a": 1}, deadline=ANY,
+        )
+        deadline = mock_container.webhook_notifier.deliver.call_args.kwargs["deadline"]
+        self.assertAlmostEqual(deadline.remaining_seconds(), 60 - 1.5, delta=1)
@@ -0,0 +1,266 @@
+import unittest
+from unittest.mock import MagicMock
+
+from code_review import near_duplicate
+from code_review.near_duplicate import (
+    IndexedSource,
+    MinHasher,
+    NearDuplicateConfig,
+    NearDuplicateFromDynamoDB,
+    NearDuplicateFromMemory,
+    NearDuplicateIndex,
+    Neighbor,
+    decode_document,
+    encode_document,
+    extract_regions,
+    index_scope,
+    lsh_bands,
+    plan_reuse,
+    restore_codelines,
+)
+
+
+SOURCE = """\
+def calc(items):
+    total = 0
+    for item in items:
+        if item.price > 100:
+            total += item.price * 2
+        else:
+            total += item.price
+    print(total)
+    return total
+"""
+
+RENAMED_SOURCE = SOURCE.replace("total", "amount").replace("item", "good")
+
+OTHER_SOURCE = """\
+class Reader:
+    def read(self, path):
+        with open(path) as file:
+            return [line.strip() for line in file if line]
+"""
+
+
+def point(codeline):
+    return {"location": "x", "codeline": codeline, "category": "C", "overview": "o", "details": "d", "suggestion": "s"}
+
+
+class TestNearDuplicateConfig(unittest.TestCase):
+    """NearDuplicateConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = NearDuplicateConfig.from_config({"Threshold": "0.9", "ContextLines": "3"})
+        self.assertEqual(config.threshold, 0.9)
+        self.assertEqual(config.context_lines, 3)
+        self.assertEqual(config.num_perm, 64)
+
+
+class TestMinHasher(unittest.TestCase):
+    """MinHasherのテストクラス"""
+
+    def setUp(self):
+        self.hasher = MinHasher()
+
+    def test_renamed_source(self):
+        """正常系: 変数名だけが異なるソースコードは同じ署名になり、無関係なソースコードとは類似度が低いことをテスト"""
+        signature = self.hasher.signature(SOURCE, "python")
+        self.assertEqual(len(signature), 64)
+        self.assertEqual(MinHasher.similarity(signature, self.hasher.signature(RENAMED_SOURCE, "python")), 1.0)
+        self.assertLess(MinHasher.similarity(signature, self.hasher.signature(OTHER_SOURCE, "python")), 0.3)
+
+    def test_deterministic(self):
+        """正常系: 同じシードのインスタンスでは同じ署名となることをテスト"""
+        self.assertEqual(self.hasher.signature(SOURCE, "python"), MinHasher().signature(SOURCE, "python"))
+
+    def test_empty_source(self):
+        """正常系: 字句がないソースコードでも署名を求められることをテスト"""
+        self.assertEqual(len(self.hasher.signature("", "python")), 64)
+        self.assertEqual(MinHasher.similarity([1, 2], [1]), 0.0)
+
+
+class TestLshBands(unittest.TestCase):
+    """lsh_bandsのテストクラス"""
+
+    def test_bands(self):
+        """正常系: バンドごとに番号付きのハッシュ値が求められ、一部が異なる署名でも一致するバンドがあることをテスト"""
+        signature = list(range(64))
+        changed = [99] + signature[1:]
+        bands, changed_bands = lsh_bands(signature, 16), lsh_bands(changed, 16)
+
+        self.assertEqual(len(bands), 16)
+        self.assertTrue(bands[0].startswith("0:"))
+        self.assertNotEqual(bands[0], changed_bands[0])
+        self.assertEqual(bands[1:], changed_bands[1:])
+
+    def test_index_scope(self):
+        """正常系: 言語の表記の揺れは同じ範囲、ルールセットが異なる場合は別の範囲となることをテスト"""
+        self.assertEqual(index_scope(" Python ", "v1", "model"), index_scope("python", "v1", "model"))
+        self.assertNotEqual(index_scope("python", "v1", "model"), index_scope("python", "v2", "model"))
+
+
+class TestPlanReuse(unittest.TestCase):
+    """plan_reuseのテストクラス"""
+
+    def neighbor(self, review_points):
+        return Neighbor(review_key="key", similarity=0.9, source_code=SOURCE, review_points=review_points)
+
+    def test_whitespace_only_changes(self):
+        """正常系: 空行・インデントだけの変更ではレビュー範囲がなく、指摘事項の行番号が付け替えられることをテスト"""
+        source_code = "\n" + SOURCE.replace("    ", "\t")
+        plan = plan_reuse(self.neighbor([point(2), point(5)]), source_code, NearDuplicateConfig())
+
+        self.assertEqual(plan.regions, [])
+        self.assertEqual([p["codeline"] for p in plan.review_points], [3, 6])
+
+    def test_points_without_codeline_are_dropped(self):
+        """正常系: 行番号のない指摘事項は流用しないことをテスト"""
+        plan = plan_reuse(self.neighbor([point(None), point(2)]), SOURCE, NearDuplicateConfig())
+        self.assertEqual([p["codeline"] for p in plan.review_points], [2])
+
+    def test_changed_lines(self):
+        """正常系: 変更された行の指摘事項は流用せず、前後の行を含めた範囲をレビュー範囲とすることをテスト"""
+        source_code = SOURCE.replace("    print(total)\n", "    print(total)\n    log(total)\n")
+        plan = plan_reuse(self.neighbor([point(2), point(8)]), source_code, NearDuplicateConfig(context_lines=1))
+
+        self.assertEqual(plan.regions, [(8, 10)])
+        self.assertEqual([p["codeline"] for p in plan.review_points], [2, 8])
+
+    def test_replaced_line_points_are_dropped(self):
+        """正常系: 書き換えられた行の指摘事項は流用しないことをテスト"""
+        source_code = SOURCE.replace("    return total\n", "    return total * 2\n")
+        plan = plan_reuse(self.neighbor([point(9)]), source_code, NearDuplicateConfig(context_lines=0))
+
+        self.assertEqual(plan.review_points, [])
+        self.assertEqual(plan.regions, [(9, 9)])
+
+    def test_too_many_changes(self):
+        """正常系: 変更された行の割合が上限を超える場合は流用しないことをテスト"""
+        self.assertIsNone(plan_reuse(self.neighbor([]), RENAMED_SOURCE, NearDuplicateConfig()))
+
+
+class TestExtractRegions(unittest.TestCase):
+    """extract_regions・restore_codelinesのテストクラス"""
+
+    def test_extract_and_restore(self):
+        """正常系: 行範囲を取り出したソースコードの行番号を、元の行番号に戻せることをテスト"""
+        extracted, line_numbers = extract_regions(SOURCE, [(1, 2), (8, 9)])
+
+        self.assertEqual(extracted, "def calc(items):\n    total = 0\n\n    print(total)\n    return total\n")
+        self.assertEqual(line_numbers, [1, 2, 0, 8, 9])
+
+        restored = restore_codelines([point(4), point(3), point(None), point(10)], line_numbers)
+        self.assertEqual([p["codeline"] for p in restored], [8, None, None, None])
+
+
+class TestNearDuplicateFromDynamoDB(unittest.TestCase):
+    """NearDuplicateFromDynamoDBのテストクラス"""
+
+    def setUp(self):
+        self.mock_client = MagicMock()
+        self.mock_client.batch_write_item.return_value = {}
+        self.sleep = MagicMock()
+        self.store = NearDuplicateFromDynamoDB(self.mock_client, "index-table", sleep=self.sleep)
+
+    def test_add(self):
+        """正常系: 提出のアイテムとバンドごとのアイテムを1回のBatchWriteItemで保存することをテスト"""
+        self.store.add("scope", ["0:aa", "1:bb"], IndexedSource("key", [1, 2], b"doc"))
+
+        items = [request["PutRequest"]["Item"] for request in self.mock_client.batch_write_item.call_args.kwargs["RequestItems"]["index-table"]]
+        self.assertEqual([item["index_key"]["S"] for item in items], ["scope#source#key", "scope#0:aa", "scope#1:bb"])
+        self.assertEqual(items[0]["document"], {"B": b"doc"})
+        self.assertEqual(items[1]["review_key"], {"S": "key"})
+
+    def test_add_in_chunks(self):
+        """正常系: BatchWriteItemの上限件数ごとに分けて保存することをテスト"""
+        bands = [f"{i}:aa" for i in range(30)]
+        self.store.add("scope", bands, IndexedSource("key", [1], b"doc"))
+
+        requests = [call.kwargs["RequestItems"]["index-table"] for call in self.mock_client.batch_write_item.call_args_list]
+        self.assertEqual([len(request) for request in requests], [25, 6])
+
+    def test_add_retry_unprocessed(self):
+        """正常系: 未処理のアイテムを待機してから再試行することをテスト"""
+        unprocessed = {"index-table": [{"PutRequest": {"Item": {"index_key": {"S": "scope#0:aa"}}}}]}
+        self.mock_client.batch_write_item.side_effect = [{"UnprocessedItems": unprocessed}, {"UnprocessedItems": {}}]
+
+        self.store.add("scope", ["0:aa"], IndexedSource("key", [1], b"doc"))
+
+        self.assertEqual(self.mock_client.batch_write_item.call_count, 2)
+        self.assertEqual(self.mock_client.batch_write_item.call_args.kwargs["RequestItems"], unprocessed)
+        self.sleep.assert_called_once_with(0.05)
+
+    def test_add_unprocessed_exhausted(self):
+        """異常系: 再試行しても未処理のアイテムが残る場合は上限回数で諦めることをテスト"""
+        unprocessed = {"index-table": [{"PutRequest": {"Item": {"index_key": {"S": "scope#0:aa"}}}}]}
+        self.mock_client.batch_write_item.return_value = {"UnprocessedItems": unprocessed}
+
+        with self.assertLogs(near_duplicate.logger, "WARNING"):
+            self.store.add("scope", ["0:aa"], IndexedSource("key", [1], b"doc"))
+
+        self.assertEqual(self.mock_client.batch_write_item.call_count, near_duplicate.BATCH_RETRY_MAX)
+
+    def test_add_too_large(self):
+        """正常系: 保存上限を超える提出は索引に追加しないことをテスト"""
+        self.store.add("scope", ["0:aa"], IndexedSource("key", [1], b"x" * (near_duplicate.MAX_DOCUMENT_BYTES + 1)))
+        self.mock_client.batch_write_item.assert_not_called()
+
+    def test_find(self):
+        """正常系: バンドのアイテムから候補のキーを求め、提出のアイテムを取得することをテスト"""
+        signature = near_duplicate.array("I", [7, 8]).tobytes()
+        self.mock_client.batch_get_item.side_effect = [
+            {"Responses": {"index-table": [{"review_key": {"S": "key"}}, {"review_key": {"S": "key"}}]}},
+            {"Responses": {"index-table": [
+                {"index_key": {"S": "scope#source#key"}, "signature": {"B": signature}, "document": {"B": b"doc"}},
+            ]}},
+        ]
+
+        sources = self.store.find("scope", ["0:aa", "1:bb"])
+
+        self.assertEqual(sources, [IndexedSource("key", [7, 8], b"doc")])
+        second_request = self.mock_client.batch_get_item.call_args_list[1].kwargs["RequestItems"]["index-table"]
+        self.assertEqual(second_request["Keys"], [{"index_key": {"S": "scope#source#key"}}])
+
+    def test_find_without_candidates(self):
+        """正常系: 一致するバンドがない場合は提出のアイテムを取得しないことをテスト"""
+        self.mock_client.batch_get_item.return_value = {"Responses": {"index-table": []}}
+        self.assertEqual(self.store.find("scope", ["0:aa"]), [])
+        self.assertEqual(self.mock_client.batch_get_item.call_count, 1)
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    """NearDuplicateIndexのテストクラス"""
+
+    def setUp(self):
+        self.index = NearDuplicateIndex(NearDuplicateFromMemory())
+
+    def test_find_renamed(self):
+        """正常系: 変数名だけが異なる提出を、保存したソースコードと指摘事項とともに見つけられることをテスト"""
+        self.index.add("scope", "key", SOURCE, "python", [point(2)])
+
+        neighbor = self.index.find("scope", RENAMED_SOURCE, "python")
+
+        self.assertEqual(neighbor.review_key, "key")
+        self.assertEqual(neighbor.similarity, 1.0)
+        self.assertEqual((neighbor.source_code, neighbor.review_points), (SOURCE, [point(2)]))
+        self.assertIsNone(self.index.find("other-scope", RENAMED_SOURCE, "python"))
+
+    def test_below_threshold(self):
+        """正常系: 類似度がしきい値未満の提出は返さないことをテスト"""
+        self.index.add("scope", "key", SOURCE, "python", [])
+        self.assertIsNone(self.index.find("scope", OTHER_SOURCE, "python"))
+
+    def test_store_error(self):
+        """正常系: 索引の障害時は見つからなかったものとして扱い、追加の失敗も無視することをテスト"""
+        store = MagicMock()
+        store.find.side_effect = RuntimeError("unavailable")
+        store.add.side_effect = RuntimeError("unavailable")
+        index = NearDuplicateIndex(store)
+
+        self.assertIsNone(index.find("scope", SOURCE, "python"))
+        index.add("scope", "key", SOURCE, "python", [])
+
+    def test_document_round_trip(self):
+        """正常系: ソースコードと指摘事項を圧縮して保存し、元に戻せることをテスト"""
+        self.assertEqual(decode_document(encode_document(SOURCE, [point(1)])), (SOURCE, [point(1)]))
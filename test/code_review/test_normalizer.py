@@ -0,0 +1,121 @@
+import unittest
+
+from code_review.normalizer import NormalizerConfig, SourceNormalizer
+
+
+class TestNormalizerConfig(unittest.TestCase):
+    """NormalizerConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMの文字列設定から生成され、未設定の項目は既定値となることをテスト"""
+        config = NormalizerConfig.from_config({"IndentWidth": "4", "CollapseBlankLines": "false"})
+        self.assertEqual(config.indent_width, 4)
+        self.assertFalse(config.collapse_blank_lines)
+        self.assertTrue(config.strip_trailing_whitespace)
+
+
+class TestSourceNormalizer(unittest.TestCase):
+    """SourceNormalizerのテストクラス"""
+
+    def setUp(self):
+        self.normalizer = SourceNormalizer()
+
+    def test_trailing_whitespace_and_blank_lines(self):
+        """正常系: 行末の空白が削除され、連続する空行が1行にまとめられることをテスト"""
+        result = self.normalizer.normalize("a = 1   \n\n\n\nb = 2\n")
+        self.assertEqual(result.text, "a = 1\n\nb = 2\n")
+        self.assertEqual(result.line_map, [1, 2, 5])
+        self.assertEqual(result.saved_chars, 5)
+
+    def test_indentation(self):
+        """正常系: タブと空白が混在したインデントが統一された幅に揃えられることをテスト"""
+        source = "if x:\n\tif y:\n        z()\n    w()\n"
+        result = self.normalizer.normalize(source)
+        self.assertEqual(result.text, "if x:\n  if y:\n    z()\n  w()\n")
+
+    def test_indentation_with_doc_comment(self):
+        """正常系: ドキュメントコメントの継続行(1桁のインデント)があっても、インデントが縮められることをテスト"""
+        source = "\n".join([
+            "/**",
+            " * 合計を求める",
+            " */",
+            "public class Calc {",
+            "    public int sum(int a, int b) {",
+            "        return a + b;",
+            "    }",
+            "}",
+        ]) + "\n"
+        result = self.normalizer.normalize(source)
+
+        self.assertEqual(result.text.splitlines()[3:7], [
+            "public class Calc {",
+            "  public int sum(int a, int b) {",
+            "    return a + b;",
+            "  }",
+        ])
+        self.assertEqual(result.text.splitlines()[1], " * 合計を求める")
+        self.assertGreater(result.saved_chars, 0)
+        self.assertGreater(result.saved_tokens, 0)
+
+    def test_no_savings_returns_original(self):
+        """正常系: 正規化しても削減できない場合は、元のソースコードをそのまま返すことをテスト"""
+        source = "if x:\n  y()\n"
+        result = self.normalizer.normalize(source)
+
+        self.assertEqual(result.text, source)
+        self.assertEqual(result.saved_tokens, 0)
+        self.assertEqual(result.to_original_line(2), 2)
+
+    def test_long_string_literal(self):
+        """正常系: 長い文字列リテラルが文字数入りの目印に置き換えられることをテスト"""
+        source = 'message = "' + "x" * 300 + '"\n'
+        result = self.normalizer.normalize(source)
+        self.assertEqual(result.text, 'message = "<<string 300 chars>>"\n')
+        self.assertGreater(result.saved_tokens, 0)
+
+    def test_base64_blob(self):
+        """正常系: Base64のような長い文字列が目印に置き換えられることをテスト"""
+        blob = "QUJD" * 50
+        result = SourceNormalizer(NormalizerConfig(max_literal_chars=0)).normalize(f"data = '{blob}'\n")
+        self.assertEqual(result.text, "data = '<<base64 200 chars>>'\n")
+
+    def test_data_literal_lines(self):
+        """正常系: 連続するデータリテラル行が1行の目印にまとめられ、行番号の対応が保たれることをテスト"""
+        rows = ["    1, 2, 3, 4," for _ in range(10)]
+        source = "\n".join(["int[] table = {"] + rows + ["};", "Use(table);"])
+        result = self.normalizer.normalize(source)
+
+        self.assertEqual(result.text.splitlines(), [
+            "int[] table = {",
+            "  <<data literal omitted: original lines 2-11>>",
+            "};",
+            "Use(table);",
+        ])
+        self.assertEqual(result.to_original_line(4), 13)
+
+    def test_short_data_literal_is_kept(self):
+        """正常系: 行数が少ないデータリテラルはそのまま残ることをテスト"""
+        source = "xs = [\n    1, 2,\n    3, 4,\n]\n"
+        self.assertEqual(self.normalizer.normalize(source).text, "xs = [\n  1, 2,\n  3, 4,\n]\n")
+
+    def test_generated_region(self):
+        """正常系: 自動生成コード領域が1行の目印にまとめられることをテスト"""
+        source = "\n".join([
+            "class Form1 {",
+            "    #region Windows Form Designer generated code",
+            "    void InitializeComponent() {",
+            "    }",
+            "    #endregion",
+            "    void Main() {}",
+            "}",
+        ])
+        result = self.normalizer.normalize(source)
+        self.assertIn("<<generated code omitted: original lines 2-5>>", result.text)
+        self.assertEqual(result.to_original_line(3), 6)
+
+    def test_remap_review_points(self):
+        """正常系: レビュー結果のcodelineが元の行番号に書き換えられ、範囲外は丸められることをテスト"""
+        result = self.normalizer.normalize("a\n\n\n\nb\n")
+        review = {"review_points": [{"codeline": 3}, {"codeline": 99}, {"codeline": "x"}]}
+        result.remap_review_points(review)
+        self.assertEqual([point["codeline"] for point in review["review_points"]], [5, 5, "x"])
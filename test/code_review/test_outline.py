@@ -0,0 +1,93 @@
+import unittest
+
+from code_review.outline import OutlineConfig, extract_outline
+
+
+PYTHON_SOURCE = "\n".join([
+    "import os",                        # 1
+    "",                                 # 2
+    "",                                 # 3
+    "@cache",                           # 4
+    "def load(path):",                  # 5
+    '    """設定を読み込む"""',            # 6
+    "    with open(path) as f:",        # 7
+    "        text = f.read()",          # 8
+    "    value = text.strip()",         # 9
+    "    return value",                 # 10
+    "",                                 # 11
+    "",                                 # 12
+    "class Store:",                     # 13
+    "    def save(self, value):",       # 14
+    "        self.value = value",       # 15
+    "        self.count += 1",          # 16
+    "        self.saved = True",        # 17
+    "        return self",              # 18
+])
+
+
+class TestExtractOutline(unittest.TestCase):
+    """extract_outlineのテストクラス"""
+
+    def test_outline(self):
+        """正常系: 宣言・デコレータと本体の先頭の行を残し、2行以上続く省略を元の行範囲を示すコメントにすることをテスト"""
+        outline = extract_outline(PYTHON_SOURCE, "python", OutlineConfig(body_lines=2))
+
+        self.assertEqual(outline.text, "\n".join([
+            "import os",
+            "@cache",
+            "def load(path):",
+            '    """設定を読み込む"""',
+            "    with open(path) as f:",
+            "        text = f.read()",
+            "    # ... (4 lines omitted: 9-12)",
+            "class Store:",
+            "    def save(self, value):",
+            "        self.value = value",
+            "        self.count += 1",
+            "        # ... (2 lines omitted: 17-18)",
+        ]) + "\n")
+        self.assertEqual(outline.line_numbers, [1, 4, 5, 6, 7, 8, 0, 13, 14, 15, 16, 0])
+
+    def test_outline_declarations_only(self):
+        """正常系: 本体の行を残すと閾値を超える場合は、宣言の行だけのアウトラインにすることをテスト"""
+        outline = extract_outline(PYTHON_SOURCE, "python", OutlineConfig(threshold_tokens=1, body_lines=2))
+
+        self.assertEqual(outline.line_numbers, [1, 4, 5, 0, 13, 14, 0])
+
+    def test_outline_csharp(self):
+        """正常系: 波括弧の言語では、複数行にわたる宣言を本体の開始の波括弧まで残すことをテスト"""
+        source_code = "\n".join([
+            "public class Calc {",
+            "    public int Sum(",
+            "        int a,",
+            "        int b)",
+            "    {",
+            "        var total = a + b;",
+            "        Log(total);",
+            "        return total;",
+            "    }",
+            "}",
+        ])
+        outline = extract_outline(source_code, "C#", OutlineConfig(body_lines=1, module_lines=0))
+
+        self.assertEqual(outline.line_numbers, [1, 2, 3, 4, 5, 6, 0])
+        self.assertIn("// ... (4 lines omitted: 7-10)", outline.text)
+
+    def test_unsupported(self):
+        """正常系: 未対応の言語・宣言のないソースコードではNoneを返すことをテスト"""
+        self.assertIsNone(extract_outline("MOVE A TO B.", "COBOL"))
+        self.assertIsNone(extract_outline("x = 1\ny = 2\n", "python"))
+
+
+class TestOutlineConfig(unittest.TestCase):
+    """OutlineConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMパラメータから設定が読み込まれ、未設定の項目は既定値となることをテスト"""
+        config = OutlineConfig.from_config({"ThresholdTokens": "4000"})
+        self.assertEqual(config.threshold_tokens, 4000)
+        self.assertEqual(config.body_lines, OutlineConfig().body_lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
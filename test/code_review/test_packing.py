@@ -0,0 +1,128 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from code_review.clone_detect import ClonePair
+from code_review.packing import PackedReviewPrompt, PackedSource, PackingConfig, pack, split_packed_result, split_usage
+from code_review.rules import CodingRules
+
+
+def _sources():
+    return [
+        PackedSource(file_id="f1", source_code="a = 1\n"),
+        PackedSource(file_id="f2", source_code="b = 2\nprint(b)"),
+    ]
+
+
+def _point(codeline):
+    return {"location": "x", "codeline": codeline, "category": "c", "overview": "o", "details": "d", "suggestion": "s"}
+
+
+class TestPack(unittest.TestCase):
+    """packのテストクラス"""
+
+    def test_pack(self):
+        """正常系: 先頭から順に、推定トークン数の合計と最大ファイル数の範囲でまとめることをテスト"""
+        config = PackingConfig(max_prompt_tokens=100, max_files=3)
+        self.assertEqual(pack([40, 40, 30, 10, 10, 10, 10], config), [[0, 1], [2, 3, 4], [5, 6]])
+
+    def test_pack_large_source(self):
+        """正常系: 上限を超える1件は単独のまとまりとなることをテスト"""
+        self.assertEqual(pack([150, 10], PackingConfig(max_prompt_tokens=100)), [[0], [1]])
+        self.assertEqual(pack([]), [])
+
+
+class TestPackedReviewPrompt(unittest.TestCase):
+    """PackedReviewPromptのテストクラス"""
+
+    def setUp(self):
+        coding_rules = MagicMock(spec=CodingRules)
+        coding_rules.to_string.return_value = "- Category1: Rule1\n"
+        self.prompt = PackedReviewPrompt(_sources(), "Python", coding_rules, max_points=3)
+
+    def test_create_user_prompt(self):
+        """正常系: 各ファイルを区切りの行で囲んで連結することをテスト"""
+        self.assertEqual(
+            self.prompt.create_user_prompt(),
+            "===== BEGIN FILE f1 =====\na = 1\n===== END FILE f1 =====\n"
+            "===== BEGIN FILE f2 =====\nb = 2\nprint(b)\n===== END FILE f2 =====\n",
+        )
+
+    def test_create_system_prompt(self):
+        """正常系: ファイルIDごとの出力形式と、ファイルごとの行番号の数え方を示すことをテスト"""
+        system_prompt = self.prompt.create_system_prompt()
+        self.assertIn("file IDs (f1, f2)", system_prompt)
+        self.assertIn('{"<file id>": {"review_result"', system_prompt)
+        self.assertIn("at most 3", system_prompt)
+        self.assertNotIn("[Duplicate Code Candidates]", system_prompt)
+
+    def test_create_duplicate_candidates(self):
+        """正常系: 重複コードの候補をファイルIDごとに示すことをテスト"""
+        sources = [
+            PackedSource(file_id="f1", source_code="a = 1\n"),
+            PackedSource(file_id="f2", source_code="b = 2\n", duplicate_candidates=(ClonePair(1, 2, 5, 6, 30),)),
+        ]
+        prompt = PackedReviewPrompt(sources, "Python", self.prompt.coding_rules)
+        self.assertIn("- f2: lines 1-2 and lines 5-6 (30 tokens)\n", prompt.create_system_prompt())
+
+
+class TestSplitPackedResult(unittest.TestCase):
+    """split_packed_resultのテストクラス"""
+
+    def test_split(self):
+        """正常系: ファイルIDごとのレビュー結果に分けることをテスト"""
+        text = json.dumps({
+            "f1": {"review_result": "OK", "review_points": []},
+            "f2": {"review_result": "NG", "review_points": [_point(2)]},
+        })
+        results = split_packed_result(text, _sources())
+        self.assertEqual(results["f1"], {"review_result": "OK", "review_points": []})
+        self.assertEqual(results["f2"]["review_points"], [_point(2)])
+
+    def test_split_truncated(self):
+        """異常系: 出力が途中で打ち切られた場合は、完結しているファイルの結果だけを取り出すことをテスト"""
+        text = json.dumps({
+            "f1": {"review_result": "NG", "review_points": [_point(1)]},
+            "f2": {"review_result": "NG", "review_points": [_point(2)]},
+        })
+        results = split_packed_result(text[:-40], _sources())
+        self.assertEqual(results["f1"]["review_points"], [_point(1)])
+        self.assertIsNone(results["f2"])
+
+    def test_split_invalid(self):
+        """異常系: 形式が正しくない結果・範囲外の指摘行・IDのないファイルはNoneとなることをテスト"""
+        self.assertEqual(
+            split_packed_result(json.dumps({"f1": {"review_result": "maybe"}, "f2": {"review_result": "NG"}}), _sources()),
+            {"f1": None, "f2": {"review_result": "NG", "review_points": []}},
+        )
+        results = split_packed_result(json.dumps({"f1": {"review_result": "NG", "review_points": [_point(5)]}}), _sources())
+        self.assertEqual(results, {"f1": None, "f2": None})
+        self.assertEqual(split_packed_result("not json", _sources()), {"f1": None, "f2": None})
+
+
+class TestSplitUsage(unittest.TestCase):
+    """split_usageのテストクラス"""
+
+    def test_split_usage(self):
+        """正常系: 使用量を等分し、割り切れない分を最初のソースコードに含めることをテスト"""
+        usages = split_usage({"inputTokens": 100, "outputTokens": 41, "metrics": "x"}, 3)
+        self.assertEqual(usages, [
+            {"inputTokens": 34, "outputTokens": 15},
+            {"inputTokens": 33, "outputTokens": 13},
+            {"inputTokens": 33, "outputTokens": 13},
+        ])
+
+
+class TestPackingConfig(unittest.TestCase):
+    """PackingConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMパラメータから設定が読み込まれ、未設定の項目は既定値となることをテスト"""
+        config = PackingConfig.from_config({"MaxPromptTokens": "2000", "MaxFiles": "4"})
+        self.assertEqual(config.max_prompt_tokens, 2000)
+        self.assertEqual(config.max_files, 4)
+        self.assertEqual(config.max_source_tokens, PackingConfig().max_source_tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()
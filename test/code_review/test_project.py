@@ -0,0 +1,171 @@
+import unittest
+from unittest.mock import MagicMock
+
+from code_review.project import (
+    FileSummaryCache, ProjectConfig, ProjectFile, ProjectReviewService, SymbolIndex, summarize,
+)
+
+
+CUSTOMER_SOURCE = "\n".join([
+    "namespace Shop {",
+    "    public class Customer {",
+    "        public string Name { get; set; }",
+    "        public int CalcPoint(int amount) {",
+    "            return amount / 100;",
+    "        }",
+    "    }",
+    "}",
+])
+
+ORDER_SOURCE = "\n".join([
+    "namespace Shop {",
+    "    public class Order {",
+    "        // Customer は購入者",
+    "        public int Total(Customer customer, int amount) {",
+    "            return customer.CalcPoint(amount);",
+    "        }",
+    "    }",
+    "}",
+])
+
+LOGGER_SOURCE = "\n".join([
+    "public static class Logger {",
+    "    public static void Write(string message) {",
+    "    }",
+    "}",
+])
+
+
+def _project_files():
+    return [
+        ProjectFile(path="Customer.cs", language="C#", source_code=CUSTOMER_SOURCE),
+        ProjectFile(path="Order.cs", language="C#", source_code=ORDER_SOURCE),
+        ProjectFile(path="Logger.cs", language="C#", source_code=LOGGER_SOURCE),
+    ]
+
+
+class TestSummarize(unittest.TestCase):
+    """summarizeのテストクラス"""
+
+    def test_summarize(self):
+        """正常系: 関数・クラスの宣言の行と、コメント・文字列を除いた参照している名前を取り出すことをテスト"""
+        summary = summarize(ORDER_SOURCE, "C#")
+
+        self.assertEqual(summary.definitions, {"Order", "Total"})
+        self.assertEqual(
+            summary.declarations,
+            ("public class Order {", "public int Total(Customer customer, int amount) {"),
+        )
+        self.assertIn("CalcPoint", summary.references)
+        self.assertNotIn("購入者", summary.references)
+
+    def test_summarize_max_declarations(self):
+        """正常系: 宣言の行が上限件数までに絞り込まれることをテスト"""
+        source_code = "\n".join(f"def func{number}():\n    pass" for number in range(5))
+        self.assertEqual(len(summarize(source_code, "python", max_declarations=2).declarations), 2)
+
+    def test_summarize_unsupported_language(self):
+        """正常系: 未対応の言語では宣言のない要約となることをテスト"""
+        summary = summarize("MOVE A TO B.", "COBOL")
+        self.assertEqual(summary.declarations, ())
+        self.assertEqual(summary.definitions, frozenset())
+
+
+class TestFileSummaryCache(unittest.TestCase):
+    """FileSummaryCacheのテストクラス"""
+
+    def test_get_cached(self):
+        """正常系: 同じソースコードの要約は作り直さず、上限を超えると古いものから破棄することをテスト"""
+        cache = FileSummaryCache(max_entries=2)
+        first = cache.get(CUSTOMER_SOURCE, "C#")
+
+        self.assertIs(cache.get(CUSTOMER_SOURCE, "C#"), first)
+
+        cache.get(ORDER_SOURCE, "C#")
+        cache.get(LOGGER_SOURCE, "C#")
+        self.assertIsNot(cache.get(CUSTOMER_SOURCE, "C#"), first)
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """SymbolIndexのテストクラス"""
+
+    def setUp(self):
+        self.files = _project_files()
+        self.index = SymbolIndex(self.files, [summarize(file.source_code, file.language) for file in self.files])
+
+    def test_neighbors(self):
+        """正常系: 参照している・参照されているファイルだけが関連ファイルとなることをテスト"""
+        self.assertEqual(self.index.neighbors(1, max_neighbors=3), [0])
+        self.assertEqual(self.index.neighbors(0, max_neighbors=3), [1])
+        self.assertEqual(self.index.neighbors(2, max_neighbors=3), [])
+
+    def test_neighbors_duplicated_definitions(self):
+        """正常系: 同じ名前を宣言しているファイルが、参照しているファイルより優先されることをテスト"""
+        files = self.files + [ProjectFile(
+            path="Point.cs", language="C#", source_code="public class Point {\n    public int CalcPoint(int amount) {\n    }\n}",
+        )]
+        index = SymbolIndex(files, [summarize(file.source_code, file.language) for file in files])
+
+        self.assertEqual(index.neighbors(0, max_neighbors=3), [3, 1])
+        self.assertEqual(index.neighbors(0, max_neighbors=1), [3])
+
+    def test_related_files(self):
+        """正常系: 関連ファイルのパスと宣言の行を、最大文字数までの要約にすることをテスト"""
+        related_files = self.index.related_files(1, ProjectConfig())
+        self.assertEqual(
+            related_files,
+            "- Customer.cs\n  public class Customer {\n  public int CalcPoint(int amount) {",
+        )
+
+        truncated = self.index.related_files(1, ProjectConfig(max_summary_chars=40))
+        self.assertEqual(truncated, "- Customer.cs\n  public class Customer {")
+
+
+class TestProjectReviewService(unittest.TestCase):
+    """ProjectReviewServiceのテストクラス"""
+
+    def test_excute_review(self):
+        """正常系: ファイルごとに関連ファイルの要約を添えてレビューし、結果をファイルごとにまとめることをテスト"""
+        mock_review_service = MagicMock()
+        mock_review_service.excute_review.side_effect = lambda source_code, language, **kwargs: (
+            {"review_result": "NG", "review_points": [{"codeline": 1}]} if source_code == ORDER_SOURCE
+            else {"review_result": "OK", "review_points": []}
+        )
+        service = ProjectReviewService(mock_review_service, ProjectConfig(max_workers=2))
+
+        result = service.excute_review(_project_files(), api_key_id="key-1", max_points=5)
+
+        self.assertEqual(result["review_result"], "NG")
+        self.assertEqual(
+            [(file["path"], file["language"], file["review_result"]) for file in result["files"]],
+            [("Customer.cs", "C#", "OK"), ("Order.cs", "C#", "NG"), ("Logger.cs", "C#", "OK")],
+        )
+        calls = {call.args[0]: call.kwargs for call in mock_review_service.excute_review.call_args_list}
+        self.assertIn("- Customer.cs", calls[ORDER_SOURCE]["related_files"])
+        self.assertEqual(calls[LOGGER_SOURCE]["related_files"], "")
+        self.assertEqual(calls[ORDER_SOURCE]["api_key_id"], "key-1")
+        self.assertEqual(calls[ORDER_SOURCE]["max_points"], 5)
+
+    def test_excute_review_error(self):
+        """異常系: いずれかのファイルのレビューで例外が発生した場合は、その例外が送出されることをテスト"""
+        mock_review_service = MagicMock()
+        mock_review_service.excute_review.side_effect = RuntimeError("failed")
+        service = ProjectReviewService(mock_review_service)
+
+        with self.assertRaises(RuntimeError):
+            service.excute_review(_project_files())
+
+
+class TestProjectConfig(unittest.TestCase):
+    """ProjectConfigのテストクラス"""
+
+    def test_from_config(self):
+        """正常系: SSMパラメータから設定が読み込まれ、未設定の項目は既定値となることをテスト"""
+        config = ProjectConfig.from_config({"MaxWorkers": "8", "MaxNeighbors": "2"})
+        self.assertEqual(config.max_workers, 8)
+        self.assertEqual(config.max_neighbors, 2)
+        self.assertEqual(config.max_summary_chars, ProjectConfig().max_summary_chars)
+
+
+if __name__ == "__main__":
+    unittest.main()
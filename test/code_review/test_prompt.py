@@ -1,7 +1,10 @@
+import json
 import unittest
 from unittest.mock import MagicMock
 
-from code_review.prompt import CodeReviewPrompt, RESPONSE_FORMAT
+from code_review.clone_detect import ClonePair
+from code_review.compact_schema import CompactResponseSchema
+from code_review.prompt import CodeReviewPrompt, RESPONSE_FORMAT, RESPONSE_JSON_SCHEMA
 from code_review.rules import CodingRules
 
 
@@ -39,3 +42,109 @@ class TestCodeReviewPrompt(unittest.TestCase):
         self.assertIn(self.mock_coding_rules.to_string.return_value, system_prompt)
         self.assertIn(RESPONSE_FORMAT, system_prompt)
         self.mock_coding_rules.to_string.assert_called_once()
+
+    def test_create_system_prompt_with_compact_schema(self):
+        """正常系: 短縮形式を指定した場合に、番号付きのルールと短縮形式のレスポンス例が含まれることをテスト"""
+        self.mock_coding_rules.to_indexed_string.return_value = "- [1] Category1: Rule1\n"
+        schema = CompactResponseSchema()
+        prompt = CodeReviewPrompt(
+            source_code=self.source_code,
+            language=self.language,
+            coding_rules=self.mock_coding_rules,
+            response_schema=schema,
+        )
+        system_prompt = prompt.create_system_prompt()
+
+        self.assertIn("- [1] Category1: Rule1\n", system_prompt)
+        self.assertIn(schema.response_format(), system_prompt)
+        self.assertNotIn(RESPONSE_FORMAT, system_prompt)
+        self.assertNotIn("`suggestion`", system_prompt)
+
+    def test_create_system_prompt_with_max_points(self):
+        """正常系: 上限件数を指定した場合に、件数と重大度順の指示がシステムプロンプトに含まれることをテスト"""
+        prompt = CodeReviewPrompt(
+            source_code=self.source_code,
+            language=self.language,
+            coding_rules=self.mock_coding_rules,
+            max_points=10,
+        )
+        system_prompt = prompt.create_system_prompt()
+
+        self.assertIn("- Report **at most 10** issues. List them in order of severity", system_prompt)
+        self.assertNotIn("at most", self.prompt.create_system_prompt())
+
+    def test_create_tool_config(self):
+        """正常系: レビュー結果を受け取るツールの呼び出しが強制され、スキーマがRESPONSE_FORMATと同じキーを持つことをテスト"""
+        tool_config = self.prompt.create_tool_config()
+
+        tool_spec = tool_config["tools"][0]["toolSpec"]
+        self.assertEqual(tool_config["toolChoice"], {"tool": {"name": tool_spec["name"]}})
+        self.assertIs(tool_spec["inputSchema"]["json"], RESPONSE_JSON_SCHEMA)
+        response_format = json.loads(RESPONSE_FORMAT)
+        self.assertEqual(set(RESPONSE_JSON_SCHEMA["properties"]), set(response_format))
+        self.assertEqual(
+            set(RESPONSE_JSON_SCHEMA["properties"]["review_points"]["items"]["properties"]),
+            set(response_format["review_points"][0]),
+        )
+
+    def test_create_tool_config_with_compact_schema(self):
+        """正常系: 短縮形式を指定した場合は短縮形式のスキーマを使うことをテスト"""
+        schema = CompactResponseSchema(include_suggestion=False)
+        prompt = CodeReviewPrompt(self.source_code, self.language, self.mock_coding_rules, response_schema=schema)
+
+        json_schema = prompt.create_tool_config()["tools"][0]["toolSpec"]["inputSchema"]["json"]
+
+        self.assertEqual(json_schema, schema.json_schema())
+        self.assertEqual(json_schema["properties"]["p"]["items"]["required"], ["l", "n", "c", "o", "d"])
+
+    def test_create_tool_system_prompt(self):
+        """正常系: 構造化出力用のシステムプロンプトは出力形式の説明を含まず、従来より短いことをテスト"""
+        system_prompt = self.prompt.create_tool_system_prompt()
+
+        self.assertIn(self.mock_coding_rules.to_string.return_value, system_prompt)
+        self.assertIn("`submit_review` tool", system_prompt)
+        self.assertNotIn(RESPONSE_FORMAT, system_prompt)
+        self.assertNotIn("escape", system_prompt)
+        self.assertLess(len(system_prompt), len(self.prompt.create_system_prompt()))
+
+    def test_create_system_prompt_with_duplicate_candidates(self):
+        """正常系: 重複コードの候補がある場合に、候補の行範囲がシステムプロンプトに含まれることをテスト"""
+        prompt = CodeReviewPrompt(
+            source_code=self.source_code,
+            language=self.language,
+            coding_rules=self.mock_coding_rules,
+            duplicate_candidates=[ClonePair(1, 5, 10, 14, 60)],
+        )
+        system_prompt = prompt.create_system_prompt()
+
+        self.assertIn("[Duplicate Code Candidates]", system_prompt)
+        self.assertIn("- lines 1-5 and lines 10-14 (60 tokens)\n", system_prompt)
+        self.assertNotIn("[Duplicate Code Candidates]", self.prompt.create_system_prompt())
+
+    def test_create_system_prompt_with_related_files(self):
+        """正常系: 関連ファイルの要約がある場合に、両方の出力形式のシステムプロンプトに含まれることをテスト"""
+        related_files = "- Models/Customer.cs\n  public class Customer"
+        prompt = CodeReviewPrompt(
+            source_code=self.source_code,
+            language=self.language,
+            coding_rules=self.mock_coding_rules,
+            related_files=related_files,
+        )
+
+        self.assertIn("[Related Files]", prompt.create_system_prompt())
+        self.assertIn(related_files, prompt.create_system_prompt())
+        self.assertIn(related_files, prompt.create_tool_system_prompt())
+        self.assertNotIn("[Related Files]", self.prompt.create_system_prompt())
+
+    def test_create_system_prompt_with_outline(self):
+        """正常系: アウトラインの場合に、構造についての観点に絞る指示がシステムプロンプトに含まれることをテスト"""
+        prompt = CodeReviewPrompt(
+            source_code=self.source_code,
+            language=self.language,
+            coding_rules=self.mock_coding_rules,
+            outline=True,
+        )
+
+        self.assertIn("[Outline]", prompt.create_system_prompt())
+        self.assertIn("[Outline]", prompt.create_tool_system_prompt())
+        self.assertNotIn("[Outline]", self.prompt.create_system_prompt())
@@ -0,0 +1,169 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from code_review.rate_limiter import (
+    Reservation,
+    TokenBucketFromDynamoDB,
+    TokenBucketFromMemory,
+    TokenRateLimiter,
+)
+from common.exception import CapacityExceededError
+
+
+class LocalDynamoDBStandIn:
+    """GetItem・条件付きPutItem・UpdateItemのADDだけを再現したDynamoDBクライアントの代役(テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = {}
+        # 次のPutItemの直前に他のコンテナが書き込んだことにする回数
+        self.interleaved_writes = 0
+
+    def get_item(self, TableName, Key, ConsistentRead):
+        item = self.items.get(Key["bucket_id"]["S"])
+        return {"Item": dict(item)} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeValues=None):
+        bucket_id = Item["bucket_id"]["S"]
+        with self._lock:
+            if self.interleaved_writes:
+                self.interleaved_writes -= 1
+                current = self.items.get(bucket_id)
+                if current:
+                    current["updated_at"] = {"N": str(float(current["updated_at"]["N"]) + 0.001)}
+            current = self.items.get(bucket_id)
+            if ExpressionAttributeValues:
+                matched = current is not None and (
+                    current["tokens"] == ExpressionAttributeValues[":previous_tokens"]
+                    and current["updated_at"] == ExpressionAttributeValues[":previous_updated_at"]
+                )
+            else:
+                matched = current is None
+            if not matched:
+                error_response = {"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}}
+                raise ClientError(error_response, "PutItem")
+            self.items[bucket_id] = dict(Item)
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression, ExpressionAttributeValues):
+        with self._lock:
+            item = self.items[Key["bucket_id"]["S"]]
+            item["tokens"] = {"N": str(float(item["tokens"]["N"]) + float(ExpressionAttributeValues[":tokens"]["N"]))}
+
+
+class TestTokenBucketFromMemory(unittest.TestCase):
+    """TokenBucketFromMemoryのテストクラス"""
+
+    def test_acquire_and_refill(self):
+        """正常系: 容量まで取り出せ、足りない場合は補充されるまでの秒数を返すことをテスト"""
+        store = TokenBucketFromMemory()
+        self.assertEqual(store.try_acquire("b", 60, 100, 10, now=0), 0)
+        self.assertEqual(store.try_acquire("b", 60, 100, 10, now=0), 2.0)
+        self.assertEqual(store.try_acquire("b", 60, 100, 10, now=2), 0)
+
+    def test_refund(self):
+        """正常系: 戻したトークンを再び取り出せることをテスト"""
+        store = TokenBucketFromMemory()
+        store.try_acquire("b", 100, 100, 10, now=0)
+        store.refund("b", 50)
+        self.assertEqual(store.try_acquire("b", 50, 100, 10, now=0), 0)
+
+
+class TestTokenBucketFromDynamoDB(unittest.TestCase):
+    """TokenBucketFromDynamoDBのテストクラス"""
+
+    def setUp(self):
+        self.client = LocalDynamoDBStandIn()
+        self.store = TokenBucketFromDynamoDB(self.client, "bucket-table")
+
+    def test_acquire_and_refund(self):
+        """正常系: 初回はバケットを作成し、以降は残量に応じて取り出し・返却できることをテスト"""
+        self.assertEqual(self.store.try_acquire("b", 60, 100, 10, now=0), 0)
+        self.assertEqual(float(self.client.items["b"]["tokens"]["N"]), 40)
+        self.assertEqual(self.store.try_acquire("b", 60, 100, 10, now=1), 1.0)
+
+        self.store.refund("b", 20)
+        self.assertEqual(self.store.try_acquire("b", 60, 100, 10, now=0), 0)
+
+    def test_retry_on_conflict(self):
+        """正常系: 他のコンテナと書き込みが競合した場合は読み直して再試行することをテスト"""
+        self.store.try_acquire("b", 10, 100, 10, now=0)
+        self.client.interleaved_writes = 2
+
+        self.assertEqual(self.store.try_acquire("b", 10, 100, 10, now=0), 0)
+        self.assertAlmostEqual(float(self.client.items["b"]["tokens"]["N"]), 80)
+
+    def test_contention_exhausted(self):
+        """異常系: 競合が続く場合は再試行を打ち切り、待ち時間を返すことをテスト"""
+        self.store.try_acquire("b", 10, 100, 10, now=0)
+        self.client.interleaved_writes = 10
+
+        self.assertEqual(self.store.try_acquire("b", 10, 100, 10, now=0), self.store.contention_retry_seconds)
+
+    def test_other_client_error(self):
+        """異常系: 条件不一致以外のエラーはそのまま送出することをテスト"""
+        client = MagicMock()
+        client.get_item.return_value = {}
+        client.put_item.side_effect = ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "PutItem")
+        with self.assertRaises(ClientError):
+            TokenBucketFromDynamoDB(client, "bucket-table").try_acquire("b", 10, 100, 10, now=0)
+
+
+class TestTokenRateLimiter(unittest.TestCase):
+    """TokenRateLimiterのテストクラス"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.store = TokenBucketFromMemory()
+        self.limiter = TokenRateLimiter(self.store, tokens_per_minute=600, clock=lambda: self.now)
+
+    def test_reserve_and_settle(self):
+        """正常系: 予約と実際の使用量の差が返却され、次の予約に使えることをテスト"""
+        reservation = self.limiter.reserve(500)
+        self.assertEqual(reservation, Reservation(bucket_id="bedrock", tokens=500))
+
+        self.limiter.settle(reservation, 100)
+        self.assertIsNotNone(self.limiter.reserve(500))
+
+    def test_reserve_empty_bucket(self):
+        """異常系: バケットが空の場合は補充までの秒数を持つCapacityExceededErrorを送出することをテスト"""
+        self.limiter.reserve(600)
+        with self.assertRaises(CapacityExceededError) as context:
+            self.limiter.reserve(25)
+        self.assertEqual(context.exception.retry_after_seconds, 3)
+
+        self.now = 3.0
+        self.assertIsNotNone(self.limiter.reserve(25))
+
+    def test_cancel(self):
+        """正常系: 取り消した予約のトークンがすべて戻ることをテスト"""
+        reservation = self.limiter.reserve(600)
+        self.limiter.cancel(reservation)
+        self.assertIsNotNone(self.limiter.reserve(600))
+
+    def test_reserve_over_capacity(self):
+        """正常系: 容量を超える予約は容量までに丸められることをテスト"""
+        self.assertEqual(self.limiter.reserve(10000).tokens, 600)
+
+    def test_fail_open(self):
+        """異常系: 保存先の障害時は予約なしで続行し、精算も行わないことをテスト"""
+        store = MagicMock()
+        store.try_acquire.side_effect = Exception("unavailable")
+        limiter = TokenRateLimiter(store, tokens_per_minute=600)
+
+        reservation = limiter.reserve(100)
+        limiter.settle(reservation, 50)
+
+        self.assertIsNone(reservation)
+        store.refund.assert_not_called()
+
+    def test_refund_error_is_ignored(self):
+        """異常系: 精算の失敗はレビュー結果に影響させないことをテスト"""
+        store = MagicMock()
+        store.try_acquire.return_value = 0
+        store.refund.side_effect = Exception("unavailable")
+        limiter = TokenRateLimiter(store, tokens_per_minute=600)
+
+        limiter.cancel(limiter.reserve(100))
+        store.refund.assert_called_once_with("bedrock", 100)
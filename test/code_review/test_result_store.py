@@ -0,0 +1,132 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from code_review.result_store import (
+    MAX_ITEM_BYTES,
+    ResultCodec,
+    ReviewResultFromDynamoDB,
+    StoredReview,
+)
+
+
+def _create_review(key: str = "key-1", result=None) -> StoredReview:
+    return StoredReview(
+        review_key=key,
+        content_hash="hash-1",
+        rule_set_version="rules-v1",
+        model_id="model-1",
+        result=result or {"review_result": "NG", "review_points": [{"details": "変数名が不明瞭です"}]},
+        usage={"inputTokens": 120, "outputTokens": 45},
+    )
+
+
+class TestResultCodec(unittest.TestCase):
+    """ResultCodecのテストクラス"""
+
+    def test_round_trip(self):
+        """正常系: 圧縮した結果が展開で元に戻ることをテスト"""
+        codec = ResultCodec()
+        result = {"review_result": "OK", "review_points": [], "memo": "日本語"}
+        data = codec.compress(result)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(ResultCodec.decompress(codec.name, data), result)
+
+    def test_zstd_fallback(self):
+        """正常系: zstandardがない場合にzlibへフォールバックすることをテスト"""
+        with patch("code_review.result_store.zstandard", None):
+            self.assertEqual(ResultCodec("zstd").name, "zlib")
+
+    def test_unknown_codec(self):
+        """異常系: 未対応の圧縮方式でValueErrorが発生することをテスト"""
+        with self.assertRaises(ValueError):
+            ResultCodec("lz4")
+
+
+class TestReviewResultFromDynamoDB(unittest.TestCase):
+    """ReviewResultFromDynamoDBのテストクラス"""
+
+    def setUp(self):
+        self.mock_client = MagicMock()
+        self.repo = ReviewResultFromDynamoDB(self.mock_client, "review-table", ttl_days=7, sleep=lambda _: None)
+
+    def test_save_and_get(self):
+        """正常系: 圧縮・TTL付きで保存したアイテムから同じレビュー結果が復元されることをテスト"""
+        review = _create_review()
+
+        self.assertTrue(self.repo.save(review))
+
+        call_args = self.mock_client.put_item.call_args[1]
+        item = call_args["Item"]
+        self.assertEqual(call_args["TableName"], "review-table")
+        self.assertEqual(item["review_key"]["S"], "key-1")
+        self.assertEqual(item["input_tokens"]["N"], "120")
+        self.assertEqual(item["output_tokens"]["N"], "45")
+        self.assertEqual(item["codec"]["S"], "zlib")
+        self.assertIsInstance(item["body"]["B"], bytes)
+        self.assertGreater(int(item["expires_at"]["N"]), time.time() + 6 * 24 * 3600)
+
+        self.mock_client.get_item.return_value = {"Item": item}
+        self.assertEqual(self.repo.get("key-1"), review)
+
+    def test_get_not_found(self):
+        """正常系: アイテムがない場合にNoneが返ることをテスト"""
+        self.mock_client.get_item.return_value = {}
+        self.assertIsNone(self.repo.get("missing"))
+
+    def test_get_expired(self):
+        """正常系: TTLを過ぎたアイテムはNoneとして扱われることをテスト"""
+        self.repo.save(_create_review())
+        item = self.mock_client.put_item.call_args[1]["Item"]
+        item["expires_at"] = {"N": str(int(time.time()) - 1)}
+        self.mock_client.get_item.return_value = {"Item": item}
+
+        self.assertIsNone(self.repo.get("key-1"))
+
+    def test_save_too_large(self):
+        """異常系: 圧縮後もサイズ上限を超える場合は保存しないことをテスト"""
+        with patch("code_review.result_store.MAX_ITEM_BYTES", 10):
+            self.assertFalse(self.repo.save(_create_review()))
+        self.mock_client.put_item.assert_not_called()
+        self.assertGreater(MAX_ITEM_BYTES, 10)
+
+    def test_batch_get_with_unprocessed_keys(self):
+        """正常系: 100件単位で取得し、未処理のキーが再試行されることをテスト"""
+        items = {}
+        for index in range(101):
+            self.repo.save(_create_review(f"key-{index}"))
+            items[f"key-{index}"] = self.mock_client.put_item.call_args[1]["Item"]
+
+        def batch_get_item(RequestItems):
+            keys = [key["review_key"]["S"] for key in RequestItems["review-table"]["Keys"]]
+            # 初回の最後のキーだけ未処理として返す
+            if len(keys) == 100:
+                return {
+                    "Responses": {"review-table": [items[key] for key in keys[:-1]]},
+                    "UnprocessedKeys": {"review-table": {"Keys": [{"review_key": {"S": keys[-1]}}]}},
+                }
+            return {"Responses": {"review-table": [items[key] for key in keys]}}
+
+        self.mock_client.batch_get_item.side_effect = batch_get_item
+
+        found = self.repo.batch_get([f"key-{index}" for index in range(101)] + ["key-0"])
+
+        self.assertEqual(len(found), 101)
+        self.assertEqual(self.mock_client.batch_get_item.call_count, 3)
+        self.assertEqual(found["key-100"].review_key, "key-100")
+
+    def test_batch_save(self):
+        """正常系: 25件単位で書き込み、未処理のアイテムが再試行されることをテスト"""
+        responses = [
+            {"UnprocessedItems": {"review-table": [{"PutRequest": {"Item": {}}}]}},
+            {},
+            {},
+        ]
+        self.mock_client.batch_write_item.side_effect = responses
+
+        saved = self.repo.batch_save([_create_review(f"key-{index}") for index in range(30)])
+
+        self.assertEqual(saved, 30)
+        self.assertEqual(self.mock_client.batch_write_item.call_count, 3)
+        first_request = self.mock_client.batch_write_item.call_args_list[0][1]["RequestItems"]
+        self.assertEqual(len(first_request["review-table"]), 25)
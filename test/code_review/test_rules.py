@@ -20,6 +20,53 @@ class TestCodingRules(unittest.TestCase):
         expected_string = "- Readability: Use clear variable names.\n- Performance: Avoid nested loops.\n"
         self.assertEqual(rules.to_string(), expected_string)
 
+    def test_categories_and_to_indexed_string(self):
+        rules = CodingRules()
+        rules.add("Readability", "Use clear variable names.")
+        rules.add("Performance", "Avoid nested loops.")
+        rules.add("Readability", "Keep functions short.")
+
+        self.assertEqual(rules.categories, ["Readability", "Performance"])
+        expected_string = (
+            "- [1] Readability: Use clear variable names.\n"
+            "- [2] Performance: Avoid nested loops.\n"
+            "- [1] Readability: Keep functions short.\n"
+        )
+        self.assertEqual(rules.to_indexed_string(), expected_string)
+
+    def test_including_categories(self):
+        rules = CodingRules()
+        rules.add("Readability", "Use clear variable names.")
+        rules.add("Performance", "Avoid nested loops.")
+
+        included = rules.including_categories(["Performance"])
+        self.assertEqual(included.to_string(), "- Performance: Avoid nested loops.\n")
+        self.assertEqual(rules.total_count, 2)
+
+    def test_version(self):
+        rules1 = CodingRules()
+        rules1.add("Readability", "Use clear variable names.")
+        rules2 = CodingRules()
+        rules2.add("Readability", "Use clear variable names.")
+        self.assertEqual(rules1.version, rules2.version)
+        self.assertEqual(len(rules1.version), 16)
+
+        rules2.add("Performance", "Avoid nested loops.")
+        self.assertNotEqual(rules1.version, rules2.version)
+
+    def test_rule_ids_and_excluding(self):
+        rules = CodingRules()
+        rules.add("Readability", "Use English names.", "english-identifiers")
+        rules.add("Readability", "Use clear variable names.")
+
+        self.assertEqual(rules.rule_ids, {"english-identifiers"})
+        self.assertEqual(rules.find("english-identifiers")["value"], "Use English names.")
+        self.assertIsNone(rules.find("unknown"))
+
+        excluded = rules.excluding(["english-identifiers"])
+        self.assertEqual(excluded.to_string(), "- Readability: Use clear variable names.\n")
+        self.assertEqual(rules.total_count, 2)
+
     def test_add_empty_rule_raises_value_error(self):
         rules = CodingRules()
         with self.assertRaisesRegex(ValueError, "Coding Rule cannot be empty."):
@@ -92,3 +139,13 @@ class TestCodingRulesBuilder(unittest.TestCase):
         self.assertEqual(rules.total_count, 2)
         expected_string = "- Readability: Readable Rule 1\n- Readability: Readable Rule 2\n"
         self.assertEqual(rules.to_string(), expected_string)
+
+    def test_rules_with_id(self):
+        self.mock_rule_provider.load_rules.return_value = {
+            "Readability": [{"id": "english-identifiers", "value": "Readable Rule 1"}, "Readable Rule 2"],
+        }
+        builder = CodingRulesBuilder(self.mock_rule_provider)
+        rules = builder.add_all_rules().build()
+
+        self.assertEqual(rules.rule_ids, {"english-identifiers"})
+        self.assertEqual(rules.to_string(), "- Readability: Readable Rule 1\n- Readability: Readable Rule 2\n")
@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import MagicMock
+
+from code_review.scheduler import ReviewScheduler, priority_class
+from common.deadline import Deadline
+
+
+class FakeClock:
+    """テスト用の手動で進める時計"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPriorityClass(unittest.TestCase):
+    """priority_classのテストクラス"""
+
+    def test_priority_class(self):
+        """正常系: 推定トークン数に応じたクラス名が返ることをテスト"""
+        self.assertEqual(priority_class(10), "small")
+        self.assertEqual(priority_class(5000), "medium")
+        self.assertEqual(priority_class(100000), "large")
+
+
+class TestReviewScheduler(unittest.TestCase):
+    """ReviewSchedulerのテストクラス"""
+
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_service.excute_review.side_effect = lambda source, language, **kwargs: {"source": source}
+        self.clock = FakeClock()
+        self.scheduler = ReviewScheduler(
+            self.mock_service,
+            aging_tokens_per_second=10.0,
+            fairness_penalty_tokens=50.0,
+            clock=self.clock,
+        )
+
+    def _executed_sources(self):
+        return [call.args[0] for call in self.mock_service.excute_review.call_args_list]
+
+    def test_shortest_job_first(self):
+        """正常系: 推定トークン数の少ないジョブから実行されることをテスト"""
+        self.scheduler.submit("x" * 4000, "python", "user-a")
+        self.scheduler.submit("x" * 40, "python", "user-b")
+
+        self.assertEqual(self.scheduler.drain(), 2)
+        self.assertEqual(self._executed_sources(), ["x" * 40, "x" * 4000])
+
+    def test_aging_prevents_starvation(self):
+        """正常系: 長く待っている大きなジョブが後から来た小さなジョブより先に実行されることをテスト"""
+        self.scheduler.submit("x" * 400, "python", "user-a")  # 100トークン
+        self.clock.now = 20.0  # 200トークン分の加齢
+        self.scheduler.submit("x" * 40, "python", "user-b")  # 10トークン
+
+        self.scheduler.drain()
+        self.assertEqual(self._executed_sources(), ["x" * 400, "x" * 40])
+
+    def test_fairness_between_users(self):
+        """正常系: 同じ利用者のジョブが連続せず、他の利用者のジョブが割り込めることをテスト"""
+        self.scheduler.submit("a" * 40, "python", "user-a")
+        self.scheduler.submit("b" * 40, "python", "user-a")
+        self.scheduler.submit("c" * 200, "python", "user-b")
+
+        self.scheduler.drain()
+        self.assertEqual(self._executed_sources(), ["a" * 40, "c" * 200, "b" * 40])
+
+    def test_duplicate_jobs_are_collapsed(self):
+        """正常系: 同一内容の待ちジョブが1回の実行にまとめられ、全員に結果が返ることをテスト"""
+        future1 = self.scheduler.submit("print(1)", "python", "user-a")
+        future2 = self.scheduler.submit("print(1)", "python", "user-b")
+        self.assertEqual(self.scheduler.pending_count, 1)
+
+        self.scheduler.drain()
+
+        self.mock_service.excute_review.assert_called_once()
+        self.assertEqual(self.mock_service.excute_review.call_args.kwargs["api_key_id"], "user-a")
+        self.assertEqual(future1.result(), {"source": "print(1)"})
+        self.assertIs(future1.result(), future2.result())
+
+    def test_error_is_propagated_to_waiters(self):
+        """異常系: レビューで例外が発生した場合に全ての待ち手に例外が伝わることをテスト"""
+        self.mock_service.excute_review.side_effect = RuntimeError("boom")
+        future1 = self.scheduler.submit("print(1)", "python", "user-a")
+        future2 = self.scheduler.submit("print(1)", "python", "user-b")
+
+        self.scheduler.run_next()
+
+        self.assertIsInstance(future1.exception(), RuntimeError)
+        self.assertIsInstance(future2.exception(), RuntimeError)
+
+    def test_api_key_and_deadline(self):
+        """正常系: ジョブを投入した利用者のAPIキーIDと処理の期限を指定してレビューを実行することをテスト"""
+        self.scheduler.submit("print(1)", "python", "key-1")
+        self.scheduler.run_next()
+
+        kwargs = self.mock_service.excute_review.call_args.kwargs
+        self.assertEqual(kwargs["api_key_id"], "key-1")
+        self.assertEqual(kwargs["deadline"].remaining_seconds(), self.scheduler.job_timeout_seconds)
+
+        deadline = Deadline.after(5, self.clock)
+        self.scheduler.submit("print(2)", "python", "key-2")
+        self.scheduler.run_next(deadline)
+        self.assertIs(self.mock_service.excute_review.call_args.kwargs["deadline"], deadline)
+
+    def test_drain_until_deadline(self):
+        """正常系: 期限を過ぎた場合は残りのジョブを実行しないことをテスト"""
+        self.scheduler.submit("print(1)", "python", "user-a")
+        self.assertEqual(self.scheduler.drain(Deadline.after(0, self.clock)), 0)
+        self.assertEqual(self.scheduler.pending_count, 1)
+
+    def test_run_next_empty(self):
+        """正常系: 待ち行列が空の場合にFalseが返ることをテスト"""
+        self.assertFalse(self.scheduler.run_next())
+
+    def test_wait_time_percentiles(self):
+        """正常系: 優先度クラスごとに待ち時間のパーセンタイルが集計されることをテスト"""
+        self.scheduler.submit("x" * 40, "python", "user-a")
+        self.scheduler.submit("y" * 40000, "python", "user-b")
+        self.clock.now = 3.0
+        self.scheduler.drain()
+
+        stats = self.scheduler.wait_time_percentiles()
+        self.assertEqual(set(stats.keys()), {"small", "large"})
+        self.assertEqual(stats["small"]["p50"], 3.0)
+        self.assertEqual(stats["large"]["p99"], 3.0)
@@ -0,0 +1,171 @@
+import os
+import json
+import base64
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from code_review.code_review import CodeReviewModelConfig, CodeReviewService
+from code_review.packing import PackingConfig
+from code_review.result_store import IReviewResultRepository
+from code_review.rules import RuleProviderBase
+from code_review.seed import (
+    STATUS_FAILED, STATUS_SEEDED, STATUS_WARM, CorpusSeeder, SeedSource, load_sources, main,
+)
+from code_review.source_decoder import SourceLimits, decode_source
+from common.exception import CapacityExceededError
+
+
+class TestLoadSources(unittest.TestCase):
+    """load_sourcesのテストクラス"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, data: bytes):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_load(self):
+        """正常系: 拡張子から言語種別を決め、BOM・改行コードを変えずに読み込むことをテスト"""
+        self.write("Program.cs", "﻿class A {}\r\n".encode("utf-8"))
+        self.write(os.path.join("sub", "main.ts"), b"let a = 1;\n")
+        self.write("README.md", b"# note\n")
+
+        sources, skipped = load_sources(self.directory.name)
+
+        self.assertEqual([(os.path.basename(s.path), s.language) for s in sources], [("Program.cs", "C#"), ("main.ts", "TypeScript")])
+        self.assertEqual(sources[0].source_code, "﻿class A {}\r\n")
+        self.assertEqual([os.path.basename(path) for path in skipped], ["README.md"])
+
+    def test_load_language_override(self):
+        """正常系: 拡張子と言語種別の対応を指定できることをテスト"""
+        self.write("main.py", b"x = 1\n")
+        sources, _ = load_sources(self.directory.name, {".py": "python3"})
+        self.assertEqual(sources[0].language, "python3")
+
+    def test_load_rejected_by_api(self):
+        """異常系: UTF-8でないファイル・サイズ上限を超えるファイルは対象外となることをテスト"""
+        self.write("a.py", b"x = '\xff'\n")
+        self.write("b.py", b"x = 1\n" * 10)
+
+        sources, skipped = load_sources(self.directory.name, limits=SourceLimits(max_bytes=1024, max_lines=5))
+
+        self.assertEqual(sources, [])
+        self.assertEqual([os.path.basename(path) for path in skipped], ["a.py", "b.py"])
+
+
+class TestCorpusSeeder(unittest.TestCase):
+    """CorpusSeederのテストクラス"""
+
+    def setUp(self):
+        stored = {}
+        self.result_store = MagicMock(spec=IReviewResultRepository)
+        self.result_store.get.side_effect = lambda key: stored.get(key)
+        self.result_store.save.side_effect = lambda review: stored.__setitem__(review.review_key, review)
+
+        rule_provider = MagicMock(spec=RuleProviderBase)
+        rule_provider.load_rules.return_value = {"TestCategory": ["Test Rule 1"]}
+        self.mock_bedrock_client = MagicMock()
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({"review_result": "OK", "review_points": []})}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5},
+        }
+        self.service = CodeReviewService(
+            self.mock_bedrock_client,
+            CodeReviewModelConfig(model_id="test-model", token_max="1024", temperature="0.5", top_p="1.0"),
+            rule_provider,
+            result_store=self.result_store,
+            max_points=10,
+        )
+        self.source_bytes = "﻿class A {}\r\n".encode("utf-8")
+        self.source = SeedSource(path="Program.cs", language="C#", source_code=self.source_bytes.decode("utf-8"))
+
+    def test_seed_keyed_as_online(self):
+        """正常系: 投入した結果が、APIで同じファイルを受け取った場合のレビューで再利用されることをテスト"""
+        counts = CorpusSeeder(self.service, concurrency=2, max_points=[None, 5]).seed([self.source])
+        self.assertEqual(counts, {STATUS_SEEDED: 2, STATUS_WARM: 0, STATUS_FAILED: 0})
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+
+        # --- APIのリクエストと同じ経路で復号したソースコードでレビューする ---
+        body = {"source_base64": base64.b64encode(self.source_bytes).decode("ascii"), "language": "C#"}
+        source_code = decode_source(body, SourceLimits())
+        self.service.excute_review(source_code, body["language"])
+        self.service.excute_review(source_code, body["language"], max_points=5)
+
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+
+    def test_seed_skips_warm(self):
+        """正常系: 保存済みのものはレビューしないことをテスト"""
+        CorpusSeeder(self.service).seed([self.source])
+        counts = CorpusSeeder(self.service).seed([self.source])
+
+        self.assertEqual(counts, {STATUS_SEEDED: 0, STATUS_WARM: 1, STATUS_FAILED: 0})
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 1)
+
+    def test_seed_packed(self):
+        """正常系: batch_size ごとに保存済みでないものだけを1回の呼び出しにまとめてレビューすることをテスト"""
+        CorpusSeeder(self.service).seed([self.source])
+        self.service.packing = PackingConfig()
+        ok = {"review_result": "OK", "review_points": []}
+        self.mock_bedrock_client.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({"f1": ok, "f2": ok})}]}},
+            "usage": {"inputTokens": 20, "outputTokens": 10},
+        }
+        sources = [
+            self.source,
+            SeedSource(path="a.py", language="Python", source_code="a = 1\n"),
+            SeedSource(path="b.py", language="Python", source_code="b = 2\n"),
+        ]
+
+        counts = CorpusSeeder(self.service, batch_size=3).seed(sources)
+
+        self.assertEqual(counts, {STATUS_SEEDED: 2, STATUS_WARM: 1, STATUS_FAILED: 0})
+        self.assertEqual(self.mock_bedrock_client.converse.call_count, 2)
+        self.assertTrue(self.service.is_review_stored("b = 2\n", "Python"))
+
+    def test_seed_retries_when_busy(self):
+        """正常系: 1分あたりのトークン数の上限に達した場合は、指定された秒数だけ待って再試行することをテスト"""
+        mock_service = MagicMock(spec=CodeReviewService)
+        mock_service.is_review_stored.return_value = False
+        mock_service.excute_review.side_effect = [CapacityExceededError.tokens_per_minute(3), {}]
+        mock_sleep = MagicMock()
+
+        counts = CorpusSeeder(mock_service, sleep=mock_sleep).seed([self.source])
+
+        self.assertEqual(counts[STATUS_SEEDED], 1)
+        mock_sleep.assert_called_once_with(3)
+
+    def test_seed_failed(self):
+        """異常系: 再試行の上限を超えた場合・その他の例外の場合は失敗として数え、残りの投入を続けることをテスト"""
+        mock_service = MagicMock(spec=CodeReviewService)
+        mock_service.is_review_stored.return_value = False
+        mock_service.excute_review.side_effect = [
+            CapacityExceededError.tokens_per_minute(1), CapacityExceededError.tokens_per_minute(1), RuntimeError(), {},
+        ]
+
+        counts = CorpusSeeder(mock_service, concurrency=1, max_retries=1, sleep=MagicMock()).seed(
+            [self.source, SeedSource(path="b.py", language="Python", source_code="x = 1\n"), self.source]
+        )
+
+        self.assertEqual(counts, {STATUS_SEEDED: 1, STATUS_WARM: 0, STATUS_FAILED: 2})
+
+
+class TestMain(unittest.TestCase):
+    """mainのテストクラス"""
+
+    def test_main_without_result_store(self):
+        """異常系: レビュー結果の保存先が設定されていない場合は何もせずに終了コード1を返すことをテスト"""
+        mock_container = MagicMock()
+        mock_container.code_review_service.result_store = None
+
+        self.assertEqual(main(["testdata"], container=mock_container), 1)
+        mock_container.code_review_service.excute_review.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
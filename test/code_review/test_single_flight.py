@@ -0,0 +1,176 @@
+import threading
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from code_review.single_flight import LeaseFromDynamoDB, LeaseFromMemory, SingleFlight
+from common.deadline import Deadline
+from common.exception import DeadlineExceededError, QuotaExceededError
+
+
+def conditional_check_failed() -> ClientError:
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}}, "PutItem")
+
+
+class TestLeaseFromMemory(unittest.TestCase):
+    """LeaseFromMemoryのテストクラス"""
+
+    def test_acquire_and_release(self):
+        """正常系: 他の所有者のロックは期限切れか解放されるまで取得できないことをテスト"""
+        store = LeaseFromMemory()
+        self.assertTrue(store.try_acquire("key", "a", 10, now=0))
+        self.assertFalse(store.try_acquire("key", "b", 10, now=5))
+        self.assertTrue(store.try_acquire("key", "b", 10, now=11))
+
+        store.release("key", "a")
+        self.assertFalse(store.try_acquire("key", "c", 10, now=12))
+        store.release("key", "b")
+        self.assertTrue(store.try_acquire("key", "c", 10, now=12))
+
+
+class TestLeaseFromDynamoDB(unittest.TestCase):
+    """LeaseFromDynamoDBのテストクラス"""
+
+    def setUp(self):
+        self.mock_client = MagicMock()
+        self.store = LeaseFromDynamoDB(self.mock_client, "lock-table")
+
+    def test_try_acquire(self):
+        """正常系: ロックが存在しないか期限切れの場合だけ書き込むことをテスト"""
+        self.assertTrue(self.store.try_acquire("key", "owner", 30, now=100.5))
+
+        kwargs = self.mock_client.put_item.call_args.kwargs
+        self.assertEqual(kwargs["Item"]["expires_at"], {"N": "131"})
+        self.assertEqual(kwargs["ConditionExpression"], "attribute_not_exists(lock_key) OR expires_at < :now")
+        self.assertEqual(kwargs["ExpressionAttributeValues"], {":now": {"N": "100"}})
+
+    def test_try_acquire_locked(self):
+        """正常系: 他の所有者がロックしている場合はFalseを返すことをテスト"""
+        self.mock_client.put_item.side_effect = conditional_check_failed()
+        self.assertFalse(self.store.try_acquire("key", "owner", 30, now=100))
+
+    def test_release(self):
+        """正常系: 所有者が一致する場合だけ削除し、一致しない場合のエラーは無視することをテスト"""
+        self.mock_client.delete_item.side_effect = conditional_check_failed()
+        self.store.release("key", "owner")
+
+        kwargs = self.mock_client.delete_item.call_args.kwargs
+        self.assertEqual(kwargs["ExpressionAttributeValues"], {":owner": {"S": "owner"}})
+
+
+class TestSingleFlight(unittest.TestCase):
+    """SingleFlightのテストクラス"""
+
+    def test_coalesce_in_process(self):
+        """正常系: コンテナ内で同時に依頼された同じキーの処理が1回だけ実行されることをテスト"""
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def execute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"review_result": "OK"}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.run("key", execute, lambda: None)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(single_flight.run("key", execute, lambda: None)))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"review_result": "OK"}] * 4)
+        # 呼び出し元ごとに別の辞書を返す
+        self.assertEqual(len({id(result) for result in results}), 4)
+        self.assertEqual(single_flight._inflight, {})
+
+    def test_leader_error(self):
+        """異常系: 処理が失敗した場合は待っていた呼び出し元にも同じ例外が送出されることをテスト"""
+        single_flight = SingleFlight()
+        future = single_flight._inflight["key"] = MagicMock()
+        future.result.side_effect = ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            single_flight.run("key", lambda: {}, lambda: None)
+
+    def test_follower_reruns_on_caller_error(self):
+        """正常系: 実行した呼び出し元に固有の例外の場合は、待っていた呼び出し元が実行し直すことをテスト"""
+        single_flight = SingleFlight()
+        future = single_flight._inflight["key"] = MagicMock()
+
+        def leader_failed(timeout=None):
+            # 実行した呼び出し元が利用枠の超過で終了した状態
+            del single_flight._inflight["key"]
+            raise QuotaExceededError("quota")
+
+        future.result.side_effect = leader_failed
+
+        result = single_flight.run("key", lambda: {"review_result": "OK"}, lambda: None, rerun_on=(QuotaExceededError,))
+
+        self.assertEqual(result, {"review_result": "OK"})
+        self.assertEqual(single_flight._inflight, {})
+
+    def test_follower_deadline(self):
+        """異常系: 待っている間に期限を過ぎた場合はDeadlineExceededErrorを送出することをテスト"""
+        single_flight = SingleFlight()
+        single_flight._inflight["key"] = MagicMock()
+        single_flight._inflight["key"].result.side_effect = FutureTimeoutError()
+
+        with self.assertRaises(DeadlineExceededError):
+            single_flight.run("key", lambda: {}, lambda: None, deadline=Deadline.after(0.01))
+
+    def test_waits_for_other_container(self):
+        """正常系: 他のコンテナがロックしている場合は、保存された結果を待って返すことをテスト"""
+        lease_store = LeaseFromMemory()
+        lease_store.try_acquire("key", "other-container", 60, now=0)
+        stored = iter([None, None, {"review_result": "NG"}])
+        sleeps = []
+        single_flight = SingleFlight(lease_store, poll_seconds=0.5, clock=lambda: 1.0, sleep=sleeps.append)
+        execute = MagicMock()
+
+        result = single_flight.run("key", execute, lambda: next(stored))
+
+        self.assertEqual(result, {"review_result": "NG"})
+        execute.assert_not_called()
+        self.assertEqual(sleeps, [0.5, 0.5, 0.5])
+
+    def test_takes_over_expired_lease(self):
+        """正常系: 他のコンテナのロックが期限切れになった場合は自分で実行し、ロックを解放することをテスト"""
+        lease_store = LeaseFromMemory()
+        lease_store.try_acquire("key", "other-container", 1, now=0)
+        now = iter([0.5, 2.0])
+        single_flight = SingleFlight(lease_store, clock=lambda: next(now), sleep=lambda seconds: None)
+
+        result = single_flight.run("key", lambda: {"review_result": "OK"}, lambda: None)
+
+        self.assertEqual(result, {"review_result": "OK"})
+        self.assertTrue(lease_store.try_acquire("key", "next-container", 60, now=3.0))
+
+    def test_lease_store_error(self):
+        """正常系: ロックの保存先の障害時はそのまま実行することをテスト"""
+        lease_store = MagicMock()
+        lease_store.try_acquire.side_effect = RuntimeError("unavailable")
+        single_flight = SingleFlight(lease_store)
+
+        self.assertEqual(single_flight.run("key", lambda: {"review_result": "OK"}, lambda: None), {"review_result": "OK"})
+
+    def test_wait_deadline(self):
+        """異常系: 他のコンテナの結果を待つ間に期限を過ぎる場合はDeadlineExceededErrorを送出することをテスト"""
+        lease_store = LeaseFromMemory()
+        lease_store.try_acquire("key", "other-container", 60, now=0)
+        single_flight = SingleFlight(lease_store, poll_seconds=1.0, clock=lambda: 1.0)
+
+        with self.assertRaises(DeadlineExceededError):
+            single_flight.run("key", lambda: {}, lambda: None, deadline=Deadline.after(0.5))
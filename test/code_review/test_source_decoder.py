@@ -0,0 +1,183 @@
+import io
+import gzip
+import base64
+import zipfile
+import unittest
+from unittest.mock import patch
+
+from code_review.source_decoder import (
+    SourceLimits, _SourceAccumulator, decode_project_files, decode_source, is_project_request,
+)
+from common.exception import PayloadTooLargeError, RequestParameterError
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+class TestSourceLimits(unittest.TestCase):
+    """SourceLimitsのテストクラス"""
+
+    def test_from_environ(self):
+        """正常系: 環境変数から上限値が読み込まれ、未設定の項目は既定値となることをテスト"""
+        limits = SourceLimits.from_environ({"MAX_SOURCE_BYTES": "1000"})
+        self.assertEqual(limits.max_bytes, 1000)
+        self.assertEqual(limits.max_lines, SourceLimits().max_lines)
+
+
+class TestDecodeSource(unittest.TestCase):
+    """decode_sourceのテストクラス"""
+
+    def setUp(self):
+        self.source = "def hello():\n    print('こんにちは')\n"
+        self.limits = SourceLimits(max_bytes=1024, max_lines=10)
+
+    def test_source_base64(self):
+        """正常系: Base64化されたソースコードが復号されることをテスト"""
+        body = {"source_base64": _b64(self.source.encode("utf-8"))}
+        self.assertEqual(decode_source(body, self.limits), self.source)
+
+    def test_source_base64_with_newlines_across_chunks(self):
+        """正常系: 改行入りのBase64が復号単位をまたいでも正しく復号されることをテスト"""
+        source = "x = 1\n" * 100
+        encoded = base64.encodebytes(source.encode("utf-8")).decode("ascii")
+        with patch("code_review.source_decoder.BASE64_CHUNK_CHARS", 10):
+            result = decode_source({"source_base64": encoded}, SourceLimits(max_bytes=4096, max_lines=1000))
+        self.assertEqual(result, source)
+
+    def test_source_gzip_base64(self):
+        """正常系: gzip圧縮+Base64化されたソースコードが展開されることをテスト"""
+        body = {"source_gzip_base64": _b64(gzip.compress(self.source.encode("utf-8")))}
+        self.assertEqual(decode_source(body, self.limits), self.source)
+
+    def test_source_text(self):
+        """正常系: テキストのソースコードがそのまま返ることをテスト"""
+        self.assertEqual(decode_source({"source": self.source}, self.limits), self.source)
+
+    def test_not_found(self):
+        """異常系: ソースコードのパラメータがない場合にエラーとなることをテスト"""
+        with self.assertRaises(RequestParameterError) as cm:
+            decode_source({}, self.limits)
+        self.assertEqual(cm.exception.parameter_name, "source_base64")
+
+    def test_invalid_base64(self):
+        """異常系: Base64として不正な場合にエラーとなることをテスト"""
+        with self.assertRaises(RequestParameterError) as cm:
+            decode_source({"source_base64": "abc=d"}, self.limits)
+        self.assertNotIsInstance(cm.exception, PayloadTooLargeError)
+
+    def test_invalid_utf8(self):
+        """異常系: UTF-8として不正な場合にエラーとなることをテスト"""
+        with self.assertRaises(RequestParameterError):
+            decode_source({"source_base64": _b64(b"\xff\xfe")}, self.limits)
+
+    def test_invalid_gzip(self):
+        """異常系: gzipとして不正、または途中で終わっている場合にエラーとなることをテスト"""
+        compressed = gzip.compress(self.source.encode("utf-8"))
+        for data in (b"not gzip", compressed[:len(compressed) // 2]):
+            with self.assertRaises(RequestParameterError) as cm:
+                decode_source({"source_gzip_base64": _b64(data)}, self.limits)
+            self.assertEqual(cm.exception.parameter_name, "source_gzip_base64")
+
+    def test_too_many_bytes(self):
+        """異常系: バイト数の上限を超えた場合にPayloadTooLargeErrorとなることをテスト"""
+        source = "a" * 2000
+        for body in (
+            {"source": source},
+            {"source_base64": _b64(source.encode("utf-8"))},
+            {"source_gzip_base64": _b64(gzip.compress(source.encode("utf-8")))},
+        ):
+            with self.assertRaises(PayloadTooLargeError):
+                decode_source(body, self.limits)
+
+    def test_too_many_lines(self):
+        """異常系: 行数の上限を超えた場合にPayloadTooLargeErrorとなることをテスト"""
+        with self.assertRaises(PayloadTooLargeError):
+            decode_source({"source": "\n" * 10}, self.limits)
+
+    def test_gzip_bomb_stops_early(self):
+        """異常系: 展開後に巨大になるgzipは上限を超えた時点で展開を止めることをテスト"""
+        bomb = gzip.compress(b"\0" * (50 * 1024 * 1024))
+        original_feed = _SourceAccumulator.feed
+        with patch.object(_SourceAccumulator, "feed", autospec=True, side_effect=original_feed) as mock_feed:
+            with self.assertRaises(PayloadTooLargeError):
+                decode_source({"source_gzip_base64": _b64(bomb)}, self.limits)
+
+        fed_bytes = sum(len(call.args[1]) for call in mock_feed.call_args_list)
+        self.assertLessEqual(fed_bytes, self.limits.max_bytes + 1)
+
+
+def _zip(entries) -> str:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return _b64(buffer.getvalue())
+
+
+class TestDecodeProjectFiles(unittest.TestCase):
+    """decode_project_filesのテストクラス"""
+
+    def setUp(self):
+        self.limits = SourceLimits(max_bytes=1024, max_lines=10, max_files=3)
+
+    def test_files(self):
+        """正常系: ファイルごとに異なる形式のソースコードを復号できることをテスト"""
+        body = {"files": [
+            {"path": "a.py", "source": "x = 1\n"},
+            {"path": "b.py", "source_gzip_base64": _b64(gzip.compress("y = 'あ'\n".encode("utf-8")))},
+        ]}
+        self.assertTrue(is_project_request(body))
+        self.assertEqual(decode_project_files(body, self.limits), [("a.py", "x = 1\n"), ("b.py", "y = 'あ'\n")])
+
+    def test_zip(self):
+        """正常系: zipファイル内の対象のファイルだけを展開し、ディレクトリ・macOSのリソースフォークは除くことをテスト"""
+        body = {"project_zip_base64": _zip([
+            ("src/", b""),
+            ("src/a.py", b"x = 1\n"),
+            ("README.md", b"# readme\n"),
+            ("__MACOSX/src/._a.py", b"\0\0"),
+        ])}
+        files = decode_project_files(body, self.limits, lambda path: path.endswith(".py"))
+        self.assertEqual(files, [("src/a.py", "x = 1\n")])
+
+    def test_not_found(self):
+        """異常系: ファイルがない場合・パスがない場合・パスが重複する場合にRequestParameterErrorとなることをテスト"""
+        for body in (
+            {"files": []},
+            {"files": [{"source": "x = 1"}]},
+            {"files": [{"path": "a.py", "source": "x = 1"}, {"path": "a.py", "source": "y = 1"}]},
+            {"project_zip_base64": _zip([("README.md", b"# readme")])},
+        ):
+            with self.assertRaises(RequestParameterError):
+                decode_project_files(body, self.limits, lambda path: path.endswith(".py"))
+        self.assertFalse(is_project_request({"source": "x = 1"}))
+
+    def test_invalid_zip(self):
+        """異常系: zipファイルとして展開できない場合にRequestParameterErrorとなることをテスト"""
+        with self.assertRaises(RequestParameterError) as context:
+            decode_project_files({"project_zip_base64": _b64(b"not a zip")}, self.limits)
+        self.assertEqual(context.exception.parameter_name, "project_zip_base64")
+
+    def test_too_large(self):
+        """異常系: ファイル数の上限・プロジェクト全体のバイト数の上限を超えた場合にPayloadTooLargeErrorとなることをテスト"""
+        for body in (
+            {"files": [{"path": f"{number}.py", "source": "x = 1"} for number in range(4)]},
+            {"files": [{"path": f"{number}.py", "source": "x" * 400} for number in range(3)]},
+            {"project_zip_base64": _zip([(f"{number}.py", b"x = 1") for number in range(4)])},
+            {"project_zip_base64": _zip([(f"{number}.py", b"x" * 400) for number in range(3)])},
+        ):
+            with self.assertRaises(PayloadTooLargeError):
+                decode_project_files(body, self.limits)
+
+    def test_zip_bomb_stops_early(self):
+        """異常系: 展開後に巨大になるzipは上限を超えた時点で展開を止めることをテスト"""
+        limits = SourceLimits(max_bytes=64 * 1024, max_lines=10)
+        body = {"project_zip_base64": _zip([("bomb.py", b"\0" * (50 * 1024 * 1024))])}
+        original_feed = _SourceAccumulator.feed
+        with patch.object(_SourceAccumulator, "feed", autospec=True, side_effect=original_feed) as mock_feed:
+            with self.assertRaises(PayloadTooLargeError):
+                decode_project_files(body, limits)
+
+        fed_bytes = sum(len(call.args[1]) for call in mock_feed.call_args_list)
+        self.assertLessEqual(fed_bytes, 2 * limits.max_bytes)
@@ -0,0 +1,176 @@
+import unittest
+
+from code_review.rules import CodingRules
+from code_review.static_check import (
+    NonAsciiIdentifierCheck,
+    StaticCheckEngine,
+    cap_review_points,
+    extract_identifiers,
+    merge_review_points,
+    resolve_language,
+)
+
+
+class TestExtractIdentifiers(unittest.TestCase):
+    """extract_identifiersのテストクラス"""
+
+    def names(self, source_code, language):
+        return {(identifier.name, identifier.line, identifier.kind) for identifier in extract_identifiers(source_code, language)}
+
+    def test_csharp(self):
+        """正常系: C#の型・メソッド・プロパティ・変数・引数の宣言を取り出せることをテスト"""
+        source_code = "\n".join([
+            "// 変数 = 1;",
+            "public class 顧客 {",
+            "    public string 名前 { get; set; }",
+            "    public int Sum(int 値, ref int total = 0) {",
+            "        var 合計 = 0;",
+            '        string text = @"a "" 文字 = 2";',
+            "        return Calc(値);",
+            "    }",
+            "}",
+        ])
+        names = self.names(source_code, "C#")
+
+        self.assertIn(("顧客", 2, "class"), names)
+        self.assertIn(("名前", 3, "variable"), names)
+        self.assertIn(("Sum", 4, "function"), names)
+        self.assertIn(("値", 4, "parameter"), names)
+        self.assertIn(("total", 4, "parameter"), names)
+        self.assertIn(("合計", 5, "variable"), names)
+        self.assertIn(("text", 6, "variable"), names)
+        # コメント・文字列中の名前や呼び出し先は含めない
+        self.assertNotIn("変数", {name for name, _, _ in names})
+        self.assertNotIn("文字", {name for name, _, _ in names})
+        self.assertNotIn("Calc", {name for name, _, _ in names})
+
+    def test_typescript(self):
+        """正常系: TypeScriptの関数・クラス・変数・引数の宣言を取り出せることをテスト"""
+        source_code = "\n".join([
+            "const 合計 = (値: number): number => 値 + 1;",
+            "function calc(x: number, ...rest: number[]) {",
+            "  let message = `${x} 変数`;",
+            "}",
+            "class Customer {",
+            "  private 名前: string;",
+            "  async 処理(a: number): Promise<void> {",
+            "    if (a) {}",
+            "  }",
+            "}",
+        ])
+        names = self.names(source_code, "TypeScript")
+
+        self.assertIn(("合計", 1, "variable"), names)
+        self.assertIn(("値", 1, "parameter"), names)
+        self.assertIn(("calc", 2, "function"), names)
+        self.assertIn(("rest", 2, "parameter"), names)
+        self.assertIn(("message", 3, "variable"), names)
+        self.assertIn(("名前", 6, "variable"), names)
+        self.assertIn(("処理", 7, "function"), names)
+        self.assertNotIn("if", {name for name, _, _ in names})
+        self.assertNotIn("変数", {name for name, _, _ in names})
+
+    def test_python(self):
+        """正常系: Pythonの関数・変数・引数の宣言を取り出せることをテスト"""
+        source_code = "\n".join([
+            "def 計算(値, *args, **kwargs):",
+            '    """変数 = 1"""',
+            "    合計 = 0  # 項目 = 2",
+            "    for item in args:",
+            "        self.total: int = item",
+        ])
+        names = self.names(source_code, "python")
+
+        self.assertIn(("計算", 1, "function"), names)
+        self.assertIn(("値", 1, "parameter"), names)
+        self.assertIn(("kwargs", 1, "parameter"), names)
+        self.assertIn(("合計", 3, "variable"), names)
+        self.assertIn(("item", 4, "variable"), names)
+        self.assertIn(("total", 5, "variable"), names)
+        self.assertNotIn("変数", {name for name, _, _ in names})
+        self.assertNotIn("項目", {name for name, _, _ in names})
+
+    def test_unsupported_language(self):
+        """正常系: 未対応の言語では空の一覧を返すことをテスト"""
+        self.assertEqual(extract_identifiers("値 = 1", "COBOL"), [])
+        self.assertIsNone(resolve_language("COBOL"))
+        self.assertEqual(resolve_language(" C# "), "csharp")
+
+
+class TestNonAsciiIdentifierCheck(unittest.TestCase):
+    """NonAsciiIdentifierCheckのテストクラス"""
+
+    def test_check(self):
+        """正常系: 非ASCII文字を含む名前だけが、名前ごとに1件指摘されることをテスト"""
+        source_code = "def count(値):\n    pass\n\n\n値 = 1\n"
+        rule = {"category": "Readability", "value": "ASCII only.", "id": "non-ascii-identifiers"}
+
+        review_points = NonAsciiIdentifierCheck().check(source_code, "python", rule)
+
+        self.assertEqual(len(review_points), 1)
+        self.assertEqual(review_points[0]["location"], "値")
+        self.assertEqual(review_points[0]["codeline"], 1)
+        self.assertEqual(review_points[0]["category"], "Readability")
+        self.assertEqual(
+            set(review_points[0]), {"location", "codeline", "category", "overview", "details", "suggestion"}
+        )
+
+
+class TestStaticCheckEngine(unittest.TestCase):
+    """StaticCheckEngineのテストクラス"""
+
+    def setUp(self):
+        self.coding_rules = CodingRules()
+        self.coding_rules.add("Readability", "ASCII only.", "non-ascii-identifiers")
+        self.coding_rules.add("Readability", "English words only.", "english-identifiers")
+        self.coding_rules.add("Readability", "Descriptive names.")
+        self.engine = StaticCheckEngine()
+
+    def test_covered_rule_ids(self):
+        """正常系: 対応言語ではルールIDが付いた検査可能なルールだけが対象となることをテスト"""
+        # 英単語であるかのルールはローカルで判定できないため、IDが付いていても対象としない
+        self.assertEqual(self.engine.covered_rule_ids(self.coding_rules, "C#"), {"non-ascii-identifiers"})
+        self.assertEqual(self.engine.covered_rule_ids(self.coding_rules, "COBOL"), set())
+        self.assertEqual(self.engine.covered_rule_ids(CodingRules(), "C#"), set())
+
+    def test_run(self):
+        """正常系: ルールのカテゴリで指摘事項が作成されることをテスト"""
+        review_points = self.engine.run("var 値 = 1;", "C#", self.coding_rules)
+        self.assertEqual([(point["location"], point["category"]) for point in review_points], [("値", "Readability")])
+
+
+class TestMergeReviewPoints(unittest.TestCase):
+    """merge_review_pointsのテストクラス"""
+
+    def test_merge(self):
+        """正常系: LLMの指摘事項の順序(重大度の高い順)を保ち、末尾にローカルの指摘事項が加わり、結果がNGとなることをテスト"""
+        review_result = {"review_result": "OK", "review_points": [{"codeline": 5}, {"codeline": None}, {"codeline": 1}]}
+        merge_review_points(review_result, [{"codeline": 2}])
+        self.assertEqual(review_result["review_result"], "NG")
+        self.assertEqual([point["codeline"] for point in review_result["review_points"]], [5, None, 1, 2])
+
+    def test_merge_without_local_points(self):
+        """正常系: ローカルの指摘事項がない場合はLLMの結果をそのまま返すことをテスト"""
+        review_result = {"review_result": "OK", "review_points": []}
+        self.assertEqual(merge_review_points(review_result, []), {"review_result": "OK", "review_points": []})
+
+
+class TestCapReviewPoints(unittest.TestCase):
+    """cap_review_pointsのテストクラス"""
+
+    def test_cap(self):
+        """正常系: LLMの指摘事項を先頭から残し、ローカル検査の指摘事項は残りの件数だけ残すことをテスト"""
+        review_result = {"review_result": "NG", "review_points": [{"codeline": 9}, {"codeline": 1}]}
+        local_points = cap_review_points(review_result, [{"codeline": 3}, {"codeline": 4}], 3)
+
+        self.assertEqual(review_result["review_points"], [{"codeline": 9}, {"codeline": 1}])
+        self.assertEqual(local_points, [{"codeline": 3}])
+        self.assertTrue(review_result["review_points_capped"])
+
+    def test_within_limit(self):
+        """正常系: 上限件数以内の場合は絞り込まず、review_points_cappedがfalseとなることをテスト"""
+        review_result = {"review_result": "NG", "review_points": [{"codeline": 9}]}
+        local_points = cap_review_points(review_result, [{"codeline": 3}], 2)
+
+        self.assertEqual(local_points, [{"codeline": 3}])
+        self.assertFalse(review_result["review_points_capped"])
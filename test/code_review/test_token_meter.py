@@ -0,0 +1,144 @@
+import threading
+import unittest
+from collections import defaultdict
+from unittest.mock import MagicMock
+
+from code_review.token_meter import (
+    TokenMeter,
+    TokenUsage,
+    TokenUsageFromDynamoDB,
+    TokenUsageFromMemory,
+    seconds_until_next_day,
+    sum_bedrock_usage,
+    usage_day,
+)
+from common.exception import QuotaExceededError
+
+
+# 2026-10-19 23:59:00 UTC
+TIMESTAMP = 1792454340.0
+
+
+class LocalDynamoDBStandIn:
+    """UpdateItemのADDとQueryだけを再現したDynamoDBクライアントの代役(テスト用)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = defaultdict(dict)
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues):
+        key = (Key["usage_key"]["S"], Key["shard"]["N"])
+        with self._lock:
+            item = self.items[key]
+            for attribute, placeholder in (("input_tokens", ":input_tokens"), ("output_tokens", ":output_tokens")):
+                current = int(item.get(attribute, {"N": "0"})["N"])
+                item[attribute] = {"N": str(current + int(ExpressionAttributeValues[placeholder]["N"]))}
+            item.setdefault("expires_at", ExpressionAttributeValues[":expires_at"])
+
+    def get_paginator(self, operation_name):
+        stand_in = self
+        paginator = MagicMock()
+
+        def paginate(TableName, KeyConditionExpression, ExpressionAttributeValues, ProjectionExpression):
+            usage_key = ExpressionAttributeValues[":usage_key"]["S"]
+            items = [dict(item) for (key, _), item in stand_in.items.items() if key == usage_key]
+            return [{"Items": items[:1]}, {"Items": items[1:]}]
+
+        paginator.paginate.side_effect = paginate
+        return paginator
+
+
+class TestHelpers(unittest.TestCase):
+    """日付計算のテストクラス"""
+
+    def test_usage_day(self):
+        """正常系: UTCの日付が集計単位となることをテスト"""
+        self.assertEqual(usage_day(TIMESTAMP), "2026-10-19")
+        self.assertEqual(seconds_until_next_day(TIMESTAMP), 60)
+
+    def test_token_usage_from_bedrock_usage(self):
+        """正常系: Bedrockのusageからトークン数が取り出せることをテスト"""
+        usage = TokenUsage.from_bedrock_usage({"inputTokens": 10, "outputTokens": 5, "totalTokens": 15})
+        self.assertEqual(usage, TokenUsage(10, 5))
+        self.assertEqual(usage.total_tokens, 15)
+        self.assertEqual(TokenUsage.from_bedrock_usage(None).total_tokens, 0)
+
+    def test_sum_bedrock_usage(self):
+        """正常系: 複数回の呼び出しのusageが合計されることをテスト"""
+        total = sum_bedrock_usage({"inputTokens": 10, "outputTokens": 5}, {}, {"inputTokens": 1, "outputTokens": 2})
+        self.assertEqual(total, {"inputTokens": 11, "outputTokens": 7})
+
+
+class TestTokenUsageFromDynamoDB(unittest.TestCase):
+    """TokenUsageFromDynamoDBのテストクラス"""
+
+    def test_add_uses_atomic_add(self):
+        """正常系: UpdateItemのADDで無作為に選んだシャードへ加算することをテスト"""
+        mock_client = MagicMock()
+        repository = TokenUsageFromDynamoDB(mock_client, "usage-table", shard_count=8, choose_shard=lambda count: 3)
+
+        repository.add("key-1", "2026-10-19", TokenUsage(10, 5))
+
+        kwargs = mock_client.update_item.call_args[1]
+        self.assertEqual(kwargs["TableName"], "usage-table")
+        self.assertEqual(kwargs["Key"], {"usage_key": {"S": "key-1#2026-10-19"}, "shard": {"N": "3"}})
+        self.assertTrue(kwargs["UpdateExpression"].startswith("ADD input_tokens :input_tokens, output_tokens :output_tokens"))
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":input_tokens"], {"N": "10"})
+
+    def test_concurrent_add_with_local_stand_in(self):
+        """正常系: 複数スレッドから同時に加算しても、全シャードの合計が失われないことをテスト"""
+        repository = TokenUsageFromDynamoDB(LocalDynamoDBStandIn(), "usage-table", shard_count=4)
+
+        def worker():
+            for _ in range(50):
+                repository.add("key-1", "2026-10-19", TokenUsage(3, 2))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(repository.get("key-1", "2026-10-19"), TokenUsage(600, 400))
+        self.assertEqual(repository.get("key-2", "2026-10-19"), TokenUsage())
+
+
+class TestTokenMeter(unittest.TestCase):
+    """TokenMeterのテストクラス"""
+
+    def setUp(self):
+        self.repository = TokenUsageFromMemory()
+        self.meter = TokenMeter(self.repository, daily_token_budget=100, clock=lambda: TIMESTAMP)
+
+    def test_record_and_check_budget(self):
+        """正常系: 記録した使用量と見込みのトークン数が予算を超えると429相当の例外となることをテスト"""
+        self.meter.record("key-1", {"inputTokens": 60, "outputTokens": 20})
+        self.meter.check_budget("key-1", estimated_tokens=20)
+
+        with self.assertRaises(QuotaExceededError) as context:
+            self.meter.check_budget("key-1", estimated_tokens=21)
+        self.assertEqual(context.exception.retry_after_seconds, 60)
+
+        # 他の利用キーには影響しない
+        self.meter.check_budget("key-2", estimated_tokens=100)
+
+    def test_unlimited_budget(self):
+        """正常系: 予算が0の場合は記録のみ行い、制限しないことをテスト"""
+        meter = TokenMeter(self.repository, daily_token_budget=0, clock=lambda: TIMESTAMP)
+        meter.record("key-1", {"inputTokens": 1000, "outputTokens": 0})
+        meter.check_budget("key-1", estimated_tokens=1000)
+        self.assertEqual(self.repository.get("key-1", "2026-10-19").total_tokens, 1000)
+
+    def test_without_api_key_id(self):
+        """正常系: APIキーIDがない場合は記録・確認を行わないことをテスト"""
+        self.meter.record(None, {"inputTokens": 1000})
+        self.meter.check_budget(None, estimated_tokens=1000)
+
+    def test_repository_error_is_ignored(self):
+        """異常系: 集計先でエラーが発生してもレビューを止めないことをテスト"""
+        repository = MagicMock()
+        repository.get.side_effect = Exception("unavailable")
+        repository.add.side_effect = Exception("unavailable")
+        meter = TokenMeter(repository, daily_token_budget=100)
+
+        meter.check_budget("key-1", estimated_tokens=1000)
+        meter.record("key-1", {"inputTokens": 10})
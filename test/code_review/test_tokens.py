@@ -0,0 +1,18 @@
+import unittest
+
+from code_review.tokens import estimate_tokens
+
+
+class TestEstimateTokens(unittest.TestCase):
+    """estimate_tokensのテストクラス"""
+
+    def test_empty(self):
+        """正常系: 空文字列の場合に0が返ることをテスト"""
+        self.assertEqual(estimate_tokens(""), 0)
+
+    def test_ascii_and_non_ascii(self):
+        """正常系: ASCII文字は4文字で1トークン、それ以外は1文字1トークンで数えられることをテスト"""
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+        self.assertEqual(estimate_tokens("日本語"), 3)
+        self.assertEqual(estimate_tokens("ab日本"), 3)
@@ -0,0 +1,68 @@
+import json
+import unittest
+
+from code_review.rules import CodingRules
+from code_review.triage import CategoryVerdict, TriagePrompt, category_verdicts, parse_verdicts
+
+
+class TestTriagePrompt(unittest.TestCase):
+    """TriagePromptのテストクラス"""
+
+    def test_create_system_prompt(self):
+        """正常系: 番号付きのルールとカテゴリ番号をキーとするレスポンス例が含まれることをテスト"""
+        coding_rules = CodingRules()
+        coding_rules.add("Readability", "Use clear names.")
+        coding_rules.add("Security", "Validate input.")
+        prompt = TriagePrompt("print(1)", "python", coding_rules)
+
+        system_prompt = prompt.create_system_prompt()
+
+        self.assertIn("- [2] Security: Validate input.\n", system_prompt)
+        self.assertIn(json.dumps({"1": "OK", "2": "OK"}, separators=(",", ":")), system_prompt)
+        self.assertEqual(prompt.create_user_prompt(), "print(1)")
+
+
+class TestParseVerdicts(unittest.TestCase):
+    """parse_verdictsのテストクラス"""
+
+    def test_parse(self):
+        """正常系: カテゴリ番号の判定がカテゴリ名の判定に変換され、前後の文章は無視されることをテスト"""
+        verdicts = parse_verdicts('```json\n{"1": "ok", "2": "NG"}\n```', ["Readability", "Security"])
+        self.assertEqual(verdicts, {"Readability": "OK", "Security": "NG"})
+
+    def test_missing_or_invalid(self):
+        """異常系: 判定のないカテゴリや解析できない出力はNGとして扱うことをテスト"""
+        self.assertEqual(parse_verdicts('{"1": "OK"}', ["A", "B"]), {"A": "OK", "B": "NG"})
+        self.assertEqual(parse_verdicts("OK", ["A"]), {"A": "NG"})
+        self.assertEqual(parse_verdicts('{"1": "OK"', ["A"]), {"A": "NG"})
+
+
+class TestCategoryVerdicts(unittest.TestCase):
+    """category_verdictsのテストクラス"""
+
+    def test_category_verdicts(self):
+        """正常系: 一次判定でOKのカテゴリは一次判定、NGのカテゴリは詳細レビューの結果が判定となることをテスト"""
+        verdicts = category_verdicts(
+            {"A": "OK", "B": "NG", "C": "NG"},
+            [{"category": "B", "codeline": 1}],
+        )
+        self.assertEqual(verdicts, [
+            CategoryVerdict("A", "OK", "triage"),
+            CategoryVerdict("B", "NG", "detail"),
+            CategoryVerdict("C", "OK", "detail"),
+        ])
+        self.assertEqual(verdicts[0].to_dict(), {"category": "A", "verdict": "OK", "phase": "triage"})
+
+    def test_category_verdicts_with_local_points(self):
+        """正常系: ローカル検査の指摘事項と、ローカルでだけ検査したカテゴリが判定に含まれることをテスト"""
+        verdicts = category_verdicts(
+            {"A": "OK", "B": "NG"},
+            [{"category": "A", "codeline": 1}, {"category": "C", "codeline": 2}],
+            ["A", "B", "C", "D"],
+        )
+        self.assertEqual(verdicts, [
+            CategoryVerdict("A", "NG", "local"),
+            CategoryVerdict("B", "OK", "detail"),
+            CategoryVerdict("C", "NG", "local"),
+            CategoryVerdict("D", "OK", "local"),
+        ])
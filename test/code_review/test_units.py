@@ -0,0 +1,115 @@
+import unittest
+
+from code_review.units import UNIT_KIND_DEFINITION, UNIT_KIND_MODULE, split_units, unit_key
+
+
+PYTHON_SOURCE = '''\
+import os
+
+
+@decorator
+def first(
+    a,
+):
+    """
+x = 1
+"""
+    return a
+
+
+class Second:
+    def method(self):
+        pass
+
+# comment
+VALUE = 1
+'''
+
+CSHARP_SOURCE = """\
+using System;
+
+namespace Sample
+{
+    public class Calculator
+    {
+        private int count;
+
+        public int Add(int a, int b)
+        {
+            if (a > 0) { count++; }
+            return a + b;
+        }
+
+        public string Name { get; set; }
+
+        /// <summary>Subtract</summary>
+        public int Sub(int a, int b)
+        {
+            return a - b;
+        }
+    }
+}
+"""
+
+TYPESCRIPT_SOURCE = """\
+function add(a: number, b: number): number {
+  return a + b;
+}
+
+const value = add(1, 2);
+"""
+
+
+class TestSplitUnits(unittest.TestCase):
+    """split_unitsのテストクラス"""
+
+    def ranges(self, source_code, language):
+        return [(unit.kind, unit.start_line, unit.end_line) for unit in split_units(source_code, language)]
+
+    def test_python(self):
+        """正常系: Pythonのトップレベルの定義がデコレータ・複数行の引数・文字列を含めて1つの単位となることをテスト"""
+        self.assertEqual(self.ranges(PYTHON_SOURCE, "python"), [
+            (UNIT_KIND_MODULE, 1, 3),
+            (UNIT_KIND_DEFINITION, 4, 11),
+            (UNIT_KIND_DEFINITION, 14, 16),
+            (UNIT_KIND_MODULE, 17, 19),
+        ])
+
+    def test_csharp(self):
+        """正常系: C#では名前空間・クラスの内側のメソッドが、前の行のフィールドやコメントを含めて単位となることをテスト"""
+        self.assertEqual(self.ranges(CSHARP_SOURCE, "C#"), [
+            (UNIT_KIND_MODULE, 1, 6),
+            (UNIT_KIND_DEFINITION, 7, 13),
+            (UNIT_KIND_DEFINITION, 15, 21),
+            (UNIT_KIND_MODULE, 22, 23),
+        ])
+
+    def test_typescript(self):
+        """正常系: TypeScriptのトップレベルの関数が単位となり、関数の内側には降りないことをテスト"""
+        self.assertEqual(self.ranges(TYPESCRIPT_SOURCE, "TypeScript"), [
+            (UNIT_KIND_DEFINITION, 1, 3),
+            (UNIT_KIND_MODULE, 4, 5),
+        ])
+
+    def test_unsupported_language(self):
+        """正常系: 未対応の言語ではファイル全体が1つの単位となることをテスト"""
+        self.assertEqual(self.ranges("a\nb\n", "COBOL"), [(UNIT_KIND_MODULE, 1, 2)])
+        self.assertEqual(split_units("", "python"), [])
+
+    def test_units_cover_source(self):
+        """正常系: 単位の行範囲が重ならず、空行以外のすべての行を含むことをテスト"""
+        for source_code, language in [(PYTHON_SOURCE, "python"), (CSHARP_SOURCE, "C#"), (TYPESCRIPT_SOURCE, "ts")]:
+            covered = [line for unit in split_units(source_code, language) for line in range(unit.start_line, unit.end_line + 1)]
+            self.assertEqual(len(covered), len(set(covered)))
+            for number, line in enumerate(source_code.splitlines(), start=1):
+                if line.strip():
+                    self.assertIn(number, covered)
+
+    def test_unit_key(self):
+        """正常系: 単位のキーはファイル内の位置や行末の空白に依存せず、範囲が異なれば別のキーとなることをテスト"""
+        first = split_units(TYPESCRIPT_SOURCE, "ts")[0]
+        moved = split_units("\n\n" + TYPESCRIPT_SOURCE.replace("{\n", "{  \n"), "ts")[0]
+
+        self.assertEqual(moved.start_line, 3)
+        self.assertEqual(unit_key("scope", first), unit_key("scope", moved))
+        self.assertNotEqual(unit_key("scope", first), unit_key("other-scope", first))
@@ -0,0 +1,224 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+from code_review.webhook import (
+    DeadLetterFromDynamoDB,
+    IDeadLetterStore,
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    WebhookNotifier,
+    WebhookQueueFromSQS,
+    is_valid_callback_url,
+    parse_webhook_message,
+    sign_payload,
+)
+from common.deadline import Deadline
+
+
+class CallbackStandIn:
+    """コールバック受信側を模したローカルHTTPサーバー"""
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                stand_in.requests.append({"headers": dict(self.headers), "body": self.rfile.read(length)})
+                status = stand_in.statuses.pop(0) if stand_in.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/callback"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestCallbackUrl(unittest.TestCase):
+    """is_valid_callback_url / sign_payloadのテストクラス"""
+
+    def test_is_valid_callback_url(self):
+        """正常系: インターネット上のアドレスに解決されるhttp(s)のURLのみ受け付けることをテスト"""
+        def resolve(hostname):
+            return ["93.184.216.34"]
+
+        self.assertTrue(is_valid_callback_url("https://example.com/hook", resolve))
+        self.assertTrue(is_valid_callback_url("http://93.184.216.34:8080/hook"))
+        self.assertFalse(is_valid_callback_url("ftp://example.com/hook", resolve))
+        self.assertFalse(is_valid_callback_url("not a url", resolve))
+
+    def test_is_valid_callback_url_internal_address(self):
+        """異常系: ループバック・リンクローカル・プライベートなどのアドレスへのURLは拒否することをテスト"""
+        for url in [
+            "http://127.0.0.1:8080/hook",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://10.0.0.5/hook",
+            "http://192.168.1.10/hook",
+            "http://[::1]/hook",
+            "http://[::ffff:127.0.0.1]/hook",
+            "http://0.0.0.0/hook",
+        ]:
+            self.assertFalse(is_valid_callback_url(url), url)
+
+        # いずれかのアドレスが内部のアドレスに解決される場合も拒否する
+        self.assertFalse(is_valid_callback_url("https://example.com/hook", lambda hostname: ["93.184.216.34", "10.0.0.1"]))
+
+    def test_is_valid_callback_url_unresolvable(self):
+        """異常系: ホスト名を解決できないURLは拒否することをテスト"""
+        def resolve(hostname):
+            raise OSError("Name or service not known")
+
+        self.assertFalse(is_valid_callback_url("https://unknown.invalid/hook", resolve))
+
+    def test_sign_payload(self):
+        """正常系: 同じ入力からは同じ署名が作られ、鍵が異なれば署名も異なることをテスト"""
+        signature = sign_payload("secret", "100", b"{}")
+        self.assertTrue(signature.startswith("sha256="))
+        self.assertEqual(signature, sign_payload("secret", "100", b"{}"))
+        self.assertNotEqual(signature, sign_payload("other", "100", b"{}"))
+
+
+class TestWebhookNotifier(unittest.TestCase):
+    """WebhookNotifierのテストクラス"""
+
+    def setUp(self):
+        self.sleeps = []
+        self.mock_dead_letter_store = MagicMock(spec=IDeadLetterStore)
+        self.notifier = WebhookNotifier(
+            dead_letter_store=self.mock_dead_letter_store,
+            max_attempts=3,
+            backoff_base_seconds=0.5,
+            sleep=self.sleeps.append,
+            # テスト用の受信側はループバックアドレスで待ち受けるため、宛先の確認を省く
+            url_validator=lambda url: True,
+        )
+
+    def test_deliver_success_with_signature(self):
+        """正常系: 署名付きでPOSTされ、受信側で署名を検証できることをテスト"""
+        payload = {"request_id": "req-1", "review": {"review_result": "OK"}}
+        with CallbackStandIn([200]) as stand_in:
+            self.assertTrue(self.notifier.notify(stand_in.url, "api-key-value", payload))
+
+        self.assertEqual(len(stand_in.requests), 1)
+        request = stand_in.requests[0]
+        self.assertEqual(json.loads(request["body"]), payload)
+        expected_signature = sign_payload("api-key-value", request["headers"][TIMESTAMP_HEADER], request["body"])
+        self.assertEqual(request["headers"][SIGNATURE_HEADER], expected_signature)
+        self.mock_dead_letter_store.save.assert_not_called()
+
+    def test_deliver_retry_with_backoff(self):
+        """正常系: 5xxの場合に指数バックオフで再送され、成功すればデッドレターにならないことをテスト"""
+        with CallbackStandIn([503, 500, 200]) as stand_in:
+            self.assertTrue(self.notifier.deliver(stand_in.url, "key", {"a": 1}))
+
+        self.assertEqual(len(stand_in.requests), 3)
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+        self.mock_dead_letter_store.save.assert_not_called()
+
+    def test_deliver_dead_letter_after_max_attempts(self):
+        """異常系: 再送上限に達した場合にデッドレターとして記録されることをテスト"""
+        with CallbackStandIn([500, 500, 500]) as stand_in:
+            self.assertFalse(self.notifier.deliver(stand_in.url, "key", {"a": 1}))
+
+        self.assertEqual(len(stand_in.requests), 3)
+        self.mock_dead_letter_store.save.assert_called_once_with(stand_in.url, {"a": 1}, "HTTP 500", 3)
+
+    def test_deliver_no_retry_on_client_error(self):
+        """異常系: 4xx(再送対象外)の場合は再送せずにデッドレターとなることをテスト"""
+        with CallbackStandIn([404]) as stand_in:
+            self.assertFalse(self.notifier.deliver(stand_in.url, "key", {"a": 1}))
+
+        self.assertEqual(len(stand_in.requests), 1)
+        self.assertEqual(self.sleeps, [])
+        self.mock_dead_letter_store.save.assert_called_once_with(stand_in.url, {"a": 1}, "HTTP 404", 1)
+
+    def test_deliver_forbidden_address(self):
+        """異常系: 送信の直前に宛先が内部のアドレスと判定された場合は送信せずにデッドレターとなることをテスト"""
+        self.notifier.url_validator = lambda url: False
+        with CallbackStandIn([200]) as stand_in:
+            self.assertFalse(self.notifier.deliver(stand_in.url, "key", {"a": 1}))
+
+        self.assertEqual(stand_in.requests, [])
+        self.mock_dead_letter_store.save.assert_called_once_with(stand_in.url, {"a": 1}, "ForbiddenAddress", 0)
+
+    def test_deliver_within_deadline(self):
+        """異常系: 再送の待ち時間が期限内に収まらない場合は再送せずにデッドレターとなることをテスト"""
+        with CallbackStandIn([500, 200]) as stand_in:
+            self.assertFalse(self.notifier.deliver(stand_in.url, "key", {"a": 1}, deadline=Deadline.after(5.2)))
+
+        self.assertEqual(len(stand_in.requests), 1)
+        self.assertEqual(self.sleeps, [])
+        self.mock_dead_letter_store.save.assert_called_once_with(stand_in.url, {"a": 1}, "HTTP 500", 1)
+
+    def test_notify_with_queue(self):
+        """正常系: キューが設定されている場合は配信依頼を送るだけで、送信しないことをテスト"""
+        mock_sqs_client = MagicMock()
+        self.notifier.queue = WebhookQueueFromSQS(mock_sqs_client, "https://sqs.example/queue")
+        self.notifier.http = MagicMock()
+
+        self.assertTrue(self.notifier.notify("https://example.com/hook", "key", {"a": 1}))
+
+        self.notifier.http.request.assert_not_called()
+        call_args = mock_sqs_client.send_message.call_args[1]
+        self.assertEqual(call_args["QueueUrl"], "https://sqs.example/queue")
+        self.assertEqual(
+            parse_webhook_message(call_args["MessageBody"]),
+            {"callback_url": "https://example.com/hook", "secret": "key", "payload": {"a": 1}},
+        )
+
+    def test_notify_queue_error(self):
+        """異常系: キューへの送信に失敗した場合は同期的に配信することをテスト"""
+        mock_queue = MagicMock(spec=WebhookQueueFromSQS)
+        mock_queue.enqueue.side_effect = RuntimeError("sqs unavailable")
+        self.notifier.queue = mock_queue
+        with CallbackStandIn([200]) as stand_in:
+            self.assertTrue(self.notifier.notify(stand_in.url, "key", {"a": 1}))
+
+        self.assertEqual(len(stand_in.requests), 1)
+
+    def test_deliver_connection_error(self):
+        """異常系: 接続できない場合に再送後デッドレターとなることをテスト"""
+        with CallbackStandIn([]) as stand_in:
+            url = stand_in.url
+        self.assertFalse(self.notifier.deliver(url, "key", {"a": 1}))
+        self.assertEqual(len(self.sleeps), 2)
+        self.mock_dead_letter_store.save.assert_called_once()
+
+
+class TestDeadLetterFromDynamoDB(unittest.TestCase):
+    """DeadLetterFromDynamoDBのテストクラス"""
+
+    def test_save(self):
+        """正常系: デッドレターがTTL付きでDynamoDBに保存されることをテスト"""
+        mock_client = MagicMock()
+        store = DeadLetterFromDynamoDB(mock_client, "dead-letter-table")
+
+        store.save("https://example.com/hook", {"review": "成功"}, "HTTP 500", 4)
+
+        call_args = mock_client.put_item.call_args[1]
+        self.assertEqual(call_args["TableName"], "dead-letter-table")
+        item = call_args["Item"]
+        self.assertEqual(item["callback_url"]["S"], "https://example.com/hook")
+        self.assertEqual(json.loads(item["payload"]["S"]), {"review": "成功"})
+        self.assertEqual(item["reason"]["S"], "HTTP 500")
+        self.assertEqual(item["attempts"]["N"], "4")
+        self.assertIn("expires_at", item)
@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import MagicMock
+
+from common.deadline import Deadline
+from common.exception import DeadlineExceededError
+
+
+class TestDeadline(unittest.TestCase):
+    """Deadlineのテストクラス"""
+
+    def setUp(self):
+        self.now = 100.0
+        self.clock = lambda: self.now
+
+    def test_remaining_seconds(self):
+        """正常系: 経過時間に応じて残り秒数が減り、期限後は0となることをテスト"""
+        deadline = Deadline.after(10, self.clock)
+        self.assertEqual(deadline.remaining_seconds(), 10)
+        self.assertTrue(deadline.has_time_for(10))
+
+        self.now = 108.0
+        self.assertEqual(deadline.remaining_seconds(), 2)
+        self.assertFalse(deadline.has_time_for(3))
+
+        self.now = 120.0
+        self.assertEqual(deadline.remaining_seconds(), 0)
+
+    def test_check(self):
+        """異常系: 必要な秒数が残っていない場合にDeadlineExceededErrorを送出することをテスト"""
+        deadline = Deadline.after(5, self.clock)
+        deadline.check("operation", 5)
+
+        with self.assertRaises(DeadlineExceededError) as context:
+            deadline.check("operation", 6)
+        self.assertEqual(context.exception.operation, "operation")
+
+        self.now = 105.0
+        with self.assertRaises(DeadlineExceededError):
+            deadline.check("operation")
+
+    def test_from_lambda_context(self):
+        """正常系: Lambdaの残り実行時間から応答を返す余裕を差し引いた期限となることをテスト"""
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 30000
+
+        deadline = Deadline.from_lambda_context(context, safety_margin_seconds=2, clock=self.clock)
+
+        self.assertEqual(deadline.remaining_seconds(), 28)
+
+    def test_from_lambda_context_without_remaining_time(self):
+        """正常系: 残り実行時間を取得できないコンテキストではNoneを返すことをテスト"""
+        self.assertIsNone(Deadline.from_lambda_context(None))
+        self.assertIsNone(Deadline.from_lambda_context(MagicMock()))
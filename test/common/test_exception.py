@@ -1,7 +1,7 @@
 import unittest
 from botocore.exceptions import ClientError
 
-from common.exception import RequestParameterError, Boto3Exception
+from common.exception import RequestParameterError, PayloadTooLargeError, QuotaExceededError, CapacityExceededError, DeadlineExceededError, Boto3Exception
 
 
 class TestRequestParameterError(unittest.TestCase):
@@ -33,6 +33,54 @@ class TestRequestParameterError(unittest.TestCase):
         self.assertEqual(str(error), f"パラメータ '{param_name}' のフォーマットが不正です。理由: {reason}")
 
 
+class TestPayloadTooLargeError(unittest.TestCase):
+    """PayloadTooLargeErrorのテストクラス"""
+
+    def test_exceeded(self):
+        """正常系: exceededクラスメソッドが正しい例外を生成することをテスト"""
+        error = PayloadTooLargeError.exceeded("source", "1024 bytes")
+        self.assertIsInstance(error, RequestParameterError)
+        self.assertEqual(error.parameter_name, "source")
+        self.assertEqual(str(error), "パラメータ 'source' のサイズが上限(1024 bytes)を超えています。")
+
+
+class TestQuotaExceededError(unittest.TestCase):
+    """QuotaExceededErrorのテストクラス"""
+
+    def test_token_budget(self):
+        """正常系: token_budgetクラスメソッドが再試行までの秒数を持つ例外を生成することをテスト"""
+        error = QuotaExceededError.token_budget(1000, 60)
+        self.assertEqual(error.retry_after_seconds, 60)
+        self.assertEqual(str(error), "1日あたりのトークン予算(1000 tokens)を超えています。")
+
+
+class TestCapacityExceededError(unittest.TestCase):
+    """CapacityExceededErrorのテストクラス"""
+
+    def test_tokens_per_minute(self):
+        """正常系: tokens_per_minuteクラスメソッドが再試行までの秒数を持つ例外を生成することをテスト"""
+        error = CapacityExceededError.tokens_per_minute(5)
+        self.assertIsInstance(error, QuotaExceededError)
+        self.assertEqual(error.retry_after_seconds, 5)
+        self.assertEqual(str(error), "混雑しているため、しばらくしてから再度実行してください。")
+
+
+class TestDeadlineExceededError(unittest.TestCase):
+    """DeadlineExceededErrorのテストクラス"""
+
+    def test_before(self):
+        """正常系: beforeクラスメソッドが残り時間を含むメッセージの例外を生成することをテスト"""
+        error = DeadlineExceededError.before("bedrock:Converse", 1.25)
+        self.assertEqual(error.operation, "bedrock:Converse")
+        self.assertEqual(str(error), "残り時間(1.2秒)では 'bedrock:Converse' を完了できません。")
+
+    def test_timed_out(self):
+        """正常系: timed_outクラスメソッドが操作名を持つ例外を生成することをテスト"""
+        error = DeadlineExceededError.timed_out("bedrock:Converse")
+        self.assertEqual(error.operation, "bedrock:Converse")
+        self.assertEqual(str(error), "'bedrock:Converse' が期限までに完了しませんでした。")
+
+
 class TestBoto3Exception(unittest.TestCase):
     """Boto3Exceptionのテストクラス"""
 
@@ -0,0 +1,37 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from common import json_codec
+
+
+class TestJsonCodec(unittest.TestCase):
+    """json_codecのテストクラス(orjsonの有無の両方で同じ結果になることを確認)"""
+
+    def setUp(self):
+        self.value = {"review_result": "NG", "review_points": [{"codeline": 1, "details": "日本語の\"説明\"\n"}]}
+
+    def _assert_codec(self):
+        text = json_codec.dumps(self.value)
+        self.assertIsInstance(text, str)
+        self.assertIn("日本語", text)
+        self.assertEqual(text, json.dumps(self.value, ensure_ascii=False, separators=(",", ":")))
+        self.assertEqual(json_codec.dumps_bytes(self.value), text.encode("utf-8"))
+        self.assertEqual(json_codec.loads(text), self.value)
+        self.assertEqual(json_codec.loads(text.encode("utf-8")), self.value)
+        with self.assertRaises(json.JSONDecodeError):
+            json_codec.loads("not json")
+
+    def test_default_codec(self):
+        """正常系: 既定のコーデックで変換・解析できることをテスト"""
+        self._assert_codec()
+
+    def test_stdlib_fallback(self):
+        """正常系: orjsonがない場合に標準ライブラリで同じ結果になることをテスト"""
+        with patch("common.json_codec.orjson", None):
+            self.assertEqual(json_codec.codec_name(), "json")
+            self._assert_codec()
+
+    def test_unsupported_value_falls_back(self):
+        """正常系: orjsonが扱えない大きな整数も変換できることをテスト"""
+        self.assertEqual(json_codec.dumps({"n": 2 ** 70}), '{"n":%d}' % (2 ** 70))
@@ -0,0 +1,36 @@
+import json
+import base64
+import unittest
+
+from common.request import get_api_key_id, get_header, get_query_parameter, load_json_body
+
+
+class TestRequest(unittest.TestCase):
+    """requestモジュールのテストクラス"""
+
+    def test_get_header(self):
+        """正常系: ヘッダー名の大文字・小文字を区別せずに値が取得できることをテスト"""
+        event = {"headers": {"Accept-Encoding": "gzip"}}
+        self.assertEqual(get_header(event, "accept-encoding"), "gzip")
+        self.assertIsNone(get_header(event, "x-api-key"))
+        self.assertIsNone(get_header({"headers": None}, "x-api-key"))
+
+    def test_get_query_parameter(self):
+        """正常系: クエリ文字列パラメータが取得できることをテスト"""
+        self.assertEqual(get_query_parameter({"queryStringParameters": {"fields": "a"}}, "fields"), "a")
+        self.assertIsNone(get_query_parameter({"queryStringParameters": None}, "fields"))
+
+    def test_get_api_key_id(self):
+        """正常系: requestContextからAPIキーIDが取得でき、ない場合はNoneとなることをテスト"""
+        event = {"requestContext": {"identity": {"apiKeyId": "abc123"}}}
+        self.assertEqual(get_api_key_id(event), "abc123")
+        self.assertIsNone(get_api_key_id({}))
+        self.assertIsNone(get_api_key_id({"requestContext": {"identity": None}}))
+
+    def test_load_json_body(self):
+        """正常系: 文字列・辞書・Base64化されたボディがそれぞれ解析できることをテスト"""
+        body = {"language": "日本語"}
+        self.assertEqual(load_json_body({"body": json.dumps(body)}), body)
+        self.assertEqual(load_json_body({"body": body}), body)
+        encoded = base64.b64encode(json.dumps(body).encode("utf-8")).decode("ascii")
+        self.assertEqual(load_json_body({"body": encoded, "isBase64Encoded": True}), body)
@@ -1,7 +1,10 @@
+import gzip
 import json
+import base64
 import unittest
+from unittest.mock import patch
 
-from common.response import ApiResponseBuilder
+from common.response import ApiResponseBuilder, negotiate_encoding, parse_fields
 
 
 class TestApiResponseBuilder(unittest.TestCase):
@@ -72,7 +75,7 @@ class TestApiResponseBuilder(unittest.TestCase):
         expected = {
             "statusCode": 200,
             "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(body, ensure_ascii=False)
+            "body": json.dumps(body, ensure_ascii=False, separators=(",", ":"))
         }
         self.assertEqual(response, expected)
 
@@ -97,6 +100,35 @@ class TestApiResponseBuilder(unittest.TestCase):
         self.assertEqual(response["statusCode"], 400)
         self.assertEqual(json.loads(response["body"]), expected_body)
 
+    def test_payload_too_large_static_method(self):
+        """正常系: payload_too_large静的メソッドが413エラーレスポンスを生成することをテスト"""
+        response = ApiResponseBuilder.payload_too_large("Too large")
+        self.assertEqual(response["statusCode"], 413)
+        self.assertEqual(json.loads(response["body"]), {"message": "Too large"})
+
+    def test_too_many_requests_static_method(self):
+        """正常系: too_many_requests静的メソッドがRetry-Afterヘッダー付きの429エラーレスポンスを生成することをテスト"""
+        response = ApiResponseBuilder.too_many_requests("Slow down", retry_after_seconds=30)
+        self.assertEqual(response["statusCode"], 429)
+        self.assertEqual(response["headers"]["Retry-After"], "30")
+        self.assertEqual(json.loads(response["body"]), {"message": "Slow down"})
+
+        response = ApiResponseBuilder.too_many_requests("Slow down")
+        self.assertNotIn("Retry-After", response["headers"])
+
+    def test_service_unavailable_static_method(self):
+        """正常系: service_unavailable静的メソッドがRetry-Afterヘッダー付きの503エラーレスポンスを生成することをテスト"""
+        response = ApiResponseBuilder.service_unavailable("Busy", retry_after_seconds=5)
+        self.assertEqual(response["statusCode"], 503)
+        self.assertEqual(response["headers"]["Retry-After"], "5")
+        self.assertEqual(json.loads(response["body"]), {"message": "Busy"})
+
+    def test_gateway_timeout_static_method(self):
+        """正常系: gateway_timeout静的メソッドが504エラーレスポンスを生成することをテスト"""
+        response = ApiResponseBuilder.gateway_timeout("Timed out")
+        self.assertEqual(response["statusCode"], 504)
+        self.assertEqual(json.loads(response["body"]), {"message": "Timed out"})
+
     def test_internal_server_error_static_method(self):
         """正常系: internal_server_error静的メソッドが500エラーレスポンスを生成することをテスト"""
         response_default = ApiResponseBuilder.internal_server_error()
@@ -108,4 +140,94 @@ class TestApiResponseBuilder(unittest.TestCase):
         """正常系: 日本語を含むJSONボディがensure_ascii=Falseでダンプされることをテスト"""
         body_dict = {"message": "成功"}
         response = ApiResponseBuilder().with_body(body_dict).build()
-        self.assertEqual(response["body"], '{"message": "成功"}')
+        self.assertEqual(response["body"], '{"message":"成功"}')
+
+
+class TestApiResponseBuilderCompression(unittest.TestCase):
+    """ApiResponseBuilderの圧縮に関するテストクラス"""
+
+    def setUp(self):
+        self.body = {"review_points": [{"details": "変数名が処理内容を表していません。" * 20}] * 10}
+
+    def test_gzip_compression(self):
+        """正常系: gzipを受け付ける場合に、しきい値以上のボディがBase64化したgzipで返ることをテスト"""
+        response = ApiResponseBuilder() \
+            .with_body(self.body) \
+            .with_compression("gzip, deflate") \
+            .build()
+
+        self.assertTrue(response["isBase64Encoded"])
+        self.assertEqual(response["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(response["headers"]["Vary"], "Accept-Encoding")
+        decompressed = gzip.decompress(base64.b64decode(response["body"]))
+        self.assertEqual(json.loads(decompressed), self.body)
+
+    def test_small_body_not_compressed(self):
+        """正常系: しきい値未満のボディは圧縮されないことをテスト"""
+        response = ApiResponseBuilder() \
+            .with_body({"message": "ok"}) \
+            .with_compression("gzip") \
+            .build()
+
+        self.assertNotIn("isBase64Encoded", response)
+        self.assertNotIn("Content-Encoding", response["headers"])
+        self.assertEqual(json.loads(response["body"]), {"message": "ok"})
+
+    def test_no_accept_encoding(self):
+        """正常系: Accept-Encodingがない、または受け付けない場合は圧縮されないことをテスト"""
+        for accept_encoding in (None, "identity", "gzip;q=0"):
+            response = ApiResponseBuilder() \
+                .with_body(self.body) \
+                .with_compression(accept_encoding) \
+                .build()
+            self.assertNotIn("isBase64Encoded", response)
+
+    @patch("common.response.brotli")
+    def test_negotiate_encoding_prefers_brotli(self, mock_brotli):
+        """正常系: brotliが利用可能な場合に品質値に応じてbrが選ばれることをテスト"""
+        self.assertEqual(negotiate_encoding("gzip, br"), "br")
+        self.assertEqual(negotiate_encoding("gzip;q=1.0, br;q=0.5"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), "br")
+
+    @patch("common.response.brotli", None)
+    def test_negotiate_encoding_without_brotli(self):
+        """正常系: brotliが利用できない場合はgzipが選ばれることをテスト"""
+        self.assertEqual(negotiate_encoding("br, gzip"), "gzip")
+        self.assertIsNone(negotiate_encoding("br"))
+
+
+class TestApiResponseBuilderFields(unittest.TestCase):
+    """ApiResponseBuilderの項目絞り込みに関するテストクラス"""
+
+    def setUp(self):
+        self.body = {
+            "review_result": "NG",
+            "review_points": [
+                {"location": "main", "codeline": 3, "category": "Readability",
+                 "overview": "概要", "details": "詳細", "suggestion": "提案"},
+            ],
+        }
+
+    def test_parse_fields(self):
+        """正常系: ドット区切りの親項目が後続の項目に引き継がれることをテスト"""
+        self.assertEqual(
+            parse_fields("review_result, review_points.location,codeline"),
+            {"review_result": {}, "review_points": {"location": {}, "codeline": {}}},
+        )
+
+    def test_with_fields(self):
+        """正常系: 指定した項目だけがJSONボディに含まれることをテスト"""
+        response = ApiResponseBuilder() \
+            .with_body(self.body) \
+            .with_fields("review_result,review_points.location,codeline,overview") \
+            .build()
+
+        self.assertEqual(json.loads(response["body"]), {
+            "review_result": "NG",
+            "review_points": [{"location": "main", "codeline": 3, "overview": "概要"}],
+        })
+
+    def test_with_fields_none(self):
+        """正常系: 項目指定がない場合はボディ全体が返ることをテスト"""
+        response = ApiResponseBuilder().with_body(self.body).with_fields(None).build()
+        self.assertEqual(json.loads(response["body"]), self.body)
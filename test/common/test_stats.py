@@ -0,0 +1,23 @@
+import unittest
+
+from common.stats import percentile, percentiles
+
+
+class TestStats(unittest.TestCase):
+    """statsモジュールのテストクラス"""
+
+    def test_percentile(self):
+        """正常系: 最近傍順位法でパーセンタイル値が求まることをテスト"""
+        values = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 90), 9)
+        self.assertEqual(percentile(values, 100), 10)
+        self.assertEqual(percentile(values, 0), 1)
+
+    def test_percentile_empty(self):
+        """正常系: 値が空の場合に0.0が返ることをテスト"""
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_percentiles(self):
+        """正常系: 複数のパーセンタイル値がまとめて求まることをテスト"""
+        self.assertEqual(percentiles([1, 2, 3, 4], (50, 99)), {"p50": 2, "p99": 4})